@@ -0,0 +1,517 @@
+"""
+有权限的常驻代理
+
+以管理员（root）身份运行一个代理进程，由它持有 NetManage 和后端（PowerShell 会话池 / netlink 套接字），
+界面、命令行和计划任务以普通用户身份通过本地套接字发送请求，不必再以管理员身份重启整个程序。
+多个客户端共用代理中的缓存和已启动的 PowerShell 进程；修改时在代理中读取当前配置、比较并执行，
+同一网卡的修改依次进行，不会按客户端缓存中过期的配置计算修改。
+
+- 地址：Linux 等为 Unix 域套接字（默认 /run/netset-agent.sock），Windows 为 127.0.0.1 上的 TCP 端口；
+  环境变量 NETSET_AGENT 可指定（"路径" 或 "主机:端口"）
+- 协议：每帧为 4 字节大端长度 + UTF-8 JSON
+    请求 {"id": 1, "op": "adapter_info", "args": {"Name": "以太网"}}
+    响应 {"id": 1, "ok": true, "result": ...} 或 {"id": 1, "ok": false, "error": "..."}
+- 权限：Unix 域套接字按对端 uid 检查（root、代理自身的用户和 sudo 启动代理的用户）；
+  TCP 连接的第一帧必须是 {"op": "auth", "args": {"token": ...}}，令牌写在只有当前用户可读的文件中
+  （每次启动删除后重新创建，不沿用其他用户预先创建的文件或符号链接，客户端读取前检查所有者）；
+  在多台主机上运行并由 fleet.py 统一下发时，用环境变量 NETSET_AGENT_TOKEN 指定相同的令牌
+
+启动：python -m netset agent
+使用：NETSET_BACKEND=agent，或 main.py 在没有管理员权限且代理在运行时自动使用 AgentBackend
+"""
+import hmac
+import json
+import os
+import secrets
+import socket
+import socketserver
+import struct
+import sys
+import tempfile
+import threading
+from typing import Optional, Union
+
+import tracing
+from backend import BackendError, NetBackend
+from function import NetManage
+from models import AdapterInfo, AdapterSnapshot, ApplyResult
+
+_HEADER = struct.Struct('>I')
+HEADER_SIZE = _HEADER.size
+MAX_FRAME = 1 << 20  # 单帧最大字节数
+DEFAULT_UNIX_PATH = '/run/netset-agent.sock'
+DEFAULT_TCP_ADDRESS = ('127.0.0.1', 47631)
+TOKEN_FILE = os.path.join(tempfile.gettempdir(), 'netset-agent.token')
+READ_OPS = frozenset(('ping', 'snapshot', 'adapter_info'))  # 可以安全重发的请求
+
+
+class AgentError(BackendError):
+    """连接代理失败或代理返回错误"""
+
+
+def parse_address(value: str) -> Union[str, tuple]:
+    """"主机:端口" 转为 (主机, 端口)，其他视为 Unix 套接字路径"""
+    host, sep, port = value.rpartition(':')
+    if sep and port.isdigit() and not value.startswith('/'):
+        return host or '127.0.0.1', int(port)
+    return value
+
+
+def default_address() -> Union[str, tuple]:
+    """代理地址：环境变量 NETSET_AGENT，否则按平台选择"""
+    if value := os.environ.get('NETSET_AGENT', ''):
+        return parse_address(value)
+    if hasattr(socket, 'AF_UNIX') and os.name != 'nt':
+        return DEFAULT_UNIX_PATH
+    return DEFAULT_TCP_ADDRESS
+
+
+# ---- 分帧 ----
+
+def encode_frame(message: dict) -> bytes:
+    """消息编码为一帧（长度 + JSON）"""
+    data = json.dumps(message, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    if len(data) > MAX_FRAME:
+        raise ValueError('消息过长（%d 字节）' % len(data))
+    return _HEADER.pack(len(data)) + data
+
+
+def frame_size(header: bytes) -> int:
+    """帧头中的长度，超过 MAX_FRAME 时抛出 ConnectionError"""
+    size, = _HEADER.unpack(header)
+    if size > MAX_FRAME:
+        raise ConnectionError('帧过长（%d 字节）' % size)
+    return size
+
+
+def decode_frame(body: bytes) -> dict:
+    message = json.loads(body.decode('utf-8'))
+    if not isinstance(message, dict):
+        raise ConnectionError('帧不是 JSON 对象')
+    return message
+
+
+def send_frame(sock: socket.socket, message: dict):
+    sock.sendall(encode_frame(message))
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 16))
+        if not chunk:
+            raise ConnectionError('连接已关闭')
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def recv_frame(sock: socket.socket) -> dict:
+    """读取一帧，对端关闭时抛出 ConnectionError"""
+    return decode_frame(_recv_exactly(sock, frame_size(_recv_exactly(sock, HEADER_SIZE))))
+
+
+# ---- 令牌文件 ----
+
+def write_token_file(path: str, content: str):
+    """创建只有当前用户可读写的令牌文件
+
+    令牌文件默认在公共的临时目录中，其他用户可以预先创建同名文件（或指向其他文件的符号链接）
+    以读取令牌，因此先删除已有的文件，再以 O_EXCL | O_NOFOLLOW 创建并检查所有者和权限。
+
+    Raises:
+        OSError: 无法删除已有的文件（如其他用户在带粘滞位的目录中创建的），或创建期间被抢先创建
+    """
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_NOFOLLOW', 0), 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        if hasattr(os, 'geteuid'):
+            stat = os.fstat(fd)
+            if stat.st_uid != os.geteuid() or stat.st_mode & 0o077:
+                raise PermissionError('令牌文件 %s 的所有者或权限不正确' % path)
+        f.write(content)
+
+
+def read_token_file(path: str) -> str:
+    """读取令牌文件中的令牌，文件不属于 root 或当前用户、其他用户可以写入时抛出 PermissionError"""
+    fd = os.open(path, os.O_RDONLY | getattr(os, 'O_NOFOLLOW', 0))
+    with os.fdopen(fd, 'r', encoding='utf-8') as f:
+        if hasattr(os, 'geteuid'):
+            stat = os.fstat(fd)
+            if stat.st_uid not in (0, os.geteuid()) or stat.st_mode & 0o022:
+                raise PermissionError('令牌文件 %s 的所有者或权限不正确' % path)
+        return f.read().split()[-1]
+
+
+# ---- 代理 ----
+
+class _Handler(socketserver.BaseRequestHandler):
+    """一个客户端连接：依次处理请求直到断开"""
+
+    def handle(self):
+        agent: AgentServer = self.server.agent
+        if not agent.authorize(self.request):
+            return
+        agent.clients += 1
+        agent.connections.add(self.request)
+        try:
+            while True:
+                try:
+                    request = recv_frame(self.request)
+                except (ConnectionError, OSError, ValueError):
+                    return
+                send_frame(self.request, agent.dispatch(request))
+        except OSError:
+            pass
+        finally:
+            agent.connections.discard(self.request)
+            agent.clients -= 1
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class AgentServer:
+    """代理服务
+
+    Attributes:
+        net (NetManage): 所有客户端共用的网络管理实例（缓存和后端会话保持预热）
+        address: 监听地址（Unix 套接字路径或 (主机, 端口)）
+        allowed_uids (set): Unix 套接字允许连接的用户
+        clients (int): 当前连接数
+        connections (set): 当前连接的套接字，停止时全部断开
+    """
+
+    def __init__(self, net: NetManage = None, address: Union[str, tuple] = None,
+                 allowed_uids: set = None, token_file: str = TOKEN_FILE, token: str = None):
+        self.net: NetManage = net or NetManage()
+        self.address: Union[str, tuple] = address or default_address()
+        self.token_file: str = token_file
+        self.clients: int = 0
+        self.connections: set = set()
+        self._token: str = token or os.environ.get('NETSET_AGENT_TOKEN', '')
+        self._server: Optional[socketserver.BaseServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+        if allowed_uids is None:
+            allowed_uids = {0}
+            if hasattr(os, 'geteuid'):
+                allowed_uids.add(os.geteuid())
+            if os.environ.get('SUDO_UID', '').isdigit():
+                allowed_uids.add(int(os.environ['SUDO_UID']))
+        self.allowed_uids: set = allowed_uids
+
+        self._ops = {
+            'ping': self._ping,
+            'snapshot': self._snapshot,
+            'adapter_info': self._adapter_info,
+            'apply': self._apply,
+            'clear': self._clear,
+            'change_ip': self._change_ip,
+            'dhcp': self._dhcp,
+        }
+
+    @property
+    def is_unix(self) -> bool:
+        return isinstance(self.address, str)
+
+    # ---- 生命周期 ----
+
+    def start(self) -> 'AgentServer':
+        """开始监听（在后台线程中处理连接）"""
+        if self.is_unix:
+            if os.path.exists(self.address):
+                os.unlink(self.address)  # 上次异常退出留下的套接字文件
+            self._server = _UnixServer(self.address, _Handler)
+            os.chmod(self.address, 0o666)  # 连接权限由 authorize 按 uid 检查
+        else:
+            self._server = _TCPServer(self.address, _Handler)
+            self.address = self._server.server_address[:2]  # 端口为 0 时取实际端口
+            self._token = self._token or secrets.token_hex(16)
+            try:
+                write_token_file(self.token_file, '%s:%d\n%s\n' % (self.address[0], self.address[1], self._token))
+            except OSError as e:
+                self._server.server_close()
+                self._server = None
+                raise AgentError('无法写入令牌文件 %s：%s' % (self.token_file, e)) from e
+        self._server.agent = self
+        self._thread = threading.Thread(target=self._server.serve_forever, name='netset-agent', daemon=True)
+        self._thread.start()
+        print('代理已启动：%s' % (self.address if self.is_unix else '%s:%d' % self.address))
+        return self
+
+    def serve_forever(self):
+        """启动并阻塞到 Ctrl+C"""
+        self.start()
+        try:
+            self._thread.join()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def stop(self):
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        for sock in list(self.connections):
+            try:
+                sock.shutdown(socket.SHUT_RDWR)  # 与进程退出一样断开客户端，处理线程随之结束
+            except OSError:
+                pass
+        if self.is_unix and os.path.exists(self.address):
+            os.unlink(self.address)
+        elif not self.is_unix and os.path.exists(self.token_file):
+            os.unlink(self.token_file)
+        self.net.backend.close()
+        print('代理已停止')
+
+    # ---- 请求 ----
+
+    def authorize(self, sock: socket.socket) -> bool:
+        """检查连接的对端：Unix 套接字按 uid，TCP 按第一帧中的令牌"""
+        if self.is_unix:
+            if not hasattr(socket, 'SO_PEERCRED'):
+                return True  # 无法取得对端身份的平台依赖套接字文件权限
+            _, uid, _ = struct.unpack('3i', sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED,
+                                                            struct.calcsize('3i')))
+            if uid in self.allowed_uids:
+                return True
+            print('拒绝 uid %d 的连接' % uid)
+            return False
+        try:
+            request = recv_frame(sock)
+        except (ConnectionError, OSError, ValueError):
+            return False
+        token = str((request.get('args') or {}).get('token', ''))
+        ok = request.get('op') == 'auth' and hmac.compare_digest(token, self._token)
+        send_frame(sock, {'id': request.get('id'), 'ok': ok, 'error': '' if ok else '令牌错误'})
+        return ok
+
+    def dispatch(self, request: dict) -> dict:
+        """执行一个请求，返回响应（不抛出异常）"""
+        op = self._ops.get(request.get('op'))
+        if op is None:
+            return {'id': request.get('id'), 'ok': False, 'error': '未知的请求：%s' % request.get('op')}
+        try:
+            with tracing.span('agent.' + request['op']):
+                result = op(**(request.get('args') or {}))
+        except BackendError as e:
+            return {'id': request.get('id'), 'ok': False, 'error': str(e)}
+        except (TypeError, ValueError, KeyError) as e:
+            return {'id': request.get('id'), 'ok': False, 'error': '请求参数错误：%s' % e}
+        except Exception as e:  # 代理常驻，单个请求出错不影响其他请求和连接
+            print('处理请求 %s 出错：%r' % (request.get('op'), e))
+            return {'id': request.get('id'), 'ok': False, 'error': '代理内部错误：%s' % e}
+        return {'id': request.get('id'), 'ok': True, 'result': result}
+
+    def _ping(self) -> dict:
+        return {'pid': os.getpid(), 'backend': self.net.backend.name, 'clients': self.clients,
+                'cache': self.net.cache.stats()}
+
+    def _snapshot(self) -> list:
+        # 直接调用后端以便把错误返回给客户端；结果同时写入代理的缓存
+        snapshot = self.net.backend.snapshot()
+        for info in snapshot.values():
+            self.net.cache.put(info.name, info.as_tuple())
+        return [info._asdict() for info in snapshot.values()]
+
+    def _adapter_info(self, Name: str) -> list:
+        cached = self.net.cache.get(Name)
+        if cached is not None:
+            return list(cached)
+        info = self.net.backend.adapter_info(Name)
+        if info[0] or info[4]:
+            self.net.cache.put(Name, info)
+        return list(info)
+
+    def _apply(self, Name: str, operations: list, var: list) -> dict:
+        var = (var[0], var[1], var[2], tuple(var[3]))
+        with self.net.adapter_lock(Name):
+            self.net.cache.invalidate(Name)
+            result = self.net.backend.apply(Name, tuple(operations), var)
+        return result._asdict()
+
+    def _change_ip(self, Name: str, var: list, minimal: bool = True) -> dict:
+        """在代理中比较并修改（批量下发时使用，读取当前配置和修改在同一把锁内完成）"""
+        return self.net.change_adapter_ip(Name, (var[0], var[1], var[2], tuple(var[3])), minimal)._asdict()
+
+    def _dhcp(self, Name: str) -> dict:
+        return self.net.up_dhcp(Name)._asdict()
+
+    def _clear(self, Name: str) -> None:
+        with self.net.adapter_lock(Name):
+            self.net.cache.invalidate(Name)
+            self.net.backend.clear(Name)
+
+
+# ---- 客户端 ----
+
+class AgentClient:
+    """代理的客户端，每个线程使用各自的连接（多个线程可以同时发送请求）"""
+
+    def __init__(self, address: Union[str, tuple] = None, timeout: float = 120.0, connect_timeout: float = 2.0,
+                 token_file: str = TOKEN_FILE, token: str = None):
+        """
+        Args:
+            address: 代理地址，默认见 default_address
+            timeout (float): 等待响应的超时（秒），修改网卡可能需要较长时间
+            connect_timeout (float): 连接和认证的超时（秒），代理未运行时尽快返回
+            token_file (str): TCP 连接使用的令牌文件
+            token (str): 直接指定令牌，默认读取环境变量 NETSET_AGENT_TOKEN，再读取令牌文件
+        """
+        self.address: Union[str, tuple] = address or default_address()
+        self.timeout: float = timeout
+        self.connect_timeout: float = connect_timeout
+        self.token_file: str = token_file
+        self.token: str = token or os.environ.get('NETSET_AGENT_TOKEN', '')
+        self._local = threading.local()
+        self._ids = iter(range(1, sys.maxsize))
+        self._connections: list = []
+        self._lock = threading.Lock()
+
+    def _connect(self) -> socket.socket:
+        if isinstance(self.address, str):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.settimeout(self.connect_timeout)
+        try:
+            sock.connect(self.address)
+            if not isinstance(self.address, str):
+                token = self.token
+                if not token:
+                    token = read_token_file(self.token_file)
+                send_frame(sock, {'id': 0, 'op': 'auth', 'args': {'token': token}})
+                if not recv_frame(sock).get('ok'):
+                    raise AgentError('代理拒绝连接：令牌错误')
+        except (OSError, ConnectionError, IndexError) as e:
+            sock.close()
+            raise AgentError('无法连接代理 %s：%s' % (self.address, e)) from e
+        sock.settimeout(self.timeout)
+        with self._lock:
+            self._connections.append(sock)
+        return sock
+
+    def request(self, op: str, **args):
+        """发送请求并等待结果，代理返回错误时抛出 AgentError
+
+        连接中断时读取类请求（READ_OPS）重新连接后重发一次；修改类请求只在发送失败
+        （代理肯定没有收到）时重发，已发出后中断或超时的不重发（代理可能仍在执行，重发会修改两次）。
+        """
+        with self._lock:
+            request_id = next(self._ids)
+        message = {'id': request_id, 'op': op, 'args': args}
+        for attempt in (1, 2):
+            sock = getattr(self._local, 'sock', None)
+            if sock is not None and op not in READ_OPS and self._closed(sock):
+                self._drop(sock)  # 代理重启后旧连接失效，修改类请求发送前先重新连接
+                sock = None
+            if sock is None:
+                sock = self._local.sock = self._connect()
+            sent = False
+            try:
+                send_frame(sock, message)
+                sent = True
+                response = recv_frame(sock)
+                break
+            except (OSError, ConnectionError) as e:
+                self._drop(sock)
+                if attempt == 2 or (sent and op not in READ_OPS):
+                    raise AgentError('与代理的连接中断：%s' % e) from e
+        if not response.get('ok'):
+            raise AgentError(response.get('error') or '代理返回错误')
+        return response.get('result')
+
+    def _closed(self, sock: socket.socket) -> bool:
+        """连接是否已被代理关闭（不阻塞）"""
+        sock.setblocking(False)
+        try:
+            return sock.recv(1, socket.MSG_PEEK) == b''
+        except (BlockingIOError, InterruptedError):
+            return False
+        except OSError:
+            return True
+        finally:
+            sock.settimeout(self.timeout)
+
+    def _drop(self, sock: socket.socket):
+        self._local.sock = None
+        with self._lock:
+            if sock in self._connections:
+                self._connections.remove(sock)
+        sock.close()
+
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for sock in connections:
+            sock.close()
+        self._local = threading.local()
+
+
+class AgentBackend(NetBackend):
+    """通过代理读写网络配置的后端（本进程不需要管理员权限）"""
+
+    name = 'agent'
+
+    def __init__(self, client: AgentClient = None):
+        self.client: AgentClient = client or AgentClient()
+
+    def snapshot(self) -> AdapterSnapshot:
+        snapshot = AdapterSnapshot()
+        for item in self.client.request('snapshot'):
+            item['dns'] = tuple(item.get('dns') or ())
+            info = AdapterInfo(**item)
+            snapshot[info.index] = info
+        return snapshot
+
+    def adapter_info(self, Name: str) -> tuple:
+        address, mask, gateway, dns, dhcp = self.client.request('adapter_info', Name=Name)
+        return address, mask, gateway, tuple(dns), dhcp
+
+    @staticmethod
+    def _result(result: dict) -> ApplyResult:
+        result['operations'] = tuple(result.get('operations') or ())
+        return ApplyResult(**result)
+
+    def apply(self, Name: str, operations: tuple, var: tuple) -> ApplyResult:
+        return self._result(self.client.request('apply', Name=Name, operations=list(operations),
+                                                var=[var[0], var[1], var[2], list(var[3])]))
+
+    def change_ip(self, Name: str, var: tuple, minimal: bool = True) -> ApplyResult:
+        # 在代理中读取当前配置、比较并修改，都在代理的同一把锁内：
+        # 多个客户端同时修改同一网卡时，不会按各自缓存中过期的配置比较、只执行部分修改
+        return self._result(self.client.request('change_ip', Name=Name, var=[var[0], var[1], var[2], list(var[3])],
+                                                minimal=minimal))
+
+    def dhcp(self, Name: str) -> ApplyResult:
+        return self._result(self.client.request('dhcp', Name=Name))
+
+    def clear(self, Name: str):
+        self.client.request('clear', Name=Name)
+
+    def close(self):
+        self.client.close()
+
+
+def connect_backend(address: Union[str, tuple] = None) -> Optional[AgentBackend]:
+    """代理在运行时返回 AgentBackend，否则返回 None"""
+    backend = AgentBackend(AgentClient(address))
+    try:
+        backend.client.request('ping')
+    except AgentError:
+        backend.close()
+        return None
+    return backend
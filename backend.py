@@ -0,0 +1,254 @@
+"""
+网络配置后端
+
+NetManage 只负责缓存、修改计划和结果提示，实际的读取和修改由后端完成：
+- PowerShellBackend：Windows，在常驻 PowerShell 会话中执行脚本
+- NetlinkBackend（netlink.py）：Linux，直接通过 rtnetlink 套接字读写，不创建子进程
+"""
+import json
+import os
+import sys
+from abc import ABC, abstractmethod
+from typing import Optional
+
+import scripts
+import tracing
+from models import AdapterInfo, AdapterSnapshot, ApplyResult
+from shell import SessionPool, ShellError, ShellSession, get_shared_pool
+from tools import subnet_converter
+
+
+def is_admin() -> bool:
+    """当前进程是否有修改网络配置的权限（Windows 为管理员，其他平台为 root）"""
+    if os.name != 'nt':
+        return os.geteuid() == 0
+    import ctypes
+    try:
+        return bool(ctypes.windll.shell32.IsUserAnAdmin())
+    except Exception:
+        return False
+
+
+class BackendError(RuntimeError):
+    """后端读取或修改网络配置失败"""
+
+
+class NetBackend(ABC):
+    """网络配置后端接口
+
+    读取方法返回与 get_adapter_info 相同的元组格式
+    (IP地址, 子网掩码, 默认网关, DNS服务器列表, DHCP状态)，
+    失败时抛出 BackendError。
+    """
+
+    name: str = ''
+
+    @abstractmethod
+    def snapshot(self) -> AdapterSnapshot:
+        """获取所有活动网卡及其 IPv4 配置"""
+
+    @abstractmethod
+    def adapter_info(self, Name: str) -> tuple:
+        """获取单个网卡的配置"""
+
+    @abstractmethod
+    def apply(self, Name: str, operations: tuple, var: tuple) -> ApplyResult:
+        """执行修改操作（见 scripts.OPERATIONS），失败时恢复修改前的配置
+
+        Returns:
+            ApplyResult: ok / gap / rolled_back / error 由后端填写，
+                提示信息和总耗时由 NetManage 填写
+        """
+
+    @abstractmethod
+    def clear(self, Name: str):
+        """清除网卡的 IP、网关和 DNS 配置并关闭 DHCP"""
+
+    def change_ip(self, Name: str, var: tuple, minimal: bool = True) -> Optional[ApplyResult]:
+        """由后端自己读取当前配置、比较并修改（如代理，在它的同一把锁内完成），返回 None 表示由 NetManage 比较后调用 apply"""
+        return None
+
+    def dhcp(self, Name: str) -> Optional[ApplyResult]:
+        """同 change_ip，启用DHCP"""
+        return None
+
+    def reserve(self, workers: int):
+        """准备从 workers 个线程同时调用（如 apply_many），需要时扩大后端的并发数，默认不需要"""
+
+    def close(self):
+        """释放后端占用的资源"""
+
+
+class PowerShellBackend(NetBackend):
+    """基于常驻 PowerShell 会话的 Windows 后端
+
+    Attributes:
+        session (ShellSession | SessionPool): 执行脚本的会话，默认为与其他实例共享的会话池，
+            多个线程（如同时修改多个网卡）可以在不同的 PowerShell 进程中并行执行
+    """
+
+    name = 'powershell'
+
+    _SNAPSHOT_SCRIPT = '''
+        $adapters = @(Get-NetAdapter | Where-Object { $_.Status -eq 'up' -and $_.InterfaceAlias -notlike 'Tailscale' })
+        $index = @($adapters | ForEach-Object { $_.ifIndex })
+        [PSCustomObject]@{
+            Adapters = @($adapters | Select-Object Name, InterfaceIndex, InterfaceAlias, InterfaceDescription)
+            Addresses = @(Get-NetIPAddress -AddressFamily IPv4 -ErrorAction SilentlyContinue |
+                Where-Object { $index -contains $_.InterfaceIndex } |
+                Select-Object InterfaceIndex, IPAddress, PrefixLength)
+            Routes = @(Get-NetRoute -AddressFamily IPv4 -DestinationPrefix '0.0.0.0/0' -ErrorAction SilentlyContinue |
+                Where-Object { $index -contains $_.InterfaceIndex } |
+                Select-Object InterfaceIndex, NextHop)
+            Dns = @(Get-DnsClientServerAddress -AddressFamily IPv4 -ErrorAction SilentlyContinue |
+                Where-Object { $index -contains $_.InterfaceIndex } |
+                Select-Object InterfaceIndex, ServerAddresses)
+            Interfaces = @(Get-NetIPInterface -AddressFamily IPv4 -ErrorAction SilentlyContinue |
+                Where-Object { $index -contains $_.InterfaceIndex } |
+                Select-Object InterfaceIndex, @{Name='Dhcp'; Expression={ "$($_.Dhcp)" }})
+        } | ConvertTo-Json -Depth 4 -Compress
+    '''
+
+    _ADAPTER_SCRIPT = '''
+        $name = %s
+        $config = Get-NetIPAddress -InterfaceAlias $name -AddressFamily IPv4
+        $gateway = Get-NetRoute -InterfaceAlias $name | Where-Object DestinationPrefix -eq '0.0.0.0/0'
+        $dns = Get-DnsClientServerAddress -InterfaceAlias $name -AddressFamily IPv4
+        $dhcp = Get-NetIPInterface -InterfaceAlias $name -AddressFamily IPv4 |
+            Select-Object @{Name='DHCP'; Expression={ if ($_.Dhcp -eq 1) { 'Enabled' } else { 'Disabled' } }}
+
+        [PSCustomObject]@{
+            InterfaceAlias = $config[0].InterfaceAlias
+            IPv4Address = $config[0].IPAddress
+            IPv4DefaultGateway = $gateway[0].NextHop
+            SubnetMask = $config[0].PrefixLength
+            DNSServer = $dns.ServerAddresses
+            DHCPEnabled = $dhcp[0].Dhcp
+        } | ConvertTo-Json
+    '''
+
+    _CLEAR_SCRIPT = '''
+        $name = %s
+        # 禁用DHCP
+        Get-NetAdapter -InterfaceAlias $name | Set-NetIPInterface -Dhcp Disabled -ErrorAction Stop
+        # 清除指定网卡Ip配置
+        Remove-NetIPAddress -InterfaceAlias $name -Confirm:$false -ErrorAction SilentlyContinue
+        # 清除指定网卡网关配置
+        Remove-NetRoute -InterfaceAlias $name -Confirm:$false -ErrorAction SilentlyContinue
+        # 清除指定网卡的DNS配置
+        Set-DnsClientServerAddress -InterfaceAlias $name -ResetServerAddresses -ErrorAction Stop
+    '''
+
+    def __init__(self, session: ShellSession | SessionPool = None):
+        self.session: ShellSession | SessionPool = session or get_shared_pool()
+
+    def reserve(self, workers: int):
+        # 会话池的大小就是最多同时运行的 PowerShell 进程数
+        if isinstance(self.session, SessionPool):
+            self.session.grow(workers)
+
+    def _run(self, command: str) -> str:
+        try:
+            result = self.session.run(command)
+        except ShellError as e:
+            raise BackendError(f"命令执行失败：{e}") from e
+        if not result.ok:
+            raise BackendError(f"命令执行失败：{result.output}")
+        return result.output
+
+    def snapshot(self) -> AdapterSnapshot:
+        output = self._run(self._SNAPSHOT_SCRIPT)
+        try:
+            with tracing.span('json.parse', chars=len(output)):
+                return self.parse_snapshot(json.loads(output))
+        except (json.JSONDecodeError, TypeError, ValueError, KeyError) as e:
+            raise BackendError(f"JSON解析失败：{e}") from e
+
+    @staticmethod
+    def parse_snapshot(data: dict) -> AdapterSnapshot:
+        """将快照脚本的JSON输出合并为AdapterSnapshot"""
+        snapshot = AdapterSnapshot()
+        for adapter in data.get('Adapters') or ():
+            index = int(adapter['InterfaceIndex'])
+            snapshot[index] = AdapterInfo(index=index,
+                                          name=adapter.get('Name') or '',
+                                          alias=adapter.get('InterfaceAlias') or '',
+                                          description=adapter.get('InterfaceDescription') or '')
+
+        # 每个网卡只取第一条记录，与get_adapter_info保持一致
+        for address in data.get('Addresses') or ():
+            index = int(address['InterfaceIndex'])
+            if index in snapshot and not snapshot[index].address:
+                snapshot[index] = snapshot[index]._replace(address=address.get('IPAddress') or '',
+                                                           prefix=address.get('PrefixLength'))
+        for route in data.get('Routes') or ():
+            index = int(route['InterfaceIndex'])
+            if index in snapshot and not snapshot[index].gateway:
+                snapshot[index] = snapshot[index]._replace(gateway=route.get('NextHop') or '')
+        for dns in data.get('Dns') or ():
+            index = int(dns['InterfaceIndex'])
+            if index in snapshot and not snapshot[index].dns:
+                snapshot[index] = snapshot[index]._replace(dns=tuple(dns.get('ServerAddresses') or ()))
+        for interface in data.get('Interfaces') or ():
+            index = int(interface['InterfaceIndex'])
+            if index in snapshot and not snapshot[index].dhcp:
+                snapshot[index] = snapshot[index]._replace(dhcp=interface.get('Dhcp') or '')
+        return snapshot
+
+    def adapter_info(self, Name: str) -> tuple:
+        try:
+            output = self.session.run(self._ADAPTER_SCRIPT % scripts.ps_quote(Name)).output
+        except ShellError as e:
+            raise BackendError(f"获取网卡配置失败：{e}") from e
+        if not output:
+            return '', '', '', (), ''
+
+        try:
+            with tracing.span('json.parse', chars=len(output)):
+                output = json.loads(output)
+        except json.JSONDecodeError as e:
+            raise BackendError(f"配置解析失败：{e}") from e
+
+        # 使用walrus运算符简化代码
+        if (mask := output.get('SubnetMask')) is not None:
+            SubnetMask = subnet_converter(cidr=mask)
+        else:
+            SubnetMask = "255.255.255.255"  # 默认无效掩码
+
+        IPv4Address: str = output.get('IPv4Address') or ''
+        IPv4DefaultGateway: str = output.get('IPv4DefaultGateway') or ''
+        DNSServer: tuple[str] = tuple(output.get('DNSServer') or ())
+        DHCPEnabled: str = output.get('DHCPEnabled') or ''
+
+        return IPv4Address, SubnetMask, IPv4DefaultGateway, DNSServer, DHCPEnabled
+
+    def apply(self, Name: str, operations: tuple, var: tuple) -> ApplyResult:
+        try:
+            with tracing.span('script.build', operations=len(operations)):
+                command = scripts.build_apply_script(Name, operations, var)
+            output = self.session.run(command).output
+            with tracing.span('json.parse', chars=len(output)):
+                output = scripts.parse_apply_output(output)
+        except (ShellError, ValueError) as e:
+            raise BackendError(str(e)) from e
+
+        return ApplyResult(bool(output.get('Ok')), '',
+                           gap=(output.get('GapMs') or 0.0) / 1000,
+                           rolled_back=bool(output.get('RolledBack')),
+                           error=output.get('Error') or '',
+                           operations=tuple(operations))
+
+    def clear(self, Name: str):
+        self._run(self._CLEAR_SCRIPT % scripts.ps_quote(Name))
+
+
+def default_backend(session: ShellSession = None) -> NetBackend:
+    """根据环境变量 NETSET_BACKEND（powershell / netlink / agent）或当前平台选择后端"""
+    name = os.environ.get('NETSET_BACKEND', '').lower()
+    if name == 'agent':
+        from agent import AgentBackend
+        return AgentBackend()
+    if name == 'netlink' or (not name and sys.platform.startswith('linux')):
+        from netlink import NetlinkBackend
+        return NetlinkBackend()
+    return PowerShellBackend(session)
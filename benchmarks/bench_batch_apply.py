@@ -0,0 +1,58 @@
+"""
+同时修改多个网卡：逐个修改与 NetManage.apply_many 的总耗时对比
+
+用法：python benchmarks/bench_batch_apply.py [网卡数] [模拟延迟毫秒]
+
+每个网卡的读取和修改各需要一次 Shell 调用（FakeShell 模拟延迟），
+逐个修改的耗时是各网卡之和，并行修改（会话池中每个线程一个会话）应接近单个网卡的耗时。
+会话池中的会话与逐个修改的会话共用同一份模拟的网卡配置，每轮开始前把改为 DHCP 的网卡恢复为静态配置。
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend import PowerShellBackend  # noqa: E402
+from fake_shell import FakeShell  # noqa: E402
+from function import NetManage  # noqa: E402
+from shell import SessionPool  # noqa: E402
+
+
+def make_profiles(names: list, round_: int) -> dict:
+    """每个网卡一个不同的配置，每轮换一次地址，保证每次都需要修改；最后一个网卡改为 DHCP"""
+    profiles = {name: ('10.%d.0.%d' % (i, 10 + round_), '255.255.255.0', '10.%d.0.1' % i, ('223.5.5.5',))
+                for i, name in enumerate(names)}
+    profiles[names[-1]] = None
+    return profiles
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    latency = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.05
+    print(f"网卡数: {count}  模拟延迟: {latency * 1000:.0f} ms/次")
+
+    # 逐个修改：一个会话，依次执行
+    shell = FakeShell(count, latency)
+    net = NetManage(backend=PowerShellBackend(shell))
+    net.get_network_adapters()
+    names = [adapter['Name'] for adapter in net.adapters]
+    profiles = make_profiles(names, 0)
+    start = time.perf_counter()
+    for name, var in profiles.items():
+        net.up_dhcp(name) if var is None else net.change_adapter_ip(name, var)
+    sequential = time.perf_counter() - start
+    print(f"逐个修改: {sequential:.2f} 秒")
+
+    # 与共享的会话池一样默认 4 个会话，apply_many 按 workers 扩大
+    pool = SessionPool(factory=lambda: FakeShell(count, latency, state=shell.adapters))
+    for workers in (2, 4, count):
+        shell.reset(names[-1])
+        net = NetManage(backend=PowerShellBackend(pool))
+        net.get_network_adapters()  # 与逐个修改相同，先有快照（各网卡的当前配置已在缓存中）
+        result = net.apply_many(make_profiles(names, workers), workers=workers)
+        slowest = max(item.elapsed for item in result.results.values())
+        print(f"apply_many(workers={workers}): {result.elapsed:.2f} 秒（最慢的网卡 {slowest:.2f} 秒，"
+              f"{sequential / result.elapsed:.1f}x），成功 {len(names) - len(result.failed)}/{len(names)}")
+    print(result.info)
@@ -0,0 +1,58 @@
+"""
+命令行冷启动：进程启动到完成第一次后端调用的耗时（含解释器启动）
+
+用法：python benchmarks/bench_cli.py [次数]
+
+每次启动新的进程执行 "python -m netset adapters"，取中位数与 netset.STARTUP_BUDGET 比较，
+并用 -X importtime 确认没有导入 PyQt6 和 NumPy。
+"""
+import importlib.util
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from netset import STARTUP_BUDGET  # noqa: E402
+
+COMMAND = [sys.executable, '-m', 'netset', 'adapters']
+
+
+def run(command: list) -> float:
+    start = time.perf_counter()
+    subprocess.run(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+    return time.perf_counter() - start
+
+
+def imported_modules(command: list) -> set:
+    """-X importtime 输出中出现的顶层模块"""
+    output = subprocess.run([command[0], '-X', 'importtime'] + command[1:], cwd=ROOT,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True).stderr
+    modules = set()
+    for line in output.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            modules.add(line.rsplit('|', 1)[1].strip().split('.')[0])
+    return modules
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    bare = statistics.median(run([sys.executable, '-c', 'pass']) for _ in range(count))
+    cli = statistics.median(run(COMMAND) for _ in range(count))
+    print(f"空解释器启动: {bare * 1000:.1f} ms（中位数，{count} 次）")
+    print(f"netset adapters: {cli * 1000:.1f} ms（含退出），预算 {STARTUP_BUDGET * 1000:.0f} ms："
+          f"{'未超出' if cli <= STARTUP_BUDGET else '超出'}")
+
+    modules = imported_modules(COMMAND)
+    for name in ('PyQt6', 'numpy'):
+        print(f"{name}: {'已导入' if name in modules else '未导入'}")
+
+    # 对比：图形界面入口光是导入界面模块的耗时
+    if importlib.util.find_spec('PyQt6') is not None:
+        gui = statistics.median(run([sys.executable, '-c', 'import ui']) for _ in range(min(count, 5)))
+        print(f"导入图形界面（import ui）: {gui * 1000:.1f} ms")
+    else:
+        print("导入图形界面: PyQt6 未安装，跳过")
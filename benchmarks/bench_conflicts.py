@@ -0,0 +1,75 @@
+"""
+配置冲突检查：两两比较与排序扫描 / 增量检查的耗时对比
+
+用法：python benchmarks/bench_conflicts.py [配置条数]
+"""
+import ipaddress
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_prefix_index import build_index, make_profiles  # noqa: E402
+from conflicts import ConflictDetector, find_conflicts  # noqa: E402
+
+PAIRWISE_SAMPLE = 2000  # 两两比较是 O(n²)，只在样本上测量后按平方外推
+
+
+def pairwise_overlaps(profiles: dict) -> set:
+    """旧思路：每两个配置比较一次子网"""
+    networks = [(key, ipaddress.IPv4Network(f"{data['IPv4Address']}/{data['SubnetMask']}", strict=False))
+                for key, data in profiles.items()]
+    found = set()
+    for i, (key, network) in enumerate(networks):
+        for other, other_network in networks[i + 1:]:
+            if network != other_network and network.overlaps(other_network):
+                found.add(key)
+                found.add(other)
+    return found
+
+
+def timed(fn, *args) -> tuple:
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    profiles = make_profiles(count)
+    rng = random.Random(1)
+    for key, data in profiles.items():
+        data['IPv4DefaultGateway'] = key.rsplit('.', 1)[0] + rng.choice(('.1', '.1', '.1', '.254'))
+    print(f"配置条数: {count}")
+
+    sample = dict(list(profiles.items())[:PAIRWISE_SAMPLE])
+    pairwise, expected = timed(pairwise_overlaps, sample)
+    assert expected == {c.key for c in find_conflicts(sample) if c.kind == 'overlap'}
+    print(f"两两比较子网（{PAIRWISE_SAMPLE} 条）: {pairwise * 1000:.1f} 毫秒，"
+          f"外推到 {count} 条约 {pairwise * (count / PAIRWISE_SAMPLE) ** 2:.0f} 秒")
+
+    elapsed, conflicts = timed(find_conflicts, profiles)
+    kinds = {}
+    for conflict in conflicts:
+        kinds[conflict.kind] = kinds.get(conflict.kind, 0) + 1
+    print(f"排序扫描整个配置库: {elapsed * 1000:.1f} 毫秒，冲突 {len(conflicts)} 条 {kinds}")
+
+    index = build_index(profiles)
+    detector = ConflictDetector(index)
+    elapsed, _ = timed(detector.build, profiles)
+    print(f"建立增量检查: {elapsed * 1000:.1f} 毫秒")
+
+    # 编辑时每次输入检查一个配置
+    keys = rng.sample(list(profiles), 1000)
+    start = time.perf_counter()
+    for key in keys:
+        detector.check(profiles[key], key)
+    elapsed = (time.perf_counter() - start) / len(keys)
+    print(f"检查单个配置: {elapsed * 1e6:.1f} 微秒/次")
+
+    # 增量结果与整体扫描一致
+    assert {(c.key, c.kind) for c in conflicts if c.key in keys} == \
+           {(c.key, c.kind) for key in keys for c in detector.check(profiles[key], key)}
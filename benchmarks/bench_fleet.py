@@ -0,0 +1,49 @@
+"""
+批量下发的模拟：LoopbackTransport 上 N 台主机在不同并发数下的总耗时
+
+用法：python benchmarks/bench_fleet.py [主机数] [模拟延迟毫秒]
+
+每台主机的修改耗时为固定延迟，理想总耗时为 ceil(主机数 / 并发数) × 延迟，
+与理想值的差即调度开销；延迟为 0 时测得的是每台主机的纯开销（规划、比较、汇总）。
+最后一组加入 1% 的连接失败和 0.5% 的无响应主机，检查超时不会拖慢其他主机。
+"""
+import asyncio
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fleet import LoopbackTransport, Target, rollout  # noqa: E402
+
+
+def make_targets(count: int) -> list:
+    """每台主机一个不同的地址，每 10 台中有 1 台改为 DHCP"""
+    return [Target('lab-%04d' % i, '以太网', None if i % 10 == 0 else
+                   ('10.%d.%d.%d' % (i >> 16 & 255, i >> 8 & 255, i & 255 or 1), '255.0.0.0', '10.0.0.1',
+                    ('223.5.5.5',)))
+            for i in range(count)]
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    latency = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.05
+    targets = make_targets(count)
+    print(f"主机数: {count}  模拟延迟: {latency * 1000:.0f} ms/台")
+
+    start = time.perf_counter()
+    result = asyncio.run(rollout(targets, LoopbackTransport(latency=0), concurrency=count))
+    overhead = time.perf_counter() - start
+    print(f"无延迟: {overhead:.3f} 秒（每台 {overhead / count * 1e6:.1f} µs）")
+
+    for concurrency in (10, 100, count):
+        result = asyncio.run(rollout(targets, LoopbackTransport(latency=latency), concurrency=concurrency))
+        ideal = math.ceil(count / concurrency) * latency
+        print(f"并发 {concurrency:>5}: {result.elapsed:6.2f} 秒（理想 {ideal:.2f} 秒，"
+              f"多出 {(result.elapsed - ideal) * 1000:.0f} ms），成功 {count - len(result.failed)}/{count}")
+
+    transport = LoopbackTransport(latency=latency, jitter=latency, failure_rate=0.01, hang_rate=0.005, seed=1)
+    result = asyncio.run(rollout(targets, transport, concurrency=100, timeout=latency * 10))
+    print(f"有故障（超时 {latency * 10:.1f} 秒）: {result.elapsed:.2f} 秒，失败 {len(result.failed)}/{count}")
+    print(result.info.splitlines()[0])
@@ -0,0 +1,62 @@
+"""
+批量导入导出：吞吐量和读取时的内存占用
+
+用法：python benchmarks/bench_import.py [配置条数]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import profile_io  # noqa: E402
+from bench_prefix_index import make_profiles  # noqa: E402
+from function import IPList  # noqa: E402
+
+
+def timed(fn, *args, **kwargs) -> tuple:
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def scan(path: str, format: str) -> int:
+    """只读取和检查，不插入（测量流式读取本身的内存）"""
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        return sum(1 for _ in profile_io.iter_profiles(f, format))
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300_000
+    profiles = make_profiles(count)
+    for key, data in profiles.items():
+        data['IPv4DefaultGateway'] = key.rsplit('.', 1)[0] + '.1'
+        data['DNSServer'] = ('114.114.114.114', '8.8.8.8')
+    print(f"配置条数: {count}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for format in ('csv', 'jsonl'):
+            path = os.path.join(directory, 'profiles.' + format)
+            elapsed, _ = timed(profile_io.export_profiles, profiles.values(), path)
+            size = os.path.getsize(path) / 1e6
+            print(f"[{format}] 导出: {elapsed:.2f} 秒（{count / elapsed:,.0f} 条/秒，{size:.1f} MB）")
+
+            tracemalloc.start()
+            elapsed, rows = timed(scan, path, format)
+            peak = tracemalloc.get_traced_memory()[1] / 1e6
+            tracemalloc.stop()
+            print(f"[{format}] 读取并检查 {rows} 行: 峰值内存 {peak:.2f} MB（与文件大小无关）")
+
+            iplist = IPList(os.path.join(directory, 'record_%s.json' % format), autosave_delay=0)
+            tracemalloc.start()
+            elapsed, result = timed(profile_io.import_profiles, iplist, path)
+            peak = tracemalloc.get_traced_memory()[1] / 1e6
+            tracemalloc.stop()
+            print(f"[{format}] 导入: {elapsed:.2f} 秒（{count / elapsed:,.0f} 行/秒），"
+                  f"添加 {result.added} 条，错误 {result.error_count} 行，"
+                  f"峰值内存 {peak:.1f} MB（含配置库本身，未写入的变更 {len(iplist.journal.pending)} 条）")
+            elapsed, _ = timed(iplist.save_ip)
+            print(f"[{format}] 导入后保存: {elapsed:.2f} 秒")
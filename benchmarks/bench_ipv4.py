@@ -0,0 +1,91 @@
+"""
+IPv4 运算：ipaddress 与 tools 整数运算（逐条 / 批量 NumPy / 批量纯 Python）的耗时对比
+
+用法：python benchmarks/bench_ipv4.py [配置条数]
+"""
+import ipaddress
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import tools  # noqa: E402
+from bench_prefix_index import make_profiles  # noqa: E402
+
+
+def old_subnet_converter(subnet_mask: str = None, cidr: int = None):
+    """旧实现：每次构造 IPv4Network"""
+    if subnet_mask:
+        return int(ipaddress.IPv4Network(f"0.0.0.0/{subnet_mask}", strict=False).prefixlen)
+    return str(ipaddress.IPv4Network(f"0.0.0.0/{cidr}", strict=False).netmask)
+
+
+def old_validate(profiles: dict) -> dict:
+    """旧做法：逐条用 ipaddress 检查"""
+    problems = {}
+    for key, data in profiles.items():
+        try:
+            interface = ipaddress.IPv4Interface(f"{data['IPv4Address']}/{data['SubnetMask']}")
+        except ValueError:
+            problems[key] = '无效'
+            continue
+        network = interface.network
+        if network.prefixlen < 31 and interface.ip in (network.network_address, network.broadcast_address):
+            problems[key] = '网络地址或广播地址'
+        elif data['IPv4DefaultGateway']:
+            try:
+                gateway = ipaddress.IPv4Address(data['IPv4DefaultGateway'])
+            except ValueError:
+                problems[key] = '无效的默认网关'
+                continue
+            if gateway not in network or gateway == interface.ip:
+                problems[key] = '默认网关'
+    return problems
+
+
+def timed(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def report(name: str, old: float, new: float, count: int):
+    print(f"{name:22} | ipaddress: {old / count * 1e6:8.3f} 微秒/条 | "
+          f"整数运算: {new / count * 1e6:8.3f} 微秒/条 | 加速比: {old / new:6.1f}x")
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    profiles = make_profiles(count)
+    for key, data in profiles.items():
+        data['IPv4DefaultGateway'] = key.rsplit('.', 1)[0] + '.1'
+    masks = [data['SubnetMask'] for data in profiles.values()]
+    addresses = [data['IPv4Address'] for data in profiles.values()]
+    numpy = tools.load_numpy()
+    print(f"配置条数: {count}  NumPy: {numpy.__version__ if numpy is not None else '未安装'}")
+
+    # 逐条调用（get_adapter_info / change_adapter_ip 的场景）
+    report('掩码 -> 前缀（逐条）', timed(lambda: [old_subnet_converter(subnet_mask=m) for m in masks]),
+           timed(lambda: [tools.subnet_converter(subnet_mask=m) for m in masks]), count)
+    report('前缀 -> 掩码（逐条）', timed(lambda: [old_subnet_converter(cidr=24) for _ in masks]),
+           timed(lambda: [tools.subnet_converter(cidr=24) for _ in masks]), count)
+    report('解析地址（逐条）', timed(lambda: [int(ipaddress.IPv4Address(a)) for a in addresses]),
+           timed(lambda: [tools.ip_to_int(a) for a in addresses]), count)
+
+    # 整个配置库一次处理
+    for label in ('NumPy', '纯 Python'):
+        if label == '纯 Python':
+            tools.np = None
+        elif numpy is None:
+            continue
+        report(f'解析地址（批量 {label}）', timed(lambda: [int(ipaddress.IPv4Address(a)) for a in addresses]),
+               timed(tools.parse_ips, addresses), count)
+        report(f'掩码 -> 前缀（批量 {label}）', timed(lambda: [old_subnet_converter(subnet_mask=m) for m in masks]),
+               timed(tools.masks_to_prefixes, masks), count)
+        old = timed(old_validate, profiles)
+        new = timed(tools.validate_profiles, profiles)
+        report(f'检查配置库（批量 {label}）', old, new, count)
+    tools.np = numpy
+    assert old_validate(profiles).keys() == tools.validate_profiles(profiles).keys()
@@ -0,0 +1,87 @@
+"""
+已保存配置的子网查询：逐条 IPv4Network 扫描与前缀树索引的耗时对比
+
+用法：python benchmarks/bench_prefix_index.py [配置条数] [查询次数]
+"""
+import ipaddress
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prefix_index import PrefixIndex  # noqa: E402
+from tools import int_to_ip, ip_to_int, subnet_converter  # noqa: E402
+
+
+def make_profiles(count: int, seed: int = 0) -> dict:
+    """生成与 IPList.ip_dict 格式相同的随机配置"""
+    rng = random.Random(seed)
+    profiles = {}
+    while len(profiles) < count:
+        address = int_to_ip(rng.choice((0x0a000000, 0xac100000, 0xc0a80000)) | rng.getrandbits(20))
+        mask = subnet_converter(cidr=rng.choice((8, 12, 16, 20, 24, 24, 24, 28)))
+        profiles[address] = {'IPv4Address': address, 'SubnetMask': mask, 'IPv4DefaultGateway': '', 'DNSServer': ()}
+    return profiles
+
+
+def linear_longest_match(profiles: dict, address: str):
+    """旧做法：遍历全部配置，逐条解析网段"""
+    target = ipaddress.IPv4Address(address)
+    best, best_prefix = None, -1
+    for key, data in profiles.items():
+        network = ipaddress.IPv4Network(f"{data['IPv4Address']}/{data['SubnetMask']}", strict=False)
+        if target in network and network.prefixlen > best_prefix:
+            best, best_prefix = key, network.prefixlen
+    return best
+
+
+def linear_within(profiles: dict, cidr: str) -> list:
+    outer = ipaddress.IPv4Network(cidr)
+    return [key for key, data in profiles.items()
+            if ipaddress.IPv4Network(f"{data['IPv4Address']}/{data['SubnetMask']}", strict=False).subnet_of(outer)]
+
+
+def timed(fn, *args) -> tuple:
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def build_index(profiles: dict) -> PrefixIndex:
+    index = PrefixIndex()
+    for key, data in profiles.items():
+        index.insert_ip(key, data['IPv4Address'], data['SubnetMask'])
+    return index
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    profiles = make_profiles(count)
+    rng = random.Random(1)
+    addresses = [int_to_ip(0x0a000000 | rng.getrandbits(20)) for _ in range(queries)]
+
+    build, index = timed(build_index, profiles)
+    print(f"配置条数: {count}  建索引: {build * 1000:.1f} 毫秒")
+
+    linear = indexed = 0.0
+    for address in addresses:
+        elapsed, expected = timed(linear_longest_match, profiles, address)
+        linear += elapsed
+        start = time.perf_counter()
+        found = index.longest_match(ip_to_int(address))
+        indexed += time.perf_counter() - start
+        # 同一网段可能有多个配置，比较网段而不是键
+        assert (found is None) == (expected is None)
+        assert found is None or index.entries[found] == index.entries[expected]
+    print(f"最长前缀匹配 | 线性扫描: {linear / queries * 1000:.3f} 毫秒/次 | "
+          f"前缀树: {indexed / queries * 1000:.4f} 毫秒/次 | 加速比: {linear / indexed:.0f}x")
+
+    cidr = '10.0.0.0/12'
+    linear, expected = timed(linear_within, profiles, cidr)
+    indexed, found = timed(index.find_in, cidr)
+    assert sorted(found) == sorted(expected)
+    print(f"网段查询 {cidr} ({len(found)} 条) | 线性扫描: {linear * 1000:.3f} 毫秒 | "
+          f"前缀树: {indexed * 1000:.3f} 毫秒 | 加速比: {linear / indexed:.0f}x")
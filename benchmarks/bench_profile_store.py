@@ -0,0 +1,79 @@
+"""
+配置存储的内存占用：record.json 解析出的 dict-of-dicts 与 ProfileStore 的对比
+
+用法：python benchmarks/bench_profile_store.py [配置条数]
+
+内存用 tracemalloc 统计（只计 Python 分配的内存，不含解释器本身）；ProfileStore 由 JSON 解析出的字典转换而来，
+峰值与 dict-of-dicts 相同，转换完成后字典即释放。
+读取（JSON 解析，ProfileStore 再加上转换）、按键查找、遍历和写回 JSON 的耗时另外测量（不开 tracemalloc）。
+"""
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from profile_store import ProfileStore  # noqa: E402
+from tools import int_to_ip, subnet_converter  # noqa: E402
+
+DNS = (['223.5.5.5', '223.6.6.6'], ['114.114.114.114'], ['8.8.8.8', '8.8.4.4'], [])
+
+
+def make_profiles(count: int, seed: int = 0) -> dict:
+    """生成与 record.json 格式相同的随机配置（网关为所在网段的第一个地址，十分之一有名称）"""
+    rng = random.Random(seed)
+    profiles = {}
+    while len(profiles) < count:
+        value = rng.choice((0x0a000000, 0xac100000, 0xc0a80000)) | rng.getrandbits(20)
+        prefix = rng.choice((8, 16, 24, 24))
+        address = int_to_ip(value)
+        profile = {'IPv4Address': address, 'SubnetMask': subnet_converter(cidr=prefix),
+                   'IPv4DefaultGateway': int_to_ip((value >> (32 - prefix) << (32 - prefix)) | 1),
+                   'DNSServer': rng.choice(DNS)}
+        if len(profiles) % 10 == 0:
+            profile['Name'] = '机房%d' % len(profiles)
+        profiles[address] = profile
+    return profiles
+
+
+def measure(label: str, load, text: str, count: int):
+    """解析 text 并统计常驻内存和峰值"""
+    gc.collect()
+    tracemalloc.start()
+    data = load(text)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<14} {current / count:7.1f} B/条  峰值 {peak / 2 ** 20:7.1f} MB")
+    return data, current
+
+
+def timed(label: str, func):
+    start = time.perf_counter()
+    result = func()
+    print(f"  {label:<12} {time.perf_counter() - start:.3f} 秒")
+    return result
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    text = json.dumps(make_profiles(count))
+    print(f"配置: {count} 条，record.json {len(text) / 2 ** 20:.1f} MB")
+
+    loaders = (('dict-of-dicts', json.loads), ('ProfileStore', lambda text_: ProfileStore.from_dict(json.loads(text_))))
+    (plain, plain_bytes), (store, store_bytes) = (measure(label, load, text, count) for label, load in loaders)
+    print(f"内存减少到 1/{plain_bytes / store_bytes:.1f}（ProfileStore.nbytes() = {store.nbytes() / count:.1f} B/条）")
+
+    keys = random.Random(1).sample(list(plain), min(count, 100_000))
+    for (label, load), profiles in zip(loaders, (plain, store)):
+        print(label)
+        gc.collect()
+        timed('读取', lambda: load(text))
+        timed('查找 %d 次' % len(keys), lambda: [profiles[key]['SubnetMask'] for key in keys])
+        timed('遍历', lambda: sum(1 for profile in profiles.values() if profile.get('Name')))
+        timed('写回 JSON', lambda: json.dumps(profiles) if isinstance(profiles, dict) else
+              ''.join(profiles.iterencode()))
+    assert ''.join(store.iterencode()) == text
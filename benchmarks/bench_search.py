@@ -0,0 +1,56 @@
+"""
+IP列表搜索：逐字输入时每次过滤（取出第一屏）的耗时
+
+用法：python benchmarks/bench_search.py [配置条数]
+"""
+import itertools
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_prefix_index import make_profiles  # noqa: E402
+from search_index import SearchIndex  # noqa: E402
+
+PAGE = 1000  # 与 ProfileListModel.batch_size 一致
+QUERIES = ('192.168.13.7', '114.114', '172.16.0.1', '10.1.25', 'office')
+
+
+def linear_filter(profiles: dict, query: str) -> list:
+    """旧做法：逐条比较全部配置"""
+    query = query.lower()
+    return [key for key, data in profiles.items()
+            if any(query in str(value).lower()
+                   for value in (data['IPv4Address'], data['IPv4DefaultGateway'], *data['DNSServer']))]
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    profiles = make_profiles(count)
+    for key, data in profiles.items():
+        data['IPv4DefaultGateway'] = key.rsplit('.', 1)[0] + '.1'
+        data['DNSServer'] = ('114.114.114.114', '8.8.8.8')
+
+    index = SearchIndex()
+    start = time.perf_counter()
+    index.build(profiles)
+    print(f"配置条数: {count}  建索引: {(time.perf_counter() - start) * 1000:.1f} 毫秒")
+
+    worst = 0.0
+    for query in QUERIES:
+        # 模拟逐字输入
+        for length in range(1, len(query) + 1):
+            start = time.perf_counter()
+            result = index.search(query[:length])
+            rows = list(itertools.islice(result, PAGE))
+            elapsed = time.perf_counter() - start
+            worst = max(worst, elapsed)
+        start = time.perf_counter()
+        expected = linear_filter(profiles, query)
+        linear = time.perf_counter() - start
+        assert rows == expected[:PAGE]
+        print(f"{query:14} 匹配 {len(expected):6} 条 | 索引(第一屏): {elapsed * 1000:.3f} 毫秒 | "
+              f"逐条比较: {linear * 1000:.1f} 毫秒")
+    print(f"逐字输入最慢一次: {worst * 1000:.3f} 毫秒")
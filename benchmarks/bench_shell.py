@@ -0,0 +1,48 @@
+"""
+常驻 Shell 会话与每次启动新进程的耗时对比
+
+用法：python benchmarks/bench_shell.py [次数]
+环境变量 NETSET_SHELL 可指定解释器（Linux 下默认 sh）
+"""
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shell import ShellSession  # noqa: E402
+
+SCRIPT = 'echo netset'
+
+
+def bench_spawn(session: ShellSession, number: int) -> float:
+    """每次调用都启动一个新的解释器进程（旧实现）"""
+    command = session.command[:-1] if session.command[-1] == '-' else session.command
+    flag = '-Command' if session.dialect.name == 'powershell' else '-c'
+    if flag in command:
+        command = command[:command.index(flag)]
+    start = time.perf_counter()
+    for _ in range(number):
+        subprocess.run(command + [flag, SCRIPT], capture_output=True, check=True)
+    return (time.perf_counter() - start) / number
+
+
+def bench_session(session: ShellSession, number: int) -> float:
+    """在常驻会话中执行"""
+    session.start()
+    start = time.perf_counter()
+    for _ in range(number):
+        session.run(SCRIPT)
+    return (time.perf_counter() - start) / number
+
+
+if __name__ == '__main__':
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    with ShellSession() as session:
+        spawn = bench_spawn(session, number)
+        shared = bench_session(session, number)
+    print(f"解释器: {' '.join(session.command)}")
+    print(f"每次新进程 | 平均耗时: {spawn * 1000:.3f} 毫秒/次")
+    print(f"常驻会话   | 平均耗时: {shared * 1000:.3f} 毫秒/次")
+    print(f"加速比: {spawn / shared:.1f}x")
@@ -0,0 +1,195 @@
+"""
+基准测试套件：网卡操作、配置读写和列表加载
+
+用法：
+    python benchmarks/bench_suite.py [--latency 毫秒] [--sizes 10,1000,100000] [--output 结果.json]
+                                     [--baseline 基准.json] [--save-baseline] [--tolerance 0.5] [--ci]
+
+- 网卡操作通过 PowerShellBackend + FakeShell（见 fake_shell.py）测量，Linux 上也能运行，
+  --latency 为每次 Shell 调用的模拟延迟；FakeShell 会按修改脚本更新网卡配置，修改前的读取和最小修改计划与真实情况相同
+- 配置读写和列表加载按 --sizes 中的每个条数各测一次（列表加载需要 PyQt6，未安装时跳过）
+- 进度输出到 stderr，结果 JSON 输出到 stdout（或 --output 指定的文件），每项为每次调用的秒数
+- 指定的基准文件存在时逐项比较，中位数比基准慢 tolerance 以上（且多出 0.01 ms 以上）算退化，退出码为 1；
+  基准与机器有关，不随代码提交，在基准机器上用 --save-baseline 生成
+- --ci：必须用 --baseline 指定基准文件，基准文件不存在或模拟延迟与本次不同时退出码为 2，
+  不会因为没有基准而“通过”；不加 --ci 时这两种情况只提示、不比较
+"""
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend import PowerShellBackend  # noqa: E402
+from bench_prefix_index import make_profiles  # noqa: E402
+from fake_shell import FakeShell  # noqa: E402
+from function import IPList, NetManage  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+MIN_REGRESSION = 1e-5  # 比基准多出的时间小于该值（秒）时不算退化，避免极快的项目因抖动误报
+
+
+def measure(fn, repeat: int = 5, min_time: float = 0.05) -> dict:
+    """多次调用 fn，返回每次调用耗时（秒）的中位数和最小值
+
+    每轮的调用次数自动确定（与 timeit 的 autorange 相同，一轮至少 min_time 秒），
+    诊断输出（print）在测量期间丢弃。
+    """
+    timer = timeit.Timer(fn)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        number = 1
+        while timer.timeit(number) < min_time:
+            number *= 2 if number < 1000 else 10
+        times = [elapsed / number for elapsed in timer.repeat(repeat, number)]
+    return {'median': statistics.median(times), 'min': min(times), 'number': number, 'repeat': repeat}
+
+
+def bench_adapters(latency: float) -> dict:
+    """NetManage 的读取和修改（每次都实际调用后端，不使用缓存）"""
+    shell = FakeShell(latency=latency)
+    net = NetManage(backend=PowerShellBackend(shell))
+    net.get_network_adapters()
+    name = net.adapters[0]['Name']
+    # 两个配置交替应用，每次都有需要修改的部分（地址、网关和 DNS 都不同）
+    profiles = itertools.cycle([('172.16.0.170', '255.255.255.0', '172.16.0.1', ('223.5.5.5', '223.6.6.6')),
+                                ('10.0.0.8', '255.255.0.0', '10.0.0.1', ('114.114.114.114',))])
+    current = ('10.0.0.8', '255.255.0.0', '10.0.0.1', ('114.114.114.114',))
+
+    def up_dhcp():
+        # 每次都从静态配置开始，否则第二次起网卡已经启用 DHCP，不需要修改
+        shell.reset(name)
+        net.up_dhcp(name)
+
+    return {
+        'net.get_network_adapters': measure(net.get_network_adapters),
+        'net.get_adapter_info': measure(lambda: net.get_adapter_info(name, use_cache=False)),
+        'net.change_adapter_ip': measure(lambda: net.change_adapter_ip(name, next(profiles))),
+        # 配置与网卡当前配置相同：只读取一次，不执行修改脚本
+        'net.change_adapter_ip_noop': measure(lambda: net.change_adapter_ip(name, current)),
+        'net.up_dhcp': measure(up_dhcp),
+    }
+
+
+def bench_profiles(size: int, directory: str) -> dict:
+    """IPList 的读取、保存（完整快照与只追加日志）和列表首批加载"""
+    profiles = make_profiles(size)
+    path = os.path.join(directory, 'record_%d.json' % size)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        iplist = IPList(path, autosave_delay=0)
+        iplist.add_ips((data['IPv4Address'], data['SubnetMask'], '', ()) for data in profiles.values())
+        iplist.save_ip(compact=True)
+    repeat = 3 if size >= 100_000 else 5
+    key = next(iter(profiles))
+    names = itertools.cycle(('A', 'B'))
+
+    def change_and_save():
+        iplist.change_ip(key, (key, iplist.ip_dict[key]['SubnetMask'], '', (), next(names)))
+        iplist.save_ip()
+
+    results = {
+        'iplist.load_ip[%d]' % size: measure(iplist.load_ip, repeat),
+        'iplist.save_ip[%d]' % size: measure(lambda: iplist.save_ip(compact=True), repeat),
+        'iplist.save_ip_journal[%d]' % size: measure(change_and_save, repeat),
+    }
+    try:
+        from PyQt6.QtCore import QModelIndex
+        from profile_model import ProfileListModel
+    except ImportError:
+        print('PyQt6 未安装，跳过列表加载', file=sys.stderr)
+        return results
+
+    def populate():
+        model = ProfileListModel(iplist)
+        if model.canFetchMore(QModelIndex()):
+            model.fetchMore(QModelIndex())
+
+    results['model.populate[%d]' % size] = measure(populate, repeat)
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """与基准逐项比较，返回退化的项目名称"""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print('%-32s %10.3f ms  （基准中没有）' % (name, result['median'] * 1000), file=sys.stderr)
+            continue
+        ratio = result['median'] / base['median'] if base['median'] else float('inf')
+        regressed = ratio > 1 + tolerance and result['median'] - base['median'] > MIN_REGRESSION
+        print('%-32s %10.3f ms  基准 %10.3f ms  %6.2fx%s' % (
+            name, result['median'] * 1000, base['median'] * 1000, ratio, '  退化' if regressed else ''),
+            file=sys.stderr)
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description='NetSet 基准测试套件')
+    parser.add_argument('--latency', type=float, default=0.0, help='模拟的 Shell 调用延迟（毫秒）')
+    parser.add_argument('--sizes', default='10,1000,100000', help='配置条数，逗号分隔')
+    parser.add_argument('--output', help='结果 JSON 文件（默认输出到 stdout）')
+    parser.add_argument('--baseline', help='基准文件（默认 %s）' % DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='把本次结果保存为基准')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='允许比基准慢的比例')
+    parser.add_argument('--ci', action='store_true', help='CI 模式：必须指定基准文件，无法比较时失败')
+    args = parser.parse_args(argv)
+    if args.ci and (args.save_baseline or not args.baseline):
+        parser.error('--ci 需要用 --baseline 指定基准文件，且不能与 --save-baseline 同时使用')
+    baseline_path = args.baseline or DEFAULT_BASELINE
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+
+    results = {}
+    print('网卡操作（模拟延迟 %.1f ms）...' % args.latency, file=sys.stderr)
+    results.update(bench_adapters(args.latency / 1000))
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            print('配置读写（%d 条）...' % size, file=sys.stderr)
+            results.update(bench_profiles(size, directory))
+
+    report = {
+        'meta': {'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': platform.python_version(),
+                 'platform': platform.platform(), 'latency_ms': args.latency, 'sizes': sizes},
+        'results': results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if args.save_baseline:
+        with open(baseline_path, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+        print('已保存基准 %s' % baseline_path, file=sys.stderr)
+        return 0
+    if not os.path.exists(baseline_path):
+        print('没有基准文件 %s，不比较（用 --save-baseline 生成）' % baseline_path, file=sys.stderr)
+        return 2 if args.ci else 0
+
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline['meta'].get('latency_ms') != args.latency:
+        print('基准的模拟延迟为 %s ms，与本次不同，不比较' % baseline['meta'].get('latency_ms'), file=sys.stderr)
+        return 2 if args.ci else 0
+    regressions = compare(results, baseline['results'], args.tolerance)
+    if regressions:
+        print('%d 项退化：%s' % (len(regressions), ', '.join(regressions)), file=sys.stderr)
+        return 1
+    print('没有退化', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
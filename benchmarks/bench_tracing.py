@@ -0,0 +1,43 @@
+"""
+追踪的开销：关闭时 span() / @traced 与不计时的差别，以及开启时每个 span 的代价
+
+用法：python benchmarks/bench_tracing.py [次数]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tracing  # noqa: E402
+
+
+def plain():
+    pass
+
+
+@tracing.traced('bench.traced')
+def decorated():
+    pass
+
+
+def with_span():
+    with tracing.span('bench.span', key='value'):
+        pass
+
+
+def per_call(fn, number: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e9
+
+
+if __name__ == '__main__':
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    tracing.disable()
+    base = per_call(plain, number)
+    print(f"空函数: {base:.0f} ns/次")
+    print(f"关闭时 @traced: {per_call(decorated, number):.0f} ns/次")
+    print(f"关闭时 with span(): {per_call(with_span, number):.0f} ns/次")
+    tracing.enable(max_spans=number)
+    print(f"开启时 @traced: {per_call(decorated, number):.0f} ns/次")
+    print(f"开启时 with span(): {per_call(with_span, number):.0f} ns/次")
+    tracing.disable()
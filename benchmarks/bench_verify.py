@@ -0,0 +1,60 @@
+"""
+连通性检查：在本地的 DNS 应答器（fake_dns.py）上测量"首个DNS应答"和总耗时
+
+用法：python benchmarks/bench_verify.py [超时秒]
+
+网关为 127.0.0.1（一个监听中的端口和一个关闭的端口，分别对应连接成功和被拒绝），
+DNS 服务器分别模拟正常、较慢、丢失前两个查询（需要重发）、返回 SERVFAIL 和无响应。
+"""
+import os
+import socket
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import verify  # noqa: E402
+from fake_dns import FakeDns  # noqa: E402
+
+CASES = (
+    ('正常', dict()),
+    ('延迟 50 ms', dict(delay=0.05)),
+    ('丢失前 2 个查询', dict(drop=2)),
+    ('SERVFAIL', dict(rcode=2)),
+    ('无响应', dict(silent=True)),
+)
+
+
+def closed_port() -> int:
+    """一个没有监听的本地端口"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+if __name__ == '__main__':
+    timeout = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen()
+    ports = {'监听中的端口': listener.getsockname()[1], '关闭的端口': closed_port()}
+
+    for label, port in ports.items():
+        result = verify.check_sync('127.0.0.1', (), timeout, gateway_ports=(port,))
+        print(f"网关（{label}）: {'可达' if result.gateway.ok else '不可达'} {result.gateway.elapsed * 1000:.1f} ms")
+
+    for label, options in CASES:
+        with FakeDns(**options) as dns:
+            result = verify.check_sync('', ('127.0.0.1',), timeout, dns_port=dns.port)
+        check = result.dns[0]
+        print(f"DNS（{label}）: {'可用' if check.ok else '不可用 ' + check.error} "
+              f"{check.elapsed * 1000:.1f} ms，发送 {dns.queries} 个查询")
+
+    # 三个服务器并行（相同端口、不同回环地址）：首个DNS应答取最快的可用服务器，总耗时受无响应的服务器限制
+    with FakeDns(delay=0.05) as slow:
+        with FakeDns(drop=1, host='127.0.0.2', port=slow.port), FakeDns(silent=True, host='127.0.0.3', port=slow.port):
+            result = verify.check_sync('127.0.0.1', ('127.0.0.1', '127.0.0.2', '127.0.0.3'), timeout,
+                                       dns_port=slow.port, gateway_ports=(ports['关闭的端口'],))
+    print(f"并行: 首个DNS应答 {result.first_dns * 1000:.1f} ms，总耗时 {result.elapsed * 1000:.1f} ms")
+    print(result.info)
+    listener.close()
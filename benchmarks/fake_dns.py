@@ -0,0 +1,70 @@
+"""
+本地的 DNS 应答器，用于测试 verify.py（不需要网络）
+
+在 127.0.0.1（或其他回环地址）的随机端口上监听 UDP，按设置的延迟返回应答（只回显问题，不含记录），
+可以模拟应答慢、头几个查询丢失（切换后交换机端口尚未转发）和返回错误的 DNS 服务器。
+
+    with FakeDns(delay=0.02, drop=2) as dns:
+        verify.check_sync('', ('127.0.0.1',), dns_port=dns.port)
+"""
+import socket
+import struct
+import threading
+import time
+
+
+class FakeDns:
+    """在后台线程中应答 DNS 查询
+
+    Attributes:
+        port (int): 监听的端口
+        queries (int): 收到的查询数
+    """
+
+    def __init__(self, delay: float = 0.0, drop: int = 0, rcode: int = 0, silent: bool = False,
+                 host: str = '127.0.0.1', port: int = 0):
+        """
+        Args:
+            delay (float): 每次应答前等待的时间（秒）
+            drop (int): 不应答前几个查询
+            rcode (int): 应答的 RCODE（0 为 NOERROR，2 为 SERVFAIL，5 为 REFUSED）
+            silent (bool): 从不应答（无响应的服务器）
+            host (str): 监听的地址（127.0.0.x 均可，多个应答器可以用不同地址、相同端口）
+            port (int): 监听的端口，0 为随机
+        """
+        self.delay: float = delay
+        self.drop: int = drop
+        self.rcode: int = rcode
+        self.silent: bool = silent
+        self.queries: int = 0
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.bind((host, port))
+        self._sock.settimeout(0.1)
+        self.port: int = self._sock.getsockname()[1]
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='fake-dns', daemon=True)
+
+    def __enter__(self) -> 'FakeDns':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sock.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                data, addr = self._sock.recvfrom(512)
+            except socket.timeout:
+                continue
+            self.queries += 1
+            if self.silent or self.queries <= self.drop or len(data) < 12:
+                continue
+            if self.delay:
+                time.sleep(self.delay)
+            query_id, flags = struct.unpack_from('>HH', data)
+            # QR=1，保留 RD，RA=1，问题原样返回
+            header = struct.pack('>HHHHHH', query_id, 0x8080 | (flags & 0x0100) | self.rcode, 1, 0, 0, 0)
+            self._sock.sendto(header + data[12:], addr)
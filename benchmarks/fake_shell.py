@@ -0,0 +1,143 @@
+"""
+模拟的 PowerShell 会话，用于在 Linux 上测量 NetManage + PowerShellBackend
+
+不执行脚本，按脚本内容返回与真实脚本格式相同的 JSON，每次调用先等待 latency 秒
+（模拟 PowerShell 执行 Get-Net* 命令的耗时），因此测到的是本程序自身的开销加上固定延迟。
+修改脚本中的各步骤（关闭/启用 DHCP、地址、网关、DNS）会更新模拟的网卡配置，
+之后的读取返回修改后的配置，最小修改计划按实际变化生成。
+"""
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import PowerShellBackend  # noqa: E402
+from shell import ShellResult  # noqa: E402
+
+_ADAPTER_PREFIX = PowerShellBackend._ADAPTER_SCRIPT.split('%s')[0]
+
+# 修改脚本（scripts.build_apply_script）中各步骤的特征，只在 try 部分（回滚之前）中查找
+_QUOTED = r"'((?:[^']|'')*)'"
+_NAME = re.compile(r'Get-NetAdapter -Name %s' % _QUOTED)
+_DHCP_OFF = re.compile(r'-AddressFamily IPv4 -Dhcp Disabled')
+_DHCP_ON = re.compile(r'-AddressFamily IPv4 -Dhcp Enabled')
+_ADDRESS = re.compile(r'New-NetIPAddress -InterfaceIndex \$ifIndex -AddressFamily IPv4 -IPAddress %s -PrefixLength (\d+)'
+                      % _QUOTED)
+_GATEWAY = re.compile(r'Remove-Ipv4Config -Addresses \$false -Routes \$true\s+if \(%s\)' % _QUOTED)
+_DNS = re.compile(r'if \((\d+)\) \{\s+Set-DnsClientServerAddress -InterfaceIndex \$ifIndex -ServerAddresses @\(([^)]*)\)')
+
+
+def _unquote(text: str) -> str:
+    return text.replace("''", "'")
+
+
+class FakeShell:
+    """模拟的 Shell 会话（只实现 PowerShellBackend 用到的 run）
+
+    Attributes:
+        adapters (dict): 网卡名称 -> 配置（InterfaceIndex / IPAddress / PrefixLength / NextHop / ServerAddresses / Dhcp），
+            修改脚本会更新其中的值；会话池中的多个会话可以共用同一个 adapters
+        latency (float): 每次调用的模拟延迟（秒）
+        calls (int): 调用次数
+        applies (int): 修改脚本的执行次数
+    """
+
+    def __init__(self, adapters: int = 4, latency: float = 0.0, state: dict = None):
+        """
+        Args:
+            adapters (int): 网卡数量
+            latency (float): 每次调用的模拟延迟（秒）
+            state (dict): 与其他会话共用的网卡配置（另一个 FakeShell 的 adapters），为空时新建
+        """
+        self.latency: float = latency
+        self.calls: int = 0
+        self.applies: int = 0
+        self.adapters: dict = state if state is not None else {}
+        if state is None:
+            for i in range(adapters):
+                self.adapters['以太网 %d' % (i + 1) if i else '以太网'] = self.initial(i)
+
+    @staticmethod
+    def initial(i: int) -> dict:
+        """第 i 个网卡的初始配置"""
+        return {'InterfaceIndex': 10 + i, 'IPAddress': '172.16.%d.160' % i, 'PrefixLength': 24,
+                'NextHop': '172.16.%d.1' % i, 'ServerAddresses': ['223.5.5.5', '223.6.6.6'], 'Dhcp': 'Disabled'}
+
+    def reset(self, name: str):
+        """把网卡恢复为初始配置"""
+        item = self.adapters[name]
+        item.update(self.initial(item['InterfaceIndex'] - 10))
+
+    def _snapshot(self) -> str:
+        items = list(self.adapters.items())
+        return json.dumps({
+            'Adapters': [{'Name': name, 'InterfaceIndex': item['InterfaceIndex'], 'InterfaceAlias': name,
+                          'InterfaceDescription': 'Fake Ethernet Adapter'} for name, item in items],
+            'Addresses': [{'InterfaceIndex': item['InterfaceIndex'], 'IPAddress': item['IPAddress'],
+                           'PrefixLength': item['PrefixLength']} for _, item in items if item['IPAddress']],
+            'Routes': [{'InterfaceIndex': item['InterfaceIndex'], 'NextHop': item['NextHop']}
+                       for _, item in items if item['NextHop']],
+            'Dns': [{'InterfaceIndex': item['InterfaceIndex'], 'ServerAddresses': item['ServerAddresses']}
+                    for _, item in items],
+            'Interfaces': [{'InterfaceIndex': item['InterfaceIndex'], 'Dhcp': item['Dhcp']} for _, item in items],
+        })
+
+    def _apply(self, script: str) -> str:
+        """按修改脚本更新网卡配置，返回脚本的结果行"""
+        self.applies += 1
+        steps = script.split('} catch {', 1)[0]
+        match = _NAME.search(steps)
+        item = self.adapters.get(_unquote(match.group(1))) if match else None
+        if item is None:
+            return json.dumps({'Ok': False, 'GapMs': 0.0, 'RolledBack': True, 'Error': '没有找到网卡'})
+
+        gap = 0.0
+        if _DHCP_OFF.search(steps):
+            item['Dhcp'] = 'Disabled'
+        match = _ADDRESS.search(steps)
+        if match:
+            item['IPAddress'], item['PrefixLength'] = _unquote(match.group(1)), int(match.group(2))
+            gap = 1.0
+        match = _GATEWAY.search(steps)
+        if match:
+            item['NextHop'] = _unquote(match.group(1))
+            gap = 1.0
+        match = _DNS.search(steps)
+        if match:
+            item['ServerAddresses'] = [_unquote(server) for server in re.findall(_QUOTED, match.group(2))]
+        if _DHCP_ON.search(steps):
+            # 模拟从 DHCP 服务器获取到地址
+            index = item['InterfaceIndex'] - 10
+            item.update(Dhcp='Enabled', IPAddress='192.168.%d.100' % index, PrefixLength=24,
+                        NextHop='192.168.%d.1' % index, ServerAddresses=['192.168.%d.1' % index])
+            gap = 1.0
+        return json.dumps({'Ok': True, 'GapMs': gap, 'RolledBack': False, 'Error': '', 'DhcpBound': True})
+
+    def run(self, script: str, timeout: float = None) -> ShellResult:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if script == PowerShellBackend._SNAPSHOT_SCRIPT:
+            return ShellResult(0, self._snapshot())
+        if script.startswith(_ADAPTER_PREFIX):
+            name = _unquote(script[len(_ADAPTER_PREFIX):].split('\n', 1)[0].strip()[1:-1])
+            item = self.adapters.get(name)
+            if item is None:
+                return ShellResult(0, '')
+            return ShellResult(0, json.dumps({
+                'InterfaceAlias': name, 'IPv4Address': item['IPAddress'], 'IPv4DefaultGateway': item['NextHop'],
+                'SubnetMask': item['PrefixLength'], 'DNSServer': item['ServerAddresses'],
+                'DHCPEnabled': item['Dhcp']}))
+        # 修改脚本：最后一行是结果
+        return ShellResult(0, self._apply(script))
+
+    def close(self):
+        pass
+
+
+def fake_backend(adapters: int = 4, latency: float = 0.0) -> PowerShellBackend:
+    """使用 FakeShell 的 PowerShellBackend"""
+    return PowerShellBackend(FakeShell(adapters, latency))
@@ -0,0 +1,73 @@
+import threading
+import time
+from typing import Any, Callable, Hashable
+
+
+class TTLCache:
+    """带过期时间的线程安全缓存
+
+    Attributes:
+        ttl (float): 条目有效期（秒），0 表示不缓存
+        hits (int): 命中次数
+        misses (int): 未命中次数（包括已过期）
+    """
+
+    _MISSING = object()
+
+    def __init__(self, ttl: float = 10.0, clock: Callable[[], float] = time.monotonic):
+        self.ttl: float = ttl
+        self.hits: int = 0
+        self.misses: int = 0
+        self._clock = clock
+        self._data: dict = {}  # 键 -> (过期时间, 值)
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """读取未过期的条目，不存在或已过期时返回 default"""
+        with self._lock:
+            entry = self._data.get(key, self._MISSING)
+            if entry is not self._MISSING:
+                expires, value = entry
+                if self._clock() < expires:
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any):
+        """写入条目（写穿），重新计时"""
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (self._clock() + self.ttl, value)
+
+    def invalidate(self, key: Hashable):
+        """删除指定条目"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._data.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        """缓存统计信息"""
+        with self._lock:
+            size = len(self._data)
+        return {'ttl': self.ttl, 'size': size, 'hits': self.hits,
+                'misses': self.misses, 'hit_rate': round(self.hit_rate, 4)}
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and self._clock() < entry[0]
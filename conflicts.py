@@ -0,0 +1,287 @@
+"""
+已保存配置之间的冲突检查
+
+除了单个配置自身的问题（格式、网络/广播地址、网关不在同一子网，见 tools.validate_profile），
+还检查配置之间的冲突：
+- duplicate: IP地址与另一个配置重复
+- gateway: IP地址是另一个配置的默认网关
+- overlap: 子网与另一个配置的子网重叠但掩码不同（一个包含另一个）
+- gateway_mismatch: 同一子网中另一个配置的默认网关不同
+
+find_conflicts 对整个配置库做一次排序扫描，O(n log n)：
+CIDR 子网要么互相包含要么不相交，按 (网络地址, 前缀长度) 排序后用一个栈即可找出所有嵌套。
+ConflictDetector 随 IPList 的增删改增量维护，单个配置的检查只需查几次字典和沿前缀树走一条路径，
+用于编辑时即时提示和列表中逐行显示。两者的判断规则相同。
+"""
+from typing import NamedTuple, Optional
+
+from prefix_index import PrefixIndex, describe
+from tools import HOSTMASKS, MASKS, int_to_ip, ip_to_int, mask_to_prefix, masks_to_prefixes, parse_ips, \
+    validate_profile, validate_profiles
+
+KINDS = ('invalid', 'duplicate', 'gateway', 'overlap', 'gateway_mismatch')
+
+
+class Conflict(NamedTuple):
+    """一条冲突
+
+    Attributes:
+        key (str): 有问题的配置（IPList 的键）
+        kind (str): 冲突类型（见 KINDS）
+        message (str): 问题说明
+        other (str): 与之冲突的配置，invalid 时为空
+    """
+    key: str
+    kind: str
+    message: str
+    other: str = ''
+
+
+def _duplicate(key: str, other: str) -> Conflict:
+    return Conflict(key, 'duplicate', 'IP地址与 %s 重复' % other, other)
+
+
+def _gateway(key: str, other: str) -> Conflict:
+    return Conflict(key, 'gateway', 'IP地址是 %s 的默认网关' % other, other)
+
+
+def _overlap_message(subnet: tuple, other: str, other_subnet: tuple) -> str:
+    return '子网 %s 与 %s 的子网 %s 重叠' % (describe(*subnet), other, describe(*other_subnet))
+
+
+def _gateway_mismatch_message(other: str, gateway: int) -> str:
+    return '同一子网的 %s 使用不同的默认网关 %s' % (other, int_to_ip(gateway))
+
+
+def _tolist(values) -> list:
+    return values.tolist() if hasattr(values, 'tolist') else list(values)
+
+
+def find_conflicts(profiles: dict) -> list:
+    """
+    一次检查整个配置库（IPList.ip_dict 格式）
+
+    返回:
+        list: Conflict 列表，按配置的顺序，同一配置按 KINDS 的顺序
+    """
+    keys = list(profiles)
+    data = [profiles[key] for key in keys]
+    problems = validate_profiles(profiles)
+    addresses, address_ok = parse_ips([item.get('IPv4Address') or '' for item in data])
+    prefixes, mask_ok = masks_to_prefixes([item.get('SubnetMask') or '' for item in data])
+    gateways, gateway_ok = parse_ips([item.get('IPv4DefaultGateway') or '' for item in data])
+    addresses, prefixes, gateways = _tolist(addresses), _tolist(prefixes), _tolist(gateways)
+    address_ok, mask_ok, gateway_ok = _tolist(address_ok), _tolist(mask_ok), _tolist(gateway_ok)
+
+    found = {key: [Conflict(key, 'invalid', message)] for key, message in problems.items()}
+    valid = [i for i in range(len(keys)) if address_ok[i] and mask_ok[i]]
+
+    # 重复的地址、作为其他配置网关的地址（每个值只需记住前两个配置）
+    by_address = {}
+    for i in valid:
+        by_address.setdefault(addresses[i], []).append(i)
+    by_gateway = {}
+    for i in range(len(keys)):
+        if gateway_ok[i]:
+            users = by_gateway.setdefault(gateways[i], [])
+            if len(users) < 2:
+                users.append(i)
+
+    # 按子网分组
+    groups = {}
+    for i in valid:
+        groups.setdefault((addresses[i] & MASKS[prefixes[i]], prefixes[i]), []).append(i)
+    nested = {}  # 子网 -> 与之重叠的一个子网
+
+    # 排序扫描：栈中是当前位置所在的一串嵌套子网
+    stack = []
+    for subnet in sorted(groups):
+        network, prefix = subnet
+        while stack and stack[-1][0] < network:
+            stack.pop()
+        if stack:
+            parent = stack[-1][1]
+            nested[subnet] = parent
+            nested.setdefault(parent, subnet)
+        stack.append((network | HOSTMASKS[prefix], subnet))
+
+    for subnet, members in groups.items():
+        # 同一组的重叠、网关不一致说明只生成一次
+        overlap = None
+        if subnet in nested:
+            other_subnet = nested[subnet]
+            other = keys[groups[other_subnet][0]]
+            overlap = (_overlap_message(subnet, other, other_subnet), other)
+        mismatch = {}  # 默认网关 -> (说明, 另一个配置)
+        if len(members) > 1:
+            first_of = {}  # 组内每个默认网关的第一个配置
+            for i in members:
+                if gateway_ok[i]:
+                    first_of.setdefault(gateways[i], i)
+            if len(first_of) > 1:
+                for gateway in first_of:
+                    other_gateway, j = next(item for item in first_of.items() if item[0] != gateway)
+                    mismatch[gateway] = (_gateway_mismatch_message(keys[j], other_gateway), keys[j])
+
+        for i in members:
+            key = keys[i]
+            items = found.get(key) or []
+            same = by_address[addresses[i]]
+            if len(same) > 1:
+                items.append(_duplicate(key, keys[same[1] if same[0] == i else same[0]]))
+            users = by_gateway.get(addresses[i])
+            if users and (users[0] != i or len(users) > 1):
+                items.append(_gateway(key, keys[users[1] if users[0] == i else users[0]]))
+            if overlap is not None:
+                items.append(Conflict(key, 'overlap', *overlap))
+            if mismatch and gateway_ok[i]:
+                items.append(Conflict(key, 'gateway_mismatch', *mismatch[gateways[i]]))
+            if items:
+                found[key] = items
+
+    return [conflict for key in keys for conflict in found.get(key, ())]
+
+
+class ConflictDetector:
+    """增量冲突检查
+
+    Attributes:
+        index (PrefixIndex): 全部配置的子网索引（由 IPList 维护，这里只读）
+        built (bool): 是否已建立
+    """
+
+    def __init__(self, index: PrefixIndex):
+        self.index: PrefixIndex = index
+        self.built: bool = False
+        self._parsed: dict = {}  # 键 -> (地址, 前缀长度, 默认网关)，无效的为 None
+        self._addresses: dict = {}  # 地址 -> {键}（按添加顺序）
+        self._gateways: dict = {}  # 默认网关 -> {键}
+        self._groups: dict = {}  # (网络地址, 前缀长度) -> {默认网关: {键}}
+
+    def __len__(self):
+        return len(self._parsed)
+
+    @staticmethod
+    def _parse(profile: dict) -> tuple:
+        try:
+            address = ip_to_int(profile.get('IPv4Address') or '')
+            prefix = mask_to_prefix(profile.get('SubnetMask') or '')
+        except (ValueError, AttributeError, TypeError):
+            address = prefix = None
+        try:
+            gateway = ip_to_int(profile.get('IPv4DefaultGateway') or '')
+        except (ValueError, AttributeError):
+            gateway = None
+        return address, prefix, gateway
+
+    def _insert(self, key: str, address: Optional[int], prefix: Optional[int], gateway: Optional[int]):
+        self._parsed[key] = (address, prefix, gateway)
+        if gateway is not None:
+            self._gateways.setdefault(gateway, {})[key] = None
+        if address is not None:
+            self._addresses.setdefault(address, {})[key] = None
+            group = self._groups.setdefault((address & MASKS[prefix], prefix), {})
+            group.setdefault(gateway, {})[key] = None
+
+    def build(self, profiles: dict):
+        """按 IPList.ip_dict 一次性建立（地址、掩码、网关批量解析）"""
+        self.clear()
+        keys = list(profiles)
+        data = [profiles[key] for key in keys]
+        addresses, address_ok = parse_ips([item.get('IPv4Address') or '' for item in data])
+        prefixes, mask_ok = masks_to_prefixes([item.get('SubnetMask') or '' for item in data])
+        gateways, gateway_ok = parse_ips([item.get('IPv4DefaultGateway') or '' for item in data])
+        for key, address, prefix, gateway, ok1, ok2, ok3 in zip(
+                keys, _tolist(addresses), _tolist(prefixes), _tolist(gateways),
+                _tolist(address_ok), _tolist(mask_ok), _tolist(gateway_ok)):
+            valid = ok1 and ok2
+            self._insert(key, address if valid else None, prefix if valid else None, gateway if ok3 else None)
+        self.built = True
+
+    def clear(self):
+        self._parsed.clear()
+        self._addresses.clear()
+        self._gateways.clear()
+        self._groups.clear()
+        self.built = False
+
+    def add(self, key: str, profile: dict):
+        """添加或更新一个配置（尚未建立时忽略）"""
+        if not self.built:
+            return
+        self.remove(key)
+        self._insert(key, *self._parse(profile))
+
+    def remove(self, key: str):
+        """删除一个配置"""
+        parsed = self._parsed.pop(key, None)
+        if parsed is None:
+            return
+        address, prefix, gateway = parsed
+        if gateway is not None:
+            _discard(self._gateways, gateway, key)
+        if address is not None:
+            _discard(self._addresses, address, key)
+            subnet = (address & MASKS[prefix], prefix)
+            group = self._groups[subnet]
+            _discard(group, gateway, key)
+            if not group:
+                del self._groups[subnet]
+
+    def check(self, profile: dict, key: str = None) -> list:
+        """
+        检查一个配置与配置库的冲突
+
+        参数:
+            profile: 配置（IPList.ip_dict 的值的格式）
+            key: 配置库中该配置原来的键（修改时），检查时排除它自己；新增时为空
+
+        返回:
+            list: Conflict 列表，按 KINDS 的顺序
+        """
+        name = key or profile.get('IPv4Address') or ''
+        conflicts = []
+        message = validate_profile(profile)
+        if message:
+            conflicts.append(Conflict(name, 'invalid', message))
+        address, prefix, gateway = self._parse(profile)
+        if address is None:
+            return conflicts
+
+        other = _first(self._addresses.get(address), key)
+        if other is not None:
+            conflicts.append(_duplicate(name, other))
+        other = _first(self._gateways.get(address), key)
+        if other is not None:
+            conflicts.append(_gateway(name, other))
+        subnet = (address & MASKS[prefix], prefix)
+        other = _first(self.index.overlapping(*subnet), key)
+        if other is not None:
+            conflicts.append(Conflict(name, 'overlap', _overlap_message(subnet, other, self.index.entries[other]), other))
+        if gateway is not None:
+            for other_gateway, users in self._groups.get(subnet, {}).items():
+                if other_gateway is None or other_gateway == gateway:
+                    continue
+                other = _first(users, key)
+                if other is not None:
+                    conflicts.append(Conflict(name, 'gateway_mismatch', _gateway_mismatch_message(other, other_gateway),
+                                              other))
+                    break
+        return conflicts
+
+
+def _discard(table: dict, value, key: str):
+    keys = table[value]
+    del keys[key]
+    if not keys:
+        del table[value]
+
+
+def _first(keys, exclude: Optional[str]) -> Optional[str]:
+    """第一个不是 exclude 的键"""
+    if keys is None:
+        return None
+    for key in keys:
+        if key != exclude:
+            return key
+    return None
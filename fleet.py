@@ -0,0 +1,359 @@
+"""
+批量下发：把配置同时应用到多台主机
+
+    targets = [Target('lab-001', '以太网', var), Target('lab-002', '以太网', None)]  # None 表示启用DHCP
+    result = asyncio.run(rollout(targets, AgentTransport(), concurrency=50, timeout=30))
+    print(result.info)
+
+- 传输（Transport）负责在一台主机上执行一次修改，可以替换：
+    AgentTransport：连接各主机上运行的代理（agent.py，python -m netset agent --address 0.0.0.0:47631），
+        比较和修改在目标主机上完成，令牌用环境变量 NETSET_AGENT_TOKEN 统一指定
+    LoopbackTransport：在本进程中模拟任意数量的主机（每台主机一个内存中的网卡表），
+        可设置延迟、失败率和无响应的比例，用于演练和基准测试（benchmarks/bench_fleet.py）
+- 最多同时处理 concurrency 台主机，每台主机超过 timeout 秒（含连接）算失败，一台主机出错不影响其他主机
+- stream() 按完成顺序逐个给出进度（FleetProgress），界面或命令行可以边执行边显示；
+  rollout() 等待全部完成并汇总，progress 回调在事件循环所在的线程中调用
+  （界面中在后台线程运行 asyncio.run(rollout(...))，回调用 worker.SignalBridge 转到界面线程）
+"""
+import asyncio
+import os
+import random
+import time
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Callable, NamedTuple, Optional
+
+import scripts
+from agent import AgentError, HEADER_SIZE, decode_frame, encode_frame, frame_size
+from backend import BackendError, NetBackend
+from function import NetManage
+from models import AdapterInfo, AdapterSnapshot, ApplyResult
+from tools import subnet_converter
+
+DEFAULT_PORT = 47631  # 与 agent.DEFAULT_TCP_ADDRESS 相同
+
+
+class Target(NamedTuple):
+    """一台主机上的一次修改
+
+    Attributes:
+        host (str): 主机名或地址，可带端口（"lab-001:47631"）
+        adapter (str): 网卡名称
+        var (tuple): (IP地址, 子网掩码, 默认网关, DNS服务器列表)，为 None 时启用DHCP
+    """
+    host: str
+    adapter: str
+    var: Optional[tuple] = None
+
+
+class HostResult(NamedTuple):
+    """一台主机的结果
+
+    Attributes:
+        target (Target): 对应的修改
+        ok (bool): 是否成功
+        info (str): 提示信息
+        elapsed (float): 从开始处理到完成的时间（秒，不含排队）
+        result (ApplyResult): 目标主机返回的结果，超时或连接失败时为 None
+    """
+    target: Target
+    ok: bool
+    info: str
+    elapsed: float
+    result: Optional[ApplyResult] = None
+
+
+class FleetProgress(NamedTuple):
+    """下发进度（每完成一台主机给出一次）
+
+    Attributes:
+        done (int): 已完成的主机数
+        total (int): 主机总数
+        failed (int): 其中失败的主机数
+        elapsed (float): 已用时间（秒）
+        index (int): 刚完成的主机在 targets 中的位置
+        last (HostResult): 刚完成的主机的结果
+    """
+    done: int
+    total: int
+    failed: int
+    elapsed: float
+    index: int
+    last: HostResult
+
+
+class FleetResult(NamedTuple):
+    """批量下发的结果
+
+    Attributes:
+        ok (bool): 全部成功
+        info (str): 汇总提示（第一行），之后每行一台失败的主机
+        elapsed (float): 总耗时（秒）
+        results (list): 按 targets 顺序的 HostResult
+    """
+    ok: bool
+    info: str
+    elapsed: float
+    results: list
+
+    @property
+    def failed(self) -> list:
+        return [item for item in self.results if not item.ok]
+
+
+def profile_var(profile: dict) -> tuple:
+    """IPList 中的一条配置转为 change_adapter_ip 的参数"""
+    return (profile.get('IPv4Address', ''), profile.get('SubnetMask', ''),
+            profile.get('IPv4DefaultGateway', ''), tuple(profile.get('DNSServer') or ()))
+
+
+# ---- 传输 ----
+
+class Transport(ABC):
+    """在一台主机上执行修改的方式"""
+
+    name = ''
+
+    @abstractmethod
+    async def apply(self, target: Target, minimal: bool = True) -> ApplyResult:
+        """执行一次修改，连接失败等抛出 OSError / BackendError"""
+
+    async def close(self):
+        pass
+
+
+class AgentTransport(Transport):
+    """通过各主机上的代理修改（每台主机一个 TCP 连接，用完即关闭）"""
+
+    name = 'agent'
+
+    def __init__(self, port: int = DEFAULT_PORT, token: str = None):
+        """
+        Args:
+            port (int): 主机名中没有端口时使用的端口
+            token (str): 代理的令牌，默认读取环境变量 NETSET_AGENT_TOKEN
+        """
+        self.port: int = port
+        self.token: str = token or os.environ.get('NETSET_AGENT_TOKEN', '')
+
+    async def _request(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, op: str, **args):
+        writer.write(encode_frame({'id': 0, 'op': op, 'args': args}))
+        await writer.drain()
+        try:
+            size = frame_size(await reader.readexactly(HEADER_SIZE))
+            response = decode_frame(await reader.readexactly(size))
+        except asyncio.IncompleteReadError as e:
+            raise ConnectionError('连接已关闭') from e
+        if not response.get('ok'):
+            raise AgentError(response.get('error') or '代理返回错误')
+        return response.get('result')
+
+    async def apply(self, target: Target, minimal: bool = True) -> ApplyResult:
+        host, sep, port = target.host.rpartition(':')
+        if not sep or not port.isdigit():
+            host, port = target.host, self.port
+        reader, writer = await asyncio.open_connection(host, int(port))
+        try:
+            await self._request(reader, writer, 'auth', token=self.token)
+            if target.var is None:
+                result = await self._request(reader, writer, 'dhcp', Name=target.adapter)
+            else:
+                var = list(target.var[:3]) + [list(target.var[3])]
+                result = await self._request(reader, writer, 'change_ip', Name=target.adapter, var=var,
+                                             minimal=minimal)
+        finally:
+            writer.close()
+        result['operations'] = tuple(result.get('operations') or ())
+        return ApplyResult(**result)
+
+
+class MemoryBackend(NetBackend):
+    """内存中的网卡表（模拟一台主机，修改立即生效）"""
+
+    name = 'memory'
+
+    def __init__(self, adapters: tuple = ('以太网',), seed: int = 0):
+        self.adapters: dict = {}
+        for i, name in enumerate(adapters):
+            self.adapters[name] = AdapterInfo(index=10 + i, name=name, alias=name, description='Loopback Adapter',
+                                              address='172.16.%d.%d' % (i, seed % 250 + 2), prefix=24,
+                                              gateway='172.16.%d.1' % i, dns=('223.5.5.5',), dhcp='Disabled')
+
+    def _get(self, Name: str) -> AdapterInfo:
+        info = self.adapters.get(Name)
+        if info is None:
+            raise BackendError("没有网卡 [%s]" % Name)
+        return info
+
+    def snapshot(self) -> AdapterSnapshot:
+        snapshot = AdapterSnapshot()
+        for info in self.adapters.values():
+            snapshot[info.index] = info
+        return snapshot
+
+    def adapter_info(self, Name: str) -> tuple:
+        return self._get(Name).as_tuple()
+
+    def apply(self, Name: str, operations: tuple, var: tuple) -> ApplyResult:
+        info = self._get(Name)
+        if scripts.DHCP_OFF in operations:
+            info = info._replace(dhcp='Disabled')
+        if scripts.ADDRESS in operations:
+            info = info._replace(address=var[0], prefix=subnet_converter(subnet_mask=var[1]))
+        if scripts.GATEWAY in operations:
+            info = info._replace(gateway=var[2])
+        if scripts.DNS in operations:
+            info = info._replace(dns=tuple(server for server in var[3] if server))
+        if scripts.DHCP_ON in operations:
+            info = info._replace(dhcp='Enabled')
+        self.adapters[Name] = info
+        return ApplyResult(True, '', operations=tuple(operations))
+
+    def clear(self, Name: str):
+        self.adapters[Name] = self._get(Name)._replace(address='', prefix=None, gateway='', dns=())
+
+
+class LoopbackTransport(Transport):
+    """在本进程中模拟的主机（每台主机一个 NetManage + MemoryBackend，首次用到时创建）
+
+    Attributes:
+        hosts (dict): 主机 -> NetManage，可检查下发后的配置
+        calls (int): apply 调用次数
+    """
+
+    name = 'loopback'
+
+    def __init__(self, latency: float = 0.05, jitter: float = 0.0, failure_rate: float = 0.0,
+                 hang_rate: float = 0.0, adapters: tuple = ('以太网',), seed: int = None):
+        """
+        Args:
+            latency (float): 每次修改的模拟耗时（秒，连接 + 目标主机上执行）
+            jitter (float): 额外的随机耗时上限（秒）
+            failure_rate (float): 连接失败的比例
+            hang_rate (float): 无响应（直到超时）的比例
+            adapters (tuple): 每台主机的网卡名称
+            seed (int): 随机数种子，相同时失败和无响应的主机相同
+        """
+        self.latency: float = latency
+        self.jitter: float = jitter
+        self.failure_rate: float = failure_rate
+        self.hang_rate: float = hang_rate
+        self.adapters: tuple = adapters
+        self.hosts: dict = {}
+        self.calls: int = 0
+        self._random = random.Random(seed)
+
+    def net(self, host: str) -> NetManage:
+        net = self.hosts.get(host)
+        if net is None:
+            net = self.hosts[host] = NetManage(MemoryBackend(self.adapters, len(self.hosts)), cache_ttl=0)
+        return net
+
+    async def apply(self, target: Target, minimal: bool = True) -> ApplyResult:
+        self.calls += 1
+        roll = self._random.random()
+        await asyncio.sleep(self.latency + self._random.random() * self.jitter)
+        if roll < self.hang_rate:
+            await asyncio.Event().wait()  # 不再返回，由超时结束
+        if roll < self.hang_rate + self.failure_rate:
+            raise ConnectionRefusedError('模拟的连接失败')
+        net = self.net(target.host)
+        if target.var is None:
+            return net.up_dhcp(target.adapter)
+        return net.change_adapter_ip(target.adapter, target.var, minimal)
+
+
+# ---- 下发 ----
+
+async def _apply_one(transport: Transport, target: Target, semaphore: asyncio.Semaphore,
+                     timeout: float, minimal: bool) -> HostResult:
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(transport.apply(target, minimal), timeout)
+        except asyncio.TimeoutError:
+            return HostResult(target, False, '[%s] 超时（%g 秒）' % (target.host, timeout),
+                              time.perf_counter() - start)
+        except OSError as e:
+            return HostResult(target, False, '[%s] 连接失败！%s' % (target.host, e), time.perf_counter() - start)
+        except BackendError as e:
+            return HostResult(target, False, '[%s] 设置失败！%s' % (target.host, e), time.perf_counter() - start)
+        except Exception as e:  # 一台主机出错不影响其他主机
+            return HostResult(target, False, '[%s] 设置失败！%r' % (target.host, e), time.perf_counter() - start)
+        elapsed = time.perf_counter() - start
+        return HostResult(target, result.ok, '%s %s' % (target.host, result.info), elapsed, result)
+
+
+async def stream(targets: list, transport: Transport, concurrency: int = 50, timeout: float = 30.0,
+                 minimal: bool = True) -> AsyncIterator[FleetProgress]:
+    """逐个给出完成的主机（按完成顺序），中途停止迭代时取消尚未完成的主机
+
+    Args:
+        targets (list): Target 列表
+        transport (Transport): 传输
+        concurrency (int): 最多同时处理的主机数
+        timeout (float): 每台主机的超时（秒）
+        minimal (bool): 同 NetManage.change_adapter_ip
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    tasks = {asyncio.ensure_future(_apply_one(transport, target, semaphore, timeout, minimal)): index
+             for index, target in enumerate(targets)}
+    start = time.perf_counter()
+    pending = set(tasks)
+    done = failed = 0
+    try:
+        while pending:
+            finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in finished:
+                item = task.result()
+                done += 1
+                failed += not item.ok
+                yield FleetProgress(done, len(tasks), failed, time.perf_counter() - start, tasks[task], item)
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def rollout(targets: list, transport: Transport, concurrency: int = 50, timeout: float = 30.0,
+                  minimal: bool = True, progress: Callable[[FleetProgress], None] = None) -> FleetResult:
+    """把配置下发到全部主机并汇总（参数同 stream）
+
+    Args:
+        progress (Callable): 每完成一台主机调用一次
+
+    Returns:
+        FleetResult: 按 targets 顺序的结果和汇总提示
+    """
+    if not targets:
+        return FleetResult(True, '没有要设置的主机', 0.0, [])
+    start = time.perf_counter()
+    results = [None] * len(targets)
+    async for item in stream(targets, transport, concurrency, timeout, minimal):
+        results[item.index] = item.last
+        if progress is not None:
+            progress(item)
+    elapsed = time.perf_counter() - start
+
+    failed = [item for item in results if not item.ok]
+    slowest = max(results, key=lambda item: item.elapsed)
+    summary = '下发到 %d 台主机：成功 %d 台，失败 %d 台，耗时 %.2f 秒（最慢 [%s] %.2f 秒，同时 %d 台）' % (
+        len(results), len(results) - len(failed), len(failed), elapsed,
+        slowest.target.host, slowest.elapsed, concurrency)
+    return FleetResult(not failed, '\n'.join([summary] + [item.info for item in failed]), elapsed, results)
+
+
+def plan_targets(assignments: list, iplist) -> list:
+    """(主机, 网卡, 配置的IP地址 或 "dhcp") 列表转为 Target 列表
+
+    Raises:
+        KeyError: 配置不存在
+    """
+    targets = []
+    for host, adapter, key in assignments:
+        if key.lower() == 'dhcp':
+            targets.append(Target(host, adapter, None))
+            continue
+        profile = iplist.ip_dict.get(key)
+        if profile is None:
+            raise KeyError('没有保存 %s 的配置' % key)
+        targets.append(Target(host, adapter, profile_var(profile)))
+    return targets
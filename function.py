@@ -1,306 +1,478 @@
-import json
-import subprocess
-from json import JSONDecodeError
-
-from tools import subnet_converter
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional
+
+import planner
+import scripts
+import tracing
+from backend import BackendError, NetBackend, default_backend
+from cache import TTLCache
+from conflicts import ConflictDetector, find_conflicts
+from journal import ProfileJournal
+from models import AdapterSnapshot, ApplyResult, BatchResult
+from prefix_index import PrefixIndex
+from profile_store import Profile, ProfileStore
+from search_index import SearchIndex, SearchResult
+from shell import ShellSession
+from tools import ip_to_int, validate_profiles
 
 
 class NetManage:
     """网络适配器管理类，用于获取和配置网络接口信息
+
+    实际的读取和修改由后端完成（Windows 为 PowerShell，Linux 为 netlink），
+    本类负责缓存、最小修改计划和结果提示，界面和命令行在两个平台上用法相同。
     
     Attributes:
         adapters (list): 存储网卡适配器信息的列表
+        snapshot (AdapterSnapshot): 最近一次获取的全部网卡配置快照
+        backend (NetBackend): 网络配置后端
+        cache (TTLCache): 网卡名称 -> get_adapter_info 结果的缓存
     """
 
-    def __init__(self):
+    def __init__(self, backend: NetBackend = None, cache_ttl: float = 10.0, session: ShellSession = None):
         """初始化网络管理实例
+
+        Args:
+            backend (NetBackend): 指定后端，为空时按平台选择（见 backend.default_backend）
+            cache_ttl (float): 网卡配置缓存有效期（秒），0 表示不缓存
+            session (ShellSession): 使用 PowerShell 后端时指定的 Shell 会话
         """
         self.adapters: list = []  # 网卡适配器信息列表
+        self.snapshot: AdapterSnapshot = AdapterSnapshot()  # 最近一次的网卡配置快照
+        self.backend: NetBackend = backend or default_backend(session)
+        self.cache: TTLCache = TTLCache(cache_ttl)
+        self._locks: dict = {}  # 网卡名称 -> 锁，同一网卡的修改依次执行
+        self._locks_guard = threading.Lock()
 
     def get_network_adapters(self):
         """获取活动状态的网络适配器列表
         
-        使用PowerShell命令获取状态为"up"的网络适配器信息，
-        并将结果以JSON格式解析存储到adapters属性中
-        
-        Raises:
-            subprocess.CalledProcessError: 当PowerShell命令执行失败时引发
+        通过一次快照查询获取状态为"up"的网络适配器信息，
+        并将结果存储到adapters属性中（同时刷新snapshot）
+        """
+        snapshot = self.get_adapter_snapshot()
+        self.adapters = [{'Name': info.name, 'InterfaceIndex': info.index,
+                          'InterfaceAlias': info.alias, 'InterfaceDescription': info.description}
+                         for info in snapshot.values()]
+
+    @tracing.traced('net.get_adapter_snapshot')
+    def get_adapter_snapshot(self) -> AdapterSnapshot:
+        """一次往返获取所有活动网卡及其IPv4配置
+
+        启动和刷新都只需要一次后端调用，与网卡数量无关。
+
+        Returns:
+            AdapterSnapshot: 以接口索引为键的网卡配置快照，失败时为空
         """
         try:
-            # 构建PowerShell命令字符串（注意开头的空格避免命令拼接错误）
-            command = ("Get-NetAdapter"
-                       "| Where-Object { $_.Status -eq 'up' } "  # 过滤状态为up的适配器
-                       "| Where-Object { $_.InterfaceAlias -notlike 'Tailscale'}"
-                       "| Select-Object Name, InterfaceIndex, InterfaceAlias, InterfaceDescription "
-                       "| ConvertTo-Json")
-
-            # 配置隐藏控制台窗口参数
-            startupinfo = subprocess.STARTUPINFO()
-            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW  # 0x00000001
-
-            # 执行PowerShell命令
-            output = subprocess.check_output(
-                ["powershell", "-ExecutionPolicy", "Bypass", "-Command", command],
-                stderr=subprocess.STDOUT,  # 将标准错误重定向到标准输出
-                startupinfo=startupinfo,
-                encoding='gbk'  # 使用中文系统默认编码
-            )
-
-            # 解析JSON输出
-            try:
-                output = json.loads(output)
-            except json.JSONDecodeError as e:
-                print(f"JSON解析失败：{e}")
-                return
-
-            # 统一数据存储格式（适配单对象和多对象情况）
-            self.adapters = [output] if isinstance(output, dict) else output
-
-        except subprocess.CalledProcessError as e:
-            # 增强错误处理：将错误信息传递到GUI界面
-            error_msg = f"命令执行失败：{e.output.strip()}"
-            print(error_msg)
-            # if self.window:
-            #     self.window.statusBar().showMessage(error_msg, 5000)
-
-    @staticmethod
-    def get_adapter_info(Name: str):
+            self.snapshot = self.backend.snapshot()
+        except BackendError as e:
+            print(e)
+            return AdapterSnapshot()
+
+        # 快照结果同时写入缓存
+        for info in self.snapshot.values():
+            self.cache.put(info.name, info.as_tuple())
+        return self.snapshot
+
+    @tracing.traced('net.get_adapter_info')
+    def get_adapter_info(self, Name: str, use_cache: bool = True):
         """获取指定网络适配器的配置信息
         
         Args:
             Name (str): 网络接口名称（如"以太网"、"WLAN"等）
+            use_cache (bool): 是否优先使用未过期的缓存结果
             
         Returns:
             tuple: 包含(IP地址, 子网掩码, 默认网关, DNS服务器列表, DHCP状态)的元组
-            None: 当获取信息失败时返回
             
         执行流程：
-        1. 通过PowerShell获取指定网卡的详细配置
-        2. 解析IPv4地址、网关、子网掩码等信息
-        3. 更新关联GUI窗口的控件显示
-        4. 返回格式化后的网络配置信息
+        1. 命中缓存时直接返回
+        2. 通过后端获取指定网卡的详细配置
+        3. 写入缓存并返回格式化后的网络配置信息
         """
-        # 使用三引号
-        command = '''
-            $name = '%s'
-            $config = Get-NetIPAddress -InterfaceAlias $name -AddressFamily IPv4
-            $gateway = Get-NetRoute -InterfaceAlias $name | Where-Object DestinationPrefix -eq '0.0.0.0/0'
-            $dns = Get-DnsClientServerAddress -InterfaceAlias $name -AddressFamily IPv4
-            $dhcp = Get-NetIPInterface -InterfaceAlias $name -AddressFamily IPv4 | 
-                Select-Object @{Name='DHCP'; Expression={ if ($_.Dhcp -eq 1) { 'Enabled' } else { 'Disabled' } }}
-
-            [PSCustomObject]@{
-                InterfaceAlias = $config[0].InterfaceAlias
-                IPv4Address = $config[0].IPAddress
-                IPv4DefaultGateway = $gateway[0].NextHop
-                SubnetMask = $config[0].PrefixLength
-                DNSServer = $dns.ServerAddresses
-                DHCPEnabled = $dhcp[0].Dhcp
-            } | ConvertTo-Json
-        ''' % Name
-
-        # 设置 startupinfo 隐藏控制台窗口
-        startupinfo = subprocess.STARTUPINFO()
-        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-
-        # 直接捕获输出
-        output = subprocess.check_output(
-            ["powershell", "-ExecutionPolicy", "Bypass", "-Command", command],
-            stderr=subprocess.STDOUT,
-            startupinfo=startupinfo,
-            encoding='gbk'
-        )
-        if output:
-            try:
-                output = json.loads(output)
-            except json.JSONDecodeError as e:
-                print(f"配置解析失败：{e}")
-                return '', '', '', (), ''
-
-            # 使用walrus运算符简化代码
-            print(output.get('SubnetMask'))
-            if (mask := output.get('SubnetMask')) is not None:
-                SubnetMask = subnet_converter(cidr=mask)
-            else:
-                SubnetMask = "255.255.255.255"  # 默认无效掩码
-
-            IPv4Address: str = output.get('IPv4Address', "")
-            IPv4DefaultGateway: str = output.get('IPv4DefaultGateway', '')
-            DNSServer: tuple[str] = output.get('DNSServer', ())
-            DHCPEnabled: str = output.get('DHCPEnabled', '')
-
-            return IPv4Address, SubnetMask, IPv4DefaultGateway, DNSServer, DHCPEnabled
-        else:
+        if use_cache and (cached := self.cache.get(Name)) is not None:
+            return cached
+
+        try:
+            info = self.backend.adapter_info(Name)
+        except BackendError as e:
+            print(e)
             return '', '', '', (), ''
 
-    def change_adapter_ip(self, Name: str, var=(str, str, str, (),)) :
-        """修改IP"""
-
-        # 清除网卡配置
-        print(self.clear_ip_cfg(Name))
-
-        command = f'''
-                $interface = Get-NetAdapter -Name "{Name}"
-                Remove-NetIPAddress -InterfaceIndex $interface.ifIndex -Confirm:$false -ErrorAction SilentlyContinue
-                New-NetIPAddress -InterfaceIndex $interface.ifIndex -IPAddress '{var[0]}' `
-                                 -PrefixLength '{subnet_converter(subnet_mask=var[1])}' -DefaultGateway '{var[2]}'
-                Set-DnsClientServerAddress -InterfaceIndex $interface.ifIndex -ServerAddresses {var[3]}
-                '''
-        print(command)
-        # 设置 startupinfo 隐藏控制台窗口
-        startupinfo = subprocess.STARTUPINFO()
-        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-
-        output = subprocess.run(
-            ["powershell", "-ExecutionPolicy", "Bypass", "-Command", command],
-            capture_output=True,
-            text=True,
-            encoding='gbk',
-            startupinfo=startupinfo
-        )
-
-        if output.returncode == 0:
-            info = '[%s] 修改IP成功！' % Name
-            return info
-        else:
-            info = '[%s] 修改IP失败！' % Name
-            return info
+        if info[0] or info[4]:
+            self.cache.put(Name, info)
+        return info
+
+    @tracing.traced('net.change_adapter_ip')
+    def change_adapter_ip(self, Name: str, var=(str, str, str, (),), minimal: bool = True) -> ApplyResult:
+        """修改IP
 
-    def up_dhcp(self, Name):
-        """启动DHCP"""
+        与当前配置比较后只执行变化的部分（仅DNS、仅网关、仅地址等），
+        配置相同时直接跳过。当前配置总是重新读取，不使用缓存（缓存期间网卡可能已被其他程序或DHCP修改）。所有操作一次完成，
+        任一步骤失败会自动恢复修改前的配置。
 
-        # 清除网卡配置
-        print(self.clear_ip_cfg(Name))
+        Args:
+            Name (str): 网卡名称
+            var (tuple): (IP地址, 子网掩码, 默认网关, DNS服务器列表)
+            minimal (bool): 为 False 时不做比较，完整应用全部配置
+
+        Returns:
+            ApplyResult: 结果、耗时与断网时长
+        """
+        with self.adapter_lock(Name):
+            result = self._delegate(Name, '修改IP', self.backend.change_ip, Name, var, minimal)
+            if result is None:
+                if minimal:
+                    operations = planner.plan_static(self.get_adapter_info(Name, use_cache=False), var)
+                else:
+                    operations = scripts.FULL_STATIC
+                result = self._apply(Name, operations, var, '修改IP')
+            if result.ok:
+                # 写穿缓存：已知修改后的配置，无需重新查询
+                DNSServer = tuple(dns for dns in var[3] if dns)
+                self.cache.put(Name, (var[0], var[1], var[2], DNSServer, 'Disabled'))
+            return result
+
+    @tracing.traced('net.up_dhcp')
+    def up_dhcp(self, Name) -> ApplyResult:
+        """启动DHCP
+
+        Returns:
+            ApplyResult: 结果、耗时与断网时长（等待获取到DHCP地址为止）
+        """
+        with self.adapter_lock(Name):
+            result = self._delegate(Name, '启用DHCP', self.backend.dhcp, Name)
+            if result is None:
+                operations = planner.plan_dhcp(self.get_adapter_info(Name, use_cache=False))
+                result = self._apply(Name, operations, ('', '', '', ()), '启用DHCP')
+            return result
 
-        command = f'''
-                        $name = "%s"
-                        # 启用 DHCP 
-                        Get-NetAdapter -InterfaceAlias $name | Set-NetIPInterface -Dhcp Enabled
-                        ''' % Name
+    @tracing.traced('net.apply_many')
+    def apply_many(self, profiles: dict, workers: int = 4, minimal: bool = True) -> BatchResult:
+        """同时修改多个网卡
 
-        # 设置 startupinfo 隐藏控制台窗口
-        startupinfo = subprocess.STARTUPINFO()
-        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+        每个网卡在线程池中各自执行 change_adapter_ip / up_dhcp，PowerShell 后端的会话池为每个线程
+        提供独立的进程，因此总耗时接近最慢的那个网卡，而不是各网卡耗时之和。
 
-        output = subprocess.run(
-            ["powershell", "-ExecutionPolicy", "Bypass", "-Command", command],
-            capture_output=True,
-            text=True,
-            encoding='gbk',
-            startupinfo=startupinfo
-        )
+        Args:
+            profiles (dict): 网卡名称 -> (IP地址, 子网掩码, 默认网关, DNS服务器列表)，值为 None 表示启用DHCP
+            workers (int): 最多同时修改的网卡数
+            minimal (bool): 同 change_adapter_ip
 
-        if output.returncode == 0:
-            info = '[%s] 启用DHCP成功！' % Name
-            return info
+        Returns:
+            BatchResult: 每个网卡的结果和汇总提示
+        """
+        names = list(profiles)
+        if not names:
+            return BatchResult(True, '没有要设置的网卡', 0.0, {})
+
+        def apply_one(Name: str) -> ApplyResult:
+            var = profiles[Name]
+            begin = time.perf_counter()
+            try:
+                if var is None:
+                    result = self.up_dhcp(Name)
+                else:
+                    result = self.change_adapter_ip(Name, var, minimal)
+            except Exception as e:  # 一个网卡出错不影响其他网卡
+                result = ApplyResult(False, '[%s] 设置失败！%s' % (Name, e), error=str(e))
+            # 耗时包括读取当前配置和比较，即该网卡从开始到完成的时间
+            return result._replace(elapsed=time.perf_counter() - begin)
+
+        workers = max(1, min(workers, len(names)))
+        self.backend.reserve(workers)  # 否则 PowerShell 会话池（默认 4 个进程）会限制实际并发数
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='netset-apply') as pool:
+            results = dict(zip(names, pool.map(apply_one, names)))
+        elapsed = time.perf_counter() - start
+
+        failed = [name for name, result in results.items() if not result.ok]
+        slowest = max(names, key=lambda name: results[name].elapsed)
+        summary = '批量设置 %d 个网卡：成功 %d 个，失败 %d 个，耗时 %.2f 秒（最慢 [%s] %.2f 秒，合计 %.2f 秒）' % (
+            len(names), len(names) - len(failed), len(failed), elapsed,
+            slowest, results[slowest].elapsed, sum(result.elapsed for result in results.values()))
+        info = '\n'.join([summary] + [results[name].info for name in names])
+        return BatchResult(not failed, info, elapsed, results)
+
+    @tracing.traced('net.verify_connectivity')
+    def verify_connectivity(self, Name: str, timeout: float = 2.0):
+        """检查网卡当前的网关和DNS是否可用（修改成功后调用，见 verify.py）
+
+        Returns:
+            verify.VerifyResult: 各项结果和首个DNS应答的时间
+        """
+        import verify  # 只在检查时才导入 asyncio
+        _, _, gateway, dns, _ = self.get_adapter_info(Name)
+        return verify.check_sync(gateway, dns, timeout)
+
+    def adapter_lock(self, Name: str) -> threading.Lock:
+        """该网卡的修改锁（读取当前配置、比较到修改完成期间持有，同一网卡的修改依次执行）"""
+        with self._locks_guard:
+            return self._locks.setdefault(Name, threading.Lock())
+
+    def _delegate(self, Name: str, action: str, fn, *args) -> Optional[ApplyResult]:
+        """后端自己比较并修改时（见 NetBackend.change_ip）由后端完成，否则返回 None"""
+        start = time.perf_counter()
+        try:
+            with tracing.span('backend.' + fn.__name__, backend=self.backend.name, adapter=Name):
+                result = fn(*args)
+        except BackendError as e:
+            result = ApplyResult(False, '[%s] %s失败！%s' % (Name, action, e), time.perf_counter() - start,
+                                 error=str(e))
+        if result is not None:
+            self.cache.invalidate(Name)  # 本进程没有读取修改前的配置，DHCP 或回滚后的配置未知
+        return result
+
+    def _apply(self, Name: str, operations: tuple, var: tuple, action: str) -> ApplyResult:
+        """通过后端执行一次修改，没有操作时直接返回"""
+        if not operations:
+            return ApplyResult(True, '[%s] 配置未变化，无需%s' % (Name, action))
+
+        # DHCP 分配的地址或失败回滚后的配置未知，先让缓存失效
+        self.cache.invalidate(Name)
+
+        start = time.perf_counter()
+        try:
+            with tracing.span('backend.apply', backend=self.backend.name, adapter=Name,
+                              operations=operations):
+                result = self.backend.apply(Name, operations, var)
+        except BackendError as e:
+            elapsed = time.perf_counter() - start
+            return ApplyResult(False, '[%s] %s失败！%s' % (Name, action, e), elapsed,
+                               error=str(e), operations=tuple(operations))
+        elapsed = time.perf_counter() - start
+
+        if result.ok:
+            info = '[%s] %s成功！（%s，耗时 %.2f 秒，断网 %.2f 秒）' % (
+                Name, action, planner.describe(operations), elapsed, result.gap)
+        elif result.rolled_back:
+            info = '[%s] %s失败，已恢复原配置！%s' % (Name, action, result.error)
         else:
-            info = '[%s] 启用DHCP失败！' % Name
-            return info
+            info = '[%s] %s失败！%s' % (Name, action, result.error)
+            print(info)
+        return result._replace(info=info, elapsed=elapsed, operations=tuple(operations))
 
-    @staticmethod
-    def clear_ip_cfg(Name: str):
+    def clear_ip_cfg(self, Name: str):
         """清除指定网卡信息"""
-        command = f'''
-                $name = "%s"
-                # 禁用DHCP
-                Get-NetAdapter -InterfaceAlias $name | Set-NetIPInterface -Dhcp Disabled
-                # 清除指定网卡Ip配置
-                Remove-NetIPAddress -InterfaceAlias $name -Confirm:$false
-                # 清除指定网卡网关配置
-                Remove-NetRoute -InterfaceAlias $name -Confirm:$false
-                # 清除指定网卡的DNS配置
-                Set-DnsClientServerAddress -InterfaceAlias $name -ResetServerAddresses
-                ''' % Name
-
-        # 设置 startupinfo 隐藏控制台窗口
-        startupinfo = subprocess.STARTUPINFO()
-        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-
-        output = subprocess.run(
-            ["powershell", "-ExecutionPolicy", "Bypass", "-Command", command],
-            capture_output=True,
-            text=True,
-            encoding='gbk',
-            startupinfo=startupinfo
-        )
-
-        if output.returncode == 0:
-            info = '[%s] 清除网卡配置成功！' % Name
-            return info
-        else:
+        self.cache.invalidate(Name)
+        try:
+            self.backend.clear(Name)
+        except BackendError as e:
+            print(e)
             info = '[%s] 清除网卡配置失败！' % Name
             return info
-
-
-
+        info = '[%s] 清除网卡配置成功！' % Name
+        return info
 
 
 class IPList:
-    """IP地址"""
+    """IP地址
+
+    数据保存在 record.json（快照）和 record.json.journal（追加日志）中，
+    每次增删改只追加变更，自动保存有防抖，日志过长时压缩为新的快照。
+    ip_dict 为按列保存的 ProfileStore（IP地址 -> Profile），用法与原来的字典相同；
+    index 按子网索引全部配置，用于按地址或网段查找；
+    search 是IP地址、网关、DNS和名称的全文索引，第一次搜索时建立（界面在后台用 build_search() 预先建立）；
+    conflicts 用于检查配置之间的冲突，第一次检查时建立。
+    """
 
-    def __init__(self, filename: str = 'record.json'):
+    def __init__(self, filename: str = 'record.json', autosave_delay: float = 1.0):
         super().__init__()
-        self.ip_dict: dict = {}
+        self.ip_dict: ProfileStore = ProfileStore()
         self.filename: str = filename
+        self.journal: ProfileJournal = ProfileJournal(filename, delay=autosave_delay)
+        self.index: PrefixIndex = PrefixIndex()
+        self.search: SearchIndex = SearchIndex()
+        self.conflicts: ConflictDetector = ConflictDetector(self.index)
+        self.bulk_threshold: int = 1000  # add_ips 一次超过该条数时重建而不是逐条更新索引
+        self.version: int = 0  # 每次增删改加一，用于判断后台建立的索引是否已过期
         self.load_ip()
 
-    def add_ip(self, IPv4Address: str, SubnetMask: str, IPv4DefaultGateway: str, DNSServer: tuple):
-        """添加IP"""
-        temp = {IPv4Address: {"IPv4Address": IPv4Address, 'SubnetMask': SubnetMask,
-                              'IPv4DefaultGateway': IPv4DefaultGateway, 'DNSServer': DNSServer}}
-        self.ip_dict.update(temp)
+    def add_ip(self, IPv4Address: str, SubnetMask: str, IPv4DefaultGateway: str, DNSServer: tuple,
+               Name: str = ''):
+        """添加IP（Name 为可选的配置名称）"""
+        self._put(IPv4Address, SubnetMask, IPv4DefaultGateway, DNSServer, Name)
+        self._record(IPv4Address)
 
+    def add_ips(self, profiles: Iterable[tuple]) -> int:
+        """批量添加IP（已存在的IP地址会被覆盖），返回添加的条数
 
-    def change_ip(self, IPv4Address: str, var: tuple[str, str, str, tuple]):
-        """修改IP"""
-        self.del_ip(IPv4Address)
-        self.add_ip(var[0],var[1],var[2],var[3])
+        每 bulk_threshold 条一组处理，只遍历一次 profiles，内存占用与条数无关。
+        条数较多时不逐条更新搜索索引和冲突检查（位图逐位更新的代价随配置数增长），
+        而是清空，在下次搜索或检查时整体重建；未写入的变更较多时直接追加到日志，不在内存中积累。
+        """
+        profiles = iter(profiles)
+        count = 0
+        while chunk := list(itertools.islice(profiles, self.bulk_threshold)):
+            if not count and len(chunk) == self.bulk_threshold:
+                self.search.clear()
+                self.conflicts.clear()
+            for var in chunk:
+                self._put(*var)
+            self.journal.record_many((var[0], self.ip_dict[var[0]].to_dict()) for var in chunk)
+            count += len(chunk)
+            if len(self.journal.pending) >= self.bulk_threshold:
+                self.journal.flush(sync=False)  # 保存时的 flush 会一并同步到磁盘
+            if self.journal.should_compact(len(self.ip_dict), pending=True):
+                self.journal.compact(self.ip_dict)
+        return count
+
+    def _put(self, IPv4Address: str, SubnetMask: str, IPv4DefaultGateway: str, DNSServer: tuple,
+             Name: str = ''):
+        temp = Profile(IPv4Address, SubnetMask, IPv4DefaultGateway, tuple(DNSServer or ()), Name)
+        self.ip_dict[IPv4Address] = temp
+        self.version += 1
+        self.index.insert_ip(IPv4Address, IPv4Address, SubnetMask)
+        self.search.add(IPv4Address, temp)
+        self.conflicts.add(IPv4Address, temp)
+
+    def change_ip(self, IPv4Address: str, var: tuple):
+        """修改IP（var 不含名称时保留原有的配置名称）"""
+        old = self.del_ip(IPv4Address) or {}
+        self.add_ip(var[0], var[1], var[2], var[3], var[4] if len(var) > 4 else old.get('Name', ''))
 
     def view_ip(self, IPv4Address: str):
         """查看IP"""
-        if self.ip_dict.get(IPv4Address):
-            ip_data = self.ip_dict.get(IPv4Address)
-
-            IPv4Address: str = ip_data.get('IPv4Address', "")
-            SubnetMask: str = ip_data.get('SubnetMask', '')
-            IPv4DefaultGateway: str = ip_data.get('IPv4DefaultGateway', '')
-            DNSServer: tuple[str] = ip_data.get('DNSServer', ())
-            DHCPEnable: str = ''
-
-            return IPv4Address, SubnetMask, IPv4DefaultGateway, DNSServer, DHCPEnable
+        profile = self.ip_dict.get(IPv4Address)
+        if profile is not None:
+            return profile.IPv4Address, profile.SubnetMask, profile.IPv4DefaultGateway, profile.DNSServer, ''
         else:
             print('没有 %s' % IPv4Address)
             return "", "", "", (), ''
 
     def del_ip(self, IPv4Address: str):
         """删除IP"""
-        if self.ip_dict.get(IPv4Address):
+        if IPv4Address in self.ip_dict:
             temp = self.ip_dict.pop(IPv4Address)
+            self.version += 1
+            self.index.remove(IPv4Address)
+            self.search.remove(IPv4Address)
+            self.conflicts.remove(IPv4Address)
+            self._record(IPv4Address)
             print('已删除 %s' % IPv4Address)
             return temp
         else:
             print('没有 %s' % IPv4Address)
             return None
 
+    def _record(self, IPv4Address: str):
+        """记录变更（写入日志由自动保存完成），日志过长时压缩"""
+        profile = self.ip_dict.get(IPv4Address)
+        self.journal.record(IPv4Address, profile.to_dict() if profile is not None else None)
+        if self.journal.should_compact(len(self.ip_dict)):
+            self.journal.compact(self.ip_dict)
+
+    def _build_index(self):
+        self.version += 1
+        self.search.clear()
+        self.conflicts.clear()
+        self.index.build(self.ip_dict)
+
+    def check_ip(self) -> dict:
+        """检查全部配置（格式、主机地址、网关是否同网段），返回 键 -> 问题说明"""
+        return validate_profiles(self.ip_dict)
+
+    def find_conflicts(self) -> list:
+        """检查整个配置库，返回 Conflict 列表（同时建立增量检查所需的数据）"""
+        if not self.conflicts.built:
+            self.conflicts.build(self.ip_dict)
+        return find_conflicts(self.ip_dict)
+
+    def check_conflicts(self, var: tuple, IPv4Address: str = None) -> list:
+        """检查一个尚未保存的配置与配置库的冲突
+
+        Args:
+            var: (IP地址, 子网掩码, 默认网关, DNS服务器列表[, 名称])
+            IPv4Address: 修改已有配置时为原来的IP地址，检查时排除它自己
+
+        Returns:
+            list: Conflict 列表
+        """
+        if not self.conflicts.built:
+            self.conflicts.build(self.ip_dict)
+        profile = {'IPv4Address': var[0], 'SubnetMask': var[1], 'IPv4DefaultGateway': var[2], 'DNSServer': var[3]}
+        return self.conflicts.check(profile, IPv4Address)
+
+    def conflicts_of(self, IPv4Address: str) -> list:
+        """已保存的配置与配置库中其他配置的冲突（尚未检查过配置库时返回空列表）"""
+        profile = self.ip_dict.get(IPv4Address)
+        if profile is None or not self.conflicts.built:
+            return []
+        return self.conflicts.check(profile, IPv4Address)
+
+    def search_ip(self, text: str) -> Optional[SearchResult]:
+        """IP地址、网关、DNS或名称中包含 text 的配置
+
+        Returns:
+            SearchResult: 可迭代、可用 in 判断的结果，text 为空时返回 None
+        """
+        if not self.search.built:
+            self.search.build(self.ip_dict)
+        return self.search.search(text)
+
+    def search_snapshot(self) -> tuple:
+        """(version, ip_dict 的副本)，在界面线程中调用，交给 build_search 在后台线程中建立索引
+
+        ProfileStore 不是线程安全的，后台线程只读取副本（复制各列，100 万条约需数毫秒）。
+        """
+        return self.version, self.ip_dict.copy()
+
+    def build_search(self, snapshot: tuple) -> tuple:
+        """按 search_snapshot() 的副本建立新的搜索索引（在后台线程中调用，不修改当前的 search），10 万条约需 2 秒
+
+        Returns:
+            tuple: (副本的 version, SearchIndex)
+        """
+        version, profiles = snapshot
+        index = SearchIndex(self.search.n)
+        index.build(profiles)
+        return version, index
+
+    def use_search(self, version: int, index: Optional[SearchIndex]) -> bool:
+        """换上 build_search() 建立的索引（在界面线程中调用），建立期间配置已被修改时不使用并返回 False"""
+        if index is None or version != self.version:
+            return False
+        self.search = index
+        return True
+
+    def find_ip(self, IPv4Address: str) -> list:
+        """包含该地址的已保存配置，子网最小的在前"""
+        return self.index.find(IPv4Address)
+
+    def match_ip(self, IPv4Address: str) -> Optional[str]:
+        """最长前缀匹配：最具体地覆盖该地址的配置，没有时返回 None"""
+        return self.index.longest_match(ip_to_int(IPv4Address))
+
+    def ips_in(self, network: str) -> list:
+        """子网位于指定网络（如"172.16.0.0/12"）之内的配置"""
+        return self.index.find_in(network)
+
+    def ips_between(self, first: str, last: str) -> list:
+        """子网位于地址范围 [first, last] 之内的配置"""
+        return self.index.in_range(ip_to_int(first), ip_to_int(last))
+
     def load_ip(self):
-        """加载IP"""
-        try:
-            with open(self.filename, 'r', encoding='utf-8') as f:
-                self.ip_dict = json.load(f)
-            print('读取 [%s] 文件完成...' % self.filename)
-            print('读取到 [%d] 条数据。' % len(self.ip_dict))
-
-        except FileNotFoundError:
-            with open(self.filename, 'w', encoding='utf-8'):
-                pass
-            print('新建文件 [%s]' % self.filename)
-
-        except JSONDecodeError:
-            print('[%s] 文件为空，加载失败' % self.filename)
-
-    def save_ip(self):
-        """保存IP"""
-        with open(self.filename, "w", encoding='utf-8') as f:
-            json.dump(self.ip_dict, f)
-        print("保存 [%s] 文件完成..." % self.filename)
-        print('已保存 [%d] 条数据。' % len(self.ip_dict))
+        """加载IP（快照 + 重放日志）"""
+        self.ip_dict = ProfileStore.from_dict(self.journal.load())
+        self._build_index()
+        print('读取 [%s] 文件完成...' % self.filename)
+        print('读取到 [%d] 条数据。' % len(self.ip_dict))
+
+    def save_ip(self, compact: bool = False):
+        """保存IP
+
+        只追加尚未写入的变更；compact 为 True 或日志过长时重写快照。
+        """
+        if compact or self.journal.should_compact(len(self.ip_dict), pending=True):
+            # 快照包含尚未写入的变更（如批量导入），不必先追加到日志
+            self.journal.compact(self.ip_dict)
+            print("保存 [%s] 文件完成..." % self.filename)
+            print('已保存 [%d] 条数据。' % len(self.ip_dict))
+        else:
+            count = self.journal.flush()
+            print("保存 [%s] 文件完成..." % self.journal.journal_file)
+            print('已保存 [%d] 条变更。' % count)
@@ -0,0 +1,229 @@
+"""
+IP 列表的增量持久化
+
+record.json 仍是完整快照（格式不变），每次增删改只在 record.json.journal
+末尾追加一行 JSON：{"k": 键, "v": 值}，值为 null 表示删除。
+- 加载：读取快照后按顺序重放日志；崩溃导致的残缺尾行会被截掉
+- 保存：只追加尚未写入的变更，写入量与变更数成正比，与列表大小无关
+- 压缩：日志过长时先写入剩余变更，再把完整数据写入临时文件、fsync 后原子替换快照，最后清空日志
+- 自动保存：变更后延迟 delay 秒批量写入（持续变更时最长 max_delay 秒）
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from json import JSONDecodeError
+from typing import Optional
+
+import tracing
+
+
+class ProfileJournal:
+    """快照 + 追加日志
+
+    Attributes:
+        filename (str): 快照文件
+        journal_file (str): 日志文件
+        entries (int): 日志中的变更条数
+        pending (dict): 尚未写入日志的变更（键 -> 值，None 表示删除）
+    """
+
+    def __init__(self, filename: str, delay: float = 1.0, max_delay: float = 5.0,
+                 compact_min: int = 1000, compact_ratio: float = 0.5):
+        """
+        Args:
+            filename (str): 快照文件
+            delay (float): 自动保存的防抖时间（秒），0 表示关闭自动保存
+            max_delay (float): 持续变更时自动保存的最长延迟（秒）
+            compact_min (int): 日志至少有多少条变更才考虑压缩
+            compact_ratio (float): 日志条数超过数据条数的该比例时压缩
+        """
+        self.filename: str = filename
+        self.journal_file: str = filename + '.journal'
+        self.delay: float = delay
+        self.max_delay: float = max_delay
+        self.compact_min: int = compact_min
+        self.compact_ratio: float = compact_ratio
+
+        self.entries: int = 0
+        self.pending: dict = {}
+        self._first_pending: Optional[float] = None
+        self._timer: Optional[threading.Timer] = None
+        self._unsynced: bool = False  # 日志中有 flush(sync=False) 写入、尚未同步到磁盘的内容
+        self._lock = threading.RLock()
+
+    @tracing.traced('file.load')
+    def load(self) -> dict:
+        """读取快照并重放日志
+
+        Returns:
+            dict: 完整数据
+        """
+        data = {}
+        try:
+            with open(self.filename, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            with open(self.filename, 'w', encoding='utf-8'):
+                pass
+            print('新建文件 [%s]' % self.filename)
+        except JSONDecodeError:
+            print('[%s] 文件为空，加载失败' % self.filename)
+
+        self.entries = self._replay(data)
+        return data
+
+    def _replay(self, data: dict) -> int:
+        entries = 0
+        good = 0  # 最后一条完整记录的结束位置
+        try:
+            with open(self.journal_file, 'rb') as f:
+                for line in f:
+                    try:
+                        if not line.endswith(b'\n'):
+                            raise ValueError('残缺记录')
+                        entry = json.loads(line)
+                        if not isinstance(entry, dict) or not isinstance(entry.get('k'), str):
+                            raise ValueError('不是变更记录')
+                    except ValueError:
+                        print('[%s] 第 %d 条记录损坏，已丢弃之后的内容' % (self.journal_file, entries + 1))
+                        break
+                    if entry.get('v') is None:
+                        data.pop(entry['k'], None)
+                    else:
+                        data[entry['k']] = entry['v']
+                    entries += 1
+                    good += len(line)
+                size = f.seek(0, os.SEEK_END)
+        except FileNotFoundError:
+            return 0
+
+        if good < size:
+            with open(self.journal_file, 'r+b') as f:
+                f.truncate(good)
+        if entries:
+            print('重放 [%s] %d 条变更' % (self.journal_file, entries))
+        return entries
+
+    def record(self, key: str, value: Optional[dict]):
+        """记录一次变更（value 为 None 表示删除），并安排自动保存"""
+        with self._lock:
+            self.pending[key] = value
+            if self._first_pending is None:
+                self._first_pending = time.monotonic()
+            self._schedule()
+
+    def record_many(self, changes):
+        """批量记录变更（(键, 值) 序列），只安排一次自动保存"""
+        with self._lock:
+            self.pending.update(changes)
+            if self._first_pending is None:
+                self._first_pending = time.monotonic()
+            self._schedule()
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self.pending)
+
+    def _schedule(self):
+        if self.delay <= 0:
+            return
+        if self._timer is not None:
+            # 持续变更时不无限推迟
+            if time.monotonic() - self._first_pending >= self.max_delay:
+                return
+            self._timer.cancel()
+        self._timer = threading.Timer(self.delay, self._autosave)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _autosave(self):
+        try:
+            self.flush()
+        except OSError as e:
+            print('自动保存失败：%s' % e)
+
+    def flush(self, sync: bool = True) -> int:
+        """把未写入的变更追加到日志（sync 为 True 时同步到磁盘，包括之前 sync=False 写入的内容）
+
+        Returns:
+            int: 写入的变更条数
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._first_pending = None
+            if not self.pending:
+                if sync and self._unsynced:
+                    with open(self.journal_file, 'a', encoding='utf-8') as f:
+                        os.fsync(f.fileno())
+                    self._unsynced = False
+                return 0
+
+            with tracing.span('file.flush', entries=len(self.pending)):
+                lines = ''.join(json.dumps({'k': key, 'v': value}, ensure_ascii=False) + '\n'
+                                for key, value in self.pending.items())
+                with open(self.journal_file, 'a', encoding='utf-8') as f:
+                    f.write(lines)
+                    f.flush()
+                    if sync:
+                        os.fsync(f.fileno())
+                self._unsynced = not sync
+            count = len(self.pending)
+            self.entries += count
+            self.pending.clear()
+            return count
+
+    def should_compact(self, size: int, pending: bool = False) -> bool:
+        """日志是否已经长到需要压缩（pending 为 True 时把尚未写入的变更也算在内）"""
+        entries = self.entries + len(self.pending) if pending else self.entries
+        return entries >= self.compact_min and entries > size * self.compact_ratio
+
+    @tracing.traced('file.compact')
+    def compact(self, data):
+        """把完整数据（dict 或 ProfileStore）原子写入快照并清空日志
+
+        先把未写入的变更追加到日志再写快照：替换快照后、清空日志前崩溃时，
+        日志中的每一条变更都已包含在快照中，且各键最后一条记录与快照一致，重放后结果不变。
+        写快照失败时变更已经在日志中，不会丢失。
+        """
+        with self._lock:
+            self.flush()
+            directory = os.path.dirname(os.path.abspath(self.filename))
+            fd, temp = tempfile.mkstemp(prefix='.%s.' % os.path.basename(self.filename), dir=directory)
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    if isinstance(data, dict):
+                        json.dump(data, f)
+                    else:
+                        f.writelines(data.iterencode())  # 逐条编码，不必先转为完整的字典
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp, self.filename)
+            except BaseException:
+                if os.path.exists(temp):
+                    os.unlink(temp)
+                raise
+            _fsync_dir(directory)
+
+            # 快照已包含日志中的全部变更；在此之前崩溃时重放日志不改变结果
+            with open(self.journal_file, 'w', encoding='utf-8'):
+                pass
+            self.entries = 0
+
+    def close(self):
+        """停止自动保存并写入剩余变更"""
+        self.flush()
+
+
+def _fsync_dir(directory: str):
+    """同步目录项，保证 rename 落盘（Windows 不支持，忽略）"""
+    if os.name == 'nt':
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
@@ -1,56 +1,146 @@
-import ctypes
-import sys
+from startup import StartupTimer
 
-from PyQt6.QtWidgets import QApplication
+timer = StartupTimer()  # 在导入 PyQt6 之前开始计时
 
-from function import NetManage, IPList
-from ui import Window
+import ctypes  # noqa: E402
+import os  # noqa: E402
+import sys  # noqa: E402
 
+from PyQt6.QtWidgets import QApplication  # noqa: E402
 
-def is_admin():
-    try:
-        return ctypes.windll.shell32.IsUserAnAdmin()
-    except:
-        return False
+import stall  # noqa: E402
+from agent import connect_backend  # noqa: E402
+from backend import is_admin  # noqa: E402
+from function import IPList, NetManage  # noqa: E402
+from ui import Window  # noqa: E402
+from watch import AdapterWatcher, changed_indexes  # noqa: E402
+from worker import NetExecutor, SignalBridge  # noqa: E402
 
 
 if __name__ == "__main__":
 
+    backend = None
     if not is_admin():
-        # 请求管理员权限并重启脚本
-        ctypes.windll.shell32.ShellExecuteW(None, "runas", sys.executable, " ".join(sys.argv), None, 1)
-        sys.exit()
-
+        # 有权限的代理在运行时通过它修改配置（见 agent.py），不必以管理员身份重启
+        backend = connect_backend()
+        if backend is not None:
+            print('通过代理修改网卡配置')
+        elif os.name == 'nt':
+            # 请求管理员权限并重启脚本
+            ctypes.windll.shell32.ShellExecuteW(None, "runas", sys.executable, " ".join(sys.argv), None, 1)
+            sys.exit()
+        else:
+            print('当前不是 root 用户，只能查看网卡配置，修改需要 root 权限（或先以 root 运行 python -m netset agent）')
+
+    # 分阶段启动：先显示窗口，网卡列表和配置在后台获取后再填入，各阶段耗时输出到日志
+    timer.mark('导入')
     app = QApplication(sys.argv)
-    window = Window()
-    net = NetManage()
-    net.get_network_adapters()
-
-    adapter_names = [adapter["Name"] for adapter in net.adapters]
-    window.adapter_combobox.addItems(adapter_names)
-    window.adapter_combobox.currentTextChanged.connect(
-        lambda: window.update_ip_ui(net.get_adapter_info(window.adapter_combobox.currentText())))
-    adapter = adapter_names[0]
-
-    window.update_ip_ui(net.get_adapter_info(adapter))
-
-    # IP列表
-    iplist = IPList()
-
-    window.ip_list_view.addItems(iplist.ip_dict.keys())
-    # window.ip_list_view.currentTextChanged.connect(
-    #     lambda: window.update_ip_ui(iplist.view_ip(window.ip_list_view.currentItem().text())))
+    watchdog = stall.install(app)  # 界面线程卡顿时记录阻塞的槽函数和调用栈到 stall.log
+    iplist = IPList()  # 配置只读取一次，窗口和之后的操作共用
+    timer.mark('读取配置')
+    window = Window(iplist)
+    window.update_status_label('正在获取网卡...')
+    window.show()
+    timer.mark('显示窗口')
+
+    net = NetManage(backend)
+    executor = NetExecutor(window)
+    executor.error.connect(lambda channel, message: window.update_status_label(f'[{channel}] {message}'))
+
+    def show_adapter(name: str):
+        """显示网卡配置，缓存中没有时在后台查询"""
+        cached = net.cache.get(name)
+        if cached is not None:
+            executor.cancel('adapter')  # 丢弃之前选择的网卡尚未返回的查询
+            window.update_ip_ui(cached)
+        else:
+            executor.submit('adapter', net.get_adapter_info, name, callback=window.update_ip_ui)
+
+    def refresh_adapter(name: str):
+        """在后台获取网卡配置（缓存过期才会查询系统，连续点击只保留最后一次）"""
+        executor.submit('adapter', net.get_adapter_info, name, callback=window.update_ip_ui)
+
+    def apply(name: str, fn, *args):
+        """在后台执行修改操作，完成后更新状态并刷新网卡信息"""
+        window.update_status_label('[%s] 正在设置...' % name)
+
+        def done(result):
+            window.update_status_label(result.info)
+            refresh_adapter(window.adapter_combobox.currentText())
+            if result.ok and result.operations:
+                # 修改成功后立即检查网关和DNS，提示信息后面追加检查结果
+                executor.submit('verify:%s' % name, net.verify_connectivity, name,
+                                callback=lambda check: window.update_status_label('%s\n%s' % (result.info, check.info)))
+
+        executor.submit('apply:%s' % name, fn, name, *args, callback=done, coalesce=False)
+
+    window.adapter_combobox.currentTextChanged.connect(show_adapter)
+
+    def prepare_search():
+        """在后台建立搜索索引，建好之前搜索框不可用（否则第一次输入时在界面线程中建立）"""
+        if iplist.search.built:
+            window.filter_entry.setEnabled(True)
+            return
+        window.filter_entry.setEnabled(False)
+
+        def done(result):
+            version, index = result
+            if not iplist.use_search(version, index) and iplist.version != version:
+                prepare_search()  # 建立期间配置被修改，重新建立
+            else:
+                window.filter_entry.setEnabled(True)
+
+        executor.submit('search', iplist.build_search, iplist.search_snapshot(), callback=done)
+
+    # 导入、批量删除等使索引失效后重新在后台建立
+    window.ip_list_model.modelReset.connect(lambda: prepare_search())
+    window.ip_list_model.rowsRemoved.connect(lambda *_: prepare_search())
+    prepare_search()
+
+    def on_first_snapshot(snapshot):
+        """首次快照：填入网卡列表，第一个网卡的配置已在缓存中，直接显示"""
+        timer.mark('获取网卡')
+        names = snapshot.names()
+        window.update_adapters(names)
+        window.update_status_label('' if names else '没有找到活动的网卡')
+        timer.mark('显示网卡配置')
+        timer.log()
+
+    # 一次快照获取全部网卡及其配置（独立通道，不会与网卡变化通知的刷新合并）
+    executor.submit('startup', net.get_adapter_snapshot, callback=on_first_snapshot)
 
     # 查看IP
-    window.adapter_button.clicked.connect(
-        lambda: window.update_ip_ui(net.get_adapter_info(window.adapter_combobox.currentText())))
+    window.adapter_button.clicked.connect(lambda: refresh_adapter(window.adapter_combobox.currentText()))
 
     # 更改IP
-    window.set_button_ip.clicked.connect(lambda: window.update_status_label(
-        net.change_adapter_ip(window.adapter_combobox.currentText(), window.current_ip())))
+    window.set_button_ip.clicked.connect(
+        lambda: apply(window.adapter_combobox.currentText(), net.change_adapter_ip, window.current_ip()))
 
     # 启动DHCP
-    window.set_button_dhcp.clicked.connect(lambda: net.up_dhcp(window.adapter_combobox.currentText()))
-
-    window.show()
-    sys.exit(app.exec())
+    window.set_button_dhcp.clicked.connect(lambda: apply(window.adapter_combobox.currentText(), net.up_dhcp))
+
+    # 网卡变化通知：防抖后刷新一次快照，增量更新网卡列表和当前网卡的配置
+    def apply_snapshot(snapshot, events: list):
+        window.update_adapters(snapshot.names())
+        indexes = changed_indexes(events)
+        info = snapshot.by_name(window.adapter_combobox.currentText())
+        if info and (not indexes or info.index in indexes):
+            executor.cancel('adapter')
+            window.update_ip_ui(info.as_tuple())
+
+    def on_adapters_changed(events: list):
+        executor.submit('snapshot', net.get_adapter_snapshot,
+                        callback=lambda snapshot: apply_snapshot(snapshot, events))
+
+    bridge = SignalBridge(window)
+    bridge.triggered.connect(on_adapters_changed)
+    watcher = AdapterWatcher(bridge)
+    try:
+        watcher.start()
+    except OSError as e:
+        print(f'网卡变化通知不可用：{e}')
+
+    exit_code = app.exec()
+    watcher.stop()
+    executor.wait(5000)
+    sys.exit(exit_code)
@@ -0,0 +1,99 @@
+from typing import NamedTuple, Optional
+
+from tools import subnet_converter
+
+
+class AdapterInfo(NamedTuple):
+    """单个网卡的 IPv4 配置
+
+    Attributes:
+        index (int): 接口索引（InterfaceIndex）
+        name (str): 网卡名称（如"以太网"）
+        alias (str): 接口别名（InterfaceAlias）
+        description (str): 网卡描述
+        address (str): IPv4 地址
+        prefix (int): 前缀长度，未配置地址时为 None
+        gateway (str): 默认网关
+        dns (tuple): DNS 服务器
+        dhcp (str): DHCP 状态（"Enabled" / "Disabled"）
+    """
+    index: int
+    name: str
+    alias: str = ''
+    description: str = ''
+    address: str = ''
+    prefix: Optional[int] = None
+    gateway: str = ''
+    dns: tuple = ()
+    dhcp: str = ''
+
+    @property
+    def mask(self) -> str:
+        """点分十进制子网掩码"""
+        if self.prefix is None:
+            return "255.255.255.255"  # 默认无效掩码
+        return subnet_converter(cidr=self.prefix)
+
+    def as_tuple(self) -> tuple:
+        """转换为 get_adapter_info 的返回格式
+
+        Returns:
+            tuple: (IP地址, 子网掩码, 默认网关, DNS服务器列表, DHCP状态)
+        """
+        return self.address, self.mask, self.gateway, self.dns, self.dhcp
+
+
+class AdapterSnapshot(dict):
+    """所有活动网卡的配置快照，以接口索引为键，值为 AdapterInfo"""
+
+    def by_name(self, name: str) -> Optional[AdapterInfo]:
+        """按网卡名称（或别名）查找"""
+        for info in self.values():
+            if name in (info.name, info.alias):
+                return info
+        return None
+
+    def names(self) -> list:
+        """网卡名称列表"""
+        return [info.name for info in self.values()]
+
+
+class ApplyResult(NamedTuple):
+    """一次修改（静态 IP / DHCP）的结果
+
+    Attributes:
+        ok (bool): 是否成功
+        info (str): 状态栏提示信息
+        elapsed (float): 调用方测得的总耗时（秒）
+        gap (float): 断网时长（秒），即地址/路由被移除到新配置生效的间隔
+        rolled_back (bool): 失败后是否已恢复到修改前的配置
+        error (str): 失败原因
+        operations (tuple): 实际执行的操作
+    """
+    ok: bool
+    info: str
+    elapsed: float = 0.0
+    gap: float = 0.0
+    rolled_back: bool = False
+    error: str = ''
+    operations: tuple = ()
+
+
+class BatchResult(NamedTuple):
+    """一次批量修改多个网卡的结果
+
+    Attributes:
+        ok (bool): 是否全部成功
+        info (str): 汇总提示（第一行为总结，之后每个网卡一行）
+        elapsed (float): 总耗时（秒），并行执行时接近最慢的网卡而不是各网卡之和
+        results (dict): 网卡名称 -> ApplyResult（与提交时的顺序相同）
+    """
+    ok: bool
+    info: str
+    elapsed: float
+    results: dict
+
+    @property
+    def failed(self) -> list:
+        """失败的网卡名称"""
+        return [name for name, result in self.results.items() if not result.ok]
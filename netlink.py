@@ -0,0 +1,520 @@
+"""
+Linux rtnetlink 后端
+
+通过 NETLINK_ROUTE 套接字直接读取网卡、地址和路由，修改地址和默认路由，
+不创建任何子进程，一次完整快照只需三次 dump 请求（微秒到毫秒级）。
+
+说明：
+- DHCP 状态由地址是否为动态地址（没有 IFA_F_PERMANENT 标志）或默认路由
+  是否由 DHCP 客户端添加判断；netlink 无法启动或停止 DHCP 客户端，因此不支持
+  启用 DHCP，网卡由 DHCP 客户端配置时也不支持关闭 DHCP（修改静态地址）。
+- DNS 为系统全局配置，读写 /etc/resolv.conf 中的 IPv4 nameserver（其他行原样保留）；
+  resolv.conf 是符号链接（systemd-resolved 等）时不修改。
+"""
+import itertools
+import os
+import socket
+import struct
+import tempfile
+import threading
+import time
+from typing import NamedTuple
+
+import scripts
+import tracing
+from backend import BackendError, NetBackend
+from models import AdapterInfo, AdapterSnapshot, ApplyResult
+from tools import subnet_converter
+
+NETLINK_ROUTE = 0
+
+# 消息类型
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+RTM_NEWLINK = 16
+RTM_DELLINK = 17
+RTM_GETLINK = 18
+RTM_NEWADDR = 20
+RTM_DELADDR = 21
+RTM_GETADDR = 22
+RTM_NEWROUTE = 24
+RTM_DELROUTE = 25
+RTM_GETROUTE = 26
+
+# 消息标志
+NLM_F_REQUEST = 0x1
+NLM_F_MULTI = 0x2
+NLM_F_ACK = 0x4
+NLM_F_DUMP = 0x300
+NLM_F_EXCL = 0x200
+NLM_F_CREATE = 0x400
+NLM_F_APPEND = 0x800
+
+# 属性类型
+IFLA_IFNAME = 3
+IFLA_IFALIAS = 20
+IFA_ADDRESS = 1
+IFA_LOCAL = 2
+IFA_BROADCAST = 4
+IFA_FLAGS = 8
+RTA_DST = 1
+RTA_OIF = 4
+RTA_GATEWAY = 5
+RTA_PRIORITY = 6
+RTA_TABLE = 15
+
+IFF_UP = 0x1
+IFF_LOOPBACK = 0x8
+IFA_F_PERMANENT = 0x80
+RT_TABLE_MAIN = 254
+RTPROT_STATIC = 4
+RTPROT_DHCP = 16
+RT_SCOPE_UNIVERSE = 0
+RT_SCOPE_NOWHERE = 255
+RTN_UNICAST = 1
+
+_NLMSGHDR = struct.Struct('=IHHII')  # 长度, 类型, 标志, 序号, 端口
+_IFINFOMSG = struct.Struct('=BxHiII')  # 协议族, 设备类型, 索引, 标志, 变化掩码
+_IFADDRMSG = struct.Struct('=BBBBI')  # 协议族, 前缀长度, 标志, 范围, 索引
+_RTMSG = struct.Struct('=BBBBBBBBI')  # 协议族, 目的前缀, 源前缀, tos, 路由表, 协议, 范围, 类型, 标志
+_RTATTR = struct.Struct('=HH')
+
+RESOLV_CONF = '/etc/resolv.conf'
+
+
+def _align(length: int) -> int:
+    return (length + 3) & ~3
+
+
+def parse_attrs(data: bytes, offset: int) -> dict:
+    """解析 rtattr 列表，返回 {类型: 负载}（同类型只保留第一个）"""
+    attrs = {}
+    while offset + _RTATTR.size <= len(data):
+        length, kind = _RTATTR.unpack_from(data, offset)
+        if length < _RTATTR.size:
+            break
+        attrs.setdefault(kind & 0x3fff, data[offset + _RTATTR.size:offset + length])
+        offset += _align(length)
+    return attrs
+
+
+def iter_messages(data: bytes):
+    """逐条解析数据包中的 netlink 消息，生成 (类型, 标志, 序号, 负载)"""
+    offset = 0
+    while offset + _NLMSGHDR.size <= len(data):
+        length, kind, flags, seq, _ = _NLMSGHDR.unpack_from(data, offset)
+        if length < _NLMSGHDR.size:
+            break
+        yield kind, flags, seq, data[offset + _NLMSGHDR.size:offset + length]
+        offset += _align(length)
+
+
+def pack_attr(kind: int, payload: bytes) -> bytes:
+    length = _RTATTR.size + len(payload)
+    return _RTATTR.pack(length, kind) + payload + b'\0' * (_align(length) - length)
+
+
+def _u32(payload: bytes) -> int:
+    return struct.unpack('=I', payload[:4])[0]
+
+
+def _cstr(payload: bytes) -> str:
+    return payload.split(b'\0', 1)[0].decode('utf-8', 'replace')
+
+
+class Link(NamedTuple):
+    """网卡"""
+    index: int
+    name: str
+    alias: str
+    flags: int
+
+
+def parse_link(payload: bytes) -> Link:
+    _, _, index, flags, _ = _IFINFOMSG.unpack_from(payload)
+    attrs = parse_attrs(payload, _IFINFOMSG.size)
+    name = _cstr(attrs.get(IFLA_IFNAME, b''))
+    return Link(index, name, _cstr(attrs.get(IFLA_IFALIAS, b'')), flags)
+
+
+def parse_addr(payload: bytes) -> tuple:
+    """返回 (索引, 地址, 前缀长度, 标志)"""
+    family, prefix, flags, _, index = _IFADDRMSG.unpack_from(payload)
+    attrs = parse_attrs(payload, _IFADDRMSG.size)
+    if IFA_FLAGS in attrs:
+        flags = _u32(attrs[IFA_FLAGS])
+    raw = attrs.get(IFA_LOCAL) or attrs.get(IFA_ADDRESS) or b''
+    address = socket.inet_ntoa(raw) if family == socket.AF_INET and len(raw) == 4 else ''
+    return index, address, prefix, flags
+
+
+def parse_route(payload: bytes) -> tuple:
+    """返回 (出接口索引, 目的前缀长度, 网关, 路由表, 协议, 优先级)"""
+    family, dst_len, _, _, table, protocol, _, _, _ = _RTMSG.unpack_from(payload)
+    attrs = parse_attrs(payload, _RTMSG.size)
+    if RTA_TABLE in attrs:
+        table = _u32(attrs[RTA_TABLE])
+    gateway = attrs.get(RTA_GATEWAY, b'')
+    return (_u32(attrs[RTA_OIF]) if RTA_OIF in attrs else 0,
+            dst_len,
+            socket.inet_ntoa(gateway) if len(gateway) == 4 else '',
+            table,
+            protocol,
+            _u32(attrs[RTA_PRIORITY]) if RTA_PRIORITY in attrs else 0)
+
+
+class RtNetlink:
+    """rtnetlink 请求/响应套接字（线程安全，出错后自动重建）"""
+
+    def __init__(self):
+        self._sock = None
+        self._seq = itertools.count(int(time.time()) & 0xffff)
+        self._lock = threading.Lock()
+
+    def _socket(self) -> socket.socket:
+        if self._sock is None:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW | socket.SOCK_CLOEXEC, NETLINK_ROUTE)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+            sock.bind((0, 0))
+            self._sock = sock
+        return self._sock
+
+    def request(self, msg_type: int, body: bytes, flags: int = NLM_F_DUMP) -> list:
+        """发送请求并收集响应
+
+        Args:
+            msg_type (int): 消息类型（RTM_*）
+            body (bytes): 消息体（含属性）
+            flags (int): 附加标志，dump 请求为 NLM_F_DUMP，修改请求应含 NLM_F_ACK
+
+        Returns:
+            list: [(消息类型, 负载), ...]
+
+        Raises:
+            OSError: 内核返回错误（如 EPERM、EEXIST）
+        """
+        with self._lock, tracing.span('netlink.request', type=msg_type):
+            try:
+                return self._request(msg_type, body, flags)
+            except OSError:
+                self.close()
+                raise
+
+    def _request(self, msg_type: int, body: bytes, flags: int) -> list:
+        sock = self._socket()
+        seq = next(self._seq) & 0xffffffff
+        sock.send(_NLMSGHDR.pack(_NLMSGHDR.size + len(body), msg_type, flags | NLM_F_REQUEST, seq, 0) + body)
+
+        messages = []
+        while True:
+            for kind, msg_flags, msg_seq, payload in iter_messages(sock.recv(1 << 17)):
+                if msg_seq != seq:
+                    continue
+                if kind == NLMSG_DONE:
+                    return messages
+                if kind == NLMSG_ERROR:
+                    code = struct.unpack_from('=i', payload)[0]
+                    if code:
+                        raise OSError(-code, os.strerror(-code))
+                    return messages  # ACK
+                messages.append((kind, payload))
+                if not msg_flags & NLM_F_MULTI and not flags & NLM_F_ACK:
+                    return messages
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    # ---- 读取 ----
+
+    def links(self) -> list:
+        return [parse_link(payload) for kind, payload in
+                self.request(RTM_GETLINK, _IFINFOMSG.pack(socket.AF_UNSPEC, 0, 0, 0, 0))
+                if kind == RTM_NEWLINK]
+
+    def addresses(self) -> list:
+        return [parse_addr(payload) for kind, payload in
+                self.request(RTM_GETADDR, _IFADDRMSG.pack(socket.AF_INET, 0, 0, 0, 0))
+                if kind == RTM_NEWADDR]
+
+    def default_routes(self) -> list:
+        routes = (parse_route(payload) for kind, payload in
+                  self.request(RTM_GETROUTE, _RTMSG.pack(socket.AF_INET, 0, 0, 0, 0, 0, 0, 0, 0))
+                  if kind == RTM_NEWROUTE)
+        return [route for route in routes if route[1] == 0 and route[3] == RT_TABLE_MAIN and route[2]]
+
+    # ---- 修改 ----
+
+    def add_address(self, index: int, address: str, prefix: int):
+        raw = socket.inet_aton(address)
+        host = struct.unpack('!I', raw)[0]
+        broadcast = struct.pack('!I', host | (0xffffffff >> prefix if prefix < 32 else 0))
+        body = (_IFADDRMSG.pack(socket.AF_INET, prefix, 0, RT_SCOPE_UNIVERSE, index)
+                + pack_attr(IFA_LOCAL, raw) + pack_attr(IFA_ADDRESS, raw) + pack_attr(IFA_BROADCAST, broadcast))
+        self.request(RTM_NEWADDR, body, NLM_F_ACK | NLM_F_CREATE | NLM_F_EXCL)
+
+    def del_address(self, index: int, address: str, prefix: int):
+        raw = socket.inet_aton(address)
+        body = _IFADDRMSG.pack(socket.AF_INET, prefix, 0, 0, index) + pack_attr(IFA_LOCAL, raw)
+        self.request(RTM_DELADDR, body, NLM_F_ACK)
+
+    def add_default_route(self, index: int, gateway: str, metric: int = 0):
+        body = (_RTMSG.pack(socket.AF_INET, 0, 0, 0, RT_TABLE_MAIN, RTPROT_STATIC, RT_SCOPE_UNIVERSE, RTN_UNICAST, 0)
+                + pack_attr(RTA_GATEWAY, socket.inet_aton(gateway)) + pack_attr(RTA_OIF, struct.pack('=I', index)))
+        if metric:
+            body += pack_attr(RTA_PRIORITY, struct.pack('=I', metric))
+        # 与 Windows 一致，允许不同网卡各有一条默认路由（相当于 ip route append）
+        self.request(RTM_NEWROUTE, body, NLM_F_ACK | NLM_F_CREATE | NLM_F_APPEND)
+
+    def del_default_route(self, index: int, gateway: str, metric: int = 0):
+        body = (_RTMSG.pack(socket.AF_INET, 0, 0, 0, RT_TABLE_MAIN, 0, RT_SCOPE_NOWHERE, RTN_UNICAST, 0)
+                + pack_attr(RTA_GATEWAY, socket.inet_aton(gateway)) + pack_attr(RTA_OIF, struct.pack('=I', index))
+                + pack_attr(RTA_PRIORITY, struct.pack('=I', metric)))
+        self.request(RTM_DELROUTE, body, NLM_F_ACK)
+
+
+def read_dns(path: str = RESOLV_CONF) -> tuple:
+    """读取 resolv.conf 中的 IPv4 nameserver"""
+    servers = []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if _ipv4_nameserver(line):
+                    servers.append(line.split()[1])
+    except OSError:
+        pass
+    return tuple(servers)
+
+
+def _ipv4_nameserver(line: str) -> bool:
+    """是否为 IPv4 nameserver 行（只管理这些行，IPv6 等其他 nameserver 原样保留）"""
+    fields = line.split()
+    return len(fields) >= 2 and fields[0] == 'nameserver' and fields[1].count('.') == 3
+
+
+def read_resolv(path: str = RESOLV_CONF):
+    """resolv.conf 的原始内容（bytes），不存在时为 None，用于修改失败时原样恢复"""
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def write_dns(servers: tuple, path: str = RESOLV_CONF):
+    """替换 resolv.conf 中的 IPv4 nameserver（保留其他行，写临时文件后原子替换）
+
+    新的 nameserver 写在原来第一条 IPv4 nameserver 的位置。
+    resolv.conf 是符号链接时（如 systemd-resolved 的 stub 文件）由其他程序管理，不做修改。
+    """
+    _check_resolv(path)
+    lines, position = [], None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if _ipv4_nameserver(line):
+                    if position is None:
+                        position = len(lines)
+                    continue
+                lines.append(line)
+    except FileNotFoundError:
+        pass
+    if position is None:
+        position = len(lines)
+        if lines and not lines[-1].endswith('\n'):
+            lines[-1] += '\n'
+    lines[position:position] = ['nameserver %s\n' % server for server in servers]
+    _replace_file(path, ''.join(lines).encode('utf-8'))
+
+
+def restore_resolv(data, path: str = RESOLV_CONF):
+    """把 resolv.conf 恢复为 read_resolv 读到的内容（None 表示原来不存在）"""
+    _check_resolv(path)
+    if data is None:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+    else:
+        _replace_file(path, data)
+
+
+def _check_resolv(path: str):
+    if os.path.islink(path):
+        raise BackendError('[%s] 是符号链接（由 systemd-resolved 等程序管理），请通过该程序修改 DNS' % path)
+
+
+def _replace_file(path: str, data: bytes):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp = tempfile.mkstemp(prefix='.resolv.', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(temp, 0o644)
+        os.replace(temp, path)
+    except BaseException:
+        if os.path.exists(temp):
+            os.unlink(temp)
+        raise
+
+
+class NetlinkBackend(NetBackend):
+    """基于 rtnetlink 的 Linux 后端
+
+    Attributes:
+        netlink (RtNetlink): rtnetlink 套接字
+        resolv_conf (str): DNS 配置文件路径
+    """
+
+    name = 'netlink'
+
+    def __init__(self, resolv_conf: str = RESOLV_CONF):
+        self.netlink: RtNetlink = RtNetlink()
+        self.resolv_conf: str = resolv_conf
+
+    def _read(self, fn, *args):
+        try:
+            return fn(*args)
+        except OSError as e:
+            raise BackendError(f"netlink 请求失败：{e}") from e
+
+    def snapshot(self) -> AdapterSnapshot:
+        links = self._read(self.netlink.links)
+        addresses = self._read(self.netlink.addresses)
+        routes = self._read(self.netlink.default_routes)
+        dns = read_dns(self.resolv_conf)
+
+        snapshot = AdapterSnapshot()
+        for link in links:
+            # 与 Windows 一致：只保留已启用的网卡，排除回环和 Tailscale
+            if not link.flags & IFF_UP or link.flags & IFF_LOOPBACK or link.name.startswith('tailscale'):
+                continue
+            snapshot[link.index] = AdapterInfo(index=link.index, name=link.name,
+                                               alias=link.alias or link.name, dns=dns, dhcp='Disabled')
+
+        # 每个网卡只取第一条记录，与get_adapter_info保持一致
+        for index, address, prefix, flags in addresses:
+            if index in snapshot:
+                info = snapshot[index]
+                if not info.address:
+                    info = info._replace(address=address, prefix=prefix)
+                if not flags & IFA_F_PERMANENT:
+                    info = info._replace(dhcp='Enabled')
+                snapshot[index] = info
+        for index, _, gateway, _, protocol, _ in sorted(routes, key=lambda route: route[5]):
+            if index in snapshot:
+                info = snapshot[index]
+                if not info.gateway:
+                    info = info._replace(gateway=gateway)
+                if protocol == RTPROT_DHCP:
+                    info = info._replace(dhcp='Enabled')
+                snapshot[index] = info
+        return snapshot
+
+    def adapter_info(self, Name: str) -> tuple:
+        info = self.snapshot().by_name(Name)
+        if info is None:
+            raise BackendError("没有网卡 [%s]" % Name)
+        return info.as_tuple()
+
+    def _index(self, Name: str) -> int:
+        for link in self._read(self.netlink.links):
+            if Name in (link.name, link.alias):
+                return link.index
+        raise BackendError("没有网卡 [%s]" % Name)
+
+    def _state(self, index: int) -> tuple:
+        """网卡当前的 (地址列表, 默认路由列表)"""
+        addresses = [(address, prefix) for i, address, prefix, _ in self._read(self.netlink.addresses)
+                     if i == index]
+        routes = [(gateway, metric) for i, _, gateway, _, _, metric in self._read(self.netlink.default_routes)
+                  if i == index]
+        return addresses, routes
+
+    def _replace(self, index: int, addresses: list, routes: list):
+        """把网卡的地址和默认路由替换为指定值"""
+        current_addresses, current_routes = self._state(index)
+        for gateway, metric in current_routes:
+            if (gateway, metric) not in routes:
+                self.netlink.del_default_route(index, gateway, metric)
+        for address, prefix in current_addresses:
+            if (address, prefix) not in addresses:
+                self.netlink.del_address(index, address, prefix)
+        for address, prefix in addresses:
+            if (address, prefix) not in current_addresses:
+                self.netlink.add_address(index, address, prefix)
+        # 删除地址时内核会一并删除经由该子网的路由，这里重新确认
+        _, current_routes = self._state(index)
+        for gateway, metric in routes:
+            if (gateway, metric) not in current_routes:
+                self.netlink.add_default_route(index, gateway, metric)
+
+    def _dhcp_active(self, index: int) -> bool:
+        """网卡上是否有 DHCP 客户端配置的动态地址或默认路由"""
+        if any(i == index and not flags & IFA_F_PERMANENT for i, _, _, flags in self._read(self.netlink.addresses)):
+            return True
+        return any(route[0] == index and route[4] == RTPROT_DHCP for route in self._read(self.netlink.default_routes))
+
+    def apply(self, Name: str, operations: tuple, var: tuple) -> ApplyResult:
+        if scripts.DHCP_ON in operations:
+            return ApplyResult(False, '', error='Linux 下无法通过 netlink 启用 DHCP，请使用 DHCP 客户端',
+                               operations=tuple(operations))
+
+        index = self._index(Name)
+        # DHCP_OFF：netlink 无法停止 DHCP 客户端，客户端续租时会覆盖静态配置；
+        # 网卡上没有 DHCP 配置的地址和路由时无需关闭
+        if scripts.DHCP_OFF in operations and self._dhcp_active(index):
+            return ApplyResult(False, '', error='Linux 下无法通过 netlink 关闭 DHCP，请先停止 DHCP 客户端'
+                                                '（dhclient / NetworkManager 等）',
+                               operations=tuple(operations))
+
+        prior_addresses, prior_routes = self._state(index)
+        prior_resolv = read_resolv(self.resolv_conf) if scripts.DNS in operations else None
+        addresses, routes = list(prior_addresses), list(prior_routes)
+
+        gap_start = gap_end = None
+        dns_written = False
+        try:
+            if scripts.ADDRESS in operations:
+                gap_start = time.perf_counter()
+                addresses = [(var[0], subnet_converter(subnet_mask=var[1]))]
+                self._replace(index, addresses, routes)
+                gap_end = time.perf_counter()
+            if scripts.GATEWAY in operations:
+                gap_start = gap_start or time.perf_counter()
+                routes = [(var[2], 0)] if var[2] else []
+                self._replace(index, addresses, routes)
+                gap_end = time.perf_counter()
+            if scripts.DNS in operations:
+                dns_written = True
+                write_dns(tuple(server for server in var[3] if server), self.resolv_conf)
+        except (OSError, BackendError, ValueError) as e:
+            error = str(e)
+            rolled_back = False
+            try:
+                self._replace(index, prior_addresses, prior_routes)
+                if dns_written:
+                    restore_resolv(prior_resolv, self.resolv_conf)
+                rolled_back = True
+            except (OSError, BackendError) as restore_error:
+                error += ' / 回滚失败：%s' % restore_error
+            gap = (time.perf_counter() - gap_start) if gap_start else 0.0
+            return ApplyResult(False, '', gap=gap, rolled_back=rolled_back, error=error,
+                               operations=tuple(operations))
+
+        gap = (gap_end - gap_start) if gap_start else 0.0
+        return ApplyResult(True, '', gap=gap, operations=tuple(operations))
+
+    def clear(self, Name: str):
+        index = self._index(Name)
+        try:
+            self._replace(index, [], [])
+            write_dns((), self.resolv_conf)
+        except OSError as e:
+            raise BackendError(f"清除网卡配置失败：{e}") from e
+
+    def close(self):
+        self.netlink.close()
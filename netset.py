@@ -0,0 +1,434 @@
+"""
+命令行入口：python -m netset
+
+不导入 PyQt6，可以在脚本、计划任务或远程会话中查看网卡、应用已保存的配置、启用DHCP和管理配置。
+各命令需要的模块在命令内部才导入，启动只加载用到的部分（NumPy 也只在批量处理大量配置时才导入）。
+
+用法示例：
+    python -m netset adapters
+    python -m netset show 以太网
+    python -m netset apply 以太网 172.16.220.160
+    python -m netset dhcp 以太网
+    python -m netset apply 以太网 172.16.220.160 --verify   # 修改后检查网关和DNS
+    python -m netset batch 以太网=172.16.220.160 "以太网 2"=dhcp --workers 4
+    python -m netset profiles list 172.16
+    python -m netset profiles add 10.0.0.8 255.255.255.0 10.0.0.1 --dns 223.5.5.5 --name 办公室
+    python -m netset profiles import profiles.csv
+    python -m netset fleet hosts.csv --concurrency 100   # 每行：主机,网卡,配置的IP地址 或 dhcp
+    python -m netset agent                    # 以管理员身份运行代理，其他命令设置 NETSET_BACKEND=agent 即可不提权
+
+诊断信息（读取文件、后端错误等）输出到 stderr，命令结果输出到 stdout。
+--timing 在 stderr 输出启动各阶段耗时，并与 STARTUP_BUDGET 比较；
+--trace 文件 记录各操作的耗时（见 tracing.py），结束时导出并在 stderr 输出统计。
+"""
+import argparse
+import contextlib
+import json
+import sys
+
+import tracing
+from startup import StartupTimer
+
+_timer = StartupTimer()
+
+STARTUP_BUDGET = 0.150  # 启动到第一次调用后端的耗时预算（秒）
+VERIFY_HELP = '修改成功后检查网关和DNS是否可用（默认最多等待 2 秒），不可用时退出码为 3'
+
+
+def _mark(label: str):
+    _timer.mark(label)  # 同一阶段只记第一次（如 apply 先读取配置再创建后端，"导入"只发生一次）
+
+
+def _report_timing():
+    """输出各阶段耗时（不含解释器自身的启动，完整的进程耗时见 benchmarks/bench_cli.py）"""
+    text = _timer.summary()
+    first_call = _timer.at('首次调用后端')
+    if first_call is not None:
+        verdict = '未超出' if first_call <= STARTUP_BUDGET else '超出'
+        text += '（到首次调用后端 %.1f ms，预算 %d ms，%s）' % (first_call * 1000, STARTUP_BUDGET * 1000, verdict)
+    print('[启动] %s，PyQt6 %s' % (text, '已导入' if 'PyQt6' in sys.modules else '未导入'), file=sys.stderr)
+
+
+def _manager():
+    from function import NetManage
+    _mark('导入')
+    net = NetManage(cache_ttl=0)
+    _mark('创建后端')
+    return net
+
+
+def _iplist(args):
+    from function import IPList
+    _mark('导入')
+    iplist = IPList(args.record, autosave_delay=0)  # 命令结束前显式保存，不启动自动保存的定时器
+    _mark('读取配置')
+    return iplist
+
+
+def _require_admin():
+    import os
+    from backend import is_admin
+    if os.environ.get('NETSET_BACKEND', '').lower() == 'agent':
+        return  # 由代理修改
+    if not is_admin():
+        print('当前没有管理员（root）权限，修改网卡配置可能失败', file=sys.stderr)
+
+
+def _adapter_dict(info) -> dict:
+    return {'index': info.index, 'name': info.name, 'description': info.description,
+            'address': info.address, 'prefix': info.prefix, 'gateway': info.gateway,
+            'dns': list(info.dns), 'dhcp': info.dhcp}
+
+
+def _format_profile(profile: dict) -> str:
+    return '%-15s  %-15s  %-15s  %-32s  %s' % (
+        profile.get('IPv4Address', ''), profile.get('SubnetMask', ''), profile.get('IPv4DefaultGateway', ''),
+        ','.join(profile.get('DNSServer') or ()), profile.get('Name', ''))
+
+
+# ---- 网卡 ----
+
+def cmd_adapters(args, out) -> int:
+    """列出活动网卡"""
+    net = _manager()
+    snapshot = net.get_adapter_snapshot()
+    _mark('首次调用后端')
+    if args.json:
+        json.dump([_adapter_dict(info) for info in snapshot.values()], out, ensure_ascii=False, indent=2)
+        print(file=out)
+        return 0
+    for info in snapshot.values():
+        address = '%s/%s' % (info.address, info.prefix) if info.address else '-'
+        print('%-4d %-20s %-18s %-15s %s' % (info.index, info.name, address, info.gateway or '-',
+                                             'DHCP' if info.dhcp == 'Enabled' else '静态'), file=out)
+    return 0 if snapshot else 1
+
+
+def cmd_show(args, out) -> int:
+    """显示一个网卡的配置"""
+    net = _manager()
+    address, mask, gateway, dns, dhcp = net.get_adapter_info(args.name, use_cache=False)
+    _mark('首次调用后端')
+    if not (address or dhcp):
+        print('没有找到网卡 [%s] 或读取失败' % args.name, file=sys.stderr)
+        return 1
+    if args.json:
+        json.dump({'name': args.name, 'address': address, 'mask': mask, 'gateway': gateway,
+                   'dns': list(dns), 'dhcp': dhcp}, out, ensure_ascii=False, indent=2)
+        print(file=out)
+        return 0
+    print('网卡:     %s' % args.name, file=out)
+    print('IP地址:   %s' % (address or '-'), file=out)
+    print('子网掩码: %s' % (mask or '-'), file=out)
+    print('默认网关: %s' % (gateway or '-'), file=out)
+    print('DNS:      %s' % (', '.join(dns) or '-'), file=out)
+    print('DHCP:     %s' % (dhcp or '-'), file=out)
+    return 0
+
+
+def _verify(net, args, result, out) -> int:
+    """--verify 时在修改成功后检查网关和DNS（见 verify.py），返回退出码"""
+    if not result.ok:
+        return 1
+    if not args.verify:
+        return 0
+    check = net.verify_connectivity(args.name, args.verify)
+    print(check.info, file=out if check.ok else sys.stderr)
+    return 0 if check.ok else 3
+
+
+def cmd_apply(args, out) -> int:
+    """把已保存的配置应用到网卡"""
+    iplist = _iplist(args)
+    profile = iplist.ip_dict.get(args.profile)
+    if profile is None:
+        print('没有保存 %s 的配置' % args.profile, file=sys.stderr)
+        return 1
+    _require_admin()
+    net = _manager()
+    var = (profile.get('IPv4Address', ''), profile.get('SubnetMask', ''),
+           profile.get('IPv4DefaultGateway', ''), tuple(profile.get('DNSServer') or ()))
+    result = net.change_adapter_ip(args.name, var, minimal=not args.full)
+    _mark('首次调用后端')
+    print(result.info, file=out)
+    return _verify(net, args, result, out)
+
+
+def cmd_dhcp(args, out) -> int:
+    """网卡改为 DHCP"""
+    _require_admin()
+    net = _manager()
+    result = net.up_dhcp(args.name)
+    _mark('首次调用后端')
+    print(result.info, file=out)
+    return _verify(net, args, result, out)
+
+
+def cmd_batch(args, out) -> int:
+    """同时设置多个网卡（网卡=配置的IP地址，或 网卡=dhcp）"""
+    profiles = {}
+    for item in args.items:
+        name, sep, value = item.rpartition('=')
+        if not sep or not name or not value:
+            print('格式应为 网卡=配置的IP地址 或 网卡=dhcp：%s' % item, file=sys.stderr)
+            return 2
+        profiles[name] = None if value.lower() == 'dhcp' else value
+    if any(value is not None for value in profiles.values()):
+        iplist = _iplist(args)
+        for name, key in profiles.items():
+            if key is None:
+                continue
+            profile = iplist.ip_dict.get(key)
+            if profile is None:
+                print('没有保存 %s 的配置' % key, file=sys.stderr)
+                return 1
+            profiles[name] = (profile.get('IPv4Address', ''), profile.get('SubnetMask', ''),
+                              profile.get('IPv4DefaultGateway', ''), tuple(profile.get('DNSServer') or ()))
+    _require_admin()
+    net = _manager()
+    result = net.apply_many(profiles, workers=args.workers, minimal=not args.full)
+    _mark('首次调用后端')
+    print(result.info, file=out)
+    return 0 if result.ok else 1
+
+
+def cmd_fleet(args, out) -> int:
+    """把配置下发到多台主机（见 fleet.py）"""
+    import asyncio
+    import csv
+    import fleet
+    _mark('导入')
+    try:
+        with open(args.hosts, 'r', encoding='utf-8-sig', newline='') as f:
+            rows = [[cell.strip() for cell in row] for row in csv.reader(f) if row and not row[0].startswith('#')]
+    except OSError as e:
+        print('读取主机列表失败：%s' % e, file=sys.stderr)
+        return 1
+    bad = [row for row in rows if len(row) != 3 or not all(row)]
+    if bad:
+        print('格式应为 主机,网卡,配置的IP地址 或 dhcp：%s' % ','.join(bad[0]), file=sys.stderr)
+        return 2
+    try:
+        targets = fleet.plan_targets(rows, _iplist(args))
+    except KeyError as e:
+        print(e.args[0], file=sys.stderr)
+        return 1
+    if args.simulate:
+        transport = fleet.LoopbackTransport(latency=args.latency / 1000)
+    else:
+        transport = fleet.AgentTransport(port=args.port)
+    step = max(1, len(targets) // 10)
+
+    def progress(item):
+        if not item.last.ok:
+            print(item.last.info, file=sys.stderr)
+        if item.done % step == 0 or item.done == item.total:
+            print('[%d/%d] 失败 %d 台，已用 %.1f 秒' % (item.done, item.total, item.failed, item.elapsed),
+                  file=sys.stderr)
+
+    result = asyncio.run(fleet.rollout(targets, transport, args.concurrency, args.timeout,
+                                       minimal=not args.full, progress=progress))
+    _mark('首次调用后端')
+    print(result.info.splitlines()[0], file=out)
+    return 0 if result.ok else 1
+
+
+def cmd_agent(args, out) -> int:
+    """运行有权限的代理（见 agent.py），Ctrl+C 停止"""
+    from agent import AgentError, AgentServer, parse_address
+    _require_admin()
+    net = _manager()
+    net.cache.ttl = args.cache_ttl  # 代理常驻，多个客户端共用缓存
+    try:
+        AgentServer(net, parse_address(args.address) if args.address else None).serve_forever()
+    except AgentError as e:
+        print(e, file=sys.stderr)
+        return 1
+    return 0
+
+
+# ---- 配置 ----
+
+def cmd_profiles_list(args, out) -> int:
+    """列出（或搜索）已保存的配置"""
+    iplist = _iplist(args)
+    result = iplist.search_ip(args.text) if args.text else None
+    # 只有空白的文本与没有给出文本相同，search_ip 返回 None
+    keys = list(iplist.ip_dict if result is None else result)
+    profiles = [iplist.ip_dict[key] for key in keys]
+    if args.json:
+        json.dump([profile.to_dict() for profile in profiles], out, ensure_ascii=False, indent=2)
+        print(file=out)
+    else:
+        for profile in profiles:
+            print(_format_profile(profile), file=out)
+    return 0
+
+
+def cmd_profiles_add(args, out) -> int:
+    """添加（或覆盖）一个配置"""
+    from profile_io import to_profile
+    iplist = _iplist(args)
+    try:
+        var = to_profile({'IPv4Address': args.ip, 'SubnetMask': args.mask, 'IPv4DefaultGateway': args.gateway,
+                          'DNSServer': args.dns, 'Name': args.name})
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    conflicts = iplist.check_conflicts(var, var[0] if var[0] in iplist.ip_dict else None)
+    for conflict in conflicts:
+        print('注意：%s' % conflict.message, file=sys.stderr)
+    iplist.add_ip(*var)
+    iplist.save_ip()
+    print(_format_profile(iplist.ip_dict[var[0]]), file=out)
+    return 0
+
+
+def cmd_profiles_del(args, out) -> int:
+    """删除配置"""
+    iplist = _iplist(args)
+    missing = [key for key in args.ip if iplist.del_ip(key) is None]
+    iplist.save_ip()
+    return 1 if missing else 0
+
+
+def cmd_profiles_import(args, out) -> int:
+    """从 CSV / JSON Lines 文件导入"""
+    import profile_io
+    iplist = _iplist(args)
+    try:
+        result = profile_io.import_profiles(iplist, args.file, args.format, replace=args.replace)
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    iplist.save_ip()
+    for error in result.errors:
+        print('第 %d 行：%s' % error, file=sys.stderr)
+    print('添加 %d 条，跳过 %d 条，错误 %d 行' % (result.added, result.skipped, result.error_count), file=out)
+    return 1 if result.error_count else 0
+
+
+def cmd_profiles_export(args, out) -> int:
+    """导出到 CSV / JSON Lines 文件"""
+    import profile_io
+    iplist = _iplist(args)
+    try:
+        count = profile_io.export_profiles(iplist.ip_dict.values(), args.file, args.format)
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    print('导出 %d 条' % count, file=out)
+    return 0
+
+
+def cmd_profiles_check(args, out) -> int:
+    """检查配置之间的冲突"""
+    iplist = _iplist(args)
+    conflicts = iplist.find_conflicts()
+    for conflict in conflicts:
+        print('%-15s  %s' % (conflict.key, conflict.message), file=out)
+    return 1 if conflicts else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='netset', description='查看和修改网卡 IPv4 配置（命令行版本）')
+    parser.add_argument('--record', default='record.json', help='配置文件（默认 record.json）')
+    parser.add_argument('--timing', action='store_true', help='在 stderr 输出启动各阶段耗时')
+    parser.add_argument('--trace', metavar='FILE', help='记录各操作耗时并导出（.jsonl 或 Chrome trace .json）')
+    commands = parser.add_subparsers(dest='command', required=True, metavar='命令')
+
+    sub = commands.add_parser('adapters', help='列出活动网卡')
+    sub.add_argument('--json', action='store_true', help='以 JSON 输出')
+    sub.set_defaults(func=cmd_adapters)
+
+    sub = commands.add_parser('show', help='显示网卡配置')
+    sub.add_argument('name', help='网卡名称')
+    sub.add_argument('--json', action='store_true', help='以 JSON 输出')
+    sub.set_defaults(func=cmd_show)
+
+    sub = commands.add_parser('apply', help='应用已保存的配置')
+    sub.add_argument('name', help='网卡名称')
+    sub.add_argument('profile', help='配置的IP地址')
+    sub.add_argument('--full', action='store_true', help='不与当前配置比较，完整应用全部配置')
+    sub.add_argument('--verify', type=float, nargs='?', const=2.0, default=0.0, metavar='秒', help=VERIFY_HELP)
+    sub.set_defaults(func=cmd_apply)
+
+    sub = commands.add_parser('dhcp', help='启用DHCP')
+    sub.add_argument('name', help='网卡名称')
+    sub.add_argument('--verify', type=float, nargs='?', const=2.0, default=0.0, metavar='秒', help=VERIFY_HELP)
+    sub.set_defaults(func=cmd_dhcp)
+
+    sub = commands.add_parser('batch', help='同时设置多个网卡')
+    sub.add_argument('items', nargs='+', metavar='网卡=配置', help='网卡=配置的IP地址，或 网卡=dhcp')
+    sub.add_argument('--workers', type=int, default=4, help='最多同时设置的网卡数（默认 4）')
+    sub.add_argument('--full', action='store_true', help='不与当前配置比较，完整应用全部配置')
+    sub.set_defaults(func=cmd_batch)
+
+    sub = commands.add_parser('fleet', help='把配置下发到多台主机（通过各主机上的代理）')
+    sub.add_argument('hosts', help='主机列表 CSV，每行：主机[:端口],网卡,配置的IP地址 或 dhcp')
+    sub.add_argument('--concurrency', type=int, default=50, help='最多同时处理的主机数（默认 50）')
+    sub.add_argument('--timeout', type=float, default=30.0, help='每台主机的超时（秒，默认 30）')
+    sub.add_argument('--port', type=int, default=47631, help='代理端口（默认 47631）')
+    sub.add_argument('--full', action='store_true', help='不与当前配置比较，完整应用全部配置')
+    sub.add_argument('--simulate', action='store_true', help='不连接主机，在本进程中模拟（演练）')
+    sub.add_argument('--latency', type=float, default=50.0, help='模拟时每台主机的耗时（毫秒，默认 50）')
+    sub.set_defaults(func=cmd_fleet)
+
+    sub = commands.add_parser('agent', help='运行有权限的代理，界面和命令行通过它修改网卡配置')
+    sub.add_argument('--address', help='Unix 套接字路径或 主机:端口（默认见 agent.default_address）')
+    sub.add_argument('--cache-ttl', type=float, default=10.0, help='网卡配置缓存有效期（秒，默认 10）')
+    sub.set_defaults(func=cmd_agent)
+
+    profiles = commands.add_parser('profiles', help='管理已保存的配置')
+    actions = profiles.add_subparsers(dest='action', required=True, metavar='操作')
+
+    sub = actions.add_parser('list', help='列出配置，给出文本时只列出包含它的配置')
+    sub.add_argument('text', nargs='?', default='', help='搜索IP地址、网关、DNS或名称')
+    sub.add_argument('--json', action='store_true', help='以 JSON 输出')
+    sub.set_defaults(func=cmd_profiles_list)
+
+    sub = actions.add_parser('add', help='添加配置（IP地址已存在时覆盖）')
+    sub.add_argument('ip', help='IP地址')
+    sub.add_argument('mask', help='子网掩码（255.255.255.0 或 24）')
+    sub.add_argument('gateway', nargs='?', default='', help='默认网关')
+    sub.add_argument('--dns', nargs='*', default=[], help='DNS服务器')
+    sub.add_argument('--name', default='', help='配置名称')
+    sub.set_defaults(func=cmd_profiles_add)
+
+    sub = actions.add_parser('del', help='删除配置')
+    sub.add_argument('ip', nargs='+', help='IP地址')
+    sub.set_defaults(func=cmd_profiles_del)
+
+    for action, func, text in (('import', cmd_profiles_import, '从文件导入'), ('export', cmd_profiles_export, '导出到文件')):
+        sub = actions.add_parser(action, help=text + '（CSV / JSON Lines）')
+        sub.add_argument('file', help='文件路径（按扩展名判断格式）')
+        sub.add_argument('--format', choices=('csv', 'jsonl'), help='指定格式')
+        if action == 'import':
+            sub.add_argument('--replace', action='store_true', help='IP地址已存在时覆盖')
+        sub.set_defaults(func=func)
+
+    sub = actions.add_parser('check', help='检查配置之间的冲突')
+    sub.set_defaults(func=cmd_profiles_check)
+    return parser
+
+
+def main(argv: list = None) -> int:
+    args = build_parser().parse_args(argv)
+    out = sys.stdout
+    if args.trace:
+        tracing.enable()
+    try:
+        # 模块中的提示信息都用 print 输出，转到 stderr，stdout 只留命令结果
+        with contextlib.redirect_stdout(sys.stderr):
+            return args.func(args, out)
+    finally:
+        if args.timing:
+            _report_timing()
+        if args.trace:
+            count = tracing.export(args.trace)
+            print(tracing.format_summary(), file=sys.stderr)
+            print('已导出 %d 个 span 到 [%s]' % (count, args.trace), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
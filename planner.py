@@ -0,0 +1,66 @@
+"""
+最小修改计划：比较网卡当前配置与目标配置，只生成必要的操作
+
+例如两个配置只差 DNS 时只执行 DNS 操作，不会移除地址和路由，
+现有连接不受影响；配置完全相同时不执行任何操作。
+"""
+import scripts
+from tools import subnet_converter
+
+_NAMES = {
+    scripts.DHCP_OFF: '关闭DHCP',
+    scripts.ADDRESS: '地址',
+    scripts.GATEWAY: '网关',
+    scripts.DNS: 'DNS',
+    scripts.DHCP_ON: '启用DHCP',
+}
+
+
+def _prefix(mask) -> int:
+    """子网掩码或前缀长度统一为前缀长度，无法识别时返回 -1"""
+    try:
+        if isinstance(mask, int) or str(mask).strip('/').isdigit():
+            return int(str(mask).strip('/'))
+        return subnet_converter(subnet_mask=mask)
+    except (TypeError, ValueError):
+        return -1
+
+
+def _dns(servers) -> tuple:
+    return tuple(server for server in servers or () if server)
+
+
+def plan_static(current: tuple, var: tuple) -> tuple:
+    """静态配置的最小操作序列
+
+    Args:
+        current (tuple): 当前配置，get_adapter_info 的返回格式
+            (IP地址, 子网掩码, 默认网关, DNS服务器列表, DHCP状态)
+        var (tuple): 目标配置 (IP地址, 子网掩码, 默认网关, DNS服务器列表)
+
+    Returns:
+        tuple: 需要执行的操作，空元组表示无需修改
+    """
+    address, mask, gateway, dns, dhcp = current
+    # DHCP 开启或当前配置未知时，必须完整应用
+    if dhcp != 'Disabled' or not address:
+        return scripts.FULL_STATIC
+
+    operations = []
+    if address != var[0] or _prefix(mask) != _prefix(var[1]):
+        operations.append(scripts.ADDRESS)
+    if (gateway or '') != (var[2] or ''):
+        operations.append(scripts.GATEWAY)
+    if _dns(dns) != _dns(var[3]):
+        operations.append(scripts.DNS)
+    return tuple(operations)
+
+
+def plan_dhcp(current: tuple) -> tuple:
+    """启用 DHCP 的操作序列，已启用时为空"""
+    return () if current[4] == 'Enabled' else (scripts.DHCP_ON,)
+
+
+def describe(operations: tuple) -> str:
+    """操作序列的简短描述（如 地址+网关）"""
+    return '+'.join(_NAMES[operation] for operation in operations) or '无'
@@ -0,0 +1,271 @@
+"""
+已保存配置的子网索引（Patricia 路径压缩前缀树）
+
+每个配置按其所在子网（IP地址 & 子网掩码, 前缀长度）插入，树深最多 32 层，
+最长前缀匹配、包含查询和范围查询都只需沿一条路径走 O(32) 步
+（范围查询再加上结果数量），不再需要遍历全部配置并逐个构造 IPv4Network。
+"""
+from typing import Hashable, Iterator, Optional
+
+from profile_store import ProfileStore
+from tools import int_to_ip, ip_to_int, mask_to_prefix, masks_to_prefixes, parse_ips
+
+_MASKS = tuple((0xffffffff << (32 - prefix)) & 0xffffffff for prefix in range(33))
+
+
+def _bit(value: int, position: int) -> int:
+    """第 position 位（从最高位 0 开始）"""
+    return (value >> (31 - position)) & 1
+
+
+class _Node:
+    __slots__ = ('network', 'prefix', 'children', 'keys')
+
+    def __init__(self, network: int, prefix: int):
+        self.network: int = network
+        self.prefix: int = prefix
+        self.children: list = [None, None]
+        self.keys: Optional[dict] = None  # 以该子网为子网的配置（按插入顺序）
+
+
+class PrefixIndex:
+    """IPv4 子网前缀树
+
+    Attributes:
+        entries (dict): 键 -> (网络地址整数, 前缀长度)
+    """
+
+    def __init__(self):
+        self._root = _Node(0, 0)
+        self._nodes: dict = {}  # (网络地址, 前缀长度) -> 有配置的节点，插入到已有子网时不必从根走下来
+        self.entries: dict = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.entries
+
+    # ---- 维护 ----
+
+    def insert(self, key: Hashable, network: int, prefix: int):
+        """插入（或移动）一个键到指定子网"""
+        if not 0 <= prefix <= 32:
+            raise ValueError("前缀长度必须在0~32之间")
+        if key in self.entries:
+            self.remove(key)
+        network &= _MASKS[prefix]
+        self.entries[key] = (network, prefix)
+        node = self._nodes.get((network, prefix))
+        if node is not None:
+            node.keys[key] = None
+            return
+
+        node = self._root
+        while node.prefix != prefix:
+            bit = (network >> (31 - node.prefix)) & 1  # 即 _bit，批量导入时这里是热点，展开调用
+            child = node.children[bit]
+            if child is None:
+                child = node.children[bit] = _Node(network, prefix)
+                node = child
+                break
+            common = 32 - (child.network ^ network).bit_length()  # 公共前缀长度
+            if child.prefix <= common and child.prefix <= prefix:
+                node = child
+                continue
+            common = min(common, prefix)
+            # 在 node 与 child 之间插入分叉节点（或新节点本身）
+            fork = _Node(network & _MASKS[common], common)
+            fork.children[_bit(child.network, common)] = child
+            node.children[bit] = fork
+            if common < prefix:
+                leaf = fork.children[_bit(network, common)] = _Node(network, prefix)
+                node = leaf
+            else:
+                node = fork
+            break
+
+        if node.keys is None:
+            node.keys = {}
+            self._nodes[(network, prefix)] = node
+        node.keys[key] = None
+
+    def insert_ip(self, key: Hashable, IPv4Address: str, SubnetMask: str) -> bool:
+        """按地址和掩码字符串插入，格式错误时不插入并返回 False"""
+        try:
+            self.insert(key, ip_to_int(IPv4Address), mask_to_prefix(SubnetMask))
+        except (ValueError, TypeError, AttributeError):
+            self.remove(key)
+            return False
+        return True
+
+    def build(self, profiles) -> int:
+        """按 IPList.ip_dict 重建索引（地址和掩码批量解析），返回跳过的无效配置数"""
+        self.clear()
+        if isinstance(profiles, ProfileStore):
+            # 地址和前缀长度已按整数保存，直接读取各列
+            skipped = 0
+            for key, address, prefix in profiles.networks():
+                if address is None:
+                    skipped += 1
+                else:
+                    self.insert(key, address, prefix)
+            return skipped
+        keys = list(profiles)
+        addresses, address_ok = parse_ips([profiles[key].get('IPv4Address', key) for key in keys])
+        prefixes, mask_ok = masks_to_prefixes([profiles[key].get('SubnetMask', '') for key in keys])
+        skipped = 0
+        for key, address, prefix, ok1, ok2 in zip(keys, addresses, prefixes, address_ok, mask_ok):
+            if ok1 and ok2:
+                self.insert(key, int(address), int(prefix))
+            else:
+                skipped += 1
+        return skipped
+
+    def remove(self, key: Hashable) -> bool:
+        """删除一个键"""
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return False
+        network, prefix = entry
+
+        # 记录路径，删除后向上收缩无用节点
+        path = [self._root]
+        node = self._root
+        while node.prefix != prefix:
+            node = node.children[_bit(network, node.prefix)]
+            path.append(node)
+        del node.keys[key]
+        if node.keys:
+            return True
+        node.keys = None
+        del self._nodes[entry]
+
+        while len(path) > 1:
+            node = path.pop()
+            if node.keys:
+                break
+            parent = path[-1]
+            slot = parent.children.index(node)
+            children = [child for child in node.children if child is not None]
+            if len(children) == 2:
+                break
+            parent.children[slot] = children[0] if children else None
+            if children:
+                break
+        return True
+
+    def clear(self):
+        self._root = _Node(0, 0)
+        self._nodes.clear()
+        self.entries.clear()
+
+    # ---- 查询 ----
+
+    def covering(self, address: int) -> list:
+        """包含该地址的所有配置，最具体（前缀最长）的在前，同一子网内按添加顺序"""
+        found = []
+        node = self._root
+        while node is not None and (address & _MASKS[node.prefix]) == node.network:
+            if node.keys:
+                found.append(node)
+            if node.prefix == 32:
+                break
+            node = node.children[_bit(address, node.prefix)]
+        return [key for node in reversed(found) for key in node.keys]
+
+    def longest_match(self, address: int) -> Optional[Hashable]:
+        """最长前缀匹配：子网最小的那个包含该地址的配置（同一子网取最早添加的）"""
+        best = None
+        node = self._root
+        while node is not None and (address & _MASKS[node.prefix]) == node.network:
+            if node.keys:
+                best = node
+            if node.prefix == 32:
+                break
+            node = node.children[_bit(address, node.prefix)]
+        return next(iter(best.keys)) if best is not None else None
+
+    def within(self, network: int, prefix: int) -> list:
+        """子网完全位于 network/prefix 之内的所有配置"""
+        network &= _MASKS[prefix]
+        node = self._root
+        while node is not None and node.prefix < prefix:
+            if (network & _MASKS[node.prefix]) != node.network:
+                return []
+            node = node.children[_bit(network, node.prefix)]
+        if node is None or (node.network & _MASKS[prefix]) != network:
+            return []
+        return list(self._walk(node))
+
+    def overlapping(self, network: int, prefix: int) -> Iterator:
+        """与 network/prefix 重叠但子网不同的配置（惰性产生）
+
+        先产生包含它的（前缀更短，最具体的在前），再产生被它包含的（前缀更长）。
+        CIDR 子网要么互相包含要么不相交，因此这就是全部重叠的配置。
+        """
+        network &= _MASKS[prefix]
+        ancestors = []
+        node = self._root
+        while node is not None and node.prefix < prefix:
+            if (network & _MASKS[node.prefix]) != node.network:
+                node = None
+                break
+            if node.keys:
+                ancestors.append(node)
+            node = node.children[_bit(network, node.prefix)]
+        for ancestor in reversed(ancestors):
+            yield from ancestor.keys
+        if node is None or (node.network & _MASKS[prefix]) != network:
+            return
+        if node.prefix == prefix:
+            # 子网相同的不算重叠，只看子节点
+            for child in node.children:
+                if child is not None:
+                    yield from self._walk(child)
+        else:
+            yield from self._walk(node)
+
+    def in_range(self, first: int, last: int) -> list:
+        """子网完全位于地址范围 [first, last] 内的所有配置"""
+        found = []
+        for network, prefix in range_to_cidrs(first, last):
+            found.extend(self.within(network, prefix))
+        return found
+
+    @staticmethod
+    def _walk(node: _Node) -> Iterator:
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node.keys:
+                yield from node.keys
+            stack.extend(child for child in node.children if child is not None)
+
+    # ---- 字符串接口 ----
+
+    def find(self, IPv4Address: str) -> list:
+        """包含该地址的配置（如"10.3.7.19"），最具体的在前"""
+        return self.covering(ip_to_int(IPv4Address))
+
+    def find_in(self, cidr: str) -> list:
+        """子网位于指定网络（如"172.16.0.0/12"）之内的配置"""
+        address, _, prefix = cidr.partition('/')
+        return self.within(ip_to_int(address), int(prefix) if prefix else 32)
+
+
+def range_to_cidrs(first: int, last: int) -> list:
+    """把地址范围拆分为最少的 CIDR 块列表 [(网络地址, 前缀长度), ...]"""
+    blocks = []
+    while first <= last:
+        # 以 first 对齐且不超过 last 的最大块
+        size = (first & -first) if first else 1 << 32
+        while first + size - 1 > last:
+            size >>= 1
+        blocks.append((first, 32 - size.bit_length() + 1))
+        first += size
+    return blocks
+
+
+def describe(network: int, prefix: int) -> str:
+    return '%s/%d' % (int_to_ip(network), prefix)
@@ -0,0 +1,229 @@
+"""
+配置的批量导入导出（CSV / JSON Lines）
+
+- 逐行流式读写，内存占用与文件大小无关（只保留当前一批和有限条错误）
+- 每行用 tools 中的 IPv4 运算检查，错误按行号报告，不影响其他行
+- 按批插入 IPList，界面在全部导入后只刷新一次
+
+CSV 的表头为 FIELDS，DNSServer 列中多个地址用分号分隔（也可以用 DNS1、DNS2 两列）；
+JSON Lines 每行一个对象，字段与 IPList.ip_dict 的值相同。
+"""
+import csv
+import json
+import os
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional
+
+from function import IPList
+from tools import MASK_STRINGS, ip_to_int, mask_to_prefix, validate_profile
+
+FIELDS = ('IPv4Address', 'SubnetMask', 'IPv4DefaultGateway', 'DNSServer', 'Name')
+FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+FILE_FILTER = 'CSV / JSON Lines (*.csv *.jsonl *.ndjson)'  # 文件对话框的过滤器
+
+
+class RowError(NamedTuple):
+    """导入时有问题的一行
+
+    Attributes:
+        line (int): 行号（从 1 开始，CSV 含表头）
+        message (str): 问题说明
+    """
+    line: int
+    message: str
+
+
+class ImportResult(NamedTuple):
+    """导入结果
+
+    Attributes:
+        added (int): 添加（或覆盖）的条数
+        skipped (int): IP地址已存在而跳过的条数
+        error_count (int): 有问题的行数
+        errors (list): 前若干条 RowError
+    """
+    added: int
+    skipped: int
+    error_count: int
+    errors: list
+
+
+def detect_format(path: str, format: str = None) -> str:
+    """按扩展名确定格式（"csv" 或 "jsonl"）"""
+    if format:
+        return format
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError('不支持的文件格式：%s（支持 %s）' % (extension, ' '.join(FORMATS)))
+    return FORMATS[extension]
+
+
+# ---- 读取 ----
+
+def read_csv(f) -> Iterator[tuple]:
+    """逐行读取 CSV，产生 (行号, 字段字典)"""
+    reader = csv.DictReader(f)
+    for row in reader:
+        if not any(row.values()):
+            continue
+        dns = row.get('DNSServer')
+        if dns is None:
+            dns = [row.get('DNS1') or '', row.get('DNS2') or '']
+        yield reader.line_num, dict(row, DNSServer=dns)
+
+
+def read_jsonl(f) -> Iterator[tuple]:
+    """逐行读取 JSON Lines，产生 (行号, 字段字典)，格式错误的行产生 (行号, RowError)"""
+    for line_no, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_no, RowError(line_no, 'JSON 格式错误：%s' % e)
+            continue
+        if not isinstance(row, dict):
+            yield line_no, RowError(line_no, '不是 JSON 对象')
+            continue
+        yield line_no, row
+
+
+def _text(value) -> str:
+    if isinstance(value, str):
+        return value.strip()
+    return '' if value is None else str(value).strip()
+
+
+_CANONICAL_MASKS = frozenset(MASK_STRINGS)
+
+
+def to_profile(row: dict) -> tuple:
+    """
+    把一行转换为 IPList.add_ip 的参数，子网掩码统一为点分十进制
+
+    返回:
+        tuple: (IP地址, 子网掩码, 默认网关, DNS服务器, 名称)
+
+    异常:
+        ValueError: 该行有问题时抛出，信息为问题说明
+    """
+    address = _text(row.get('IPv4Address'))
+    mask = _text(row.get('SubnetMask'))
+    gateway = _text(row.get('IPv4DefaultGateway'))
+    if mask not in _CANONICAL_MASKS:
+        try:
+            mask = MASK_STRINGS[mask_to_prefix(mask.lstrip('/'))]
+        except ValueError:
+            pass  # 由 validate_profile 报告
+    message = validate_profile({'IPv4Address': address, 'SubnetMask': mask, 'IPv4DefaultGateway': gateway})
+    if message:
+        raise ValueError(message)
+
+    dns = row.get('DNSServer') or ()
+    if isinstance(dns, str):
+        dns = dns.replace(',', ';').split(';')
+    dns = tuple(server for server in map(_text, dns) if server)
+    for server in dns:
+        try:
+            ip_to_int(server)
+        except ValueError:
+            raise ValueError('无效的DNS服务器：%s' % server) from None
+    return address, mask, gateway, dns, _text(row.get('Name'))
+
+
+def iter_profiles(f, format: str) -> Iterator[tuple]:
+    """
+    逐行读取并检查
+
+    返回:
+        迭代器，每行产生 (行号, add_ip 参数元组) 或 (行号, RowError)
+    """
+    rows = read_csv(f) if format == 'csv' else read_jsonl(f)
+    for line_no, row in rows:
+        if isinstance(row, RowError):
+            yield line_no, row
+            continue
+        try:
+            yield line_no, to_profile(row)
+        except ValueError as e:
+            yield line_no, RowError(line_no, str(e))
+
+
+def import_profiles(iplist: IPList, path: str, format: str = None, replace: bool = False,
+                    batch_size: int = 5000, max_errors: int = 1000,
+                    progress: Optional[Callable[[int], None]] = None) -> ImportResult:
+    """
+    从文件导入配置
+
+    参数:
+        iplist: 导入到的 IPList
+        path: CSV 或 JSON Lines 文件
+        format: "csv" / "jsonl"，为空时按扩展名判断
+        replace: IP地址已存在时覆盖（默认跳过）
+        batch_size: 每批插入的条数
+        max_errors: 最多保留的错误条数（只影响 errors，error_count 是全部）
+        progress: 每插入一批后调用，参数为已读取的行数
+
+    返回:
+        ImportResult
+    """
+    format = detect_format(path, format)
+    added = skipped = error_count = lines = 0
+    errors = []
+    batch = {}
+
+    def flush():
+        nonlocal added
+        added += iplist.add_ips(batch.values())
+        batch.clear()
+        if progress is not None:
+            progress(lines)
+
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        for lines, item in iter_profiles(f, format):
+            if isinstance(item, RowError):
+                error_count += 1
+                if len(errors) < max_errors:
+                    errors.append(item)
+                continue
+            key = item[0]
+            if not replace and (key in iplist.ip_dict or key in batch):
+                skipped += 1
+                continue
+            batch[key] = item
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+
+    print('导入 [%s] 完成：添加 %d 条，跳过 %d 条，错误 %d 行' % (path, added, skipped, error_count))
+    return ImportResult(added, skipped, error_count, errors)
+
+
+# ---- 写出 ----
+
+def export_profiles(profiles: Iterable[dict], path: str, format: str = None) -> int:
+    """
+    把配置（IPList.ip_dict 的值）逐条写入文件
+
+    返回:
+        int: 写入的条数
+    """
+    format = detect_format(path, format)
+    count = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        if format == 'csv':
+            writer = csv.writer(f)
+            writer.writerow(FIELDS)
+            for profile in profiles:
+                writer.writerow([profile.get('IPv4Address', ''), profile.get('SubnetMask', ''),
+                                 profile.get('IPv4DefaultGateway', ''),
+                                 ';'.join(server for server in profile.get('DNSServer') or () if server),
+                                 profile.get('Name', '')])
+                count += 1
+        else:
+            for profile in profiles:
+                f.write(json.dumps({field: profile[field] for field in FIELDS if field in profile},
+                                   ensure_ascii=False) + '\n')
+                count += 1
+    print('导出 [%s] 完成：%d 条' % (path, count))
+    return count
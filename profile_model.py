@@ -0,0 +1,334 @@
+"""
+IP列表的数据模型
+
+QListWidget 为每一行创建一个 QListWidgetItem，十万行以上时启动和每次添加都很慢，
+查重还要逐行比较文本。ProfileListModel 直接以 IPList 为数据源：
+- 行只保存键（IP地址），显示时再从 IPList.ip_dict 取数据
+- 分批加载（canFetchMore / fetchMore），视图滚动到底部时才加载下一批
+- 查重直接查 ip_dict，O(1)
+- 批量增删时每段连续的行只发一次 beginInsertRows / beginRemoveRows
+- 过滤使用 IPList 的搜索索引，结果惰性产生，每次输入只取出第一批
+- 可按IP地址的数值排序（10.0.0.9 排在 10.0.0.10 之前）
+- 与其他配置冲突的行显示为红色，提示中列出冲突（只检查显示出来的行）
+"""
+import bisect
+import itertools
+from typing import Iterable, Iterator, Optional
+
+from PyQt6.QtCore import QAbstractListModel, QModelIndex, Qt
+from PyQt6.QtGui import QColor
+
+from function import IPList
+from search_index import SearchResult
+from tools import ip_to_int
+
+
+def address_sort_key(key: str) -> tuple:
+    """按IP地址数值排序的键，格式错误的排在最后"""
+    try:
+        return 0, ip_to_int(key)
+    except (ValueError, AttributeError):
+        return 1, key
+
+
+class ProfileListModel(QAbstractListModel):
+    """IP列表模型
+
+    Attributes:
+        iplist (IPList): 数据源
+        batch_size (int): 每批加载的行数
+    """
+
+    ProfileRole = Qt.ItemDataRole.UserRole + 1  # data() 返回 IPList.view_ip 格式的元组
+
+    def __init__(self, iplist: IPList, batch_size: int = 1000, parent=None):
+        super().__init__(parent)
+        self.iplist: IPList = iplist
+        self.batch_size: int = batch_size
+        self._order: list = []  # 全部键（显示顺序），不过滤时 _keys 就是这个列表，不另外复制
+        self._sort_keys: Optional[dict] = None  # 按地址排序后：键 -> 排序键
+        self._filter: str = ''
+        self._keys: list = []  # 已取出的行
+        self._pending: Optional[Iterator] = None  # 过滤时尚未取出的行
+        self._rows: Optional[dict] = None  # 键 -> 行号，删除后失效，用到时重建
+        self._loaded: int = 0
+        self.reset()
+
+    # ---- QAbstractListModel ----
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else self._loaded
+
+    def canFetchMore(self, parent: QModelIndex) -> bool:
+        return not parent.isValid() and (self._loaded < len(self._keys) or self._pending is not None)
+
+    def fetchMore(self, parent: QModelIndex):
+        if parent.isValid():
+            return
+        self._take(self._loaded + self.batch_size)
+        count = min(self.batch_size, len(self._keys) - self._loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+        self._loaded += count
+        self.endInsertRows()
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= self._loaded:
+            return None
+        key = self._keys[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return key
+        if role == Qt.ItemDataRole.ToolTipRole:
+            profile = self.iplist.ip_dict.get(key) or {}
+            tip = '%s / %s' % (profile.get('SubnetMask', ''), profile.get('IPv4DefaultGateway', ''))
+            lines = [profile['Name'], tip] if profile.get('Name') else [tip]
+            lines.extend(conflict.message for conflict in self.iplist.conflicts_of(key))
+            return '\n'.join(lines)
+        if role == Qt.ItemDataRole.ForegroundRole:
+            return QColor(Qt.GlobalColor.red) if self.iplist.conflicts_of(key) else None
+        if role == self.ProfileRole:
+            return self.iplist.view_ip(key)
+        return None
+
+    # ---- 查询 ----
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.iplist.ip_dict
+
+    def __len__(self) -> int:
+        """全部配置数（不受过滤影响）"""
+        return len(self._order)
+
+    @property
+    def filter_text(self) -> str:
+        return self._filter
+
+    @property
+    def sorted(self) -> bool:
+        return self._sort_keys is not None
+
+    def key(self, row: int) -> str:
+        return self._keys[row] if 0 <= row < self._loaded else ''
+
+    def row_of(self, key: str) -> int:
+        """键所在的行号（只在已取出的行中查找），不存在时返回 -1"""
+        if self._rows is None:
+            self._rows = {key: row for row, key in enumerate(self._keys)}
+        return self._rows.get(key, -1)
+
+    def index_of(self, key: str) -> QModelIndex:
+        """键对应的索引，尚未加载时先加载到该行"""
+        row = self.row_of(key)
+        while row < 0 and self._pending is not None:
+            self._take(len(self._keys) + self.batch_size)
+            row = self.row_of(key)
+        if row < 0:
+            return QModelIndex()
+        while row >= self._loaded:
+            self.fetchMore(QModelIndex())
+        return self.index(row)
+
+    # ---- 过滤和排序 ----
+
+    def _take(self, count: int):
+        """从过滤结果中取出行，直到共有 count 行或取完"""
+        if self._pending is None or len(self._keys) >= count:
+            return
+        start = len(self._keys)
+        self._keys.extend(itertools.islice(self._pending, count - start))
+        if len(self._keys) < count:
+            self._pending = None
+        if self._rows is not None:
+            self._rows.update((key, start + i) for i, key in enumerate(self._keys[start:]))
+
+    def _select(self) -> tuple:
+        """按当前过滤条件和排序方式确定行：(已取出的行, 其余行的迭代器)"""
+        result: Optional[SearchResult] = self.iplist.search_ip(self._filter) if self._filter else None
+        if result is None:
+            return self._order, None
+        if self._sort_keys is None:
+            # 搜索结果按添加顺序产生，与未排序时的显示顺序一致
+            return [], iter(result)
+        if result.count * 8 <= len(self._order):
+            # 匹配较少：取出全部结果再排序
+            return sorted(result, key=self._sort_keys.__getitem__), None
+        # 匹配较多：按显示顺序逐条判断，只取第一批
+        return [], (key for key in self._order if key in result)
+
+    def _refresh(self):
+        self.beginResetModel()
+        self._keys, self._pending = self._select()
+        self._rows = None
+        self._take(self.batch_size)
+        self._loaded = min(self.batch_size, len(self._keys))
+        self.endResetModel()
+
+    def reset(self):
+        """按 IPList 的当前内容重建模型（只加载第一批）"""
+        self._order = list(self.iplist.ip_dict)
+        if self._sort_keys is not None:
+            self._sort_keys = {key: address_sort_key(key) for key in self._order}
+            self._order.sort(key=self._sort_keys.__getitem__)
+        self._refresh()
+
+    def set_filter(self, text: str):
+        """只显示IP地址、网关、DNS或名称中包含 text 的配置，text 为空时显示全部"""
+        text = text.strip()
+        if text == self._filter:
+            return
+        self._filter = text
+        self._refresh()
+
+    def sort_by_address(self):
+        """按IP地址的数值排序，之后添加的配置也插入到对应位置"""
+        self._sort_keys = {key: address_sort_key(key) for key in self._order}
+        self._order.sort(key=self._sort_keys.__getitem__)
+        self._refresh()
+
+    def refresh_conflicts(self):
+        """冲突可能变化后（增删改、检查配置库）重绘已加载的行"""
+        if self._loaded:
+            self.dataChanged.emit(self.index(0), self.index(self._loaded - 1),
+                                  [Qt.ItemDataRole.ForegroundRole, Qt.ItemDataRole.ToolTipRole])
+
+    # ---- 修改 ----
+
+    def add_profiles(self, profiles: Iterable[tuple]) -> int:
+        """批量添加配置，跳过已存在的IP地址
+
+        Args:
+            profiles: (IP地址, 子网掩码, 默认网关, DNS服务器列表[, 名称]) 元组
+
+        Returns:
+            int: 实际添加的条数
+        """
+        new = {}
+        for profile in profiles:
+            if profile[0] not in self.iplist.ip_dict and profile[0] not in new:
+                new[profile[0]] = profile
+        if not new:
+            return 0
+        self.iplist.add_ips(new.values())
+        keys = list(new)
+
+        if self._sort_keys is not None:
+            self._sort_keys.update((key, address_sort_key(key)) for key in keys)
+            if len(keys) > 1:
+                self._order.extend(keys)
+                self._order.sort(key=self._sort_keys.__getitem__)
+                self._refresh()
+                return len(keys)
+            row = bisect.bisect(self._order, self._sort_keys[keys[0]], key=self._sort_keys.__getitem__)
+            if self._filter:
+                self._order.insert(row, keys[0])
+                self._refresh()
+            else:
+                self._insert_row(row, keys[0])
+            return len(keys)
+
+        if self._filter:
+            self._order.extend(keys)
+            self._refresh()
+            return len(keys)
+        # 不过滤时 _keys 就是 _order，只修改一次
+        first = len(self._keys)
+        if self._rows is not None:
+            self._rows.update((key, first + i) for i, key in enumerate(keys))
+        if self._loaded < first:
+            # 还有未加载的行，新行排在最后，随 fetchMore 显示
+            self._keys.extend(keys)
+            return len(keys)
+        self.beginInsertRows(QModelIndex(), first, first + len(keys) - 1)
+        self._keys.extend(keys)
+        self._loaded = len(self._keys)
+        self.endInsertRows()
+        return len(keys)
+
+    def _insert_row(self, row: int, key: str):
+        self._rows = None
+        if row > self._loaded or (row == self._loaded and self._loaded < len(self._keys)):
+            self._keys.insert(row, key)
+            return
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._keys.insert(row, key)
+        self._loaded += 1
+        self.endInsertRows()
+
+    def remove_profiles(self, keys: Iterable[str]) -> int:
+        """批量删除配置，连续的行合并为一次删除
+
+        Returns:
+            int: 实际删除的条数
+        """
+        removed = {key for key in keys if key in self.iplist.ip_dict}
+        if not removed:
+            return 0
+        if self._sort_keys is not None:
+            for key in removed:
+                self._sort_keys.pop(key, None)
+
+        if self._filter:
+            self._order[:] = [key for key in self._order if key not in removed]
+            for key in removed:
+                self.iplist.del_ip(key)
+            self._refresh()
+            return len(removed)
+
+        # 不过滤时 _keys 就是 _order，全部键都在其中，按行删除即可
+        rows = sorted({row for key in removed if (row := self.row_of(key)) >= 0}, reverse=True)
+        # 从后往前按连续段删除，前面的行号不受影响
+        start = 0
+        while start < len(rows):
+            end = start
+            while end + 1 < len(rows) and rows[end + 1] == rows[end] - 1:
+                end += 1
+            first, last = rows[end], rows[start]
+            if first >= self._loaded:
+                del self._keys[first:last + 1]
+            else:
+                visible = min(last, self._loaded - 1)
+                self.beginRemoveRows(QModelIndex(), first, visible)
+                del self._keys[first:last + 1]
+                self._loaded -= visible - first + 1
+                self.endRemoveRows()
+            start = end + 1
+
+        self._rows = None
+        for key in removed:
+            self.iplist.del_ip(key)
+        return len(removed)
+
+    def change_profile(self, key: str, var: tuple) -> bool:
+        """修改配置，IP地址变化时原位替换该行
+
+        Returns:
+            bool: 新的IP地址与其他配置重复时返回 False
+        """
+        if key not in self.iplist.ip_dict:
+            return False
+        new_key = var[0]
+        row = -1 if self._filter else self.row_of(key)  # 修改 _order 前查找（不过滤时 _keys 就是 _order）
+        if new_key == key:
+            name = var[4] if len(var) > 4 else self.iplist.ip_dict[key].get('Name', '')
+            self.iplist.add_ip(var[0], var[1], var[2], var[3], name)
+        elif new_key in self.iplist.ip_dict:
+            return False
+        else:
+            self.iplist.change_ip(key, var)
+            self._order[self._order.index(key)] = new_key
+            if self._sort_keys is not None:
+                del self._sort_keys[key]
+                self._sort_keys[new_key] = address_sort_key(new_key)
+                self._order.sort(key=self._sort_keys.__getitem__)
+
+        if self._filter or (self._sort_keys is not None and new_key != key):
+            self._refresh()
+            return True
+        if new_key != key:
+            self._rows.pop(key, None)
+            self._rows[new_key] = row
+        if row < self._loaded:
+            index = self.index(row)
+            self.dataChanged.emit(index, index)
+        return True
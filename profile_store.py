@@ -0,0 +1,436 @@
+"""
+紧凑的配置存储
+
+IPList.ip_dict 原来是 {IP地址: {字段: 字符串}}，每条配置一个字典、4~5 个字符串和一个 DNS 列表，
+100 万条约 620 MB。ProfileStore 按列保存：
+- 地址、网关：array('I')（32 位整数，网关 0 表示没有网关），前缀长度：array('B')
+- DNS 服务器列表和名称去重后编号，array('I') 中只保存编号（多数配置共用少数几组 DNS）
+- IP地址 -> 行号：开放寻址的哈希表（array('i')），不为每条配置创建 Python 对象
+100 万条时每条配置约 40 字节（原来约 620 字节，见 benchmarks/bench_profile_store.py）。
+删除只做标记，删除的行过多时整体重排。
+
+ProfileStore 实现 MutableMapping，键为IP地址字符串，值为 Profile（__slots__ 记录，读取时从列中解码），
+Profile 可以像原来的字典一样用 get() / [] 按字段名读取，读取配置的代码不需要修改；
+ProfileStore.from_dict() / to_dict() 与 record.json 的格式互相转换，iterencode() 逐条写出 JSON。
+无法压缩的配置（地址不是规范的点分十进制、掩码不是规范的写法、键与地址不同、有其他字段等）
+原样保存，转换回 JSON 时与原来完全相同。
+"""
+import json
+from array import array
+from collections.abc import ItemsView, MutableMapping, ValuesView
+from typing import Iterator, Optional
+
+from tools import MASK_STRINGS, int_to_ip, ip_to_int, mask_to_prefix
+
+FIELDS = ('IPv4Address', 'SubnetMask', 'IPv4DefaultGateway', 'DNSServer', 'Name')
+
+_PREFIX_OF_MASK: dict = {mask: prefix for prefix, mask in enumerate(MASK_STRINGS)}
+_KNOWN = frozenset(FIELDS)
+_OVERFLOW = 254  # 前缀列中的标记：该行原样保存在 _overflow 中
+_DEAD = 255  # 前缀列中的标记：该行已删除
+_EMPTY = -1  # 哈希表中的空槽
+_DELETED = -2  # 哈希表中已删除的槽
+_GOLDEN = 2654435761  # Fibonacci 散列的乘数（2^32 / 黄金分割比）
+
+
+class Profile:
+    """一条配置（只读记录）
+
+    字段与 record.json 中的字段名相同，DNSServer 为元组，没有名称时 Name 为空字符串；
+    get() / [] / in 与原来的字典用法一致（没有名称时视为没有 Name 字段）。
+
+    Attributes:
+        raw (dict): 无法压缩、原样保存的配置，其他情况为 None
+    """
+    __slots__ = ('IPv4Address', 'SubnetMask', 'IPv4DefaultGateway', 'DNSServer', 'Name', 'raw')
+
+    def __init__(self, IPv4Address: str, SubnetMask: str, IPv4DefaultGateway: str = '', DNSServer: tuple = (),
+                 Name: str = '', raw: dict = None):
+        self.IPv4Address = IPv4Address
+        self.SubnetMask = SubnetMask
+        self.IPv4DefaultGateway = IPv4DefaultGateway
+        self.DNSServer = DNSServer
+        self.Name = Name
+        self.raw = raw
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Profile':
+        """原样保存一个字典（字段值不做转换）"""
+        return cls(data.get('IPv4Address', ''), data.get('SubnetMask', ''), data.get('IPv4DefaultGateway', ''),
+                   data.get('DNSServer', ()), data.get('Name', ''), data)
+
+    def get(self, field: str, default=None):
+        if self.raw is not None:
+            return self.raw.get(field, default)
+        if field in _KNOWN and (field != 'Name' or self.Name):
+            return getattr(self, field)
+        return default
+
+    def __getitem__(self, field: str):
+        value = self.get(field, KeyError)
+        if value is KeyError:
+            raise KeyError(field)
+        return value
+
+    def __contains__(self, field: str) -> bool:
+        return self.get(field, KeyError) is not KeyError
+
+    def keys(self) -> tuple:
+        if self.raw is not None:
+            return tuple(self.raw)
+        return FIELDS if self.Name else FIELDS[:4]
+
+    def to_dict(self) -> dict:
+        """record.json 中的格式"""
+        if self.raw is not None:
+            return dict(self.raw)
+        data = {'IPv4Address': self.IPv4Address, 'SubnetMask': self.SubnetMask,
+                'IPv4DefaultGateway': self.IPv4DefaultGateway, 'DNSServer': list(self.DNSServer)}
+        if self.Name:
+            data['Name'] = self.Name
+        return data
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Profile):
+            other = other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return 'Profile(%r)' % self.to_dict()
+
+
+class _Values(ValuesView):
+    def __iter__(self) -> Iterator[Profile]:
+        return self._mapping._values()
+
+
+class _Items(ItemsView):
+    def __iter__(self) -> Iterator[tuple]:
+        return self._mapping._items()
+
+
+class ProfileStore(MutableMapping):
+    """按列保存的配置，键为IP地址，按插入顺序遍历（与 dict 一致）"""
+
+    def __init__(self, profiles: dict = None):
+        self.clear()
+        if profiles:
+            self.update(profiles)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'ProfileStore':
+        """从 record.json 格式的字典建立（批量追加后一次建立哈希表）"""
+        store = cls()
+        for key, value in data.items():
+            store._append(key, value)
+        store._rehash()
+        return store
+
+    def clear(self):
+        self._address = array('I')
+        self._prefix = array('B')
+        self._gateway = array('I')
+        self._dns = array('I')
+        self._name = array('I')
+        self._dns_values: list = [()]  # 编号 -> DNS 元组
+        self._dns_ids: dict = {(): 0}
+        self._names: list = ['']  # 编号 -> 名称
+        self._name_ids: dict = {'': 0}
+        self._overflow: dict = {}  # 行号 -> (键, Profile)，原样保存的配置
+        self._overflow_rows: dict = {}  # 键 -> 行号
+        self._live: int = 0
+        self._slots = array('i', [_EMPTY]) * 8
+        self._bits: int = 3
+        self._used: int = 0  # 哈希表中非空的槽（含已删除的）
+
+    def copy(self) -> 'ProfileStore':
+        """独立的副本（复制各列和哈希表，不解码配置），可以交给其他线程只读遍历"""
+        store = self.__class__.__new__(self.__class__)
+        for name in ('_address', '_prefix', '_gateway', '_dns', '_name', '_slots'):
+            setattr(store, name, getattr(self, name)[:])
+        store._dns_values, store._names = self._dns_values[:], self._names[:]
+        store._dns_ids, store._name_ids = self._dns_ids.copy(), self._name_ids.copy()
+        store._overflow, store._overflow_rows = self._overflow.copy(), self._overflow_rows.copy()
+        store._live, store._bits, store._used = self._live, self._bits, self._used
+        return store
+
+    __copy__ = copy
+
+    # ---- 编码 ----
+
+    def _intern_name(self, name: str) -> int:
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            name_id = self._name_ids[name] = len(self._names)
+            self._names.append(name)
+        return name_id
+
+    def _encode(self, key: str, value) -> Optional[tuple]:
+        """(地址, 前缀长度, 网关, DNS编号, 名称编号)，无法压缩时返回 None"""
+        if isinstance(value, Profile):
+            value = value.raw if value.raw is not None else value.to_dict()
+        if not isinstance(value, dict):
+            return None
+        name = value.get('Name')
+        # 字段数与必需字段都符合时，字段正好是 FIELDS（或去掉 Name）
+        if len(value) != (4 if name is None else 5):
+            return None
+        try:
+            address, mask, gateway, dns = (value['IPv4Address'], value['SubnetMask'], value['IPv4DefaultGateway'],
+                                           value['DNSServer'])
+        except KeyError:
+            return None
+        if address != key or type(gateway) is not str or type(dns) not in (list, tuple) \
+                or (name is not None and (type(name) is not str or not name)):
+            return None
+        prefix = _PREFIX_OF_MASK.get(mask) if type(mask) is str else None
+        if prefix is None:
+            return None
+        dns = tuple(dns)
+        try:
+            dns_id = self._dns_ids.get(dns)
+        except TypeError:  # DNS 列表中有列表等不可哈希的值
+            return None
+        if dns_id is None:
+            if not all(type(server) is str for server in dns):
+                return None
+            dns_id = self._dns_ids[dns] = len(self._dns_values)
+            self._dns_values.append(dns)
+        try:
+            address = ip_to_int(key)
+            gateway_int = ip_to_int(gateway) if gateway else 0
+        except (ValueError, AttributeError):
+            return None
+        if gateway_int == 0 and gateway:
+            return None  # 0.0.0.0 与"没有网关"无法区分
+        return address, prefix, gateway_int, dns_id, self._intern_name(name) if name else 0
+
+    def _decode(self, row: int, key: str) -> Profile:
+        gateway = self._gateway[row]
+        return Profile(key, MASK_STRINGS[self._prefix[row]], int_to_ip(gateway) if gateway else '',
+                       self._dns_values[self._dns[row]], self._names[self._name[row]])
+
+    # ---- 哈希表 ----
+
+    def _probe(self, address: int) -> tuple:
+        """(槽位, 行号)：找到时为所在的槽位和行号，否则为可插入的槽位和 -1"""
+        slots = self._slots
+        mask = len(slots) - 1
+        i = ((address * _GOLDEN) & 0xffffffff) >> (32 - self._bits)
+        free = -1
+        while True:
+            row = slots[i]
+            if row == _EMPTY:
+                return (free if free >= 0 else i), -1
+            if row == _DELETED:
+                if free < 0:
+                    free = i
+            elif self._address[row] == address:
+                return i, row
+            i = (i + 1) & mask
+
+    def _rehash(self):
+        """按当前的行重建哈希表（容量为有效行数的 2~4 倍）"""
+        bits = max(3, (self._live * 2).bit_length())
+        slots = array('i', [_EMPTY]) * (1 << bits)
+        mask = len(slots) - 1
+        shift = 32 - bits
+        address = self._address
+        prefix = self._prefix
+        for row in range(len(prefix)):
+            if prefix[row] >= _OVERFLOW:
+                continue
+            i = ((address[row] * _GOLDEN) & 0xffffffff) >> shift
+            while slots[i] != _EMPTY:
+                i = (i + 1) & mask
+            slots[i] = row
+        self._slots, self._bits = slots, bits
+        self._used = self._live - len(self._overflow)
+
+    def _locate(self, key: str) -> tuple:
+        """(槽位, 行号)，键不存在时行号为 -1，键不是规范的地址时槽位为 -1"""
+        try:
+            address = ip_to_int(key)
+        except (ValueError, AttributeError, TypeError):
+            return -1, self._overflow_rows.get(key, -1)
+        slot, row = self._probe(address)
+        if row < 0:
+            row = self._overflow_rows.get(key, -1)
+        return slot, row
+
+    # ---- 行 ----
+
+    def _append(self, key: str, value) -> int:
+        """追加一行（不检查键是否已存在，不更新哈希表）"""
+        encoded = self._encode(key, value)
+        row = len(self._prefix)
+        if encoded is None:
+            encoded = (0, _OVERFLOW, 0, 0, 0)
+            if not isinstance(value, Profile):
+                value = Profile.from_dict(value)
+            self._overflow[row] = (key, value)
+            self._overflow_rows[key] = row
+        address, prefix, gateway, dns_id, name_id = encoded
+        self._address.append(address)
+        self._prefix.append(prefix)
+        self._gateway.append(gateway)
+        self._dns.append(dns_id)
+        self._name.append(name_id)
+        self._live += 1
+        return row
+
+    def _write(self, row: int, encoded: tuple):
+        self._address[row], self._prefix[row], self._gateway[row], self._dns[row], self._name[row] = encoded
+
+    def _values(self) -> Iterator[Profile]:
+        prefix = self._prefix
+        for row in range(len(prefix)):
+            value = prefix[row]
+            if value < _OVERFLOW:
+                yield self._decode(row, int_to_ip(self._address[row]))
+            elif value == _OVERFLOW:
+                yield self._overflow[row][1]
+
+    def _items(self) -> Iterator[tuple]:
+        prefix = self._prefix
+        for row in range(len(prefix)):
+            value = prefix[row]
+            if value < _OVERFLOW:
+                key = int_to_ip(self._address[row])
+                yield key, self._decode(row, key)
+            elif value == _OVERFLOW:
+                yield self._overflow[row]
+
+    def _compact(self):
+        """删除的行超过一半时重排各列（保持顺序）并重建哈希表"""
+        keep = [row for row in range(len(self._prefix)) if self._prefix[row] != _DEAD]
+        overflow = {}
+        for new, row in enumerate(keep):
+            if row in self._overflow:
+                overflow[new] = self._overflow[row]
+        self._address = array('I', (self._address[row] for row in keep))
+        self._prefix = array('B', (self._prefix[row] for row in keep))
+        self._gateway = array('I', (self._gateway[row] for row in keep))
+        self._dns = array('I', (self._dns[row] for row in keep))
+        self._name = array('I', (self._name[row] for row in keep))
+        self._overflow = overflow
+        self._overflow_rows = {key: row for row, (key, _) in overflow.items()}
+        self._rehash()
+
+    # ---- MutableMapping ----
+
+    def __getitem__(self, key: str) -> Profile:
+        _, row = self._locate(key)
+        if row < 0:
+            raise KeyError(key)
+        if self._prefix[row] == _OVERFLOW:
+            return self._overflow[row][1]
+        return self._decode(row, key)
+
+    def __contains__(self, key) -> bool:
+        return self._locate(key)[1] >= 0
+
+    def __setitem__(self, key: str, value):
+        slot, row = self._locate(key)
+        encoded = self._encode(key, value)
+        if row >= 0 and self._prefix[row] == _OVERFLOW:
+            # 原样保存的行：改为压缩保存时移入哈希表，否则替换保存的值
+            if encoded is None:
+                self._overflow[row] = (key, value if isinstance(value, Profile) else Profile.from_dict(value))
+                return
+            del self._overflow[row], self._overflow_rows[key]
+            self._write(row, encoded)
+            self._insert_slot(slot, row)
+        elif row >= 0:
+            if encoded is not None:
+                self._write(row, encoded)
+                return
+            self._slots[slot] = _DELETED
+            self._write(row, (0, _OVERFLOW, 0, 0, 0))
+            self._overflow[row] = (key, value if isinstance(value, Profile) else Profile.from_dict(value))
+            self._overflow_rows[key] = row
+        else:
+            row = self._append(key, value)
+            if encoded is not None:
+                self._insert_slot(slot, row)
+
+    def _insert_slot(self, slot: int, row: int):
+        if self._slots[slot] == _EMPTY:
+            self._used += 1
+        self._slots[slot] = row
+        if self._used * 2 > len(self._slots):
+            self._rehash()
+
+    def __delitem__(self, key: str):
+        slot, row = self._locate(key)
+        if row < 0:
+            raise KeyError(key)
+        if self._prefix[row] == _OVERFLOW:
+            del self._overflow[row], self._overflow_rows[key]
+        else:
+            self._slots[slot] = _DELETED
+        self._write(row, (0, _DEAD, 0, 0, 0))
+        self._live -= 1
+        if len(self._prefix) > 1024 and self._live * 2 < len(self._prefix):
+            self._compact()
+
+    def __iter__(self) -> Iterator[str]:
+        # 只转换地址列，不构造 Profile（ProfileListModel.reset 在界面线程中遍历全部键）
+        prefix, address, overflow = self._prefix, self._address, self._overflow
+        for row in range(len(prefix)):
+            value = prefix[row]
+            if value < _OVERFLOW:
+                yield int_to_ip(address[row])
+            elif value == _OVERFLOW:
+                yield overflow[row][0]
+
+    def __len__(self) -> int:
+        return self._live
+
+    def values(self) -> ValuesView:
+        return _Values(self)
+
+    def items(self) -> ItemsView:
+        return _Items(self)
+
+    def __repr__(self) -> str:
+        return 'ProfileStore(%d 条)' % self._live
+
+    # ---- 转换 ----
+
+    def to_dict(self) -> dict:
+        """record.json 格式的字典"""
+        return {key: value.to_dict() for key, value in self._items()}
+
+    def iterencode(self) -> Iterator[str]:
+        """逐条编码为 record.json 的内容（与 json.dump(to_dict()) 相同，不必先建立完整的字典）"""
+        encode = json.JSONEncoder().encode
+        yield '{'
+        separator = ''
+        for key, value in self._items():
+            yield '%s%s: %s' % (separator, encode(key), encode(value.to_dict()))
+            separator = ', '
+        yield '}'
+
+    def networks(self) -> Iterator[tuple]:
+        """(键, 地址整数, 前缀长度)，直接读取各列，不解码配置；原样保存的配置无法解析时为 (键, None, None)"""
+        address, prefix = self._address, self._prefix
+        for row in range(len(prefix)):
+            value = prefix[row]
+            if value < _OVERFLOW:
+                yield int_to_ip(address[row]), address[row], value
+            elif value == _OVERFLOW:
+                key, profile = self._overflow[row]
+                try:
+                    yield key, ip_to_int(profile.get('IPv4Address', key)), mask_to_prefix(profile.get('SubnetMask', ''))
+                except (ValueError, TypeError, AttributeError):
+                    yield key, None, None
+
+    def nbytes(self) -> int:
+        """各列和哈希表占用的字节数（不含去重后的 DNS、名称和原样保存的配置）"""
+        return sum(column.itemsize * len(column) for column in
+                   (self._address, self._prefix, self._gateway, self._dns, self._name, self._slots))
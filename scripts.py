@@ -0,0 +1,185 @@
+"""
+PowerShell 修改类脚本的生成
+
+一次修改（静态 IP / DHCP）编译成一个脚本，在同一次调用中完成：
+1. 记录修改前的配置（DHCP、地址、默认路由、DNS）
+2. 按顺序执行各个操作，任一步骤失败即回滚到修改前的配置
+3. 以 JSON 返回结果、总耗时和断网时长（地址/路由被移除到重新生效的间隔）
+"""
+import json
+
+from tools import subnet_converter
+
+# 可用的操作（按执行顺序）
+DHCP_OFF = 'dhcp_off'
+ADDRESS = 'address'
+GATEWAY = 'gateway'
+DNS = 'dns'
+DHCP_ON = 'dhcp_on'
+
+OPERATIONS = (DHCP_OFF, ADDRESS, GATEWAY, DNS, DHCP_ON)
+FULL_STATIC = (DHCP_OFF, ADDRESS, GATEWAY, DNS)
+
+_PROLOGUE = '''
+$ErrorActionPreference = 'Stop'
+$sw = [Diagnostics.Stopwatch]::StartNew()
+$gapStart = $null
+$gapEnd = $null
+$result = [ordered]@{ Ok = $true; Error = ''; RolledBack = $false; GapMs = 0.0; ElapsedMs = 0.0; DhcpBound = $false }
+$ifIndex = (Get-NetAdapter -Name %(name)s).ifIndex
+
+# 记录修改前的配置
+$prior = [PSCustomObject]@{
+    Dhcp = "$((Get-NetIPInterface -InterfaceIndex $ifIndex -AddressFamily IPv4).Dhcp)"
+    Addresses = @(Get-NetIPAddress -InterfaceIndex $ifIndex -AddressFamily IPv4 -ErrorAction SilentlyContinue |
+        Where-Object { $_.PrefixOrigin -ne 'WellKnown' } | Select-Object IPAddress, PrefixLength)
+    Routes = @(Get-NetRoute -InterfaceIndex $ifIndex -AddressFamily IPv4 -DestinationPrefix '0.0.0.0/0' -ErrorAction SilentlyContinue |
+        Select-Object NextHop, RouteMetric)
+    Dns = @((Get-DnsClientServerAddress -InterfaceIndex $ifIndex -AddressFamily IPv4).ServerAddresses)
+}
+
+function Remove-Ipv4Config([bool]$Addresses, [bool]$Routes) {
+    if ($Routes) {
+        Get-NetRoute -InterfaceIndex $ifIndex -AddressFamily IPv4 -DestinationPrefix '0.0.0.0/0' -ErrorAction SilentlyContinue |
+            Remove-NetRoute -Confirm:$false
+    }
+    if ($Addresses) {
+        Get-NetIPAddress -InterfaceIndex $ifIndex -AddressFamily IPv4 -ErrorAction SilentlyContinue |
+            Where-Object { $_.PrefixOrigin -ne 'WellKnown' } | Remove-NetIPAddress -Confirm:$false
+    }
+}
+
+try {
+'''
+
+_STEPS = {
+    DHCP_OFF: '''
+    Set-NetIPInterface -InterfaceIndex $ifIndex -AddressFamily IPv4 -Dhcp Disabled
+''',
+    ADDRESS: '''
+    if ($gapStart -eq $null) { $gapStart = $sw.Elapsed.TotalMilliseconds }
+    Remove-Ipv4Config -Addresses $true -Routes $false
+    New-NetIPAddress -InterfaceIndex $ifIndex -AddressFamily IPv4 -IPAddress %(address)s -PrefixLength %(prefix)d | Out-Null
+    $gapEnd = $sw.Elapsed.TotalMilliseconds
+''',
+    GATEWAY: '''
+    if ($gapStart -eq $null) { $gapStart = $sw.Elapsed.TotalMilliseconds }
+    Remove-Ipv4Config -Addresses $false -Routes $true
+    if (%(gateway)s) {
+        New-NetRoute -InterfaceIndex $ifIndex -AddressFamily IPv4 -DestinationPrefix '0.0.0.0/0' -NextHop %(gateway)s | Out-Null
+    }
+    $gapEnd = $sw.Elapsed.TotalMilliseconds
+''',
+    DNS: '''
+    if (%(dns_count)d) {
+        Set-DnsClientServerAddress -InterfaceIndex $ifIndex -ServerAddresses @(%(dns)s)
+    } else {
+        Set-DnsClientServerAddress -InterfaceIndex $ifIndex -ResetServerAddresses
+    }
+''',
+    DHCP_ON: '''
+    if ($gapStart -eq $null) { $gapStart = $sw.Elapsed.TotalMilliseconds }
+    Remove-Ipv4Config -Addresses $true -Routes $true
+    Set-NetIPInterface -InterfaceIndex $ifIndex -AddressFamily IPv4 -Dhcp Enabled
+    Set-DnsClientServerAddress -InterfaceIndex $ifIndex -ResetServerAddresses
+    # 等待获取到 DHCP 地址，以测得实际的断网时长
+    $deadline = $sw.Elapsed.TotalMilliseconds + %(dhcp_wait_ms)d
+    while ($sw.Elapsed.TotalMilliseconds -lt $deadline) {
+        if (Get-NetIPAddress -InterfaceIndex $ifIndex -AddressFamily IPv4 -PrefixOrigin Dhcp -ErrorAction SilentlyContinue) {
+            $result.DhcpBound = $true
+            break
+        }
+        Start-Sleep -Milliseconds 100
+    }
+    $gapEnd = $sw.Elapsed.TotalMilliseconds
+''',
+}
+
+_EPILOGUE = '''
+} catch {
+    $result.Ok = $false
+    $result.Error = $_.Exception.Message
+    # 回滚到修改前的配置
+    try {
+        $ErrorActionPreference = 'Continue'
+        Remove-Ipv4Config -Addresses $true -Routes $true
+        if ($prior.Dhcp -eq 'Enabled') {
+            Set-NetIPInterface -InterfaceIndex $ifIndex -AddressFamily IPv4 -Dhcp Enabled -ErrorAction Stop
+        } else {
+            Set-NetIPInterface -InterfaceIndex $ifIndex -AddressFamily IPv4 -Dhcp Disabled -ErrorAction Stop
+            foreach ($a in $prior.Addresses) {
+                New-NetIPAddress -InterfaceIndex $ifIndex -AddressFamily IPv4 -IPAddress $a.IPAddress `
+                                 -PrefixLength $a.PrefixLength -ErrorAction Stop | Out-Null
+            }
+            foreach ($r in $prior.Routes) {
+                New-NetRoute -InterfaceIndex $ifIndex -AddressFamily IPv4 -DestinationPrefix '0.0.0.0/0' `
+                             -NextHop $r.NextHop -RouteMetric $r.RouteMetric -ErrorAction Stop | Out-Null
+            }
+        }
+        if ($prior.Dns.Count) {
+            Set-DnsClientServerAddress -InterfaceIndex $ifIndex -ServerAddresses $prior.Dns -ErrorAction Stop
+        } else {
+            Set-DnsClientServerAddress -InterfaceIndex $ifIndex -ResetServerAddresses -ErrorAction Stop
+        }
+        $result.RolledBack = $true
+    } catch {
+        $result.Error += ' / 回滚失败：' + $_.Exception.Message
+    }
+}
+if ($gapStart -ne $null) {
+    if ($gapEnd -eq $null) { $gapEnd = $sw.Elapsed.TotalMilliseconds }
+    $result.GapMs = $gapEnd - $gapStart
+}
+$result.ElapsedMs = $sw.Elapsed.TotalMilliseconds
+[PSCustomObject]$result | ConvertTo-Json -Compress
+'''
+
+
+def ps_quote(value: str) -> str:
+    """PowerShell 单引号字符串字面量"""
+    return "'%s'" % str(value).replace("'", "''")
+
+
+def build_apply_script(Name: str, operations=FULL_STATIC, var=('', '', '', ()), dhcp_wait: float = 10.0) -> str:
+    """生成一次修改的完整脚本
+
+    Args:
+        Name (str): 网卡名称
+        operations (tuple): 要执行的操作，见 OPERATIONS
+        var (tuple): 目标配置 (IP地址, 子网掩码, 默认网关, DNS服务器列表)
+        dhcp_wait (float): 启用 DHCP 后等待获取地址的最长时间（秒）
+
+    Returns:
+        str: PowerShell 脚本
+    """
+    unknown = set(operations) - set(OPERATIONS)
+    if unknown:
+        raise ValueError("未知的操作：%s" % ', '.join(sorted(unknown)))
+
+    dns = [server for server in var[3] if server] if var[3] else []
+    params = {
+        'name': ps_quote(Name),
+        'address': ps_quote(var[0]),
+        'prefix': subnet_converter(subnet_mask=var[1]) if ADDRESS in operations else 0,
+        'gateway': ps_quote(var[2]),
+        'dns': ', '.join(ps_quote(server) for server in dns),
+        'dns_count': len(dns),
+        'dhcp_wait_ms': int(dhcp_wait * 1000),
+    }
+
+    parts = [_PROLOGUE % params]
+    # 始终按固定顺序执行，保证先关闭 DHCP、先有地址再加路由
+    for operation in OPERATIONS:
+        if operation in operations:
+            parts.append(_STEPS[operation] % params)
+    parts.append(_EPILOGUE)
+    return ''.join(parts)
+
+
+def parse_apply_output(output: str) -> dict:
+    """解析脚本输出的 JSON（取最后一行，忽略之前的告警信息）"""
+    for line in reversed(output.splitlines()):
+        line = line.strip()
+        if line.startswith('{'):
+            return json.loads(line)
+    raise ValueError("脚本没有返回结果：%s" % output.strip()[:200])
@@ -0,0 +1,208 @@
+"""
+已保存配置的搜索索引
+
+对每个配置的IP地址、默认网关、DNS服务器和名称建立三元组（n-gram）倒排索引，
+输入时即时过滤：
+- 每个配置分配一个递增编号，每个 n-gram 的倒排表是以编号为位的整数位图，
+  求交集只需几次整数与运算，与配置数量几乎无关
+- 查询长度大于 n 时，交集只是候选，逐条用原文确认子串匹配（按需进行）
+- 查询长度小于 n 时，取所有包含查询文本的 n-gram 位图的并集
+- 结果按编号（即 IPList 的添加顺序）惰性产生，界面只需取出第一屏
+索引在第一次搜索时建立，之后随 IPList 的增删改增量维护；
+删除只清除位图中的位，编号不复用，被删除的编号过多时下次搜索前重建。
+"""
+from typing import Iterator, Optional
+
+FIELDS = ('IPv4Address', 'IPv4DefaultGateway', 'Name')
+
+
+def profile_tokens(profile: dict) -> tuple:
+    """配置中参与搜索的字段（小写，去重）"""
+    tokens = [str(profile.get(field) or '') for field in FIELDS]
+    tokens.extend(str(dns) for dns in profile.get('DNSServer') or ())
+    return tuple(dict.fromkeys(token.lower() for token in tokens if token))
+
+
+class SearchResult:
+    """一次搜索的结果，按需计算
+
+    Attributes:
+        query (str): 规范化后的查询文本
+        count (int): 匹配数量的上限（需要逐条确认时可能偏大）
+    """
+
+    def __init__(self, index: 'SearchIndex', query: str, bitmap: int):
+        self.index: SearchIndex = index
+        self.query: str = query
+        self._bitmap: int = bitmap
+        self._bits: Optional[str] = None
+        self._exact: bool = len(query) <= index.n
+        self.count: int = bitmap.bit_count()
+
+    def _bit_string(self) -> str:
+        # 第 i 个字符对应编号 i
+        if self._bits is None:
+            self._bits = bin(self._bitmap)[:1:-1] if self._bitmap else ''
+        return self._bits
+
+    def __contains__(self, key: str) -> bool:
+        index = self.index
+        id_ = index.ids.get(key)
+        if id_ is None:
+            return False
+        bits = self._bit_string()
+        if id_ >= len(bits) or bits[id_] != '1':
+            return False
+        return self._exact or self.query in index.texts[id_]
+
+    def __iter__(self) -> Iterator[str]:
+        """按编号（即添加顺序）依次产生匹配的键"""
+        index = self.index
+        bits = self._bit_string()
+        find = bits.find
+        id_ = find('1')
+        while id_ >= 0:
+            key = index.keys[id_]
+            if key is not None and (self._exact or self.query in index.texts[id_]):
+                yield key
+            id_ = find('1', id_ + 1)
+
+
+class SearchIndex:
+    """n-gram 位图索引
+
+    Attributes:
+        n (int): n-gram 长度
+        built (bool): 索引是否已建立
+        ids (dict): 键 -> 编号
+        keys (list): 编号 -> 键（已删除为 None）
+        texts (list): 编号 -> 各字段以换行连接的原文（已删除为空字符串）
+    """
+
+    def __init__(self, n: int = 3):
+        self.n: int = n
+        self.built: bool = False
+        self.ids: dict = {}
+        self.keys: list = []
+        self.texts: list = []
+        self._bitmaps: dict = {}  # n-gram -> 编号位图
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _token_grams(self, token: str) -> set:
+        # 短于 n 的字段整体作为一个 gram
+        n = self.n
+        if len(token) <= n:
+            return {token}
+        return {token[i:i + n] for i in range(len(token) - n + 1)}
+
+    def _grams(self, text: str) -> set:
+        grams = set()
+        for token in text.split('\n'):
+            grams |= self._token_grams(token)
+        return grams
+
+    def build(self, profiles: dict):
+        """按 IPList.ip_dict 一次性建立索引"""
+        self.clear()
+        postings = {}
+        token_grams = {}  # 网关、DNS 等重复的字段只切分一次
+        for id_, (key, profile) in enumerate(profiles.items()):
+            tokens = profile_tokens(profile)
+            self.ids[key] = id_
+            self.keys.append(key)
+            self.texts.append('\n'.join(tokens))
+            grams = set()
+            for token in tokens:
+                cached = token_grams.get(token)
+                if cached is None:
+                    cached = token_grams[token] = tuple(self._token_grams(token))
+                grams.update(cached)
+            for gram in grams:
+                ids = postings.get(gram)
+                if ids is None:
+                    postings[gram] = [id_]
+                else:
+                    ids.append(id_)
+
+        for gram, ids in postings.items():
+            bitmap = bytearray((ids[-1] >> 3) + 1)
+            for id_ in ids:
+                bitmap[id_ >> 3] |= 1 << (id_ & 7)
+            self._bitmaps[gram] = int.from_bytes(bitmap, 'little')
+        self.built = True
+
+    def clear(self):
+        self.ids.clear()
+        self.keys.clear()
+        self.texts.clear()
+        self._bitmaps.clear()
+        self.built = False
+
+    def add(self, key: str, profile: dict):
+        """添加或更新一个配置（索引尚未建立时忽略）"""
+        if not self.built:
+            return
+        if key in self.ids:
+            self.remove(key)
+        id_ = len(self.keys)
+        text = '\n'.join(profile_tokens(profile))
+        self.ids[key] = id_
+        self.keys.append(key)
+        self.texts.append(text)
+        bit = 1 << id_
+        bitmaps = self._bitmaps
+        for gram in self._grams(text):
+            bitmaps[gram] = bitmaps.get(gram, 0) | bit
+
+    def remove(self, key: str):
+        """删除一个配置"""
+        id_ = self.ids.pop(key, None)
+        if id_ is None:
+            return
+        bit = 1 << id_
+        bitmaps = self._bitmaps
+        for gram in self._grams(self.texts[id_]):
+            bitmap = bitmaps[gram] ^ bit
+            if bitmap:
+                bitmaps[gram] = bitmap
+            else:
+                del bitmaps[gram]
+        self.keys[id_] = None
+        self.texts[id_] = ''
+        # 被删除的编号超过一半时，下次搜索前重建
+        if len(self.keys) > 64 and len(self.ids) * 2 < len(self.keys):
+            self.built = False
+
+    def search(self, query: str) -> Optional[SearchResult]:
+        """搜索包含查询文本的配置，查询为空时返回 None（表示全部）"""
+        query = query.strip().lower()
+        if not query:
+            return None
+        bitmaps = self._bitmaps
+        if len(query) < self.n:
+            result = 0
+            for gram, bitmap in bitmaps.items():
+                if query in gram:
+                    result |= bitmap
+            return SearchResult(self, query, result)
+
+        postings = []
+        for gram in {query[i:i + self.n] for i in range(len(query) - self.n + 1)}:
+            bitmap = bitmaps.get(gram)
+            if bitmap is None:
+                return SearchResult(self, query, 0)
+            postings.append(bitmap)
+        result = postings[0]
+        for bitmap in postings[1:]:
+            result &= bitmap
+        return SearchResult(self, query, result)
+
+    def matches(self, key: str, query: str) -> bool:
+        """单个配置是否匹配查询（与 search 的规则一致）"""
+        query = query.strip().lower()
+        id_ = self.ids.get(key)
+        if id_ is None:
+            return False
+        return not query or query in self.texts[id_]
@@ -0,0 +1,336 @@
+import atexit
+import base64
+import itertools
+import os
+import queue
+import subprocess
+import threading
+import uuid
+from typing import Callable, NamedTuple, Optional
+
+import tracing
+
+
+class ShellError(RuntimeError):
+    """Shell 会话异常（启动失败、超时、进程崩溃等）"""
+
+
+class ShellResult(NamedTuple):
+    """一次脚本执行的结果
+
+    Attributes:
+        returncode (int): 0 表示成功，非 0 表示脚本抛出了终止性错误
+        output (str): 脚本的标准输出与标准错误（已合并）
+    """
+    returncode: int
+    output: str
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0
+
+
+class PowerShellDialect:
+    """PowerShell 请求封装
+
+    脚本以 Base64 编码成单行请求写入 stdin，执行完毕后输出结束标记和返回码。
+    脚本中抛出的终止性错误（throw / -ErrorAction Stop）视为失败。
+    """
+
+    name = 'powershell'
+    command = ["powershell", "-NoLogo", "-NoProfile", "-NonInteractive",
+               "-ExecutionPolicy", "Bypass", "-Command", "-"]
+    # 统一输出编码，避免依赖系统默认的 gbk
+    init_script = ("[Console]::OutputEncoding = [Text.Encoding]::UTF8\n"
+                   "$ProgressPreference = 'SilentlyContinue'")
+
+    @staticmethod
+    def frame(script: str, marker: str) -> str:
+        encoded = base64.b64encode(script.encode('utf-8')).decode('ascii')
+        return ("$__netset_rc = 0; try { "
+                "& ([ScriptBlock]::Create([Text.Encoding]::UTF8.GetString("
+                f"[Convert]::FromBase64String('{encoded}')))) 2>&1 | Out-String -Width 4096 "
+                "} catch { $_ | Out-String; $__netset_rc = 1 }; "
+                f"'{marker} ' + $__netset_rc\n")
+
+
+class PosixShellDialect:
+    """POSIX sh 请求封装，用于在 Linux 上以替身解释器测试和压测"""
+
+    name = 'sh'
+    command = ["sh"]
+    init_script = ''
+
+    @staticmethod
+    def frame(script: str, marker: str) -> str:
+        # 单引号转义后直接 eval，不额外派生解码进程
+        quoted = "'%s'" % script.replace("'", "'\\''")
+        return ("__netset_rc=0; "
+                f"{{ eval {quoted}; }} 2>&1 || __netset_rc=$?; "
+                f"printf '%s %s\\n' '{marker}' \"$__netset_rc\"\n")
+
+
+def default_dialect():
+    """根据平台和环境变量 NETSET_SHELL 选择默认的 Shell 方言"""
+    executable = os.environ.get('NETSET_SHELL')
+    if executable:
+        base = os.path.basename(executable).lower()
+        return PowerShellDialect if ('powershell' in base or 'pwsh' in base) else PosixShellDialect
+    return PowerShellDialect if os.name == 'nt' else PosixShellDialect
+
+
+class ShellSession:
+    """常驻 Shell 会话
+
+    只启动一次解释器进程，之后每个脚本都通过 stdin 以带结束标记的帧发送，
+    从 stdout 读取到对应的结束标记为止即为一次完整响应。
+    进程崩溃或超时后会在下一次调用时自动重启。多个调用方可以共享同一会话，
+    同一时刻只有一个脚本在执行。
+
+    Attributes:
+        dialect: Shell 方言（PowerShellDialect / PosixShellDialect）
+        command (list): 启动解释器的命令行
+        timeout (float): 单个脚本的默认超时时间（秒）
+        restarts (int): 会话（重新）启动的次数
+    """
+
+    def __init__(self, dialect=None, command: Optional[list] = None,
+                 encoding: str = 'utf-8', timeout: float = 60.0):
+        self.dialect = dialect or default_dialect()
+        if command is None:
+            command = list(self.dialect.command)
+            if executable := os.environ.get('NETSET_SHELL'):
+                command[0] = executable
+        self.command: list = command
+        self.encoding: str = encoding
+        self.timeout: float = timeout
+        self.restarts: int = 0
+
+        self._process: Optional[subprocess.Popen] = None
+        self._lines: Optional[queue.Queue] = None
+        self._lock = threading.RLock()
+        self._prefix = '__NETSET_END_%s' % uuid.uuid4().hex
+        self._counter = itertools.count()
+
+    @property
+    def alive(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self._process.pid if self.alive else None
+
+    def start(self):
+        """启动解释器进程（已在运行时不做任何事）"""
+        with self._lock:
+            if self.alive:
+                return
+            self._kill()
+
+            kwargs = {}
+            if os.name == 'nt':
+                # 隐藏控制台窗口
+                startupinfo = subprocess.STARTUPINFO()
+                startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+                kwargs['startupinfo'] = startupinfo
+                kwargs['creationflags'] = subprocess.CREATE_NO_WINDOW
+
+            try:
+                with tracing.span('shell.spawn', command=self.command[0]):
+                    self._process = subprocess.Popen(
+                        self.command,
+                        stdin=subprocess.PIPE,
+                        stdout=subprocess.PIPE,
+                        stderr=subprocess.STDOUT,  # 将标准错误重定向到标准输出
+                        encoding=self.encoding,
+                        errors='replace',
+                        bufsize=1,
+                        **kwargs
+                    )
+            except OSError as e:
+                raise ShellError(f"启动 Shell 失败：{e}") from e
+
+            self._lines = queue.Queue()
+            threading.Thread(target=self._pump, args=(self._process.stdout, self._lines),
+                             name='netset-shell-reader', daemon=True).start()
+            self.restarts += 1
+
+            if self.dialect.init_script:
+                self._execute(self.dialect.init_script, self.timeout)
+
+    def close(self):
+        """关闭解释器进程"""
+        with self._lock:
+            if self.alive:
+                try:
+                    self._process.stdin.close()
+                    self._process.wait(timeout=2)
+                except (OSError, subprocess.TimeoutExpired):
+                    pass
+            self._kill()
+
+    def restart(self):
+        """强制重启解释器进程"""
+        with self._lock:
+            self._kill()
+            self.start()
+
+    def run(self, script: str, timeout: Optional[float] = None) -> ShellResult:
+        """在会话中执行脚本
+
+        Args:
+            script (str): 脚本内容，可以是多行
+            timeout (float): 超时时间（秒），默认使用 self.timeout
+
+        Returns:
+            ShellResult: 返回码与输出
+
+        Raises:
+            ShellError: 会话启动失败、执行超时或执行过程中进程崩溃
+        """
+        timeout = self.timeout if timeout is None else timeout
+        with self._lock:
+            self.start()
+            with tracing.span('shell.execute', chars=len(script)) as span:
+                result = self._execute(script, timeout)
+                span.set(returncode=result.returncode)
+            return result
+
+    def _execute(self, script: str, timeout: float) -> ShellResult:
+        marker = '%s_%d__' % (self._prefix, next(self._counter))
+        request = self.dialect.frame(script, marker)
+        try:
+            self._process.stdin.write(request)
+            self._process.stdin.flush()
+        except (OSError, ValueError):
+            # 写入失败说明进程已退出，脚本尚未执行，重启后重发一次
+            self._kill()
+            self.start()
+            self._process.stdin.write(request)
+            self._process.stdin.flush()
+
+        output = []
+        while True:
+            try:
+                line = self._lines.get(timeout=timeout)
+            except queue.Empty:
+                self._kill()
+                raise ShellError(f"脚本执行超时（{timeout} 秒）") from None
+            if line is None:
+                self._kill()
+                raise ShellError("Shell 进程意外退出：%s" % ''.join(output).strip())
+
+            index = line.find(marker)
+            if index < 0:
+                output.append(line)
+                continue
+
+            output.append(line[:index])
+            try:
+                returncode = int(line[index + len(marker):].strip() or 0)
+            except ValueError:
+                returncode = 1
+            return ShellResult(returncode, ''.join(output).strip())
+
+    def _kill(self):
+        if self._process is not None:
+            try:
+                self._process.kill()
+                self._process.wait(timeout=2)
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+            for stream in (self._process.stdin, self._process.stdout):
+                try:
+                    stream.close()
+                except (OSError, ValueError):
+                    pass
+        self._process = None
+
+    @staticmethod
+    def _pump(stream, lines: queue.Queue):
+        """后台读取 stdout，逐行放入队列，EOF 时放入 None"""
+        try:
+            for line in stream:
+                lines.put(line)
+        except (OSError, ValueError):
+            pass
+        lines.put(None)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SessionPool:
+    """多个 Shell 会话，可以从多个线程同时执行脚本
+
+    run 时取一个空闲的会话执行，用完放回；会话在需要时才创建（最多 size 个，可用 grow() 扩大），
+    优先复用最近用过的会话（进程已经预热）。接口与 ShellSession 的 run / close 相同，
+    可以直接代替 ShellSession 传给 PowerShellBackend。
+
+    Attributes:
+        size (int): 最多同时存在的会话数（即最大并发数）
+        sessions (list): 已创建的会话
+    """
+
+    def __init__(self, size: int = 4, factory: Callable[[], ShellSession] = None):
+        """
+        Args:
+            size (int): 最大会话数
+            factory (Callable): 创建会话的函数，默认为 ShellSession
+        """
+        self.size: int = size
+        self.factory: Callable[[], ShellSession] = factory or ShellSession
+        self.sessions: list = []
+        self._idle: list = []
+        self._lock = threading.Lock()
+        self._available = threading.Semaphore(size)
+
+    def run(self, script: str, timeout: Optional[float] = None) -> ShellResult:
+        """在一个空闲的会话中执行脚本（没有空闲会话且已达到 size 个时等待）"""
+        with self._available:
+            with self._lock:
+                if self._idle:
+                    session = self._idle.pop()
+                else:
+                    session = self.factory()
+                    self.sessions.append(session)
+            try:
+                return session.run(script, timeout)
+            finally:
+                with self._lock:
+                    if session in self.sessions:
+                        self._idle.append(session)
+
+    def grow(self, size: int):
+        """把最大会话数扩大到 size（不会缩小，正在等待的线程立即可以继续）"""
+        with self._lock:
+            extra, self.size = size - self.size, max(self.size, size)
+        if extra > 0:
+            self._available.release(extra)
+
+    def close(self):
+        """关闭全部会话（之后仍可使用，会重新创建）"""
+        with self._lock:
+            sessions, self.sessions, self._idle = self.sessions, [], []
+        for session in sessions:
+            session.close()
+
+
+_shared_pool: Optional[SessionPool] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_pool(size: int = 4) -> SessionPool:
+    """获取进程内共享的会话池（延迟创建，已存在且小于 size 时扩大到 size）"""
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is None:
+            _shared_pool = SessionPool(size)
+            atexit.register(_shared_pool.close)
+        else:
+            _shared_pool.grow(size)
+        return _shared_pool
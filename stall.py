@@ -0,0 +1,182 @@
+"""
+界面线程卡顿监测
+
+界面线程用定时器定期调用 StallWatchdog.beat()（心跳），后台线程检查心跳：
+超过 threshold 秒没有心跳说明事件循环被某个槽函数阻塞，此时每隔 interval 秒用
+sys._current_frames() 采样一次界面线程的 Python 调用栈；心跳恢复后把卡顿时长、
+阻塞事件循环的槽函数（调用栈中最内层 exec() 调用的下一层）和最常见的调用栈写入滚动日志。
+
+    watchdog = stall.install(app)  # 创建 QApplication 之后调用，退出时自动停止
+
+环境变量 NETSET_STALL_MS 可修改阈值（毫秒），为 0 时不监测。
+"""
+import logging
+import logging.handlers
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from typing import Callable, NamedTuple, Optional
+
+
+class Stall(NamedTuple):
+    """一次卡顿
+
+    Attributes:
+        started (float): 开始时间（time.time()，即最后一次正常心跳）
+        duration (float): 两次心跳的间隔（秒）
+        slot (str): 阻塞事件循环的槽函数，如 "<lambda> (main.py:72)"
+        stack (tuple): 最常见的调用栈（traceback.format_list 的格式）
+        samples (int): 采样次数
+    """
+    started: float
+    duration: float
+    slot: str
+    stack: tuple
+    samples: int
+
+
+def _describe(frame: tuple) -> str:
+    filename, lineno, name, _ = frame
+    return '%s (%s:%d)' % (name, os.path.basename(filename), lineno)
+
+
+def find_slot(stack: list) -> str:
+    """调用栈（从外到内的 (文件, 行号, 函数, 源代码)）中被事件循环直接调用的函数
+
+    事件循环在 app.exec() / dialog.exec() 中运行，最内层 exec() 调用的下一层就是当前的槽函数；
+    找不到时返回最外层之后的第一层。
+    """
+    if not stack:
+        return ''
+    for i in range(len(stack) - 1, -1, -1):
+        if '.exec(' in (stack[i][3] or '') and i + 1 < len(stack):
+            return _describe(stack[i + 1])
+    return _describe(stack[1] if len(stack) > 1 else stack[0])
+
+
+class StallWatchdog:
+    """卡顿监测线程
+
+    Attributes:
+        threshold (float): 超过多少秒没有心跳算卡顿
+        interval (float): 检查和采样的间隔（秒），也是建议的心跳间隔
+        stalls (deque): 最近的 Stall
+    """
+
+    def __init__(self, threshold: float = 0.2, interval: float = None, path: str = 'stall.log',
+                 max_bytes: int = 1 << 20, backups: int = 3, thread_id: int = None,
+                 on_stall: Optional[Callable[[Stall], None]] = None):
+        """
+        Args:
+            threshold (float): 卡顿阈值（秒）
+            interval (float): 检查间隔，默认为阈值的 1/4
+            path (str): 卡顿日志文件，为空时不写文件
+            max_bytes (int): 日志文件超过该大小时滚动
+            backups (int): 保留的旧日志个数（stall.log.1 ...）
+            thread_id (int): 被监测的线程，默认为主线程（界面线程）
+            on_stall (Callable): 每次卡顿结束后在监测线程中调用
+        """
+        self.threshold: float = threshold
+        self.interval: float = interval or threshold / 4
+        self.thread_id: int = thread_id or threading.main_thread().ident
+        self.on_stall = on_stall
+        self.stalls: deque = deque(maxlen=100)
+
+        self._last: float = time.monotonic()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._logger: Optional[logging.Logger] = None
+        if path:
+            self._logger = logging.getLogger('netset.stall.%s' % os.path.abspath(path))
+            self._logger.propagate = False
+            if not self._logger.handlers:
+                handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups,
+                                                               encoding='utf-8', delay=True)
+                handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+                self._logger.addHandler(handler)
+            self._logger.setLevel(logging.INFO)
+
+    def beat(self):
+        """心跳（在被监测的线程中定期调用）"""
+        self._last = time.monotonic()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._last = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name='netset-stall-watchdog', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def _run(self):
+        stall_from = None  # 卡顿前最后一次心跳
+        wall_from = 0.0
+        samples: Counter = Counter()
+        while not self._stop.wait(self.interval):
+            last = self._last
+            if time.monotonic() - last < self.threshold:
+                if stall_from is not None and last != stall_from:
+                    self._report(wall_from, last - stall_from, samples)
+                    stall_from = None
+                continue
+            if stall_from is None:
+                stall_from = last
+                wall_from = time.time() - (time.monotonic() - last)
+                samples = Counter()
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                samples[tuple((item.filename, item.lineno, item.name, item.line)
+                              for item in traceback.extract_stack(frame))] += 1
+                del frame
+
+    def _report(self, started: float, duration: float, samples: Counter):
+        if samples:
+            stack, _ = samples.most_common(1)[0]
+            stall = Stall(started, duration, find_slot(stack), tuple(traceback.format_list(list(stack))),
+                          sum(samples.values()))
+        else:
+            stall = Stall(started, duration, '', (), 0)
+        self.stalls.append(stall)
+        print('界面卡顿 %.0f ms：%s' % (duration * 1000, stall.slot or '未知'))
+        if self._logger is not None:
+            self._logger.info('卡顿 %.0f ms，槽函数 %s，采样 %d 次，最常见的调用栈：\n%s',
+                              duration * 1000, stall.slot or '未知', stall.samples, ''.join(stall.stack).rstrip())
+        if self.on_stall is not None:
+            self.on_stall(stall)
+
+
+def install(app, threshold: float = None, path: str = 'stall.log') -> Optional[StallWatchdog]:
+    """为 QApplication 安装心跳定时器并启动监测，应用退出时停止
+
+    Args:
+        app: QApplication
+        threshold (float): 卡顿阈值（秒），默认读取环境变量 NETSET_STALL_MS，再默认 0.2
+        path (str): 卡顿日志文件
+
+    Returns:
+        StallWatchdog: 阈值为 0 时不监测，返回 None
+    """
+    from PyQt6.QtCore import QTimer
+
+    if threshold is None:
+        threshold = float(os.environ.get('NETSET_STALL_MS', 200)) / 1000
+    if threshold <= 0:
+        return None
+    watchdog = StallWatchdog(threshold, path=path)
+    timer = QTimer(app)
+    timer.setInterval(max(1, int(watchdog.interval * 1000)))
+    timer.timeout.connect(watchdog.beat)
+    timer.start()
+    app.aboutToQuit.connect(watchdog.stop)
+    app.aboutToQuit.connect(timer.stop)
+    watchdog.start()
+    return watchdog
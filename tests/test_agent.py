@@ -0,0 +1,226 @@
+"""
+agent.py：临时目录中的 Unix 域套接字上的代理（后端为 fleet.MemoryBackend），客户端通过 AgentBackend 访问
+
+用法：python -m pytest tests 或 python -m unittest discover tests
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent import READ_OPS, AgentBackend, AgentClient, AgentError, AgentServer, read_token_file  # noqa: E402
+from fleet import MemoryBackend  # noqa: E402
+from function import NetManage  # noqa: E402
+
+NAME = '以太网'
+PROFILE = ('172.16.0.50', '255.255.255.0', '172.16.0.1', ('223.5.5.5',))
+
+
+def quietly(fn, *args):
+    """调用时不输出代理的启动、停止提示"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args)
+
+
+class CountingBackend(MemoryBackend):
+    """记录 apply 的调用次数，每次修改耗时 delay 秒"""
+
+    def __init__(self, delay: float = 0.0):
+        super().__init__((NAME,))
+        self.delay: float = delay
+        self.applies: int = 0
+
+    def apply(self, Name, operations, var):
+        self.applies += 1
+        time.sleep(self.delay)
+        return super().apply(Name, operations, var)
+
+
+@unittest.skipUnless(hasattr(os, 'geteuid'), '需要 Unix 域套接字')
+class AgentTestCase(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'agent.sock')
+        self.backend = CountingBackend()
+        self.net = NetManage(self.backend)
+        self.server = self.start()
+
+    def start(self) -> AgentServer:
+        server = quietly(AgentServer(self.net, self.path).start)
+        self.addCleanup(quietly, server.stop)
+        return server
+
+    def client(self, timeout: float = 5.0) -> AgentClient:
+        client = AgentClient(self.path, timeout=timeout)
+        self.addCleanup(client.close)
+        return client
+
+
+class RequestTest(AgentTestCase):
+
+    def test_read(self):
+        backend = AgentBackend(self.client())
+        self.assertEqual(backend.client.request('ping')['backend'], 'memory')
+        self.assertEqual(backend.snapshot().names(), [NAME])
+        self.assertEqual(backend.adapter_info(NAME), self.backend.adapter_info(NAME))
+
+    def test_error(self):
+        with self.assertRaises(AgentError):
+            AgentBackend(self.client()).adapter_info('没有这个网卡')
+        with self.assertRaises(AgentError):
+            self.client().request('reboot')
+
+
+class SerializeTest(AgentTestCase):
+
+    def test_change_before_apply(self):
+        # 客户端 A 决定修改（只差 DNS）后、修改请求到达代理前，客户端 B 修改了网卡地址：
+        # 在代理中按当前配置比较，A 的配置完整生效，不会只修改 DNS 而留下 B 的地址
+        first = NetManage(AgentBackend(self.client()))
+        second = NetManage(AgentBackend(self.client()))
+        original = first.get_adapter_info(NAME)
+        target = (original[0], original[1], original[2], ('8.8.8.8',))
+        request, raced = first.backend.client.request, []
+
+        def racing_request(op, **args):
+            if op not in READ_OPS and not raced:
+                raced.append(op)
+                second.change_adapter_ip(NAME, ('172.16.0.99', '255.255.255.0', '172.16.0.1', ('223.5.5.5',)))
+            return request(op, **args)
+
+        first.backend.client.request = racing_request
+        result = first.change_adapter_ip(NAME, target)
+        self.assertTrue(raced)
+        self.assertTrue(result.ok, result.info)
+        self.assertEqual(self.backend.adapter_info(NAME), target + ('Disabled',))
+
+    def test_concurrent_clients(self):
+        # 多个客户端同时修改同一网卡：代理中依次执行，最后的配置是其中一个客户端的完整配置
+        self.backend.delay = 0.02
+        active, overlaps = [0], []
+        apply = self.backend.apply
+
+        def tracked(*args):
+            active[0] += 1
+            overlaps.append(active[0])
+            try:
+                return apply(*args)
+            finally:
+                active[0] -= 1
+
+        self.backend.apply = tracked
+        profiles = [('172.16.%d.10' % i, '255.255.255.0', '172.16.%d.1' % i, ('10.0.0.%d' % i,)) for i in range(8)]
+
+        def run(profile):
+            net = NetManage(AgentBackend(self.client()))
+            net.get_adapter_info(NAME)
+            results.append(net.change_adapter_ip(NAME, profile))
+
+        results = []
+        threads = [threading.Thread(target=run, args=(profile,)) for profile in profiles]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertTrue(all(result.ok for result in results))
+        self.assertEqual(max(overlaps), 1)
+        self.assertIn(self.backend.adapter_info(NAME)[:4], profiles)
+
+    def test_dhcp(self):
+        net = NetManage(AgentBackend(self.client()))
+        self.assertTrue(net.up_dhcp(NAME).ok)
+        self.assertEqual(self.backend.adapter_info(NAME)[4], 'Enabled')
+        self.assertIn('无需', net.up_dhcp(NAME).info)
+
+
+class RetryTest(AgentTestCase):
+
+    def test_write_not_resent_after_timeout(self):
+        # 代理已收到请求、仍在修改时客户端超时：不能重发，否则同一修改执行两次
+        self.backend.delay = 0.5
+        client = self.client(timeout=0.2)
+        with self.assertRaises(AgentError):
+            client.request('change_ip', Name=NAME, var=[PROFILE[0], PROFILE[1], PROFILE[2], list(PROFILE[3])],
+                           minimal=False)  # 完整应用：每次收到都会修改
+        time.sleep(0.6)
+        self.assertEqual(self.backend.applies, 1)
+
+    def test_reconnect_after_restart(self):
+        client = self.client()
+        client.request('ping')
+        quietly(self.server.stop)
+        self.server = self.start()
+        # 读取类请求在旧连接上失败后重发；修改类请求发送前发现连接已断开，重新连接后只发送一次
+        self.assertEqual(client.request('ping')['backend'], 'memory')
+        quietly(self.server.stop)
+        self.server = self.start()
+        result = client.request('dhcp', Name=NAME)
+        self.assertTrue(result['ok'])
+        self.assertEqual(self.backend.applies, 1)
+
+
+
+@unittest.skipUnless(hasattr(os, 'geteuid'), '需要 POSIX 文件权限')
+class TokenFileTest(unittest.TestCase):
+    """TCP 代理的令牌文件：不沿用预先创建的文件或符号链接"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.token_file = os.path.join(self.directory, 'netset-agent.token')
+
+    def start(self) -> AgentServer:
+        server = quietly(AgentServer(NetManage(MemoryBackend()), ('127.0.0.1', 0), token_file=self.token_file).start)
+        self.addCleanup(quietly, server.stop)
+        return server
+
+    def test_precreated_file_replaced(self):
+        # 其他用户预先创建、自己可读的文件：删除后重新创建，令牌不会写入该文件
+        with open(self.token_file, 'w') as f:
+            f.write('old')
+        os.chmod(self.token_file, 0o644)
+        reader = open(self.token_file)
+        self.addCleanup(reader.close)
+        server = self.start()
+        self.assertEqual(reader.read(), 'old')
+        self.assertEqual(os.stat(self.token_file).st_mode & 0o777, 0o600)
+        self.assertEqual(read_token_file(self.token_file), server._token)
+        client = AgentClient(server.address, token_file=self.token_file)
+        self.addCleanup(client.close)
+        self.assertEqual(client.request('ping')['backend'], 'memory')
+
+    def test_symlink_not_followed(self):
+        target = os.path.join(self.directory, 'target')
+        with open(target, 'w') as f:
+            f.write('keep')
+        os.symlink(target, self.token_file)
+        self.start()
+        self.assertFalse(os.path.islink(self.token_file))
+        with open(target) as f:
+            self.assertEqual(f.read(), 'keep')
+
+    def test_client_rejects_writable_file(self):
+        server = self.start()
+        os.chmod(self.token_file, 0o666)
+        with self.assertRaises(PermissionError):
+            read_token_file(self.token_file)
+        with self.assertRaises(AgentError):
+            AgentClient(server.address, token_file=self.token_file).request('ping')
+
+    def test_wrong_token(self):
+        server = self.start()
+        with self.assertRaises(AgentError):
+            AgentClient(server.address, token='0' * 32).request('ping')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+"""
+netset.py：profiles 子命令（列出、搜索、JSON 输出、添加、删除、冲突检查）和按需导入
+
+用法：python -m pytest tests 或 python -m unittest discover tests
+"""
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import netset  # noqa: E402
+
+
+class ProfilesTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.record = os.path.join(directory.name, 'record.json')
+        self.run_cli('profiles', 'add', '10.0.0.8', '24', '10.0.0.1', '--dns', '223.5.5.5', '--name', '办公室')
+        self.run_cli('profiles', 'add', '192.168.1.20', '255.255.255.0', '192.168.1.1')
+
+    def run_cli(self, *argv) -> tuple:
+        """(退出码, stdout)"""
+        out = io.StringIO()
+        with mock.patch('sys.stdout', out), mock.patch('sys.stderr', io.StringIO()):
+            code = netset.main(['--record', self.record] + list(argv))
+        return code, out.getvalue()
+
+    def listed(self, *argv) -> list:
+        code, output = self.run_cli('profiles', 'list', *argv)
+        self.assertEqual(code, 0)
+        return [line.split()[0] for line in output.splitlines()]
+
+    def test_list_and_search(self):
+        self.assertEqual(self.listed(), ['10.0.0.8', '192.168.1.20'])
+        self.assertEqual(self.listed('192.168'), ['192.168.1.20'])
+        self.assertEqual(self.listed('办公'), ['10.0.0.8'])
+        self.assertEqual(self.listed('172.16'), [])
+        # 只有空白的文本按没有给出文本处理
+        self.assertEqual(self.listed('   '), ['10.0.0.8', '192.168.1.20'])
+
+    def test_json(self):
+        code, output = self.run_cli('profiles', 'list', '--json')
+        self.assertEqual(code, 0)
+        self.assertEqual(json.loads(output), [
+            {'IPv4Address': '10.0.0.8', 'SubnetMask': '255.255.255.0', 'IPv4DefaultGateway': '10.0.0.1',
+             'DNSServer': ['223.5.5.5'], 'Name': '办公室'},
+            {'IPv4Address': '192.168.1.20', 'SubnetMask': '255.255.255.0', 'IPv4DefaultGateway': '192.168.1.1',
+             'DNSServer': []},
+        ])
+
+    def test_add_invalid_and_delete(self):
+        self.assertEqual(self.run_cli('profiles', 'add', '10.0.0.300', '24')[0], 1)
+        self.assertEqual(self.run_cli('profiles', 'del', '10.0.0.8')[0], 0)
+        self.assertEqual(self.run_cli('profiles', 'del', '10.0.0.8')[0], 1)
+        self.assertEqual(self.listed(), ['192.168.1.20'])
+
+    def test_check(self):
+        self.assertEqual(self.run_cli('profiles', 'check'), (0, ''))
+        # 同一子网使用不同网关
+        self.run_cli('profiles', 'add', '10.0.0.9', '24', '10.0.0.254')
+        code, output = self.run_cli('profiles', 'check')
+        self.assertEqual(code, 1)
+        self.assertIn('10.0.0.9', output)
+
+
+class LazyImportTest(unittest.TestCase):
+
+    def test_profiles_without_gui_or_numpy(self):
+        with tempfile.TemporaryDirectory() as directory:
+            code = ("import sys, netset; netset.main(['--record', sys.argv[1], 'profiles', 'list']); "
+                    "print(sorted(m for m in ('PyQt6', 'numpy', 'main', 'agent', 'fleet') if m in sys.modules))")
+            result = subprocess.run([sys.executable, '-c', code, os.path.join(directory, 'record.json')],
+                                    cwd=ROOT, capture_output=True, text=True, timeout=60)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip(), '[]')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+"""
+conflicts.py：整库检查 find_conflicts、增量检查 ConflictDetector.check 与逐对比较（暴力搜索）的结果一致，
+包括增删改之后
+
+用法：python -m pytest tests 或 python -m unittest discover tests
+"""
+import ipaddress
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conflicts import KINDS, ConflictDetector, find_conflicts  # noqa: E402
+from prefix_index import PrefixIndex  # noqa: E402
+from tools import validate_profile  # noqa: E402
+
+MASKS = ('255.255.0.0', '255.255.252.0', '255.255.255.0', '255.255.255.0', '255.255.255.128', '255.255.255.252',
+         '24', '255.0.255.0', '')
+ADDRESSES = ('10.0.0.%d', '10.0.1.%d', '10.0.2.%d', '10.0.3.%d', '192.168.0.%d')
+
+
+def random_profile(rng: random.Random) -> dict:
+    """地址集中在少数几个子网中，保证各种冲突都经常出现"""
+    address = rng.choice(ADDRESSES) % rng.randrange(256)
+    if rng.random() < 0.03:
+        address = rng.choice(('10.0.0.300', '', 'x'))
+    gateway = rng.choice(('', '10.0.0.1', '10.0.0.254', '10.0.1.1', '10.0.2.1', '192.168.0.1', 'bad',
+                          rng.choice(ADDRESSES) % rng.randrange(256)))
+    return {'IPv4Address': address, 'SubnetMask': rng.choice(MASKS), 'IPv4DefaultGateway': gateway, 'DNSServer': []}
+
+
+def parse(profile: dict) -> tuple:
+    """(子网, 地址, 默认网关)，无效的为 None"""
+    try:
+        network = ipaddress.IPv4Network('%s/%s' % (profile['IPv4Address'], profile['SubnetMask']), strict=False)
+        address = ipaddress.IPv4Address(profile['IPv4Address'])
+    except ValueError:
+        network = address = None
+    try:
+        gateway = ipaddress.IPv4Address(profile['IPv4DefaultGateway'])
+    except ValueError:
+        gateway = None
+    return network, address, gateway
+
+
+def conflicts_with(a: tuple, b: tuple, kind: str) -> bool:
+    """配置 a 是否因为 b 而有 kind 类型的冲突（a、b 为 parse 的结果）"""
+    network, address, gateway = a
+    other_network, other_address, other_gateway = b
+    if network is None:
+        return False
+    if kind == 'duplicate':
+        return other_network is not None and address == other_address
+    if kind == 'gateway':
+        return address == other_gateway
+    if kind == 'overlap':
+        return other_network is not None and network != other_network and network.overlaps(other_network)
+    if kind == 'gateway_mismatch':
+        return (network == other_network and gateway is not None and other_gateway is not None
+                and gateway != other_gateway)
+    raise ValueError(kind)
+
+
+def brute_force(profiles: dict) -> dict:
+    """键 -> 有冲突的类型列表（按 KINDS 的顺序）"""
+    parsed = {key: parse(profile) for key, profile in profiles.items()}
+    result = {}
+    for key, profile in profiles.items():
+        kinds = ['invalid'] if validate_profile(profile) else []
+        for kind in KINDS[1:]:
+            if any(conflicts_with(parsed[key], parsed[other], kind) for other in profiles if other != key):
+                kinds.append(kind)
+        if kinds:
+            result[key] = kinds
+    return result
+
+
+class ConflictsTest(unittest.TestCase):
+
+    def assert_conflicts(self, conflicts: list, expected: dict, profiles: dict):
+        """conflicts 与暴力搜索的类型一致，且说明中的另一个配置确实与之冲突"""
+        kinds = {}
+        for conflict in conflicts:
+            kinds.setdefault(conflict.key, []).append(conflict.kind)
+            if conflict.kind == 'invalid':
+                self.assertEqual(conflict.message, validate_profile(profiles[conflict.key]))
+                self.assertEqual(conflict.other, '')
+            else:
+                self.assertNotEqual(conflict.other, conflict.key)
+                self.assertTrue(conflicts_with(parse(profiles[conflict.key]), parse(profiles[conflict.other]),
+                                               conflict.kind), conflict)
+        self.assertEqual(kinds, expected)
+
+    def detector(self, profiles: dict) -> ConflictDetector:
+        index = PrefixIndex()
+        index.build(profiles)
+        detector = ConflictDetector(index)
+        detector.build(profiles)
+        return detector
+
+    def test_find_conflicts_against_check(self):
+        rng = random.Random(11)
+        for size in (0, 1, 30, 400):
+            with self.subTest(size=size):
+                profiles = {'key%d' % i: random_profile(rng) for i in range(size)}
+                expected = brute_force(profiles)
+                conflicts = find_conflicts(profiles)
+                self.assert_conflicts(conflicts, expected, profiles)
+                # 同一配置的冲突连续，配置按原来的顺序
+                order = [key for key in profiles if key in expected]
+                self.assertEqual(list(dict.fromkeys(conflict.key for conflict in conflicts)), order)
+
+                detector = self.detector(profiles)
+                checked = [conflict for key, profile in profiles.items() for conflict in detector.check(profile, key)]
+                self.assert_conflicts(checked, expected, profiles)
+        # 随机配置覆盖了全部冲突类型
+        self.assertEqual({kind for kinds in expected.values() for kind in kinds}, set(KINDS))
+
+    def test_incremental(self):
+        rng = random.Random(12)
+        profiles = {'key%d' % i: random_profile(rng) for i in range(100)}
+        detector = self.detector(profiles)
+        for step in range(600):
+            key = 'key%d' % rng.randrange(150)
+            if key in profiles and rng.random() < 0.4:
+                del profiles[key]
+                detector.index.remove(key)
+                detector.remove(key)
+            else:
+                profile = random_profile(rng)
+                profiles.pop(key, None)
+                profiles[key] = profile
+                detector.index.insert_ip(key, profile['IPv4Address'], profile['SubnetMask'])
+                detector.add(key, profile)
+            self.assertEqual(len(detector), len(profiles))
+            if step % 50 == 0:
+                expected = brute_force(profiles)
+                checked = [conflict for key, profile in profiles.items() for conflict in detector.check(profile, key)]
+                self.assert_conflicts(checked, expected, profiles)
+                self.assert_conflicts(find_conflicts(profiles), expected, profiles)
+
+    def test_check_new_profile(self):
+        profiles = {'10.0.0.8': {'IPv4Address': '10.0.0.8', 'SubnetMask': '255.255.255.0',
+                                 'IPv4DefaultGateway': '10.0.0.1', 'DNSServer': []}}
+        detector = self.detector(profiles)
+        # 新增（没有原来的键）时不排除任何配置
+        conflicts = detector.check({'IPv4Address': '10.0.0.8', 'SubnetMask': '255.255.0.0',
+                                    'IPv4DefaultGateway': '10.0.0.254'})
+        self.assertEqual([(conflict.key, conflict.kind, conflict.other) for conflict in conflicts],
+                         [('10.0.0.8', 'duplicate', '10.0.0.8'), ('10.0.0.8', 'overlap', '10.0.0.8')])
+        self.assertEqual(detector.check({'IPv4Address': '10.0.0.1', 'SubnetMask': '255.255.255.0',
+                                         'IPv4DefaultGateway': '10.0.0.254'})[0].kind, 'gateway')
+        # 修改时排除它自己
+        self.assertEqual(detector.check(profiles['10.0.0.8'], '10.0.0.8'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,200 @@
+"""
+fleet.py：通过 LoopbackTransport 批量下发（全部成功、连接失败和无响应的主机、并发上限、进度、
+中途停止），以及通过 TCP 上的代理（agent.py）下发
+
+用法：python -m pytest tests 或 python -m unittest discover tests
+"""
+import asyncio
+import io
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fleet  # noqa: E402
+from agent import AgentServer  # noqa: E402
+from fleet import AgentTransport, LoopbackTransport, MemoryBackend, Target  # noqa: E402
+from function import NetManage  # noqa: E402
+
+NAME = '以太网'
+
+
+def targets(count: int, dhcp_every: int = 5) -> list:
+    """count 台主机，每 dhcp_every 台中有一台启用DHCP"""
+    return [Target('lab-%03d' % i, NAME, None if i % dhcp_every == 0 else
+                   ('10.1.%d.%d' % (i // 200, i % 200 + 10), '255.255.255.0', '10.1.%d.1' % (i // 200), ('223.5.5.5',)))
+            for i in range(count)]
+
+
+class CountingTransport(LoopbackTransport):
+    """记录同时处理的主机数"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.active = 0
+        self.max_active = 0
+
+    async def apply(self, target, minimal=True):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            return await super().apply(target, minimal)
+        finally:
+            self.active -= 1
+
+
+class FleetTestCase(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('sys.stdout', io.StringIO())  # 不输出各主机的修改提示
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def assert_applied(self, transport: LoopbackTransport, target: Target):
+        info = transport.hosts[target.host].get_adapter_info(target.adapter, use_cache=False)
+        if target.var is None:
+            self.assertEqual(info[4], 'Enabled')
+        else:
+            self.assertEqual(info, target.var + ('Disabled',))
+
+
+class RolloutTest(FleetTestCase):
+
+    def test_all_succeed(self):
+        transport = CountingTransport(latency=0.01, jitter=0.01, seed=1)
+        items = targets(60)
+        progress = []
+        result = asyncio.run(fleet.rollout(items, transport, concurrency=8, timeout=5, progress=progress.append))
+        self.assertTrue(result.ok, result.info)
+        self.assertEqual(result.failed, [])
+        self.assertEqual([item.target for item in result.results], items)
+        self.assertEqual(transport.max_active, 8)  # 同时处理的主机数达到但不超过 concurrency
+        for target in items:
+            self.assert_applied(transport, target)
+
+        # 每完成一台主机给出一次进度，index 指向 targets 中的位置
+        self.assertEqual([item.done for item in progress], list(range(1, 61)))
+        self.assertEqual(sorted(item.index for item in progress), list(range(60)))
+        self.assertTrue(all(items[item.index] == item.last.target and item.total == 60 and item.failed == 0
+                            for item in progress))
+        self.assertTrue(result.info.startswith('下发到 60 台主机：成功 60 台，失败 0 台'))
+
+        # 再次下发相同的配置：每台主机只比较，不修改
+        again = asyncio.run(fleet.rollout(items, transport, concurrency=8, timeout=5))
+        self.assertTrue(again.ok, again.info)
+        self.assertTrue(all(item.result.operations == () for item in again.results if item.target.var is not None))
+
+    def test_failures_and_hangs(self):
+        items = targets(120)
+        runs = []
+        for _ in range(2):
+            transport = LoopbackTransport(latency=0.005, failure_rate=0.15, hang_rate=0.1, seed=7)
+            start = time.perf_counter()
+            result = asyncio.run(fleet.rollout(items, transport, concurrency=40, timeout=0.3))
+            elapsed = time.perf_counter() - start
+            runs.append((transport, result))
+
+            self.assertFalse(result.ok)
+            timeouts = [item for item in result.failed if '超时' in item.info]
+            refused = [item for item in result.failed if '连接失败' in item.info]
+            self.assertTrue(timeouts and refused)
+            self.assertEqual(len(timeouts) + len(refused), len(result.failed))
+            self.assertTrue(all(item.result is None for item in result.failed))
+            # 无响应的主机在超时后结束，不会拖住整个下发
+            self.assertTrue(all(0.3 <= item.elapsed < 2 for item in timeouts))
+            self.assertLess(elapsed, 5)
+            # 失败的主机没有被修改，其余主机不受影响
+            for item in result.results:
+                if item.ok:
+                    self.assert_applied(transport, item.target)
+                else:
+                    self.assertNotIn(item.target.host, transport.hosts)
+            lines = result.info.splitlines()
+            self.assertIn('失败 %d 台' % len(result.failed), lines[0])
+            self.assertEqual(lines[1:], [item.info for item in result.failed])
+
+        # 相同的种子：失败和无响应的主机相同
+        self.assertEqual([item.target for item in runs[0][1].failed], [item.target for item in runs[1][1].failed])
+
+    def test_bad_adapter_and_errors(self):
+        transport = LoopbackTransport(latency=0)
+        items = [Target('lab-001', NAME, ('10.0.0.8', '255.255.255.0', '', ())),
+                 Target('lab-002', '不存在的网卡', ('10.0.0.9', '255.255.255.0', '', ())),
+                 Target('lab-003', NAME, None)]
+        result = asyncio.run(fleet.rollout(items, transport))
+        self.assertEqual([item.ok for item in result.results], [True, False, True])
+
+        # 传输抛出的其他异常只影响该主机
+        original = transport.apply
+
+        async def apply(target, minimal=True):
+            if target.host == 'lab-003':
+                raise RuntimeError('意外错误')
+            return await original(target, minimal)
+
+        with mock.patch.object(transport, 'apply', apply):
+            result = asyncio.run(fleet.rollout(items, transport))
+        self.assertEqual([item.ok for item in result.results], [True, False, False])
+        self.assertIn('意外错误', result.results[2].info)
+
+        self.assertEqual(asyncio.run(fleet.rollout([], transport)), fleet.FleetResult(True, '没有要设置的主机', 0.0, []))
+
+    def test_stream_stop_cancels_pending(self):
+        transport = LoopbackTransport(latency=0.05)
+
+        async def first():
+            async for item in fleet.stream(targets(50), transport, concurrency=2):
+                return item
+
+        item = asyncio.run(first())
+        self.assertEqual(item.done, 1)
+        # 停止迭代后尚未开始的主机不再处理：最多是同时完成的前两台释放出的两个位置
+        self.assertLessEqual(transport.calls, 4)
+        self.assertLessEqual(len(transport.hosts), 2)
+
+
+class PlanTargetsTest(unittest.TestCase):
+
+    def test_plan_targets(self):
+        profile = {'IPv4Address': '10.0.0.8', 'SubnetMask': '255.255.255.0', 'IPv4DefaultGateway': '10.0.0.1',
+                   'DNSServer': ['223.5.5.5']}
+        iplist = mock.Mock(ip_dict={'10.0.0.8': profile})
+        self.assertEqual(fleet.plan_targets([('lab-001', NAME, '10.0.0.8'), ('lab-002', NAME, 'DHCP')], iplist),
+                         [Target('lab-001', NAME, ('10.0.0.8', '255.255.255.0', '10.0.0.1', ('223.5.5.5',))),
+                          Target('lab-002', NAME, None)])
+        with self.assertRaises(KeyError):
+            fleet.plan_targets([('lab-001', NAME, '10.0.0.9')], iplist)
+
+
+class AgentTransportTest(FleetTestCase):
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.net = NetManage(MemoryBackend((NAME,)), cache_ttl=0)
+        self.server = AgentServer(self.net, ('127.0.0.1', 0), token_file=os.path.join(directory.name, 'token'),
+                                  token='secret').start()
+        self.addCleanup(self.server.stop)
+        self.host = '127.0.0.1:%d' % self.server.address[1]
+
+    def test_rollout_over_tcp(self):
+        items = [Target(self.host, NAME, ('10.0.0.8', '255.255.255.0', '10.0.0.1', ('8.8.8.8',)))]
+        result = asyncio.run(fleet.rollout(items, AgentTransport(token='secret'), timeout=5))
+        self.assertTrue(result.ok, result.info)
+        self.assertEqual(result.results[0].result.operations, ('address', 'gateway', 'dns'))
+        self.assertEqual(self.net.get_adapter_info(NAME, use_cache=False),
+                         ('10.0.0.8', '255.255.255.0', '10.0.0.1', ('8.8.8.8',), 'Disabled'))
+
+        result = asyncio.run(fleet.rollout([Target(self.host, NAME, None)], AgentTransport(token='wrong'), timeout=5))
+        self.assertFalse(result.ok)
+        self.assertIn('令牌错误', result.results[0].info)
+        self.assertEqual(self.net.get_adapter_info(NAME, use_cache=False)[4], 'Disabled')
+
+
+if __name__ == '__main__':
+    unittest.main()
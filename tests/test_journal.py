@@ -0,0 +1,147 @@
+"""
+journal.py：快照 + 追加日志的重放、残缺尾行截断和压缩（包括替换快照后、清空日志前崩溃）
+
+用法：python -m pytest tests 或 python -m unittest discover tests
+"""
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import journal  # noqa: E402
+from journal import ProfileJournal  # noqa: E402
+from profile_store import ProfileStore  # noqa: E402
+
+
+def profile(address: str, gateway: str = '') -> dict:
+    return {'IPv4Address': address, 'SubnetMask': '255.255.255.0', 'IPv4DefaultGateway': gateway,
+            'DNSServer': []}
+
+
+class Crash(Exception):
+    """模拟进程在某一步之后崩溃"""
+
+
+class JournalTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.filename = os.path.join(self.directory, 'record.json')
+        patcher = mock.patch('sys.stdout', io.StringIO())  # 不输出新建、重放的提示
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def journal(self) -> ProfileJournal:
+        return ProfileJournal(self.filename, delay=0)
+
+    def load(self) -> dict:
+        return self.journal().load()
+
+    def write_journal(self, data: bytes):
+        with open(self.filename + '.journal', 'wb') as f:
+            f.write(data)
+
+    def journal_size(self) -> int:
+        return os.path.getsize(self.filename + '.journal')
+
+    def test_replay(self):
+        first = self.journal()
+        self.assertEqual(first.load(), {})
+        first.record('10.0.0.1', profile('10.0.0.1'))
+        first.record('10.0.0.2', profile('10.0.0.2'))
+        self.assertEqual(first.flush(), 2)
+        first.record('10.0.0.1', None)
+        first.record('10.0.0.2', profile('10.0.0.2', '10.0.0.254'))
+        first.record('10.0.0.3', profile('10.0.0.3'))
+        first.close()
+
+        second = self.journal()
+        self.assertEqual(second.load(), {'10.0.0.2': profile('10.0.0.2', '10.0.0.254'),
+                                         '10.0.0.3': profile('10.0.0.3')})
+        self.assertEqual(second.entries, 5)
+
+    def test_torn_tail_truncated(self):
+        good = b'{"k": "10.0.0.1", "v": %s}\n' % json.dumps(profile('10.0.0.1')).encode()
+        self.write_journal(good + b'{"k": "10.0.0.2", "v": {"IPv4Addr')
+        self.assertEqual(self.load(), {'10.0.0.1': profile('10.0.0.1')})
+        self.assertEqual(self.journal_size(), len(good))
+        # 截断后可以继续追加
+        second = self.journal()
+        second.load()
+        second.record('10.0.0.2', profile('10.0.0.2'))
+        second.flush()
+        self.assertEqual(list(self.load()), ['10.0.0.1', '10.0.0.2'])
+
+    def test_corrupt_lines(self):
+        # 合法的 JSON 但不是变更记录，按损坏处理：丢弃该行及之后的内容
+        good = b'{"k": "10.0.0.1", "v": null}\n'
+        for bad in (b'1\n', b'[]\n', b'"k"\n', b'{"v": null}\n', b'{"k": 5, "v": null}\n', b'{oops\n'):
+            with self.subTest(bad=bad):
+                self.write_journal(good + bad + good)
+                self.assertEqual(self.load(), {})
+                self.assertEqual(self.journal_size(), len(good))
+
+    def test_compact(self):
+        first = self.journal()
+        first.load()
+        data = {}
+        for i in range(1, 6):
+            key = '10.0.0.%d' % i
+            data[key] = profile(key)
+            first.record(key, data[key])
+        first.flush()
+        del data['10.0.0.1']
+        first.record('10.0.0.1', None)
+        first.compact(ProfileStore.from_dict(data))
+        self.assertEqual(first.entries, 0)
+        self.assertFalse(first.dirty)
+        self.assertEqual(self.journal_size(), 0)
+        with open(self.filename, encoding='utf-8') as f:
+            self.assertEqual(json.load(f), data)
+        self.assertEqual(self.load(), data)
+        self.assertEqual([name for name in os.listdir(self.directory) if name.startswith('.')], [])
+
+    def crash_after_replace(self):
+        """快照文件替换后、日志清空前崩溃"""
+        return mock.patch.object(journal, '_fsync_dir', side_effect=Crash)
+
+    def test_crash_between_replace_and_truncate(self):
+        first = self.journal()
+        first.load()
+        first.record('10.0.0.1', profile('10.0.0.1'))
+        first.record('10.0.0.2', profile('10.0.0.2'))
+        first.flush()
+        first.record('10.0.0.1', profile('10.0.0.1', '10.0.0.254'))
+        first.flush()
+        # 尚未写入日志的变更：删除一个键、修改另一个键
+        data = {'10.0.0.2': profile('10.0.0.2', '10.0.0.254')}
+        first.record('10.0.0.1', None)
+        first.record('10.0.0.2', data['10.0.0.2'])
+        with self.crash_after_replace(), self.assertRaises(Crash):
+            first.compact(data)
+        with open(self.filename, encoding='utf-8') as f:
+            self.assertEqual(json.load(f), data)
+        self.assertGreater(self.journal_size(), 0)
+        # 重放旧日志不会恢复已删除的键，也不会把修改过的键改回旧值
+        self.assertEqual(self.load(), data)
+
+    def test_failed_snapshot_keeps_changes(self):
+        first = self.journal()
+        first.load()
+        first.record('10.0.0.1', profile('10.0.0.1'))
+        with mock.patch.object(journal.os, 'replace', side_effect=OSError('disk full')), \
+                self.assertRaises(OSError):
+            first.compact({'10.0.0.1': profile('10.0.0.1')})
+        self.assertEqual([name for name in os.listdir(self.directory) if name.startswith('.')], [])
+        self.assertEqual(self.load(), {'10.0.0.1': profile('10.0.0.1')})
+
+
+if __name__ == '__main__':
+    unittest.main()
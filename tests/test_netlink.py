@@ -0,0 +1,184 @@
+"""
+netlink.py：resolv.conf 的读写与恢复，NetlinkBackend.apply 的 DHCP 判断和失败回滚
+（用内存中的 FakeNetlink 代替 rtnetlink 套接字，不需要 root 权限）
+
+用法：python -m pytest tests 或 python -m unittest discover tests
+"""
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import netlink  # noqa: E402
+import scripts  # noqa: E402
+from backend import BackendError  # noqa: E402
+from netlink import Link, NetlinkBackend, read_dns, read_resolv, restore_resolv, write_dns  # noqa: E402
+
+RESOLV = (b'# generated by hand\n'
+          b'search example.com\n'
+          b'nameserver 192.0.2.53\n'
+          b'nameserver 2001:db8::53\n'
+          b'nameserver 198.51.100.53\n'
+          b'options edns0\n')
+
+
+class FakeNetlink:
+    """一块网卡 eth0（索引 2）的地址和默认路由，fail 中的操作下一次调用时抛出 OSError（只失败一次）"""
+
+    def __init__(self, address=('192.0.2.10', 24), gateway='192.0.2.1', dynamic=False, dhcp_route=False):
+        flags = 0 if dynamic else netlink.IFA_F_PERMANENT
+        protocol = netlink.RTPROT_DHCP if dhcp_route else netlink.RTPROT_STATIC
+        self.address_list = [(2, address[0], address[1], flags)]
+        self.route_list = [(2, 0, gateway, netlink.RT_TABLE_MAIN, protocol, 0)]
+        self.fail = set()
+
+    def _check(self, operation: str):
+        if operation in self.fail:
+            self.fail.discard(operation)
+            raise OSError('%s 失败' % operation)
+
+    def links(self) -> list:
+        return [Link(2, 'eth0', '', netlink.IFF_UP)]
+
+    def addresses(self) -> list:
+        return list(self.address_list)
+
+    def default_routes(self) -> list:
+        return list(self.route_list)
+
+    def add_address(self, index, address, prefix):
+        self._check('add_address')
+        self.address_list.append((index, address, prefix, netlink.IFA_F_PERMANENT))
+
+    def del_address(self, index, address, prefix):
+        self._check('del_address')
+        self.address_list = [item for item in self.address_list if item[:3] != (index, address, prefix)]
+        # 与内核一致：删除地址时一并删除经由该地址的路由
+        self.route_list = [route for route in self.route_list if route[0] != index]
+
+    def add_default_route(self, index, gateway, metric=0):
+        self._check('add_default_route')
+        self.route_list.append((index, 0, gateway, netlink.RT_TABLE_MAIN, netlink.RTPROT_STATIC, metric))
+
+    def del_default_route(self, index, gateway, metric=0):
+        self._check('del_default_route')
+        self.route_list = [route for route in self.route_list if (route[0], route[2], route[5]) != (index, gateway, metric)]
+
+    def close(self):
+        pass
+
+
+class ResolvTestCase(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.path = os.path.join(self.directory, 'resolv.conf')
+        with open(self.path, 'wb') as f:
+            f.write(RESOLV)
+
+    def content(self) -> bytes:
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+
+class ResolvConfTest(ResolvTestCase):
+
+    def test_read(self):
+        self.assertEqual(read_dns(self.path), ('192.0.2.53', '198.51.100.53'))
+        self.assertEqual(read_dns(os.path.join(self.directory, 'missing')), ())
+
+    def test_write_keeps_other_lines(self):
+        write_dns(('223.5.5.5', '8.8.8.8'), self.path)
+        # IPv4 nameserver 写在原来第一条的位置，IPv6 nameserver 和其他行不变
+        self.assertEqual(self.content(), b'# generated by hand\n'
+                                         b'search example.com\n'
+                                         b'nameserver 223.5.5.5\n'
+                                         b'nameserver 8.8.8.8\n'
+                                         b'nameserver 2001:db8::53\n'
+                                         b'options edns0\n')
+        write_dns((), self.path)
+        self.assertEqual(self.content(), b'# generated by hand\nsearch example.com\nnameserver 2001:db8::53\n'
+                                         b'options edns0\n')
+        write_dns(('10.0.0.53',), self.path)
+        self.assertTrue(self.content().endswith(b'options edns0\nnameserver 10.0.0.53\n'))
+
+    def test_restore(self):
+        data = read_resolv(self.path)
+        write_dns(('223.5.5.5',), self.path)
+        restore_resolv(data, self.path)
+        self.assertEqual(self.content(), RESOLV)
+        missing = os.path.join(self.directory, 'missing')
+        write_dns(('223.5.5.5',), missing)
+        restore_resolv(None, missing)
+        self.assertFalse(os.path.exists(missing))
+
+    def test_symlink_not_followed(self):
+        # systemd-resolved：resolv.conf 是指向 stub 文件的符号链接，不修改链接目标
+        link = os.path.join(self.directory, 'resolv.link')
+        os.symlink(self.path, link)
+        with self.assertRaises(BackendError):
+            write_dns(('223.5.5.5',), link)
+        self.assertEqual(self.content(), RESOLV)
+        self.assertTrue(os.path.islink(link))
+
+
+class ApplyTest(ResolvTestCase):
+
+    def backend(self, **kwargs) -> NetlinkBackend:
+        backend = NetlinkBackend(self.path)
+        backend.netlink.close()
+        backend.netlink = FakeNetlink(**kwargs)
+        return backend
+
+    def test_address_only_failure_keeps_resolv(self):
+        backend = self.backend()
+        os.utime(self.path, (0, 0))
+        backend.netlink.fail.add('add_default_route')
+        result = backend.apply('eth0', (scripts.ADDRESS, scripts.GATEWAY), ('10.0.0.10', '255.255.255.0', '10.0.0.1', ()))
+        self.assertFalse(result.ok)
+        self.assertTrue(result.rolled_back, result.error)
+        self.assertEqual(backend.netlink.address_list, [(2, '192.0.2.10', 24, netlink.IFA_F_PERMANENT)])
+        # 没有执行 DNS 步骤：resolv.conf 不被改写
+        self.assertEqual(self.content(), RESOLV)
+        self.assertEqual(os.stat(self.path).st_mtime, 0)
+
+    def test_dns_failure_restores_raw_file(self):
+        backend = self.backend()
+        original = netlink.write_dns
+
+        def failing_write(servers, path):
+            original(servers, path)
+            raise OSError('磁盘已满')
+
+        with mock.patch.object(netlink, 'write_dns', failing_write):
+            result = backend.apply('eth0', (scripts.DNS,), ('192.0.2.10', '255.255.255.0', '192.0.2.1', ('8.8.8.8',)))
+        self.assertFalse(result.ok)
+        self.assertTrue(result.rolled_back, result.error)
+        self.assertEqual(self.content(), RESOLV)
+
+    def test_static_apply(self):
+        backend = self.backend()
+        result = backend.apply('eth0', scripts.FULL_STATIC, ('10.0.0.10', '255.255.255.0', '10.0.0.1', ('8.8.8.8',)))
+        self.assertTrue(result.ok, result.error)
+        self.assertEqual(backend.adapter_info('eth0'), ('10.0.0.10', '255.255.255.0', '10.0.0.1', ('8.8.8.8',), 'Disabled'))
+        self.assertIn(b'nameserver 2001:db8::53\n', self.content())
+
+    def test_dhcp_off_unsupported_when_dhcp_active(self):
+        for kwargs in ({'dynamic': True}, {'dhcp_route': True}):
+            with self.subTest(**kwargs):
+                backend = self.backend(**kwargs)
+                before = backend.netlink.addresses(), backend.netlink.default_routes()
+                result = backend.apply('eth0', scripts.FULL_STATIC, ('10.0.0.10', '255.255.255.0', '10.0.0.1', ()))
+                self.assertFalse(result.ok)
+                self.assertIn('DHCP', result.error)
+                self.assertEqual((backend.netlink.addresses(), backend.netlink.default_routes()), before)
+                self.assertEqual(self.content(), RESOLV)
+
+
+if __name__ == '__main__':
+    unittest.main()
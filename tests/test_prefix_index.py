@@ -0,0 +1,183 @@
+"""
+prefix_index.py：子网前缀树的各种查询与逐个比较子网（暴力搜索）的结果一致，包括删除和移动键；
+range_to_cidrs 拆分的块恰好覆盖地址范围
+
+用法：python -m pytest tests 或 python -m unittest discover tests
+"""
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prefix_index import PrefixIndex, range_to_cidrs  # noqa: E402
+from profile_store import ProfileStore  # noqa: E402
+from tools import int_to_ip, prefix_to_mask  # noqa: E402
+
+MASKS = tuple((0xffffffff << (32 - prefix)) & 0xffffffff for prefix in range(33))
+
+
+def random_network(rng: random.Random) -> tuple:
+    """集中在少数几个 /16 中的子网，保证有大量互相包含的子网"""
+    address = rng.choice((0x0a000000, 0x0a010000, 0xac100000, 0xc0a80000)) | rng.randrange(1 << 16)
+    prefix = rng.choice((0, 8, 12, 16, 20, 22, 24, 24, 24, 25, 28, 30, 32))
+    return address, prefix
+
+
+def random_address(rng: random.Random) -> int:
+    return rng.choice((0x0a000000, 0x0a010000, 0xac100000, 0xc0a80000, 0x08080000)) | rng.randrange(1 << 16)
+
+
+class BruteForce:
+    """逐个比较子网的参照实现，键的顺序与 PrefixIndex 相同（移动的键排在最后）"""
+
+    def __init__(self):
+        self.entries = {}
+
+    def insert(self, key, network: int, prefix: int):
+        self.entries.pop(key, None)
+        self.entries[key] = (network & MASKS[prefix], prefix)
+
+    def remove(self, key):
+        self.entries.pop(key, None)
+
+    def covering(self, address: int) -> list:
+        found = [(key, prefix) for key, (network, prefix) in self.entries.items()
+                 if address & MASKS[prefix] == network]
+        found.sort(key=lambda item: -item[1])  # 稳定排序：同一子网内保持添加顺序
+        return [key for key, _ in found]
+
+    def within(self, network: int, prefix: int) -> set:
+        network &= MASKS[prefix]
+        return {key for key, (other, length) in self.entries.items()
+                if length >= prefix and other & MASKS[prefix] == network}
+
+    def containing(self, network: int, prefix: int) -> list:
+        """前缀更短且包含 network/prefix 的配置，最具体的在前"""
+        network &= MASKS[prefix]
+        found = [(key, length) for key, (other, length) in self.entries.items()
+                 if length < prefix and network & MASKS[length] == other]
+        found.sort(key=lambda item: -item[1])
+        return [key for key, _ in found]
+
+    def in_range(self, first: int, last: int) -> set:
+        return {key for key, (network, prefix) in self.entries.items()
+                if first <= network and network + (1 << (32 - prefix)) - 1 <= last}
+
+
+class PrefixIndexTest(unittest.TestCase):
+
+    def assert_matches(self, index: PrefixIndex, expected: BruteForce, rng: random.Random, count: int):
+        self.assertEqual(index.entries, expected.entries)
+        for _ in range(count):
+            address = random_address(rng)
+            covering = expected.covering(address)
+            self.assertEqual(index.covering(address), covering, int_to_ip(address))
+            self.assertEqual(index.longest_match(address), covering[0] if covering else None)
+
+            network, prefix = random_network(rng)
+            self.assertEqual(sorted(index.within(network, prefix)), sorted(expected.within(network, prefix)))
+            overlapping = list(index.overlapping(network, prefix))
+            containing = expected.containing(network, prefix)
+            # 先是包含它的（最具体的在前），再是被它包含的（子网相同的不算）
+            self.assertEqual(overlapping[:len(containing)], containing)
+            self.assertEqual(set(overlapping[len(containing):]),
+                             {key for key in expected.within(network, prefix)
+                              if expected.entries[key] != (network & MASKS[prefix], prefix)})
+            self.assertEqual(len(overlapping), len(set(overlapping)))
+
+            first = random_address(rng)
+            last = first + rng.randrange(1 << rng.choice((4, 10, 16)))
+            self.assertEqual(sorted(index.in_range(first, last)), sorted(expected.in_range(first, last)))
+
+    def test_against_brute_force(self):
+        rng = random.Random(3)
+        index, expected = PrefixIndex(), BruteForce()
+        for step in range(3000):
+            if expected.entries and rng.random() < 0.3:
+                key = rng.choice(list(expected.entries))
+                self.assertTrue(index.remove(key))
+                expected.remove(key)
+            else:
+                key = rng.randrange(800)  # 已有的键会移动到新的子网
+                network, prefix = random_network(rng)
+                index.insert(key, network, prefix)
+                expected.insert(key, network, prefix)
+            self.assertEqual(len(index), len(expected.entries))
+            if step % 250 == 0:
+                self.assert_matches(index, expected, rng, 20)
+        self.assert_matches(index, expected, rng, 300)
+
+        # 全部删除后回到空树
+        for key in list(expected.entries):
+            index.remove(key)
+        self.assertFalse(index.remove(0))
+        self.assertEqual(index.covering(0x0a000001), [])
+        self.assertIsNone(index._root.children[0])
+        self.assertIsNone(index._root.children[1])
+        self.assertEqual(index._nodes, {})
+
+    def test_build(self):
+        rng = random.Random(4)
+        profiles = {}
+        for _ in range(500):
+            network, prefix = random_network(rng)
+            address = int_to_ip(network | rng.randrange(1 << (32 - prefix)) if prefix < 32 else network)
+            profiles[address] = {'IPv4Address': address, 'SubnetMask': prefix_to_mask(prefix),
+                                 'IPv4DefaultGateway': '', 'DNSServer': []}
+        profiles['bad'] = {'IPv4Address': '10.0.0.300', 'SubnetMask': '255.255.255.0'}
+        profiles['mask'] = {'IPv4Address': '10.0.0.1', 'SubnetMask': '255.0.255.0'}
+
+        expected = PrefixIndex()
+        for key, profile in profiles.items():
+            expected.insert_ip(key, profile['IPv4Address'], profile['SubnetMask'])
+        self.assertEqual(len(expected), len(profiles) - 2)
+        for source in (profiles, ProfileStore.from_dict(profiles)):
+            with self.subTest(source=type(source).__name__):
+                index = PrefixIndex()
+                self.assertEqual(index.build(source), 2)
+                self.assertEqual(index.entries, expected.entries)
+                for _ in range(200):
+                    address = random_address(rng)
+                    self.assertEqual(index.covering(address), expected.covering(address))
+
+    def test_strings(self):
+        index = PrefixIndex()
+        self.assertTrue(index.insert_ip('a', '10.1.2.3', '255.255.0.0'))
+        self.assertTrue(index.insert_ip('b', '10.1.2.3', '255.255.255.0'))
+        self.assertTrue(index.insert_ip('c', '192.168.1.1', '255.255.255.0'))
+        self.assertEqual(index.find('10.1.2.200'), ['b', 'a'])
+        self.assertEqual(sorted(index.find_in('10.0.0.0/8')), ['a', 'b'])
+        self.assertEqual(index.find_in('10.1.2.3'), [])
+        # 格式错误时不插入，并删除原有的键
+        self.assertFalse(index.insert_ip('b', '10.1.2', '255.255.255.0'))
+        self.assertNotIn('b', index)
+        with self.assertRaises(ValueError):
+            index.insert('d', 0, 33)
+
+
+class RangeToCidrsTest(unittest.TestCase):
+
+    def test_exact_cover(self):
+        rng = random.Random(5)
+        cases = [(0, 0xffffffff), (0, 0), (0xffffffff, 0xffffffff), (0x0a000001, 0x0a0000fe)]
+        for _ in range(300):
+            first = rng.randrange(1 << 32)
+            cases.append((first, min(first + rng.randrange(1 << rng.randrange(1, 24)), 0xffffffff)))
+        for first, last in cases:
+            with self.subTest(first=first, last=last):
+                blocks = range_to_cidrs(first, last)
+                position = first
+                for network, prefix in blocks:
+                    self.assertEqual(network, position)
+                    self.assertEqual(network & MASKS[prefix], network)  # 对齐
+                    position += 1 << (32 - prefix)
+                self.assertEqual(position, last + 1)
+                # 相邻的两个同样大小的块不能合并（否则不是最少的块数）
+                for (a, p), (b, q) in zip(blocks, blocks[1:]):
+                    self.assertFalse(p == q and p > 0 and a & MASKS[p - 1] == a and b & MASKS[p - 1] == a)
+
+
+if __name__ == '__main__':
+    unittest.main()
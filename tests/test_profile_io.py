@@ -0,0 +1,150 @@
+"""
+profile_io.py：CSV / JSON Lines 导入导出的往返、按行报告的错误，以及大批量导入时 IPList.add_ips 的内存占用
+
+用法：python -m pytest tests 或 python -m unittest discover tests
+"""
+import io
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import profile_io  # noqa: E402
+from function import IPList  # noqa: E402
+from profile_io import RowError, to_profile  # noqa: E402
+
+PROFILES = [
+    ('10.0.0.8', '255.255.255.0', '10.0.0.1', ('223.5.5.5', '8.8.8.8'), '办公室'),
+    ('192.168.1.20', '255.255.0.0', '', (), ''),
+    ('172.16.5.1', '255.255.255.252', '172.16.5.2', ('172.16.0.53',), 'a,"quoted"; name'),
+]
+
+
+class ProfileIoTestCase(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        patcher = mock.patch('sys.stdout', io.StringIO())  # 不输出读取、导入的提示
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def iplist(self, name: str = 'record.json') -> IPList:
+        return IPList(os.path.join(self.directory, name), autosave_delay=0)
+
+    def write(self, name: str, text: str) -> str:
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return path
+
+
+class RoundTripTest(ProfileIoTestCase):
+
+    def test_round_trip(self):
+        source = self.iplist('source.json')
+        source.add_ips(PROFILES)
+        for format in ('csv', 'jsonl'):
+            with self.subTest(format=format):
+                path = os.path.join(self.directory, 'profiles.' + format)
+                self.assertEqual(profile_io.export_profiles(source.ip_dict.values(), path), len(PROFILES))
+                target = self.iplist('target_%s.json' % format)
+                result = profile_io.import_profiles(target, path)
+                self.assertEqual(result, profile_io.ImportResult(len(PROFILES), 0, 0, []))
+                self.assertEqual([target.ip_dict[var[0]].to_dict() for var in PROFILES],
+                                 [source.ip_dict[var[0]].to_dict() for var in PROFILES])
+
+    def test_skip_and_replace(self):
+        iplist = self.iplist()
+        iplist.add_ip('10.0.0.8', '255.255.255.0', '', ())
+        path = self.write('profiles.csv', 'IPv4Address,SubnetMask,IPv4DefaultGateway\n'
+                                          '10.0.0.8,24,10.0.0.1\n10.0.0.9,24,10.0.0.1\n10.0.0.9,24,\n')
+        self.assertEqual(profile_io.import_profiles(iplist, path)[:3], (1, 2, 0))
+        self.assertEqual(iplist.ip_dict['10.0.0.8']['IPv4DefaultGateway'], '')
+        self.assertEqual(profile_io.import_profiles(iplist, path, replace=True)[:3], (2, 0, 0))
+        self.assertEqual(iplist.ip_dict['10.0.0.8']['IPv4DefaultGateway'], '10.0.0.1')
+        # 同一文件中重复的IP地址以最后一行为准
+        self.assertEqual(iplist.ip_dict['10.0.0.9']['IPv4DefaultGateway'], '')
+
+    def test_dns_columns(self):
+        path = self.write('profiles.csv', 'IPv4Address,SubnetMask,DNS1,DNS2\n10.0.0.8,/24,223.5.5.5,\n')
+        iplist = self.iplist()
+        profile_io.import_profiles(iplist, path)
+        self.assertEqual(iplist.ip_dict['10.0.0.8'].to_dict(), {
+            'IPv4Address': '10.0.0.8', 'SubnetMask': '255.255.255.0', 'IPv4DefaultGateway': '',
+            'DNSServer': ['223.5.5.5']})
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            profile_io.import_profiles(self.iplist(), self.write('profiles.txt', ''))
+
+
+class RowErrorTest(ProfileIoTestCase):
+
+    def test_to_profile(self):
+        self.assertEqual(to_profile({'IPv4Address': ' 10.0.0.8 ', 'SubnetMask': '24', 'DNSServer': '1.1.1.1, 8.8.8.8'}),
+                         ('10.0.0.8', '255.255.255.0', '', ('1.1.1.1', '8.8.8.8'), ''))
+        for row in ({'IPv4Address': '10.0.0.300', 'SubnetMask': '24'},
+                    {'IPv4Address': '10.0.0.8', 'SubnetMask': '255.0.255.0'},
+                    {'IPv4Address': '10.0.0.8', 'SubnetMask': '24', 'IPv4DefaultGateway': '10.0.1.1'},
+                    {'IPv4Address': '10.0.0.8', 'SubnetMask': '24', 'DNSServer': ['dns.example']}):
+            with self.subTest(row=row), self.assertRaises(ValueError):
+                to_profile(row)
+
+    def test_csv_line_numbers(self):
+        path = self.write('profiles.csv', 'IPv4Address,SubnetMask\n10.0.0.8,24\n10.0.0.300,24\n\n10.0.0.9,33\n'
+                                          '10.0.0.10,24\n')
+        iplist = self.iplist()
+        result = profile_io.import_profiles(iplist, path)
+        self.assertEqual((result.added, result.error_count), (2, 2))
+        # 行号从 1 开始并包含表头
+        self.assertEqual([error.line for error in result.errors], [3, 5])
+        self.assertEqual(list(iplist.ip_dict), ['10.0.0.8', '10.0.0.10'])
+
+    def test_jsonl_errors(self):
+        path = self.write('profiles.jsonl', '{"IPv4Address": "10.0.0.8", "SubnetMask": "24"}\n{oops\n[1]\n'
+                                            '{"IPv4Address": "10.0.0.9"}\n')
+        result = profile_io.import_profiles(self.iplist(), path, max_errors=2)
+        self.assertEqual((result.added, result.error_count), (1, 3))
+        self.assertEqual([error.line for error in result.errors], [2, 3])
+        self.assertTrue(all(isinstance(error, RowError) for error in result.errors))
+
+
+class BulkImportTest(ProfileIoTestCase):
+
+    def test_pending_changes_bounded(self):
+        iplist = self.iplist()
+        iplist.bulk_threshold = 100
+        pending = []
+        add_ips = iplist.add_ips
+
+        def tracked(profiles):
+            count = add_ips(profiles)
+            pending.append(len(iplist.journal.pending))
+            return count
+
+        rows = ''.join('10.%d.%d.1,24\n' % (i // 256, i % 256) for i in range(5000))
+        path = self.write('profiles.csv', 'IPv4Address,SubnetMask\n' + rows)
+        with mock.patch.object(iplist, 'add_ips', tracked):
+            result = profile_io.import_profiles(iplist, path, batch_size=1000)
+        self.assertEqual(result.added, 5000)
+        # 未写入日志的变更不随导入的条数增长
+        self.assertLess(max(pending), iplist.bulk_threshold)
+        iplist.save_ip()
+        self.assertEqual(list(self.iplist().ip_dict), list(iplist.ip_dict))
+
+    def test_generator_consumed_once(self):
+        iplist = self.iplist()
+        iplist.bulk_threshold = 10
+        profiles = (('10.0.%d.1' % i, '255.255.255.0', '', ()) for i in range(25))
+        self.assertEqual(iplist.add_ips(profiles), 25)
+        self.assertEqual(len(iplist.ip_dict), 25)
+        self.assertEqual(list(iplist.search_ip('10.0.24')), ['10.0.24.1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
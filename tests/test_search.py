@@ -0,0 +1,130 @@
+"""
+search_index.py：n-gram 位图索引与逐条比较（暴力搜索）的结果一致，包括增量增删；
+IPList 在后台线程中按副本建立索引
+
+用法：python -m pytest tests 或 python -m unittest discover tests
+"""
+import io
+import os
+import random
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from function import IPList  # noqa: E402
+from search_index import SearchIndex, profile_tokens  # noqa: E402
+
+NAMES = ('', '', '办公室', '实验室 A', 'Lab-B', '机房2')
+DNS = ((), ('223.5.5.5',), ('114.114.114.114', '8.8.8.8'), ('10.0.0.53',))
+
+
+def random_profile(rng: random.Random) -> dict:
+    address = '%d.%d.%d.%d' % (rng.choice((10, 172, 192)), rng.randrange(256), rng.randrange(256), rng.randrange(1, 255))
+    profile = {'IPv4Address': address, 'SubnetMask': '255.255.255.0',
+               'IPv4DefaultGateway': rng.choice(('', address.rsplit('.', 1)[0] + '.1')),
+               'DNSServer': list(rng.choice(DNS))}
+    name = rng.choice(NAMES)
+    if name:
+        profile['Name'] = name
+    return profile
+
+
+def brute_force(profiles: dict, query: str) -> list:
+    query = query.strip().lower()
+    return [key for key, profile in profiles.items() if any(query in token for token in profile_tokens(profile))]
+
+
+def random_queries(rng: random.Random, profiles: dict, count: int) -> list:
+    queries = ['1', '.', '10.', '.1', '0.0', '8.8.8.8', 'lab', 'LAB-b', '实验', '室', ' 223.5 ', 'zzz', '10.0.0.53\n']
+    texts = [token for profile in profiles.values() for token in profile_tokens(profile)]
+    for _ in range(count):
+        text = rng.choice(texts)
+        start = rng.randrange(len(text))
+        queries.append(text[start:start + rng.randrange(1, 9)])
+    return queries
+
+
+class SearchIndexTest(unittest.TestCase):
+
+    def assert_matches(self, index: SearchIndex, profiles: dict, queries: list):
+        for query in queries:
+            expected = brute_force(profiles, query)
+            result = index.search(query)
+            self.assertEqual(list(result), expected, query)
+            self.assertLessEqual(len(expected), result.count)
+            for key in list(profiles)[:20]:
+                self.assertEqual(key in result, key in expected, (query, key))
+                self.assertEqual(index.matches(key, query), key in expected, (query, key))
+
+    def test_build_against_brute_force(self):
+        rng = random.Random(1)
+        profiles = {}
+        for _ in range(500):
+            profile = random_profile(rng)
+            profiles[profile['IPv4Address']] = profile
+        for n in (2, 3, 4):
+            with self.subTest(n=n):
+                index = SearchIndex(n)
+                index.build(profiles)
+                self.assertEqual(len(index), len(profiles))
+                self.assertEqual(index.search('   '), None)
+                self.assert_matches(index, profiles, random_queries(rng, profiles, 150))
+
+    def test_incremental_against_brute_force(self):
+        rng = random.Random(2)
+        profiles = {}
+        index = SearchIndex()
+        index.build(profiles)
+        for step in range(1500):
+            if profiles and rng.random() < 0.4:
+                key = rng.choice(list(profiles))
+                del profiles[key]
+                index.remove(key)
+            else:
+                profile = random_profile(rng)
+                if rng.random() < 0.2 and profiles:
+                    profile['IPv4Address'] = rng.choice(list(profiles))  # 修改已有的配置
+                key = profile['IPv4Address']
+                profiles.pop(key, None)  # 与 ProfileStore 一致：修改后排在最后
+                profiles[key] = profile
+                index.add(key, profile)
+            if not index.built:
+                # 被删除的编号过多，与 IPList.search_ip 一样重建
+                index.build(profiles)
+            if step % 100 == 0:
+                self.assert_matches(index, profiles, random_queries(rng, profiles, 20))
+        self.assert_matches(index, profiles, random_queries(rng, profiles, 100))
+
+
+class BackgroundBuildTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        with mock.patch('sys.stdout', io.StringIO()):
+            self.iplist = IPList(os.path.join(directory.name, 'record.json'), autosave_delay=0)
+            self.iplist.add_ips(('10.0.%d.%d' % (i // 250, i % 250 + 1), '255.255.255.0', '', ()) for i in range(2000))
+
+    def test_built_from_snapshot(self):
+        snapshot = self.iplist.search_snapshot()
+        # 建立期间界面线程修改配置：后台只读取副本，不受影响
+        with mock.patch('sys.stdout', io.StringIO()):
+            self.iplist.del_ip('10.0.0.1')
+        self.iplist.add_ip('10.9.9.9', '255.255.255.0', '', ())
+        version, index = self.iplist.build_search(snapshot)
+        self.assertIn('10.0.0.1', index.ids)
+        self.assertNotIn('10.9.9.9', index.ids)
+        self.assertFalse(self.iplist.use_search(version, index))
+
+        version, index = self.iplist.build_search(self.iplist.search_snapshot())
+        self.assertTrue(self.iplist.use_search(version, index))
+        self.assertIs(self.iplist.search, index)
+        self.assertEqual(list(self.iplist.search_ip('10.9.9')), ['10.9.9.9'])
+        self.assertEqual(list(self.iplist.search_ip('10.0.0.1')), brute_force(self.iplist.ip_dict, '10.0.0.1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+"""
+stall.py：用后台线程模拟界面线程的事件循环，心跳停止时报告卡顿时长、阻塞的槽函数并写入日志；
+心跳正常时不报告；find_slot 从调用栈中找出被事件循环调用的函数
+
+用法：python -m pytest tests 或 python -m unittest discover tests
+"""
+import io
+import logging
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stall import StallWatchdog, find_slot  # noqa: E402
+
+
+class FakeLoop:
+    """模拟的事件循环：依次调用队列中的槽函数，空闲时每 interval 秒调用一次心跳
+
+    真实的事件循环在 C++ 中运行，调用栈里 app.exec() 的下一层就是槽函数；
+    这里调用槽函数的那一行带有 ".exec(" 的注释，find_slot 同样找到它的下一层。
+    """
+
+    def __init__(self, beat, interval: float):
+        self.beat = beat
+        self.interval = interval
+        self.slots = queue.Queue()
+
+    def exec(self):
+        while True:
+            try:
+                slot = self.slots.get(timeout=self.interval)
+            except queue.Empty:
+                self.beat()
+                continue
+            if slot is None:
+                return
+            slot()  # 相当于 app.exec() 调用槽函数
+            self.beat()
+
+
+def blocking_slot():
+    time.sleep(0.3)
+
+
+class StallWatchdogTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'stall.log')
+        patcher = mock.patch('sys.stdout', io.StringIO())  # 不输出卡顿提示
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_loop(self, *slots, threshold: float = 0.1) -> list:
+        """在模拟的界面线程中运行事件循环，依次执行 slots，返回报告的卡顿"""
+        reported = []
+        watchdog = StallWatchdog(threshold, path=self.path, on_stall=reported.append)
+        self.addCleanup(self.close_log)
+        loop = FakeLoop(watchdog.beat, 0.01)
+        thread = threading.Thread(target=loop.exec)
+        thread.start()
+        watchdog.thread_id = thread.ident
+        watchdog.start()
+        try:
+            done = threading.Event()
+            for slot in slots + (done.set,):
+                loop.slots.put(slot)
+            # 执行完后继续空闲一段时间，心跳恢复，监测线程报告卡顿
+            self.assertTrue(done.wait(10))
+            time.sleep(threshold * 3)
+        finally:
+            loop.slots.put(None)
+            thread.join(timeout=10)
+            watchdog.stop()
+        self.assertEqual(list(watchdog.stalls), reported)
+        return reported
+
+    def close_log(self):
+        logger = logging.getLogger('netset.stall.%s' % os.path.abspath(self.path))
+        for handler in list(logger.handlers):
+            handler.close()
+            logger.removeHandler(handler)
+
+    def test_reports_blocking_slot(self):
+        reported = self.run_loop(lambda: time.sleep(0.01), blocking_slot)
+        self.assertEqual(len(reported), 1)
+        stall = reported[0]
+        self.assertTrue(stall.slot.startswith('blocking_slot (test_stall.py:'), stall.slot)
+        self.assertGreaterEqual(stall.duration, 0.25)
+        self.assertGreaterEqual(stall.samples, 1)
+        self.assertIn('time.sleep(0.3)', ''.join(stall.stack))
+        self.assertLessEqual(abs(stall.started - (time.time() - stall.duration)), 5)
+        with open(self.path, encoding='utf-8') as f:
+            log = f.read()
+        self.assertIn('槽函数 blocking_slot', log)
+
+    def test_no_report_when_responsive(self):
+        self.assertEqual(self.run_loop(*[lambda: time.sleep(0.01)] * 10, threshold=0.25), [])
+        self.assertFalse(os.path.exists(self.path))  # 没有卡顿时不创建日志文件
+
+    def test_start_stop(self):
+        watchdog = StallWatchdog(0.05, path='')
+        watchdog.start()
+        thread = watchdog._thread
+        watchdog.start()  # 已启动时不再启动新线程
+        self.assertIs(watchdog._thread, thread)
+        watchdog.stop()
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(watchdog.interval, 0.05 / 4)
+
+
+class FindSlotTest(unittest.TestCase):
+
+    def test_find_slot(self):
+        stack = [('main.py', 10, '<module>', 'sys.exit(app.exec())'),
+                 ('main.py', 72, '<lambda>', 'self.apply()'),
+                 ('main.py', 90, 'apply', 'dialog.exec()'),
+                 ('dialog.py', 5, 'accept', 'self.save()'),
+                 ('dialog.py', 9, 'save', 'time.sleep(1)')]
+        # 最内层 exec() 的下一层
+        self.assertEqual(find_slot(stack), 'accept (dialog.py:5)')
+        self.assertEqual(find_slot(stack[:3]), '<lambda> (main.py:72)')
+        # 没有 exec() 时取最外层之后的第一层，没有源代码行时同样处理
+        self.assertEqual(find_slot([('a.py', 1, 'run', None), ('b.py', 2, 'work', None)]), 'work (b.py:2)')
+        self.assertEqual(find_slot([('a.py', 1, 'run', None)]), 'run (a.py:1)')
+        self.assertEqual(find_slot([]), '')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+"""
+tools.py：IPv4 整数运算与 ipaddress 的结果一致；批量运算（NumPy 向量化实现与纯 Python 实现）
+与逐条运算的结果一致
+
+用法：python -m pytest tests 或 python -m unittest discover tests
+"""
+import ipaddress
+import os
+import random
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tools  # noqa: E402
+from tools import (HOSTMASKS, MASKS, int_to_ip, ip_to_int, is_host_address, mask_to_prefix,  # noqa: E402
+                   prefix_to_mask, validate_profile, validate_profiles)
+
+INVALID_IPS = ['', '1.2.3', '1.2.3.4.5', '256.1.1.1', '1.2.3.-1', '01.2.3.4', '1.2.3.04', '1..2.3', '1.2.3.',
+               '.1.2.3', ' 1.2.3.4', '1.2.3.4 ', '1.2.3.4\n', '١.2.3.4', '1.2.3.a', '1.2.3.4/24', '0x1.2.3.4',
+               '1.2.3.1000', '1.2.3.4444', '255.255.255.2555']
+
+
+def random_ip_text(rng: random.Random) -> str:
+    """大部分是合法的地址，其余是随机修改过的（可能仍然合法）"""
+    text = str(ipaddress.IPv4Address(rng.randrange(1 << 32)))
+    if rng.random() < 0.3:
+        position = rng.randrange(len(text) + 1)
+        text = text[:position] + rng.choice('0.9a ') + text[position + rng.randrange(2):]
+    return text
+
+
+def reference_ip(text: str):
+    try:
+        return int(ipaddress.IPv4Address(text))
+    except ValueError:
+        return None
+
+
+def with_numpy(enabled: bool):
+    """批量运算使用（或不使用）NumPy"""
+    return mock.patch.multiple(tools, np=tools.load_numpy() if enabled else None, _numpy_checked=True)
+
+
+class ScalarTest(unittest.TestCase):
+
+    def test_ip_to_int(self):
+        rng = random.Random(6)
+        texts = INVALID_IPS + ['0.0.0.0', '255.255.255.255'] + [random_ip_text(rng) for _ in range(3000)]
+        for text in texts:
+            expected = reference_ip(text)
+            if expected is None:
+                with self.assertRaises(ValueError, msg=text):
+                    ip_to_int(text)
+            else:
+                self.assertEqual(ip_to_int(text), expected, text)
+                self.assertEqual(int_to_ip(expected), text)
+
+    def test_masks(self):
+        for prefix in range(33):
+            network = ipaddress.IPv4Network('0.0.0.0/%d' % prefix)
+            self.assertEqual(MASKS[prefix], int(network.netmask))
+            self.assertEqual(HOSTMASKS[prefix], int(network.hostmask))
+            self.assertEqual(prefix_to_mask(prefix), str(network.netmask))
+            self.assertEqual(prefix_to_mask('/%d' % prefix), str(network.netmask))
+            for mask in (str(network.netmask), str(network.hostmask), str(prefix), MASKS[prefix]):
+                if mask == str(network.hostmask) and prefix in (0, 32):
+                    continue  # 0.0.0.0 和 255.255.255.255 按子网掩码处理
+                self.assertEqual(mask_to_prefix(mask), prefix, mask)
+        for mask in ('255.0.255.0', '255.255.255.1', '33', '-1', '', '255.255.255', '２４', 0x00ff0000):
+            with self.assertRaises(ValueError, msg=mask):
+                mask_to_prefix(mask)
+        with self.assertRaises(ValueError):
+            prefix_to_mask(33)
+
+    def test_is_host_address(self):
+        rng = random.Random(7)
+        for _ in range(2000):
+            address, prefix = rng.randrange(1 << 32), rng.randrange(33)
+            network = ipaddress.IPv4Network((address, prefix), strict=False)
+            expected = prefix >= 31 or address not in (int(network.network_address), int(network.broadcast_address))
+            self.assertEqual(is_host_address(address, prefix), expected, (address, prefix))
+
+
+def random_profile(rng: random.Random) -> dict:
+    address = rng.choice(['10.0.%d.%d' % (rng.randrange(4), rng.randrange(256)), random_ip_text(rng),
+                          rng.choice(INVALID_IPS)])
+    profile = {'IPv4Address': address,
+               'SubnetMask': rng.choice(['255.255.255.0', '24', '/24', '0.0.0.255', '255.255.252.0', '255.0.255.0',
+                                         '255.255.255.254', '255.255.255.255', '', '33'])}
+    gateway = rng.choice(['', '', '10.0.0.1', '10.0.1.1', address, random_ip_text(rng), rng.choice(INVALID_IPS)])
+    if gateway or rng.random() < 0.5:
+        profile['IPv4DefaultGateway'] = gateway
+    return profile
+
+
+class BatchTest(unittest.TestCase):
+    """批量运算在两种实现下都与逐条运算的结果一致"""
+
+    @staticmethod
+    def modes() -> list:
+        """是否使用 NumPy，没有安装 NumPy 时只测纯 Python 实现"""
+        return [False] if tools.load_numpy() is None else [False, True]
+
+    def test_parse_ips(self):
+        rng = random.Random(8)
+        texts = [text for text in INVALID_IPS if text.isascii()] + [random_ip_text(rng) for _ in range(3000)]
+        texts += [None, 12345]
+        for enabled in self.modes():
+            with self.subTest(numpy=enabled), with_numpy(enabled):
+                # 含非 ASCII 字符时整批改为逐条解析，结果相同
+                for batch in (texts, texts + ['١.2.3.4']):
+                    values, valid = tools.parse_ips(batch)
+                    for text, value, ok in zip(batch, values, valid):
+                        expected = reference_ip(text) if isinstance(text, str) else None
+                        self.assertEqual(bool(ok), expected is not None, text)
+                        self.assertEqual(int(value), expected or 0, text)
+
+    def test_masks_to_prefixes(self):
+        masks = [prefix_to_mask(prefix) for prefix in range(33)] + ['24', '/24', '0.0.0.255', '255.0.255.0', '', None]
+        for enabled in self.modes():
+            with self.subTest(numpy=enabled), with_numpy(enabled):
+                prefixes, valid = tools.masks_to_prefixes(masks * 40)
+                for mask, prefix, ok in zip(masks * 40, prefixes, valid):
+                    try:
+                        expected = mask_to_prefix(mask)
+                    except (ValueError, TypeError, AttributeError):
+                        expected = -1
+                    self.assertEqual((int(prefix), bool(ok)), (expected, expected >= 0), mask)
+                self.assertEqual(tools.prefixes_to_masks([24, 0, -1, 33]), ['255.255.255.0', '0.0.0.0', '', ''])
+
+    def test_subnet_operations(self):
+        rng = random.Random(9)
+        a = [rng.randrange(1 << 32) for _ in range(2000)]
+        b = [x ^ (rng.randrange(1 << 32) >> rng.randrange(33)) for x in a]
+        prefixes = [rng.randrange(-1, 33) for _ in a]
+        for enabled in self.modes():
+            with self.subTest(numpy=enabled), with_numpy(enabled):
+                for i, (network, broadcast, same, host) in enumerate(zip(
+                        tools.networks(a, prefixes), tools.broadcasts(a, prefixes),
+                        tools.same_subnets(a, b, prefixes), tools.host_addresses(a, prefixes))):
+                    prefix = prefixes[i]
+                    if prefix < 0:
+                        self.assertEqual((int(network), int(broadcast), bool(same), bool(host)), (0, 0, False, False))
+                        continue
+                    self.assertEqual(int(network), tools.network_address(a[i], prefix))
+                    self.assertEqual(int(broadcast), tools.broadcast_address(a[i], prefix))
+                    self.assertEqual(bool(same), tools.same_subnet(a[i], b[i], prefix))
+                    self.assertEqual(bool(host), is_host_address(a[i], prefix))
+
+    def test_validate_profiles(self):
+        rng = random.Random(10)
+        profiles = {'key%d' % i: random_profile(rng) for i in range(3000)}
+        expected = {key: problem for key, problem in
+                    ((key, validate_profile(profile)) for key, profile in profiles.items()) if problem}
+        self.assertTrue(0 < len(expected) < len(profiles))
+        for enabled in self.modes():
+            with self.subTest(numpy=enabled), with_numpy(enabled):
+                self.assertEqual(validate_profiles(profiles), expected)
+                # 少于 _NUMPY_MIN 条时同样一致
+                small = dict(list(profiles.items())[:50])
+                self.assertEqual(validate_profiles(small), {key: expected[key] for key in small if key in expected})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+"""
+tracing.py：关闭时 span/traced 不记录，开启后记录名称、属性、错误和线程，统计的百分位，
+JSON Lines 和 Chrome trace 导出，以及 NETSET_TRACE 退出时自动导出
+
+用法：python -m pytest tests 或 python -m unittest discover tests
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import tracing  # noqa: E402
+
+
+class TracingTestCase(unittest.TestCase):
+
+    def setUp(self):
+        # 每个测试从关闭状态开始，结束后恢复原来的记录器
+        previous = tracing.disable()
+        self.addCleanup(setattr, tracing, '_tracer', previous)
+
+
+class DisabledTest(TracingTestCase):
+
+    def test_noop(self):
+        self.assertFalse(tracing.enabled())
+        self.assertIs(tracing.span('a', x=1), tracing.span('b'))
+        with tracing.span('a') as item:
+            item.set(count=1)
+
+        @tracing.traced()
+        def add(a, b):
+            return a + b
+
+        self.assertEqual(add(1, b=2), 3)
+        self.assertEqual(add.__name__, 'add')
+        self.assertEqual(tracing.summary(), {})
+        self.assertEqual(tracing.export(os.path.join(tempfile.gettempdir(), 'unused.json')), 0)
+        self.assertIn('NETSET_TRACE', tracing.format_summary())
+
+
+class EnabledTest(TracingTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.tracer = tracing.enable()
+        self.addCleanup(tracing.disable)
+
+    def test_span_and_traced(self):
+        self.assertIs(tracing.enable(), self.tracer)
+        with tracing.span('shell.execute', chars=10) as item:
+            item.set(lines=2)
+        with self.assertRaises(KeyError), tracing.span('cache.get'):
+            raise KeyError('x')
+
+        @tracing.traced('net.read')
+        def read():
+            return 'ok'
+
+        @tracing.traced()
+        def unnamed():
+            pass
+
+        self.assertEqual(read(), 'ok')
+        unnamed()
+        spans = list(self.tracer.spans)
+        self.assertEqual([item.name for item in spans], ['shell.execute', 'cache.get', 'net.read',
+                                                         'EnabledTest.test_span_and_traced.<locals>.unnamed'])
+        self.assertEqual(spans[0].attrs, {'chars': 10, 'lines': 2})
+        self.assertEqual(spans[1].attrs, {'error': 'KeyError'})
+        self.assertTrue(all(item.duration >= 0 and item.start >= self.tracer.origin for item in spans))
+        self.assertTrue(all(item.thread == threading.get_ident() for item in spans))
+
+    def test_threads_and_limit(self):
+        tracer = tracing.disable()
+        self.assertIs(tracer, self.tracer)
+        self.tracer = tracing.enable(max_spans=50)
+
+        def work():
+            for _ in range(40):
+                with tracing.span('work'):
+                    pass
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # 只保留最近的 max_spans 个
+        self.assertEqual(len(self.tracer.spans), 50)
+        self.assertEqual(tracing.summary()['work'].count, 50)
+        self.assertTrue({item.thread for item in self.tracer.spans} <= {thread.ident for thread in threads})
+
+    def test_summary(self):
+        durations = {'slow': [0.2, 0.4, 0.1], 'fast': [i / 10000 for i in range(1, 101)]}
+        for name, values in durations.items():
+            for value in values:
+                self.tracer.spans.append(tracing.Span(name, self.tracer.origin, value, 1, {}))
+        stats = tracing.summary()
+        # 按总耗时从大到小
+        self.assertEqual(list(stats), ['slow', 'fast'])
+        self.assertEqual(stats['slow'].count, 3)
+        self.assertAlmostEqual(stats['slow'].total, 0.7)
+        self.assertEqual((stats['slow'].p50, stats['slow'].p95, stats['slow'].max), (0.2, 0.4, 0.4))
+        self.assertEqual((stats['fast'].p50, stats['fast'].p95, stats['fast'].max), (0.005, 0.0095, 0.01))
+        self.assertEqual(tracing.format_summary().splitlines()[1].split()[:2], ['slow', '3'])
+
+    def test_export(self):
+        with tracing.span('shell.execute', adapter='以太网', path=object()):
+            pass
+        with tracing.span('plan'):
+            pass
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'trace.jsonl')
+            self.assertEqual(tracing.export(path), 2)
+            with open(path, encoding='utf-8') as f:
+                lines = [json.loads(line) for line in f]
+            self.assertEqual([line['name'] for line in lines], ['shell.execute', 'plan'])
+            self.assertEqual(lines[0]['attrs']['adapter'], '以太网')
+            self.assertIsInstance(lines[0]['attrs']['path'], str)  # 无法序列化的属性转为字符串
+            self.assertGreaterEqual(lines[1]['start_ms'], lines[0]['start_ms'])
+
+            path = os.path.join(directory, 'trace.json')
+            self.assertEqual(tracing.export(path), 2)
+            with open(path, encoding='utf-8') as f:
+                trace = json.load(f)
+            event = trace['traceEvents'][0]
+            self.assertEqual((event['name'], event['cat'], event['ph'], event['pid']),
+                             ('shell.execute', 'shell', 'X', os.getpid()))
+            self.assertGreaterEqual(event['dur'], 0)
+
+
+class EnvironmentTest(unittest.TestCase):
+
+    def test_export_at_exit(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'trace.jsonl')
+            code = 'import tracing\nwith tracing.span("startup"):\n    pass\n'
+            result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True,
+                                    encoding='utf-8', timeout=60,
+                                    env=dict(os.environ, NETSET_TRACE=path, PYTHONIOENCODING='utf-8'))
+            self.assertEqual(result.returncode, 0, result.stderr)
+            self.assertIn('已导出 1 个 span', result.stdout)
+            with open(path, encoding='utf-8') as f:
+                self.assertEqual(json.loads(f.readline())['name'], 'startup')
+
+
+if __name__ == '__main__':
+    unittest.main()
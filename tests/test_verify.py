@@ -0,0 +1,161 @@
+"""
+verify.py：连通性检查，DNS 服务器用本地的应答器 benchmarks/fake_dns.py 模拟（慢、丢包、错误应答、无响应），
+网关用回环地址上的 TCP 端口（可达）和替换的连接函数（无响应、网络不可达）模拟，不需要网络
+
+用法：python -m pytest tests 或 python -m unittest discover tests
+"""
+import asyncio
+import errno
+import os
+import socket
+import sys
+import time
+import unittest
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import verify  # noqa: E402
+from fake_dns import FakeDns  # noqa: E402
+from verify import build_query, parse_response  # noqa: E402
+
+
+def unused_port(kind: int = socket.SOCK_STREAM) -> int:
+    """一个当前没有监听的回环端口"""
+    with socket.socket(socket.AF_INET, kind) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class MessageTest(unittest.TestCase):
+
+    def test_query_and_response(self):
+        query = build_query('www.example.com.', 0x1234)
+        self.assertEqual(query[:12], b'\x12\x34\x01\x00\x00\x01\x00\x00\x00\x00\x00\x00')
+        self.assertEqual(query[12:], b'\x03www\x07example\x03com\x00\x00\x01\x00\x01')
+        response = b'\x12\x34\x81\x83' + query[4:]
+        self.assertEqual(parse_response(response, 0x1234), verify.RCODE_NXDOMAIN)
+        self.assertIsNone(parse_response(response, 0x1235))  # 不是对该查询的应答
+        self.assertIsNone(parse_response(query, 0x1234))  # 查询本身（QR=0）
+        self.assertIsNone(parse_response(response[:11], 0x1234))
+
+
+class DnsTest(unittest.TestCase):
+
+    def check(self, *servers: FakeDns, timeout: float = 1.0, addresses: tuple = None) -> verify.VerifyResult:
+        port = servers[0].port if servers else unused_port(socket.SOCK_DGRAM)
+        return verify.check_sync('', addresses or ('127.0.0.1',) * len(servers), timeout=timeout, dns_port=port)
+
+    def test_answer(self):
+        with FakeDns(delay=0.02) as dns:
+            result = self.check(dns)
+        self.assertTrue(result.ok, result.info)
+        self.assertIsNone(result.gateway)
+        self.assertEqual(len(result.dns), 1)
+        self.assertTrue(0.02 <= result.first_dns < 0.5)
+        self.assertEqual(result.first_dns, result.dns[0].elapsed)
+        self.assertEqual(dns.queries, 1)
+        self.assertIn('首个DNS应答', result.info)
+
+    def test_retry_after_drops(self):
+        # 切换后前两个查询丢失：按 RETRY 间隔重发，第三个查询得到应答
+        with FakeDns(drop=2) as dns:
+            result = self.check(dns)
+        self.assertTrue(result.ok, result.info)
+        self.assertEqual(dns.queries, 3)
+        self.assertGreaterEqual(result.first_dns, 2 * verify.RETRY)
+
+    def test_error_codes(self):
+        for rcode, ok in ((verify.RCODE_NXDOMAIN, True), (2, False), (5, False)):
+            with self.subTest(rcode=rcode), FakeDns(rcode=rcode) as dns:
+                result = self.check(dns)
+                self.assertEqual(result.ok, ok, result.info)
+                self.assertEqual(result.dns[0].error, '' if ok else 'RCODE %d' % rcode)
+
+    def test_silent_server_times_out(self):
+        start = time.perf_counter()
+        with FakeDns(silent=True) as dns:
+            result = self.check(dns, timeout=0.6)
+        self.assertFalse(result.ok)
+        self.assertEqual(result.dns[0].error, '超时')
+        self.assertIsNone(result.first_dns)
+        self.assertGreaterEqual(dns.queries, 2)  # 超时前重发过
+        self.assertLess(time.perf_counter() - start, 2)
+        self.assertIn('没有可用的DNS', result.info)
+
+    def test_closed_port(self):
+        # 没有监听的端口：收到 ICMP 端口不可达，不必等到超时
+        result = self.check(timeout=1.0, addresses=('127.0.0.1',))
+        self.assertFalse(result.ok)
+        self.assertNotEqual(result.dns[0].error, '')
+        self.assertLess(result.elapsed, 1.0)
+
+    def test_first_answer_among_servers(self):
+        # 多个应答器：不同的回环地址、相同的端口
+        with FakeDns(silent=True, host='127.0.0.1') as silent:
+            with FakeDns(delay=0.15, host='127.0.0.2', port=silent.port) as slow, \
+                    FakeDns(delay=0.01, host='127.0.0.3', port=silent.port):
+                result = verify.check_sync('', ('127.0.0.1', '127.0.0.2', '', '127.0.0.3'), timeout=0.8,
+                                           dns_port=slow.port)
+        self.assertTrue(result.ok, result.info)
+        self.assertEqual([item.target for item in result.dns], ['127.0.0.1', '127.0.0.2', '127.0.0.3'])
+        self.assertEqual([item.ok for item in result.dns], [False, True, True])
+        self.assertEqual(result.first_dns, result.dns[2].elapsed)
+        self.assertLess(result.dns[2].elapsed, result.dns[1].elapsed)
+        # 最慢的检查（无响应的服务器）决定总耗时
+        self.assertGreaterEqual(result.elapsed, 0.8)
+
+
+class GatewayTest(unittest.TestCase):
+
+    def test_listening_or_refused(self):
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server:
+            server.bind(('127.0.0.1', 0))
+            server.listen()
+            result = verify.check_sync('127.0.0.1', (), timeout=1.0, gateway_ports=(server.getsockname()[1],))
+        self.assertTrue(result.ok, result.info)
+        self.assertTrue(result.gateway.ok)
+        self.assertEqual(result.dns, ())
+        self.assertNotIn('DNS', result.info)
+        # 端口没有开放（收到 RST）同样说明网关可达
+        result = verify.check_sync('127.0.0.1', (), timeout=1.0, gateway_ports=(unused_port(),))
+        self.assertTrue(result.gateway.ok, result.info)
+
+    def test_gateway_and_dns_together(self):
+        with FakeDns() as dns:
+            result = verify.check_sync('127.0.0.1', ('127.0.0.1',), timeout=1.0, dns_port=dns.port,
+                                       gateway_ports=(unused_port(),))
+        self.assertTrue(result.ok, result.info)
+        self.assertTrue(result.info.startswith('连通性：网关 '))
+
+    def test_unreachable(self):
+        # 网关不应答（SYN 被丢弃）：直到截止时间
+        async def hang(host, port):
+            await asyncio.Event().wait()
+
+        with mock.patch.object(verify, '_connect', hang):
+            result = verify.check_sync('192.0.2.1', (), timeout=0.3)
+        self.assertFalse(result.ok)
+        self.assertEqual(result.gateway.error, '超时')
+        self.assertTrue(0.3 <= result.elapsed < 1.5)
+
+        # 网络不可达：给出原因
+        async def unreachable(host, port):
+            raise OSError(errno.ENETUNREACH, 'Network is unreachable')
+
+        with mock.patch.object(verify, '_connect', unreachable):
+            result = verify.check_sync('192.0.2.1', (), timeout=0.3)
+        self.assertFalse(result.ok)
+        self.assertEqual(result.gateway.error, 'Network is unreachable')
+        self.assertIn('网关 不可用（Network is unreachable）', result.info)
+
+    def test_nothing_to_check(self):
+        result = asyncio.run(verify.check('', ('', ''), timeout=0.1))
+        self.assertEqual(result, verify.VerifyResult(True, '连通性：未配置网关和DNS，不检查', None, (), None,
+                                                     result.elapsed))
+
+
+if __name__ == '__main__':
+    unittest.main()
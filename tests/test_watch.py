@@ -0,0 +1,159 @@
+"""
+watch.py：防抖批量回调（手动放入合成事件）和 rtnetlink 多播数据包的解析（构造好的数据包）
+
+用法：python -m pytest tests 或 python -m unittest discover tests
+"""
+import os
+import queue
+import socket
+import struct
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import netlink  # noqa: E402
+from watch import ADDRESS, LINK, ROUTE, AdapterWatcher, NetEvent, NetlinkWatcher, changed_indexes  # noqa: E402
+
+
+def message(kind: int, body: bytes) -> bytes:
+    """一条 netlink 消息（按 4 字节对齐）"""
+    data = netlink._NLMSGHDR.pack(netlink._NLMSGHDR.size + len(body), kind, 0, 0, 0) + body
+    return data + b'\0' * (netlink._align(len(data)) - len(data))
+
+
+def link(kind: int, index: int, name: str) -> bytes:
+    body = netlink._IFINFOMSG.pack(socket.AF_INET, 1, index, netlink.IFF_UP, 0)
+    return message(kind, body + netlink.pack_attr(netlink.IFLA_IFNAME, name.encode() + b'\0'))
+
+
+def addr(kind: int, index: int, address: str, prefix: int) -> bytes:
+    body = netlink._IFADDRMSG.pack(socket.AF_INET, prefix, 0, netlink.RT_SCOPE_UNIVERSE, index)
+    return message(kind, body + netlink.pack_attr(netlink.IFA_LOCAL, socket.inet_aton(address)))
+
+
+def route(kind: int, index: int, dst_len: int = 0, table: int = netlink.RT_TABLE_MAIN, attr_table: int = None) -> bytes:
+    body = netlink._RTMSG.pack(socket.AF_INET, dst_len, 0, 0, table, netlink.RTPROT_STATIC,
+                               netlink.RT_SCOPE_UNIVERSE, netlink.RTN_UNICAST, 0)
+    body += netlink.pack_attr(netlink.RTA_GATEWAY, socket.inet_aton('192.0.2.1'))
+    body += netlink.pack_attr(netlink.RTA_OIF, struct.pack('=I', index))
+    if attr_table is not None:
+        body += netlink.pack_attr(netlink.RTA_TABLE, struct.pack('=I', attr_table))
+    return message(kind, body)
+
+
+class ParseTest(unittest.TestCase):
+
+    def test_link(self):
+        self.assertEqual(NetlinkWatcher.parse(link(netlink.RTM_NEWLINK, 3, 'eth0')), [NetEvent(LINK, 'new', 3)])
+        self.assertEqual(NetlinkWatcher.parse(link(netlink.RTM_DELLINK, 7, 'dummy0')), [NetEvent(LINK, 'del', 7)])
+
+    def test_address(self):
+        self.assertEqual(NetlinkWatcher.parse(addr(netlink.RTM_NEWADDR, 2, '192.0.2.10', 24)),
+                         [NetEvent(ADDRESS, 'new', 2)])
+        self.assertEqual(NetlinkWatcher.parse(addr(netlink.RTM_DELADDR, 2, '192.0.2.10', 24)),
+                         [NetEvent(ADDRESS, 'del', 2)])
+
+    def test_default_route(self):
+        self.assertEqual(NetlinkWatcher.parse(route(netlink.RTM_NEWROUTE, 4)), [NetEvent(ROUTE, 'new', 4)])
+        self.assertEqual(NetlinkWatcher.parse(route(netlink.RTM_DELROUTE, 4)), [NetEvent(ROUTE, 'del', 4)])
+        # 路由表编号大于 255 时放在 RTA_TABLE 属性中，以属性为准
+        self.assertEqual(NetlinkWatcher.parse(route(netlink.RTM_NEWROUTE, 4, table=252, attr_table=254)),
+                         [NetEvent(ROUTE, 'new', 4)])
+
+    def test_ignored_routes(self):
+        # 非默认路由、其他路由表的默认路由不产生事件
+        self.assertEqual(NetlinkWatcher.parse(route(netlink.RTM_NEWROUTE, 4, dst_len=24)), [])
+        self.assertEqual(NetlinkWatcher.parse(route(netlink.RTM_NEWROUTE, 4, table=255)), [])
+        self.assertEqual(NetlinkWatcher.parse(route(netlink.RTM_NEWROUTE, 4, attr_table=1000)), [])
+
+    def test_several_messages(self):
+        data = (link(netlink.RTM_NEWLINK, 3, 'eth0') + message(netlink.NLMSG_DONE, b'\0' * 4)
+                + addr(netlink.RTM_NEWADDR, 3, '10.0.0.2', 8) + route(netlink.RTM_NEWROUTE, 3))
+        self.assertEqual(NetlinkWatcher.parse(data),
+                         [NetEvent(LINK, 'new', 3), NetEvent(ADDRESS, 'new', 3), NetEvent(ROUTE, 'new', 3)])
+
+    def test_truncated(self):
+        data = link(netlink.RTM_NEWLINK, 3, 'eth0')
+        self.assertEqual(NetlinkWatcher.parse(data + data[:10]), [NetEvent(LINK, 'new', 3)])
+        self.assertEqual(NetlinkWatcher.parse(b''), [])
+
+
+class DebounceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.batches = queue.Queue()
+
+    def watcher(self, delay: float, max_delay: float) -> AdapterWatcher:
+        watcher = AdapterWatcher(lambda events: self.batches.put((time.monotonic(), events)), delay, max_delay,
+                                 source=False)
+        watcher.start()
+        self.addCleanup(watcher.stop)
+        return watcher
+
+    def test_burst_is_one_batch(self):
+        watcher = self.watcher(delay=0.1, max_delay=2.0)
+        start = time.monotonic()
+        for event in (NetEvent(LINK, 'new', 3), NetEvent(ADDRESS, 'new', 3), NetEvent(LINK, 'new', 3),
+                      NetEvent(ROUTE, 'new', 3)):
+            watcher.events.put(event)
+        at, events = self.batches.get(timeout=2)
+        # 去重并保持到达顺序，静默 delay 后即回调，不等到 max_delay
+        self.assertEqual(events, [NetEvent(LINK, 'new', 3), NetEvent(ADDRESS, 'new', 3), NetEvent(ROUTE, 'new', 3)])
+        self.assertLess(at - start, 1.0)
+        self.assertRaises(queue.Empty, self.batches.get, timeout=0.3)
+        self.assertEqual(watcher.batches, 1)
+
+    def test_separate_bursts(self):
+        watcher = self.watcher(delay=0.05, max_delay=2.0)
+        watcher.events.put(NetEvent(LINK, 'new', 1))
+        self.assertEqual(self.batches.get(timeout=2)[1], [NetEvent(LINK, 'new', 1)])
+        watcher.events.put(NetEvent(LINK, 'del', 1))
+        self.assertEqual(self.batches.get(timeout=2)[1], [NetEvent(LINK, 'del', 1)])
+
+    def test_max_delay(self):
+        # 事件间隔小于 delay，一直不静默：每 max_delay 秒至少回调一次
+        watcher = self.watcher(delay=0.2, max_delay=0.3)
+        start = time.monotonic()
+        index = 0
+        while time.monotonic() - start < 1.0:
+            index += 1
+            watcher.events.put(NetEvent(ADDRESS, 'new', index))
+            time.sleep(0.02)
+        at, events = self.batches.get(timeout=2)
+        self.assertLess(at - start, 0.6)
+        self.assertGreater(len(events), 1)
+
+        time.sleep(0.5)
+        batches = [events]
+        while not self.batches.empty():
+            batches.append(self.batches.get()[1])
+        # 约 1 秒内每 0.3 秒一批，事件不丢失也不重复
+        self.assertGreaterEqual(len(batches), 3)
+        self.assertEqual([event.index for batch in batches for event in batch], list(range(1, index + 1)))
+
+    def test_callback_error_does_not_stop(self):
+        calls = []
+
+        def callback(events):
+            calls.append(events)
+            if len(calls) == 1:
+                raise RuntimeError('boom')
+            self.batches.put(events)
+
+        watcher = AdapterWatcher(callback, delay=0.02, source=False)
+        watcher.start()
+        self.addCleanup(watcher.stop)
+        watcher.events.put(NetEvent(LINK, 'new', 1))
+        time.sleep(0.2)
+        watcher.events.put(NetEvent(LINK, 'new', 2))
+        self.assertEqual(self.batches.get(timeout=2), [NetEvent(LINK, 'new', 2)])
+
+    def test_changed_indexes(self):
+        self.assertEqual(changed_indexes([NetEvent(LINK, 'new', 3), NetEvent(ROUTE, 'del', 5)]), {3, 5})
+        self.assertEqual(changed_indexes([NetEvent(LINK, 'new', 3), NetEvent(LINK, 'change')]), set())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,21 @@
-from ipaddress import IPv4Network, NetmaskValueError
-from typing import Union
+from typing import Iterable, Sequence, Union
+
+np = None  # NumPy（可选依赖，pip install netset[fast]）在第一次批量处理大量数据时才导入（导入约需 0.1 秒，命令行和小配置库用不到）
+_numpy_checked = False
+_NUMPY_MIN = 1000  # 批量运算达到该条数才导入 NumPy
+
+
+def load_numpy():
+    """导入 NumPy（只尝试一次），没有安装时返回 None"""
+    global np, _numpy_checked
+    if not _numpy_checked:
+        _numpy_checked = True
+        try:
+            import numpy
+            np = numpy
+        except ImportError:  # 没有 NumPy 时批量运算使用纯 Python 实现
+            pass
+    return np
 
 
 def test_time(func_name: str, number: int = 100):
@@ -12,7 +28,93 @@ def test_time(func_name: str, number: int = 100):
     import timeit
     print(f'开始测试函数：{func_name}')
     optimized_time = timeit.timeit(stmt=f"{func_name}()", setup=f"from __main__ import {func_name}", number=number)
-    print(f"{func_name} | 平均耗时: {optimized_time / 100:.4f} 秒/次")
+    print(f"{func_name} | 平均耗时: {optimized_time / number:.4f} 秒/次")
+
+
+# ---- IPv4 整数运算 ----
+# 地址、掩码统一用 32 位整数表示，掩码与前缀长度的转换全部查表
+
+MASKS: tuple = tuple((0xffffffff << (32 - prefix)) & 0xffffffff for prefix in range(33))  # 前缀长度 -> 掩码
+HOSTMASKS: tuple = tuple(~mask & 0xffffffff for mask in MASKS)  # 前缀长度 -> 反掩码
+_PREFIX_OF_MASK: dict = {mask: prefix for prefix, mask in enumerate(MASKS)}
+_PREFIX_OF_HOSTMASK: dict = {mask: prefix for prefix, mask in reversed(tuple(enumerate(HOSTMASKS)))}
+_OCTETS: dict = {str(octet): octet for octet in range(256)}
+
+
+def ip_to_int(ip: str) -> int:
+    """
+    点分十进制IPv4地址转换为32位整数
+
+    异常:
+        ValueError: 地址格式错误时抛出
+    """
+    # 查表同时完成数字、范围和前导零（与 ipaddress 一致，不允许）的检查
+    try:
+        a, b, c, d = ip.split('.')
+        return _OCTETS[a] << 24 | _OCTETS[b] << 16 | _OCTETS[c] << 8 | _OCTETS[d]
+    except (ValueError, KeyError):
+        raise ValueError(f"无效的IPv4地址：{ip}") from None
+
+
+_OCTET_STRINGS: tuple = tuple(map(str, range(256)))  # 0~255 -> 十进制字符串
+
+
+def int_to_ip(value: int, _octets=_OCTET_STRINGS) -> str:
+    """32位整数转换为点分十进制IPv4地址"""
+    return f"{_octets[value >> 24 & 255]}.{_octets[value >> 16 & 255]}.{_octets[value >> 8 & 255]}.{_octets[value & 255]}"
+
+
+MASK_STRINGS: tuple = tuple(int_to_ip(mask) for mask in MASKS)  # 前缀长度 -> 子网掩码字符串
+_PREFIX_OF_MASK_STRING: dict = {mask: prefix for prefix, mask in enumerate(MASK_STRINGS)}
+
+
+def mask_to_prefix(mask: Union[str, int]) -> int:
+    """
+    子网掩码转换为前缀长度
+
+    参数:
+        mask: 子网掩码字符串（"255.255.255.0"）、反掩码（"0.0.0.255"）、
+            前缀长度字符串（"24"）或掩码整数
+
+    异常:
+        ValueError: 不是有效的子网掩码时抛出
+    """
+    if isinstance(mask, int):
+        prefix = _PREFIX_OF_MASK.get(mask)
+        if prefix is None:
+            raise ValueError(f"无效的子网掩码格式：{mask:#010x}")
+        return prefix
+
+    prefix = _PREFIX_OF_MASK_STRING.get(mask)
+    if prefix is not None:
+        return prefix
+    if mask.isascii() and mask.isdigit():
+        prefix = int(mask)
+        if prefix > 32:
+            raise ValueError(f"无效的子网掩码格式：{mask}")
+        return prefix
+    try:
+        value = ip_to_int(mask)
+    except ValueError:
+        raise ValueError(f"无效的子网掩码格式：{mask}") from None
+    prefix = _PREFIX_OF_MASK.get(value, _PREFIX_OF_HOSTMASK.get(value))
+    if prefix is None:
+        raise ValueError(f"无效的子网掩码格式：{mask}")
+    return prefix
+
+
+def prefix_to_mask(prefix: Union[int, str]) -> str:
+    """
+    前缀长度（24 或 "/24"）转换为子网掩码字符串
+
+    异常:
+        ValueError: 前缀长度不在0~32之间时抛出
+    """
+    if isinstance(prefix, str):
+        prefix = int(prefix.strip('/'))
+    if not 0 <= prefix <= 32:
+        raise ValueError("CIDR必须在0~32之间")
+    return MASK_STRINGS[prefix]
 
 
 def subnet_converter(subnet_mask: str = None, cidr: Union[int, str] = None) -> Union[int, str]:
@@ -29,25 +131,253 @@ def subnet_converter(subnet_mask: str = None, cidr: Union[int, str] = None) -> U
     异常:
         ValueError: 输入格式错误或参数冲突时抛出
     """
-    # 参数冲突检查
-    if (subnet_mask and cidr) or (not subnet_mask and not cidr):
+    # 参数冲突检查（cidr 可以为 0）
+    has_cidr = cidr is not None and cidr != ''
+    if bool(subnet_mask) == has_cidr:
         raise ValueError("必须且只能指定一个参数：subnet_mask 或 cidr")
 
+    # 子网掩码 → CIDR
+    if subnet_mask:
+        return mask_to_prefix(subnet_mask)
+
+    # CIDR → 子网掩码
+    return prefix_to_mask(cidr)
+
+
+def network_address(address: int, prefix: int) -> int:
+    """网络地址"""
+    return address & MASKS[prefix]
+
+
+def broadcast_address(address: int, prefix: int) -> int:
+    """广播地址"""
+    return address | HOSTMASKS[prefix]
+
+
+def same_subnet(a: int, b: int, prefix: int) -> bool:
+    """两个地址是否在同一子网"""
+    return not (a ^ b) & MASKS[prefix]
+
+
+def is_host_address(address: int, prefix: int) -> bool:
+    """是否为可用的主机地址（/31、/32 之外不能是网络地址或广播地址）"""
+    if prefix >= 31:
+        return True
+    host = address & HOSTMASKS[prefix]
+    return host != 0 and host != HOSTMASKS[prefix]
+
+
+def validate_profile(profile: dict) -> str:
+    """
+    检查单个配置（规则与 validate_profiles 一致）
+
+    返回:
+        str: 问题说明，没有问题时为空字符串
+    """
+    try:
+        address = ip_to_int(profile.get('IPv4Address') or '')
+    except (ValueError, AttributeError):
+        return '无效的IP地址'
     try:
-        # 子网掩码 → CIDR
-        if subnet_mask:
-            network = IPv4Network(f"0.0.0.0/{subnet_mask}", strict=False)
-            return int(network.prefixlen)
-
-        # CIDR → 子网掩码
-        else:
-            # 处理字符串格式的CIDR（如"/24"）
-            if isinstance(cidr, str):
-                cidr = int(cidr.strip('/'))
-            if not 0 <= cidr <= 32:
-                raise ValueError("CIDR必须在0~32之间")
-            network = IPv4Network(f"0.0.0.0/{cidr}", strict=False)
-            return str(network.netmask)
-
-    except NetmaskValueError as e:
-        raise ValueError(f"无效的子网掩码格式：{e}") from None
+        prefix = mask_to_prefix(profile.get('SubnetMask') or '')
+    except (ValueError, AttributeError, TypeError):
+        return '无效的子网掩码'
+    if not is_host_address(address, prefix):
+        return 'IP地址是网络地址或广播地址'
+    gateway = profile.get('IPv4DefaultGateway') or ''
+    if not gateway:
+        return ''
+    try:
+        gateway = ip_to_int(gateway)
+    except (ValueError, AttributeError):
+        return '无效的默认网关'
+    if not same_subnet(address, gateway, prefix):
+        return '默认网关与IP地址不在同一子网'
+    if gateway == address:
+        return '默认网关与IP地址相同'
+    return ''
+
+
+# ---- 批量运算 ----
+# 输入为字符串或整数序列，一次处理整个配置库；
+# 安装了 NumPy 时返回 NumPy 数组并使用向量化实现，否则返回列表
+
+_MAX_IP_LENGTH = 15  # "255.255.255.255"
+
+
+def parse_ips(ips: Sequence[str]) -> tuple:
+    """
+    批量解析IPv4地址
+
+    返回:
+        (地址整数, 是否有效)，无效的地址对应 0
+    """
+    if len(ips) >= _NUMPY_MIN:
+        load_numpy()
+    if np is not None and len(ips):
+        try:
+            return _parse_ips_numpy(ips)
+        except UnicodeEncodeError:
+            pass  # 含非 ASCII 字符，交给逐条解析
+    values, valid = [], []
+    for ip in ips:
+        try:
+            values.append(ip_to_int(ip))
+            valid.append(True)
+        except (ValueError, AttributeError):
+            values.append(0)
+            valid.append(False)
+    if np is not None:
+        return np.array(values, dtype=np.uint32), np.array(valid, dtype=bool)
+    return values, valid
+
+
+def _parse_ips_numpy(ips: Sequence[str]) -> tuple:
+    count = len(ips)
+    ips = [ip if isinstance(ip, str) else '' for ip in ips]
+    lengths = np.fromiter(map(len, ips), dtype=np.int64, count=count)
+    chars = np.array(ips, dtype='S%d' % _MAX_IP_LENGTH).view(np.uint8).reshape(count, _MAX_IP_LENGTH)
+
+    ok = (lengths >= 7) & (lengths <= _MAX_IP_LENGTH)
+    octet = np.zeros(count, dtype=np.uint32)
+    digits = np.zeros(count, dtype=np.uint8)
+    leading_zero = np.zeros(count, dtype=bool)
+    segment = np.zeros(count, dtype=np.uint8)
+    value = np.zeros(count, dtype=np.uint32)
+
+    # 逐列扫描（最多 15 列），每列对全部地址同时处理
+    for column in range(_MAX_IP_LENGTH):
+        char = chars[:, column]
+        inside = column < lengths
+        is_digit = inside & (char >= 48) & (char <= 57)
+        is_dot = inside & (char == 46)
+        ok &= (~inside | is_digit | is_dot) & ~(is_dot & (column + 1 == lengths))
+
+        leading_zero |= is_digit & (digits == 1) & (octet == 0)
+        octet = np.where(is_digit, octet * 10 + (char - 48), octet)
+        digits += is_digit
+
+        # 点号或结尾：结束一段
+        end = is_dot | (column + 1 == lengths)
+        ok &= ~end | ((digits >= 1) & (digits <= 3) & (octet <= 255) & ~leading_zero)
+        value = np.where(end, (value << 8) | octet, value)
+        segment += end
+        octet = np.where(end, 0, octet)
+        digits = np.where(end, 0, digits)
+        leading_zero &= ~end
+
+    ok &= segment == 4
+    return np.where(ok, value, 0).astype(np.uint32), ok
+
+
+def masks_to_prefixes(masks: Sequence[Union[str, int]]) -> tuple:
+    """
+    批量把子网掩码转换为前缀长度（与 mask_to_prefix 的规则一致）
+
+    返回:
+        (前缀长度, 是否有效)，无效的掩码对应 -1
+    """
+    if len(masks) >= _NUMPY_MIN:
+        load_numpy()
+    # 配置中几乎都是标准写法，先整体查表，查不到的少数条目再逐条解析
+    lookup = _PREFIX_OF_MASK_STRING.get
+    prefixes = [lookup(mask, -1) if isinstance(mask, str) else -1 for mask in masks]
+    for i, prefix in enumerate(prefixes):
+        if prefix < 0:
+            try:
+                prefixes[i] = mask_to_prefix(masks[i])
+            except (ValueError, AttributeError, TypeError):
+                pass
+    if np is not None:
+        prefixes = np.array(prefixes, dtype=np.int8)
+        return prefixes, prefixes >= 0
+    return prefixes, [prefix >= 0 for prefix in prefixes]
+
+
+def prefixes_to_masks(prefixes: Iterable[int]) -> list:
+    """批量把前缀长度转换为子网掩码字符串，无效的前缀对应空字符串"""
+    return [MASK_STRINGS[prefix] if 0 <= prefix <= 32 else '' for prefix in map(int, prefixes)]
+
+
+def _mask_array(prefixes):
+    return np.array(MASKS + (0,), dtype=np.uint32)[np.asarray(prefixes, dtype=np.int64)]
+
+
+def networks(addresses, prefixes):
+    """批量计算网络地址（前缀为 -1 时结果为 0）"""
+    if np is None:
+        return [address & MASKS[prefix] if prefix >= 0 else 0 for address, prefix in zip(addresses, prefixes)]
+    return np.asarray(addresses, dtype=np.uint32) & _mask_array(prefixes)
+
+
+def broadcasts(addresses, prefixes):
+    """批量计算广播地址（前缀为 -1 时结果为 0）"""
+    if np is None:
+        return [address | HOSTMASKS[prefix] if prefix >= 0 else 0 for address, prefix in zip(addresses, prefixes)]
+    prefixes = np.asarray(prefixes, dtype=np.int64)
+    return np.where(prefixes >= 0, np.asarray(addresses, dtype=np.uint32) | ~_mask_array(prefixes), 0)
+
+
+def same_subnets(a, b, prefixes):
+    """批量判断两组地址是否两两在同一子网"""
+    if np is None:
+        return [prefix >= 0 and not (x ^ y) & MASKS[prefix] for x, y, prefix in zip(a, b, prefixes)]
+    prefixes = np.asarray(prefixes, dtype=np.int64)
+    a = np.asarray(a, dtype=np.uint32)
+    b = np.asarray(b, dtype=np.uint32)
+    return (prefixes >= 0) & (((a ^ b) & _mask_array(prefixes)) == 0)
+
+
+def host_addresses(addresses, prefixes):
+    """批量判断是否为可用的主机地址（规则同 is_host_address）"""
+    if np is None:
+        return [prefix >= 0 and is_host_address(address, prefix) for address, prefix in zip(addresses, prefixes)]
+    prefixes = np.asarray(prefixes, dtype=np.int64)
+    host = np.asarray(addresses, dtype=np.uint32) & ~_mask_array(prefixes)
+    hostmask = ~_mask_array(prefixes)
+    return (prefixes >= 31) | ((prefixes >= 0) & (host != 0) & (host != hostmask))
+
+
+def validate_profiles(profiles: dict) -> dict:
+    """
+    一次检查整个配置库（IPList.ip_dict 格式）
+
+    检查IP地址、子网掩码、默认网关的格式，IP地址是否为可用的主机地址，
+    默认网关是否与IP地址在同一子网。
+
+    返回:
+        dict: 有问题的配置，键 -> 问题说明
+    """
+    keys = list(profiles)
+    data = [profiles[key] for key in keys]
+    addresses, address_ok = parse_ips([item.get('IPv4Address') or '' for item in data])
+    prefixes, mask_ok = masks_to_prefixes([item.get('SubnetMask') or '' for item in data])
+    gateway_text = [item.get('IPv4DefaultGateway') or '' for item in data]
+    gateways, gateway_ok = parse_ips(gateway_text)
+    hosts = host_addresses(addresses, prefixes)
+    same = same_subnets(addresses, gateways, prefixes)
+
+    if np is not None:
+        no_gateway = np.fromiter((not text for text in gateway_text), dtype=bool, count=len(keys))
+        bad = ~address_ok | ~mask_ok | ~hosts | (~no_gateway & (~gateway_ok | ~same | (gateways == addresses)))
+        candidates = np.flatnonzero(bad).tolist()
+    else:
+        candidates = range(len(keys))
+
+    problems = {}
+    for i in candidates:
+        if not address_ok[i]:
+            problems[keys[i]] = '无效的IP地址'
+        elif not mask_ok[i]:
+            problems[keys[i]] = '无效的子网掩码'
+        elif not hosts[i]:
+            problems[keys[i]] = 'IP地址是网络地址或广播地址'
+        elif not gateway_text[i]:
+            continue
+        elif not gateway_ok[i]:
+            problems[keys[i]] = '无效的默认网关'
+        elif not same[i]:
+            problems[keys[i]] = '默认网关与IP地址不在同一子网'
+        elif gateways[i] == addresses[i]:
+            problems[keys[i]] = '默认网关与IP地址相同'
+    return problems
@@ -0,0 +1,225 @@
+"""
+轻量的耗时追踪（span）
+
+    with tracing.span('shell.execute', chars=len(script)):
+        ...
+
+    @tracing.traced('net.get_adapter_info')
+    def get_adapter_info(...): ...
+
+默认关闭：span() 只判断一次全局变量并返回共享的空上下文管理器，几乎没有额外开销。
+开启后（tracing.enable()，或启动前设置环境变量 NETSET_TRACE=文件名）每个 span 记录名称、开始时间、
+耗时、线程和属性，可以：
+- export(path)：.jsonl 每行一个 span，其他扩展名导出 Chrome trace（chrome://tracing 或 Perfetto 打开）
+- summary() / format_summary()：按名称统计次数、p50、p95 和最大耗时
+设置了 NETSET_TRACE 时，退出前自动导出到该文件。
+"""
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import NamedTuple, Optional
+
+
+class Span(NamedTuple):
+    """一次计时
+
+    Attributes:
+        name (str): 操作名称，如"shell.execute"
+        start (float): 开始时间（time.perf_counter()）
+        duration (float): 耗时（秒）
+        thread (int): 线程标识
+        attrs (dict): 属性（网卡名称、条数等），出错时含 error
+    """
+    name: str
+    start: float
+    duration: float
+    thread: int
+    attrs: dict
+
+
+class SpanStats(NamedTuple):
+    """同一名称的 span 的统计（耗时单位为秒）"""
+    count: int
+    total: float
+    p50: float
+    p95: float
+    max: float
+
+
+class _NoopSpan:
+    """追踪关闭时 span() 返回的共享对象"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class _ActiveSpan:
+    __slots__ = ('tracer', 'name', 'attrs', 'start')
+
+    def __init__(self, tracer: 'Tracer', name: str, attrs: dict):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        if exc_type is not None:
+            self.attrs['error'] = exc_type.__name__
+        self.tracer.spans.append(Span(self.name, self.start, duration, threading.get_ident(), self.attrs))
+        return False
+
+    def set(self, **attrs):
+        """在 span 结束前补充属性（如结果条数）"""
+        self.attrs.update(attrs)
+
+
+def _percentile(ordered: list, fraction: float) -> float:
+    """最近秩百分位（ordered 已排序且非空）"""
+    return ordered[min(len(ordered) - 1, max(0, int(len(ordered) * fraction + 0.5) - 1))]
+
+
+class Tracer:
+    """span 记录器，只保留最近 max_spans 个
+
+    Attributes:
+        spans (deque): Span 列表（deque.append 是线程安全的，记录时不加锁）
+        origin (float): 开启追踪的时间，导出时作为 0 点
+    """
+
+    def __init__(self, max_spans: int = 100_000):
+        self.spans: deque = deque(maxlen=max_spans)
+        self.origin: float = time.perf_counter()
+
+    def summary(self) -> dict:
+        """名称 -> SpanStats，按总耗时从大到小"""
+        durations: dict = {}
+        for item in list(self.spans):
+            durations.setdefault(item.name, []).append(item.duration)
+        stats = {}
+        for name, values in durations.items():
+            values.sort()
+            stats[name] = SpanStats(len(values), sum(values), _percentile(values, 0.5),
+                                    _percentile(values, 0.95), values[-1])
+        return dict(sorted(stats.items(), key=lambda item: item[1].total, reverse=True))
+
+    def export_chrome(self, path: str) -> int:
+        """导出 Chrome trace（Trace Event Format 的完整事件），返回 span 数"""
+        pid = os.getpid()
+        spans = list(self.spans)
+        events = [{'name': item.name, 'cat': item.name.split('.', 1)[0], 'ph': 'X', 'pid': pid, 'tid': item.thread,
+                   'ts': round((item.start - self.origin) * 1e6, 3), 'dur': round(item.duration * 1e6, 3),
+                   'args': item.attrs} for item in spans]
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False, default=str)
+        return len(spans)
+
+    def export_jsonl(self, path: str) -> int:
+        """每行一个 span（时间单位为毫秒），返回 span 数"""
+        spans = list(self.spans)
+        with open(path, 'w', encoding='utf-8') as f:
+            for item in spans:
+                f.write(json.dumps({'name': item.name, 'start_ms': round((item.start - self.origin) * 1000, 3),
+                                    'duration_ms': round(item.duration * 1000, 3), 'thread': item.thread,
+                                    'attrs': item.attrs}, ensure_ascii=False, default=str) + '\n')
+        return len(spans)
+
+
+_tracer: Optional[Tracer] = None
+
+
+def span(name: str, **attrs):
+    """计时一段代码（with 语句），追踪关闭时什么也不做"""
+    if _tracer is None:
+        return _NOOP
+    return _ActiveSpan(_tracer, name, attrs)
+
+
+def traced(name: str = None):
+    """装饰器：计时整个函数调用（名称默认为函数的限定名）"""
+    def decorator(fn):
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return fn(*args, **kwargs)
+            with _ActiveSpan(_tracer, label, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def enable(max_spans: int = 100_000) -> Tracer:
+    """开启追踪（已开启时返回当前的记录器）"""
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer(max_spans)
+    return _tracer
+
+
+def disable() -> Optional[Tracer]:
+    """关闭追踪，返回之前的记录器（可继续导出）"""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+def summary() -> dict:
+    """当前记录器的统计，追踪关闭时为空"""
+    return _tracer.summary() if _tracer is not None else {}
+
+
+def format_summary() -> str:
+    """统计表（文本），追踪关闭时给出开启方法"""
+    if _tracer is None:
+        return '未开启追踪（启动前设置环境变量 NETSET_TRACE=文件名）'
+    lines = ['%-28s %6s %10s %10s %10s' % ('操作', '次数', 'p50 ms', 'p95 ms', '最大 ms')]
+    for name, stats in summary().items():
+        lines.append('%-28s %6d %10.2f %10.2f %10.2f' % (name, stats.count, stats.p50 * 1000,
+                                                         stats.p95 * 1000, stats.max * 1000))
+    return '\n'.join(lines)
+
+
+def export(path: str) -> int:
+    """按扩展名导出（.jsonl 为 JSON Lines，其他为 Chrome trace），返回 span 数"""
+    if _tracer is None:
+        return 0
+    if path.lower().endswith(('.jsonl', '.ndjson')):
+        return _tracer.export_jsonl(path)
+    return _tracer.export_chrome(path)
+
+
+def _export_at_exit(path: str):
+    try:
+        count = export(path)
+    except OSError as e:
+        print('导出追踪记录失败：%s' % e)
+        return
+    print('已导出 %d 个 span 到 [%s]' % (count, path))
+
+
+if _path := os.environ.get('NETSET_TRACE'):
+    enable()
+    atexit.register(_export_at_exit, _path)
@@ -1,21 +1,27 @@
 from PyQt6.QtCore import Qt, QRegularExpression
 from PyQt6.QtGui import QIcon, QFont, QCloseEvent, QRegularExpressionValidator
-from PyQt6.QtWidgets import (QApplication, QComboBox, QListWidget,
+from PyQt6.QtWidgets import (QApplication, QComboBox, QFileDialog, QListView,
                              QHBoxLayout, QMenu, QWidget, QMessageBox)
 
+import profile_io
+import tracing
 from function import IPList
+from profile_model import ProfileListModel
 
 from PyQt6.QtWidgets import QDialog, QVBoxLayout, QLabel, QLineEdit, QPushButton
 
 
 class Window(QWidget):
-    def __init__(self):
+    def __init__(self, iplist: IPList = None):
+        """
+        :param iplist: 使用已加载的配置（由启动流程加载一次后共享），为空时在这里加载
+        """
         super().__init__()
         self.setGeometry(200, 200, 700, 500)
         self.setWindowTitle("IP地址切换工具")
         self.setWindowIcon(QIcon("images/python.png"))
 
-        self.ipList = IPList()
+        self.ipList = iplist if iplist is not None else IPList()
 
         self._set_font()
         self._init_ui()
@@ -50,6 +56,7 @@ class Window(QWidget):
         # 网卡下拉框
         self.adapter_label: QLabel = QLabel("选择网卡:")
         self.adapter_combobox: QComboBox = QComboBox()
+        self.adapter_combobox.setPlaceholderText("正在获取网卡...")  # 网卡列表在后台获取，窗口先显示
         self.adapter_button: QPushButton = QPushButton('查看IP')
 
         # IP 地址输入框
@@ -82,8 +89,16 @@ class Window(QWidget):
         # 状态标签
         self.status_label: QLabel = QLabel("")
 
-        # IP列表
-        self.ip_list_view: QListWidget = QListWidget()
+        # IP列表搜索框
+        self.filter_entry: QLineEdit = QLineEdit()
+        self.filter_entry.setPlaceholderText("搜索 IP / 网关 / DNS / 名称")
+        self.filter_entry.setClearButtonEnabled(True)
+
+        # IP列表（模型直接读取 IPList，分批加载，行高固定以免逐行计算布局）
+        self.ip_list_model: ProfileListModel = ProfileListModel(self.ipList, parent=self)
+        self.ip_list_view: QListView = QListView()
+        self.ip_list_view.setModel(self.ip_list_model)
+        self.ip_list_view.setUniformItemSizes(True)
 
         # 右键菜单
         # 设置上下文菜单策略为CustomContextMenu，表示需要自定义右键菜单行为（而非使用默认菜单）
@@ -91,8 +106,9 @@ class Window(QWidget):
         # 当用户右键点击列表时，会触发customContextMenuRequested信号。此处将该信号连接到自定义的槽函数self.custom_right_menu，用于动态生成并弹出右键菜单
         self.ip_list_view.customContextMenuRequested.connect(self.custom_right_menu)
 
-
-        self.ip_list_view.itemDoubleClicked.connect(lambda item: self.update_ip_ui(self.ipList.view_ip(item.text())))
+        self.ip_list_view.doubleClicked.connect(
+            lambda index: self.update_ip_ui(index.data(ProfileListModel.ProfileRole)))
+        self.filter_entry.textChanged.connect(self.ip_list_model.set_filter)
 
     def _init_layout(self):
         """
@@ -157,6 +173,7 @@ class Window(QWidget):
 
         # 右边布局
         right_vbox: QVBoxLayout = QVBoxLayout()
+        right_vbox.addWidget(self.filter_entry)
         right_vbox.addWidget(self.ip_list_view)
 
         # 页面布局
@@ -170,6 +187,23 @@ class Window(QWidget):
         self.ipList.save_ip()
         event.accept()
 
+    @tracing.traced('ui.update_adapters')
+    def update_adapters(self, names: list):
+        """增量更新网卡下拉框：删除消失的网卡，追加新出现的网卡，保持当前选择"""
+        current = self.adapter_combobox.currentText()
+        self.adapter_combobox.blockSignals(True)
+        for i in reversed(range(self.adapter_combobox.count())):
+            if self.adapter_combobox.itemText(i) not in names:
+                self.adapter_combobox.removeItem(i)
+        existing = {self.adapter_combobox.itemText(i) for i in range(self.adapter_combobox.count())}
+        self.adapter_combobox.addItems([name for name in names if name not in existing])
+        self.adapter_combobox.blockSignals(False)
+
+        # 当前网卡已消失时，通知选择变化
+        if self.adapter_combobox.currentText() != current:
+            self.adapter_combobox.currentTextChanged.emit(self.adapter_combobox.currentText())
+
+    @tracing.traced('ui.update_ip_ui')
     def update_ip_ui(self, var=(str, str, str, (), str)):
         """更新IP信息窗口"""
         try:
@@ -204,20 +238,26 @@ class Window(QWidget):
         opt2 = menu.addAction("修改")
         opt3 = menu.addAction("删除")
         opt4 = menu.addAction("排序")
+        opt5 = menu.addAction("检查冲突")
+        menu.addSeparator()
+        opt6 = menu.addAction("导入...")
+        opt7 = menu.addAction("导出...")
+        menu.addSeparator()
+        opt8 = menu.addAction("性能统计")
         action = menu.exec(self.ip_list_view.mapToGlobal(pos))
 
         if action == opt1:
             try:
                 # 新增IP地址
-                add_ip_dialog = IPDialog(self, title="新增IP")
+                add_ip_dialog = IPDialog(self, title="新增IP", iplist=self.ipList)
                 if add_ip_dialog.exec() == QDialog.DialogCode.Accepted:
                     result: tuple = add_ip_dialog.get_result()
 
                     if self.is_duplicate(result[0]):
                         QMessageBox.information(self, "提示", "请勿重复添加")
                     else:
-                        self.ip_list_view.addItems([result[0]])
-                        self.ipList.add_ip(result[0], result[1], result[2], result[3])
+                        self.ip_list_model.add_profiles([result])
+                        self.show_conflicts(result[0])
 
             except Exception:
                 print('没有选中')
@@ -226,14 +266,17 @@ class Window(QWidget):
         elif action == opt2:
             # 修改IP地址
             try:
-                change_ip_dialog = IPDialog(self, title='修改IP')
-                result = self.ipList.view_ip(self.ip_list_view.currentItem().text())
-                change_ip_dialog.change_ip(result)
+                key = self.current_profile()
+                change_ip_dialog = IPDialog(self, title='修改IP', iplist=self.ipList, key=key)
+                result = self.ipList.view_ip(key)
+                change_ip_dialog.change_ip(result, self.ipList.ip_dict[key].get('Name', ''))
                 if change_ip_dialog.exec() == QDialog.DialogCode.Accepted:
                     result: tuple = change_ip_dialog.get_result()
-                    self.ipList.add_ip(result[0], result[1], result[2], result[3])
-                    print('已修改 [%s]' % result[0])
-                    self.ip_list_view.currentItem().setText(result[0])
+                    if self.ip_list_model.change_profile(key, result):
+                        print('已修改 [%s]' % result[0])
+                        self.show_conflicts(result[0])
+                    else:
+                        QMessageBox.information(self, "提示", "请勿重复添加")
 
             except Exception as e:
                 print('修改IP地址,没有选中\n', e)
@@ -241,38 +284,132 @@ class Window(QWidget):
         elif action == opt3:
             try:
                 # 删除IP地址
+                key = self.current_profile()
                 reply = QMessageBox.warning(self, '删除IP地址',
-                                            f'确定要删除【{self.ip_list_view.currentItem().text()}】吗?',
+                                            f'确定要删除【{key}】吗?',
                                             QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
                                             QMessageBox.StandardButton.No)
                 if reply == QMessageBox.StandardButton.Yes:
-                    # 在IPList字典中删除IP
-                    temp = self.ipList.del_ip(self.ip_list_view.currentItem().text())
-                    print('已删除 [%s]' % temp)
-
-                    # 在QListWidget中删除元素
-                    self.ip_list_view.takeItem(self.ip_list_view.currentRow())
+                    # 模型同时删除列表中的行和IPList中的数据
+                    self.ip_list_model.remove_profiles([key])
+                    self.ip_list_model.refresh_conflicts()
+                    print('已删除 [%s]' % key)
 
             except:
                 print(f'没有选中')
 
 
         elif action == opt4:
+            # 按IP地址数值排序
+            self.ip_list_model.sort_by_address()
             print('排序')
 
+        elif action == opt5:
+            self.check_conflicts()
+
+        elif action == opt6:
+            self.import_profiles()
+
+        elif action == opt7:
+            self.export_profiles()
+
+        elif action == opt8:
+            self.show_trace_summary()
+
+    def import_profiles(self):
+        """从 CSV / JSON Lines 文件导入配置，全部导入后列表只刷新一次"""
+        path, _ = QFileDialog.getOpenFileName(self, '导入配置', '', profile_io.FILE_FILTER)
+        if not path:
+            return
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        try:
+            with tracing.span('file.import', path=path):
+                result = profile_io.import_profiles(self.ipList, path)
+        except (OSError, ValueError) as e:
+            QApplication.restoreOverrideCursor()
+            QMessageBox.warning(self, '导入配置', '导入失败：%s' % e)
+            return
+        with tracing.span('ui.model.reset', rows=len(self.ipList.ip_dict)):
+            self.ip_list_model.reset()
+        QApplication.restoreOverrideCursor()
+
+        info = '导入 %d 条，跳过已存在的 %d 条' % (result.added, result.skipped)
+        self.update_status_label(info)
+        if result.error_count:
+            lines = ['第 %d 行：%s' % (error.line, error.message) for error in result.errors[:20]]
+            if result.error_count > 20:
+                lines.append('…… 共 %d 行有错误' % result.error_count)
+            QMessageBox.warning(self, '导入配置', info + '\n\n' + '\n'.join(lines))
+
+    def export_profiles(self):
+        """把全部配置导出为 CSV / JSON Lines 文件"""
+        path, _ = QFileDialog.getSaveFileName(self, '导出配置', 'profiles.csv', profile_io.FILE_FILTER)
+        if not path:
+            return
+        try:
+            with tracing.span('file.export', path=path):
+                count = profile_io.export_profiles(self.ipList.ip_dict.values(), path)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, '导出配置', '导出失败：%s' % e)
+            return
+        self.update_status_label('已导出 %d 条到 %s' % (count, path))
+
+    def check_conflicts(self):
+        """检查整个配置库的冲突，列出前若干条，之后列表中有冲突的行显示为红色"""
+        conflicts = self.ipList.find_conflicts()
+        self.ip_list_model.refresh_conflicts()
+        if not conflicts:
+            self.update_status_label('没有发现冲突')
+            QMessageBox.information(self, "检查冲突", "没有发现冲突")
+            return
+
+        count = len({conflict.key for conflict in conflicts})
+        self.update_status_label('%d 个配置存在冲突' % count)
+        lines = ['%s: %s' % (conflict.key, conflict.message) for conflict in conflicts[:20]]
+        if len(conflicts) > 20:
+            lines.append('…… 共 %d 条' % len(conflicts))
+        QMessageBox.warning(self, "检查冲突", '\n'.join(lines))
+
+    def show_trace_summary(self):
+        """各操作耗时的 p50 / p95（需要启动前设置环境变量 NETSET_TRACE 开启追踪）"""
+        box = QMessageBox(QMessageBox.Icon.Information, "性能统计", tracing.format_summary(), parent=self)
+        box.setFont(QFont("Consolas", 9))  # 等宽字体，表格对齐
+        box.exec()
+
+    def show_conflicts(self, key: str):
+        """新增或修改配置后，在状态栏提示该配置的冲突"""
+        conflicts = self.ipList.conflicts_of(key)
+        self.ip_list_model.refresh_conflicts()
+        if conflicts:
+            self.update_status_label('[%s] %s' % (key, '；'.join(conflict.message for conflict in conflicts)))
+
+    def current_profile(self) -> str:
+        """IP列表中当前选中的IP地址
+
+        异常:
+            LookupError: 没有选中时抛出
+        """
+        key = self.ip_list_model.key(self.ip_list_view.currentIndex().row())
+        if not key:
+            raise LookupError('没有选中')
+        return key
+
     def is_duplicate(self, text):
-        """IP List Widget 添加去重"""
-        return any(
-            self.ip_list_view.item(i).text() == text
-            for i in range(self.ip_list_view.count())
-        )
+        """IP列表添加去重"""
+        return text in self.ip_list_model
 
 
 class IPDialog(QDialog):
     """IP子窗口"""
 
-    def __init__(self, parent=None, title: str = None):
+    def __init__(self, parent=None, title: str = None, iplist: IPList = None, key: str = None):
+        """
+        :param iplist: 指定时，输入过程中即时检查与已保存配置的冲突
+        :param key: 修改已有配置时为原来的IP地址（检查时排除它自己）
+        """
         super().__init__(parent)
+        self.iplist: IPList = iplist
+        self.key: str = key
         self.setWindowTitle(title)
         self.setGeometry(300, 300, 300, 200)
 
@@ -323,6 +460,17 @@ class IPDialog(QDialog):
         self.dns_entry_2: QLineEdit = QLineEdit()
         self.dns_entry_2.setValidator(validator)
 
+        # 名称输入框（可选）
+        self.name_label: QLabel = QLabel("  名称  :")
+        self.name_entry: QLineEdit = QLineEdit()
+
+        # 冲突提示
+        self.warning_label: QLabel = QLabel("")
+        self.warning_label.setStyleSheet("color: red")
+        self.warning_label.setWordWrap(True)
+        for entry in (self.ip_entry, self.subnet_entry, self.gateway_entry):
+            entry.textChanged.connect(self.update_conflicts)
+
         # 确认按钮
         self.button: QPushButton = QPushButton('确认')
         self.button.clicked.connect(self.accept)
@@ -373,6 +521,14 @@ class IPDialog(QDialog):
         dns_layout_2.addWidget(self.dns_entry_2)
         left_vbox.addLayout(dns_layout_2)
 
+        name_layout: QHBoxLayout = QHBoxLayout()
+        name_layout.addWidget(self.name_label)
+        name_layout.addWidget(self.name_entry)
+        left_vbox.addLayout(name_layout)
+
+        # 冲突提示
+        left_vbox.addWidget(self.warning_label)
+
         # 确认按钮
         left_vbox.addWidget(self.button)
 
@@ -388,14 +544,37 @@ class IPDialog(QDialog):
         SubnetMask: str = self.subnet_entry.text()
         IPv4DefaultGateway: str = self.gateway_entry.text()
         DNSServer: tuple = (self.dns_entry_1.text(), self.dns_entry_2.text())
+        Name: str = self.name_entry.text().strip()
 
         # result = {IPv4: {"IPv4": IPv4, 'SubnetMask': SubnetMask,
         #                       'IPv4DefaultGateway': IPv4DefaultGateway, 'DNSServer': DNSServer}}
 
-        result = (IPv4, SubnetMask, IPv4DefaultGateway, DNSServer)
+        result = (IPv4, SubnetMask, IPv4DefaultGateway, DNSServer, Name)
         return result
 
-    def change_ip(self, ip_data: tuple):
+    def conflicts(self) -> list:
+        """当前输入与已保存配置的冲突"""
+        if self.iplist is None or not self.ip_entry.text():
+            return []
+        return self.iplist.check_conflicts(self.get_result(), self.key)
+
+    def update_conflicts(self):
+        """输入变化时更新冲突提示"""
+        self.warning_label.setText('\n'.join(conflict.message for conflict in self.conflicts()))
+
+    def accept(self):
+        """有冲突时确认后再保存"""
+        conflicts = self.conflicts()
+        if conflicts:
+            reply = QMessageBox.question(self, '配置冲突',
+                                         '\n'.join(conflict.message for conflict in conflicts) + '\n\n仍要保存吗?',
+                                         QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+                                         QMessageBox.StandardButton.No)
+            if reply != QMessageBox.StandardButton.Yes:
+                return
+        super().accept()
+
+    def change_ip(self, ip_data: tuple, name: str = ''):
         """修改IP地址"""
 
         self.ip_entry.setText(ip_data[0])
@@ -403,6 +582,7 @@ class IPDialog(QDialog):
         self.gateway_entry.setText(ip_data[2])
         self.dns_entry_1.setText(ip_data[3][0] if len(ip_data[3]) > 0 else "")
         self.dns_entry_2.setText(ip_data[3][1] if len(ip_data[3]) > 1 else "")
+        self.name_entry.setText(name)
 
 
 def main_ui():
@@ -0,0 +1,220 @@
+"""
+修改后的连通性检查
+
+修改IP成功只说明配置已写入，网关和DNS是否可用（交换机端口、VLAN、DNS地址填错等）要实际访问才知道。
+check() 在修改后立即并行执行：
+- 网关：向若干常用端口发起 TCP 连接，连接成功或被拒绝（收到 RST）都说明网关可达
+- DNS：向每个 DNS 服务器直接发送 UDP 查询（不经过系统解析器和缓存），收到匹配的正确应答即可用，
+  期间按 RETRY 间隔重发，应对切换后头几个包丢失的情况
+全部检查共用一个截止时间，最慢的检查决定总耗时。"首个DNS应答"（从开始检查到第一个可用的DNS服务器应答）
+可以作为切换后恢复上网所需时间的指标。
+
+    result = asyncio.run(verify.check('192.168.1.1', ('223.5.5.5', '223.6.6.6'), timeout=2.0))
+    print(result.info)
+
+dns_port、gateway_ports 可以改为本地端口，配合本地的 DNS 应答器测试（见 benchmarks/fake_dns.py）。
+"""
+import asyncio
+import os
+import struct
+import time
+from typing import NamedTuple, Optional
+
+GATEWAY_PORTS = (53, 80, 443)
+QUERY_NAME = 'www.msftconnecttest.com'  # Windows 网络连接状态检测使用的域名
+RETRY = 0.25  # DNS 查询的重发间隔（秒）
+
+_HEADER = struct.Struct('>HHHHHH')
+RCODE_NOERROR = 0
+RCODE_NXDOMAIN = 3
+
+
+class Check(NamedTuple):
+    """一项检查的结果
+
+    Attributes:
+        target (str): 网关或DNS服务器的地址
+        ok (bool): 是否可用
+        elapsed (float): 从开始检查到得出结果的时间（秒）
+        error (str): 不可用的原因
+    """
+    target: str
+    ok: bool
+    elapsed: float
+    error: str = ''
+
+
+class VerifyResult(NamedTuple):
+    """连通性检查的结果
+
+    Attributes:
+        ok (bool): 网关可达且至少一个DNS服务器可用（未配置的项目不检查）
+        info (str): 提示信息
+        gateway (Check): 网关检查，未配置网关时为 None
+        dns (tuple): 每个DNS服务器的 Check
+        first_dns (float): 首个DNS应答的时间（秒），没有可用的DNS服务器时为 None
+        elapsed (float): 检查总耗时（秒）
+    """
+    ok: bool
+    info: str
+    gateway: Optional[Check]
+    dns: tuple
+    first_dns: Optional[float]
+    elapsed: float
+
+
+# ---- DNS 报文 ----
+
+def build_query(name: str, query_id: int, qtype: int = 1) -> bytes:
+    """DNS 查询报文（期望递归，一个问题，qtype 默认为 A 记录）"""
+    question = b''.join(bytes([len(label)]) + label.encode('idna') for label in name.strip('.').split('.') if label)
+    return _HEADER.pack(query_id, 0x0100, 1, 0, 0, 0) + question + b'\x00' + struct.pack('>HH', qtype, 1)
+
+
+def parse_response(data: bytes, query_id: int) -> Optional[int]:
+    """应答报文的 RCODE，不是对该查询的应答时返回 None"""
+    if len(data) < _HEADER.size:
+        return None
+    response_id, flags, *_ = _HEADER.unpack_from(data)
+    if response_id != query_id or not flags & 0x8000:
+        return None
+    return flags & 0x000F
+
+
+class _DnsProtocol(asyncio.DatagramProtocol):
+    def __init__(self, query_id: int, future: asyncio.Future):
+        self.query_id = query_id
+        self.future = future
+
+    def datagram_received(self, data: bytes, addr):
+        rcode = parse_response(data, self.query_id)
+        if rcode is not None and not self.future.done():
+            self.future.set_result(rcode)
+
+    def error_received(self, exc: Exception):
+        # ICMP 端口不可达等（Linux 上会报告给已连接的 UDP 套接字）
+        if not self.future.done():
+            self.future.set_exception(exc)
+
+
+# ---- 检查 ----
+
+async def query_dns(server: str, name: str = QUERY_NAME, timeout: float = 2.0, port: int = 53,
+                    start: float = None) -> Check:
+    """向 DNS 服务器发送一次查询（按 RETRY 间隔重发），NOERROR 或 NXDOMAIN 应答都说明服务器可用"""
+    start = start or time.perf_counter()
+    loop = asyncio.get_running_loop()
+    query_id = int.from_bytes(os.urandom(2), 'big')
+    future = loop.create_future()
+    try:
+        transport, _ = await loop.create_datagram_endpoint(lambda: _DnsProtocol(query_id, future),
+                                                           remote_addr=(server, port))
+    except OSError as e:
+        return Check(server, False, time.perf_counter() - start, str(e))
+    packet = build_query(name, query_id)
+    deadline = start + timeout
+    try:
+        while True:
+            transport.sendto(packet)
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                raise asyncio.TimeoutError
+            done, _ = await asyncio.wait((future,), timeout=min(RETRY, remaining))
+            if done:
+                break
+        rcode = future.result()
+    except asyncio.TimeoutError:
+        return Check(server, False, time.perf_counter() - start, '超时')
+    except OSError as e:
+        return Check(server, False, time.perf_counter() - start, e.strerror or str(e))
+    finally:
+        transport.close()
+    elapsed = time.perf_counter() - start
+    if rcode in (RCODE_NOERROR, RCODE_NXDOMAIN):
+        return Check(server, True, elapsed)
+    return Check(server, False, elapsed, 'RCODE %d' % rcode)
+
+
+async def _connect(host: str, port: int) -> bool:
+    try:
+        _, writer = await asyncio.open_connection(host, port)
+    except ConnectionRefusedError:
+        return True  # 收到 RST，网关可达，只是端口没有开放
+    writer.close()
+    return True
+
+
+async def probe_gateway(gateway: str, ports: tuple = GATEWAY_PORTS, timeout: float = 2.0,
+                        start: float = None) -> Check:
+    """同时向网关的多个端口发起 TCP 连接，任一端口连接成功或被拒绝即可达"""
+    start = start or time.perf_counter()
+    tasks = [asyncio.ensure_future(_connect(gateway, port)) for port in ports]
+    error = '超时'
+    try:
+        for future in asyncio.as_completed(tasks, timeout=max(0.0, start + timeout - time.perf_counter())):
+            try:
+                await future
+            except asyncio.TimeoutError:
+                raise  # 截止时间已到（Python 3.11 起 TimeoutError 是 OSError 的子类，需先于 OSError 处理）
+            except OSError as e:
+                error = e.strerror or str(e)  # 网络不可达等，继续等其他端口
+                continue
+            return Check(gateway, True, time.perf_counter() - start)
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        for task in tasks:
+            task.cancel()
+    return Check(gateway, False, time.perf_counter() - start, error)
+
+
+async def check(gateway: str, dns: tuple, timeout: float = 2.0, name: str = QUERY_NAME, dns_port: int = 53,
+                gateway_ports: tuple = GATEWAY_PORTS) -> VerifyResult:
+    """并行检查网关和全部DNS服务器
+
+    Args:
+        gateway (str): 默认网关，为空时不检查
+        dns (tuple): DNS服务器
+        timeout (float): 截止时间（秒，从开始检查算起）
+        name (str): 查询的域名
+        dns_port (int): DNS 端口
+        gateway_ports (tuple): 探测网关的 TCP 端口
+
+    Returns:
+        VerifyResult: 各项结果和首个DNS应答的时间
+    """
+    start = time.perf_counter()
+    servers = tuple(server for server in dns or () if server)
+    jobs = [query_dns(server, name, timeout, dns_port, start) for server in servers]
+    if gateway:
+        jobs.append(probe_gateway(gateway, gateway_ports, timeout, start))
+    results = await asyncio.gather(*jobs)
+    elapsed = time.perf_counter() - start
+
+    gateway_check = results[-1] if gateway else None
+    dns_checks = tuple(results[:len(servers)])
+    answered = [item.elapsed for item in dns_checks if item.ok]
+    first_dns = min(answered) if answered else None
+    ok = (gateway_check is None or gateway_check.ok) and (not servers or first_dns is not None)
+    return VerifyResult(ok, describe(gateway_check, dns_checks, first_dns), gateway_check, dns_checks,
+                        first_dns, elapsed)
+
+
+def describe(gateway: Optional[Check], dns: tuple, first_dns: Optional[float]) -> str:
+    """提示信息，如：连通性：网关 3 ms，DNS 223.5.5.5 12 ms / 223.6.6.6 不可用（超时），首个DNS应答 12 ms"""
+    def item(check_: Check) -> str:
+        return '%.0f ms' % (check_.elapsed * 1000) if check_.ok else '不可用（%s）' % check_.error
+
+    parts = []
+    if gateway is not None:
+        parts.append('网关 %s' % item(gateway))
+    if dns:
+        parts.append('DNS %s' % ' / '.join('%s %s' % (check_.target, item(check_)) for check_ in dns))
+        parts.append('首个DNS应答 %.0f ms' % (first_dns * 1000) if first_dns is not None else '没有可用的DNS')
+    return '连通性：%s' % ('，'.join(parts) or '未配置网关和DNS，不检查')
+
+
+def check_sync(gateway: str, dns: tuple, timeout: float = 2.0, **kwargs) -> VerifyResult:
+    """在当前线程中执行 check（后台线程、命令行使用）"""
+    return asyncio.run(check(gateway, dns, timeout, **kwargs))
+
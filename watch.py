@@ -0,0 +1,233 @@
+"""
+网卡变化通知
+
+订阅系统的网卡/地址/路由变化事件并放入队列，经过防抖后批量回调，
+用于增量刷新网卡列表和当前网卡的配置，而不是定时启动 Shell 轮询：
+- Linux：rtnetlink 多播组（RTMGRP_LINK / RTMGRP_IPV4_IFADDR / RTMGRP_IPV4_ROUTE）
+- Windows：IP Helper 的 NotifyIpInterfaceChange / NotifyUnicastIpAddressChange / NotifyRouteChange2
+"""
+import ctypes
+import errno
+import queue
+import socket
+import sys
+import threading
+import time
+from typing import Callable, NamedTuple, Optional
+
+import netlink
+
+LINK = 'link'
+ADDRESS = 'address'
+ROUTE = 'route'
+
+
+class NetEvent(NamedTuple):
+    """一次网卡变化
+
+    Attributes:
+        kind (str): 变化类型（LINK / ADDRESS / ROUTE）
+        action (str): "new" / "del" / "change"
+        index (int): 接口索引，未知时为 0
+    """
+    kind: str
+    action: str
+    index: int = 0
+
+
+class NetlinkWatcher:
+    """通过 rtnetlink 多播组接收变化事件（Linux）"""
+
+    RTMGRP_LINK = 0x1
+    RTMGRP_IPV4_IFADDR = 0x10
+    RTMGRP_IPV4_ROUTE = 0x40
+
+    def __init__(self, events: queue.Queue):
+        self.events: queue.Queue = events
+        self._sock: Optional[socket.socket] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        self._sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW | socket.SOCK_CLOEXEC, netlink.NETLINK_ROUTE)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+        self._sock.bind((0, self.RTMGRP_LINK | self.RTMGRP_IPV4_IFADDR | self.RTMGRP_IPV4_ROUTE))
+        self._sock.settimeout(0.5)
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='netset-netlink-watch', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                data = self._sock.recv(1 << 17)
+            except socket.timeout:
+                continue
+            except OSError as e:
+                # 接收缓冲区溢出时丢失了事件，按"全部变化"处理
+                if e.errno == errno.ENOBUFS:
+                    self.events.put(NetEvent(LINK, 'change'))
+                    continue
+                break
+            for event in self.parse(data):
+                self.events.put(event)
+
+    @staticmethod
+    def parse(data: bytes) -> list:
+        """把一个多播数据包解析为 NetEvent 列表"""
+        events = []
+        for kind, _, _, payload in netlink.iter_messages(data):
+            action = 'del' if kind in (netlink.RTM_DELLINK, netlink.RTM_DELADDR, netlink.RTM_DELROUTE) else 'new'
+            if kind in (netlink.RTM_NEWLINK, netlink.RTM_DELLINK):
+                events.append(NetEvent(LINK, action, netlink.parse_link(payload).index))
+            elif kind in (netlink.RTM_NEWADDR, netlink.RTM_DELADDR):
+                events.append(NetEvent(ADDRESS, action, netlink.parse_addr(payload)[0]))
+            elif kind in (netlink.RTM_NEWROUTE, netlink.RTM_DELROUTE):
+                index, dst_len, _, table, _, _ = netlink.parse_route(payload)
+                # 只关心主路由表的默认路由
+                if dst_len == 0 and table == netlink.RT_TABLE_MAIN:
+                    events.append(NetEvent(ROUTE, action, index))
+        return events
+
+
+class IpHelperWatcher:
+    """通过 IP Helper 变化通知接收事件（Windows）"""
+
+    AF_INET = 2
+    _ACTIONS = {1: 'new', 2: 'del'}
+    # 各通知结构体中 InterfaceIndex 的偏移
+    _INDEX_OFFSETS = {LINK: 16, ADDRESS: 40, ROUTE: 8}
+
+    def __init__(self, events: queue.Queue):
+        self.events: queue.Queue = events
+        self._handles: list = []
+        self._callbacks: list = []  # 保持回调对象的引用，防止被回收
+        self._cancel: Optional[Callable] = None
+
+    def start(self):
+        iphlpapi = ctypes.WinDLL('iphlpapi')
+        # 先取得注销函数：后面的注册失败时 stop() 要注销已经注册的通知
+        self._cancel = iphlpapi.CancelMibChangeNotify2
+        callback_type = ctypes.WINFUNCTYPE(None, ctypes.c_void_p, ctypes.c_void_p, ctypes.c_int)
+        for kind, register in ((LINK, iphlpapi.NotifyIpInterfaceChange),
+                               (ADDRESS, iphlpapi.NotifyUnicastIpAddressChange),
+                               (ROUTE, iphlpapi.NotifyRouteChange2)):
+            callback = callback_type(self._make_callback(kind))
+            handle = ctypes.c_void_p()
+            code = register(self.AF_INET, callback, None, False, ctypes.byref(handle))
+            if code:
+                self.stop()
+                raise OSError(code, '注册网卡变化通知失败')
+            self._callbacks.append(callback)
+            self._handles.append(handle)
+
+    def _make_callback(self, kind: str):
+        offset = self._INDEX_OFFSETS[kind]
+
+        def callback(_context, row, notification_type):
+            index = ctypes.c_uint32.from_address(row + offset).value if row else 0
+            self.events.put(NetEvent(kind, self._ACTIONS.get(notification_type, 'change'), index))
+        return callback
+
+    def stop(self):
+        for handle in self._handles:
+            self._cancel(handle)
+        self._handles.clear()
+        self._callbacks.clear()
+
+
+class AdapterWatcher:
+    """网卡变化订阅：事件队列 + 防抖批量回调
+
+    事件到达后等待 delay 秒内没有新事件（最长 max_delay 秒）再回调一次，
+    回调参数为这段时间内去重后的事件列表。回调在后台线程中执行。
+
+    Attributes:
+        events (queue.Queue): 原始事件队列，也可以直接放入事件（用于测试）
+        delay (float): 防抖静默时间（秒）
+        max_delay (float): 持续有事件时的最长等待时间（秒）
+        batches (int): 已回调的批次数
+    """
+
+    def __init__(self, callback: Callable[[list], None], delay: float = 0.3, max_delay: float = 2.0,
+                 source=None):
+        """
+        Args:
+            callback (Callable): 以事件列表为参数的回调
+            delay (float): 防抖静默时间（秒）
+            max_delay (float): 最长等待时间（秒）
+            source: 事件源类（NetlinkWatcher / IpHelperWatcher），为空时按平台选择，
+                为 False 时不订阅系统事件，只处理手动放入队列的事件
+        """
+        self.callback = callback
+        self.delay: float = delay
+        self.max_delay: float = max_delay
+        self.batches: int = 0
+        self.events: queue.Queue = queue.Queue()
+
+        if source is None:
+            source = IpHelperWatcher if sys.platform == 'win32' else NetlinkWatcher
+        self.source = source(self.events) if source else None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        if self.source is not None:
+            self.source.start()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='netset-watch-debounce', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self.source is not None:
+            self.source.stop()
+        self.events.put(None)
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def _run(self):
+        while not self._stopped.is_set():
+            event = self.events.get()
+            if event is None:
+                continue
+            batch = {event: None}
+            deadline = time.monotonic() + self.max_delay
+            # 防抖：静默 delay 秒或达到 max_delay 后批量回调
+            while (remaining := deadline - time.monotonic()) > 0:
+                try:
+                    event = self.events.get(timeout=min(self.delay, remaining))
+                except queue.Empty:
+                    break
+                if event is None:
+                    break
+                batch[event] = None
+            self.batches += 1
+            try:
+                self.callback(list(batch))
+            except Exception as e:
+                print(f'网卡变化回调报错\n{e}')
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def changed_indexes(events: list) -> set:
+    """事件涉及的接口索引，包含未知索引（0）时返回空集合表示"全部"""
+    indexes = {event.index for event in events}
+    return set() if 0 in indexes else indexes
+
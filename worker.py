@@ -0,0 +1,138 @@
+import itertools
+import threading
+import traceback
+from typing import Callable, Optional
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+
+class _TaskSignals(QObject):
+    """后台任务信号（跨线程以队列方式投递到界面线程）"""
+    finished = pyqtSignal(int, object)  # 任务编号, 结果
+    failed = pyqtSignal(int, str)  # 任务编号, 错误信息
+
+
+_SKIPPED = object()  # 被合并掉的过期任务的结果占位
+
+
+class _Task(QRunnable):
+    """在线程池中执行的单个任务"""
+
+    def __init__(self, executor: 'NetExecutor', ticket: int, fn: Callable, args: tuple, kwargs: dict):
+        super().__init__()
+        self.executor = executor
+        self.ticket = ticket
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = executor.signals
+
+    def run(self):
+        # 排队期间已有更新的请求，直接丢弃
+        if self.executor.is_stale(self.ticket):
+            self.signals.finished.emit(self.ticket, _SKIPPED)
+            return
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            traceback.print_exc()
+            self.signals.failed.emit(self.ticket, f'{type(e).__name__}: {e}')
+        else:
+            self.signals.finished.emit(self.ticket, result)
+
+
+class SignalBridge(QObject):
+    """把后台线程中的回调转为界面线程中的信号（用作 AdapterWatcher 的回调）"""
+    triggered = pyqtSignal(object)
+
+    def __call__(self, value):
+        self.triggered.emit(value)
+
+
+class NetExecutor(QObject):
+    """后台执行 NetManage 操作，结果通过信号回到界面线程
+
+    同一通道（channel）的请求采用"最新者胜"的合并策略：
+    排队中的过期请求不会执行，已在执行的过期请求结果会被丢弃，
+    只有最后一次提交的请求会回调。
+
+    Signals:
+        busy_changed (bool): 是否有任务在执行
+        error (str, str): 通道, 错误信息
+    """
+
+    busy_changed = pyqtSignal(bool)
+    error = pyqtSignal(str, str)
+
+    def __init__(self, parent: QObject = None, max_threads: int = 2):
+        super().__init__(parent)
+        self.pool: QThreadPool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+
+        self.signals = _TaskSignals()
+        self.signals.finished.connect(self._on_finished)
+        self.signals.failed.connect(self._on_failed)
+
+        self._lock = threading.Lock()
+        self._tickets = itertools.count(1)
+        self._latest: dict = {}  # 通道 -> 最新的可合并任务编号
+        self._tasks: dict = {}  # 任务编号 -> (通道, 回调, 是否合并)
+
+    def submit(self, channel: str, fn: Callable, *args, callback: Optional[Callable] = None,
+               coalesce: bool = True, **kwargs) -> int:
+        """提交后台任务
+
+        Args:
+            channel (str): 任务通道，如"adapter"、"apply:以太网"
+            fn (Callable): 在后台线程执行的函数
+            callback (Callable): 在界面线程中以结果为参数调用
+            coalesce (bool): 是否与同通道的请求合并（修改类操作应为 False）
+
+        Returns:
+            int: 任务编号
+        """
+        with self._lock:
+            ticket = next(self._tickets)
+            if coalesce:
+                self._latest[channel] = ticket
+            self._tasks[ticket] = (channel, callback, coalesce)
+            busy = len(self._tasks) == 1
+
+        if busy:
+            self.busy_changed.emit(True)
+        self.pool.start(_Task(self, ticket, fn, args, kwargs))
+        return ticket
+
+    def cancel(self, channel: str):
+        """使该通道所有未完成的可合并任务过期"""
+        with self._lock:
+            self._latest[channel] = next(self._tickets)
+
+    def is_stale(self, ticket: int) -> bool:
+        """判断任务是否已被同通道的更新请求取代（不合并的任务永不过期）"""
+        with self._lock:
+            channel, _, coalesce = self._tasks.get(ticket, ('', None, False))
+            return coalesce and ticket < self._latest.get(channel, 0)
+
+    def _finish(self, ticket: int):
+        stale = self.is_stale(ticket)
+        with self._lock:
+            channel, callback, _ = self._tasks.pop(ticket)
+            idle = not self._tasks
+        if idle:
+            self.busy_changed.emit(False)
+        return channel, None if stale else callback, stale
+
+    def _on_finished(self, ticket: int, result):
+        _, callback, _ = self._finish(ticket)
+        if callback is not None and result is not _SKIPPED:
+            callback(result)
+
+    def _on_failed(self, ticket: int, message: str):
+        channel, _, stale = self._finish(ticket)
+        if not stale:
+            self.error.emit(channel, message)
+
+    def wait(self, msecs: int = -1) -> bool:
+        """等待所有任务完成（退出程序前调用）"""
+        return self.pool.waitForDone(msecs)